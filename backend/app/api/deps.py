@@ -0,0 +1,69 @@
+"""
+Shared API dependencies
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Header, HTTPException, Query
+
+from app.core.date_ranges import DEFAULT_PERIOD, PERIODS, DateRange, resolve_date_range
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+DEFAULT_TENANT_ID = "default"
+
+
+async def get_tenant_id(x_tenant_id: Optional[str] = Header(None, alias="X-Tenant-ID")) -> str:
+    """
+    Resolve the tenant making the request
+
+    The Next.js frontend forwards the signed-in tenant as ``X-Tenant-ID``;
+    requests without it share the default tenant.
+    """
+    return x_tenant_id or DEFAULT_TENANT_ID
+
+
+@dataclass
+class ListParams:
+    """Pagination, sorting and filter parameters of a list endpoint"""
+    sort: Optional[str] = None
+    status: Optional[str] = None
+    min_cost: Optional[float] = None
+    min_clicks: Optional[int] = None
+    page_size: Optional[int] = None
+    page_token: Optional[str] = None
+
+    @property
+    def requested(self) -> bool:
+        """False for a plain request, which keeps the unpaginated response"""
+        return any(value is not None for value in vars(self).values())
+
+
+async def get_list_params(
+    sort: Optional[str] = Query(None, description="Sort field; prefix with '-' for descending, e.g. -cost"),
+    status: Optional[str] = Query(None, description="Comma-separated statuses to include (ENABLED, PAUSED)"),
+    min_cost: Optional[float] = Query(None, ge=0, description="Only rows that spent at least this much"),
+    min_clicks: Optional[int] = Query(None, ge=0, description="Only rows with at least this many clicks"),
+    page_size: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description=f"Rows per page (default {DEFAULT_PAGE_SIZE})"),
+    page_token: Optional[str] = Query(None, description="next_page_token of the previous page")
+) -> ListParams:
+    return ListParams(sort, status, min_cost, min_clicks, page_size, page_token)
+
+
+def get_date_range(default: Optional[str] = DEFAULT_PERIOD):
+    """
+    Dependency resolving ``period`` or ``start_date``/``end_date`` to concrete dates
+
+    ``default`` is the period used when neither is given; with None the
+    dependency yields None and the endpoint keeps its undated behavior.
+    """
+    async def dependency(
+        period: Optional[str] = Query(None, description=f"Predefined period: {', '.join(PERIODS)}"),
+        start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD, inclusive)"),
+        end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD, inclusive)")
+    ) -> Optional[DateRange]:
+        try:
+            return resolve_date_range(period, start_date, end_date, default)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return dependency
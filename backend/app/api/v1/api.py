@@ -5,7 +5,7 @@ Main API router
 from fastapi import APIRouter
 
 from app.api.v1.endpoints import auth, users, agents
-from app.api.v1 import google_ads, meta_ads
+from app.api.v1 import google_ads, meta_ads, performance, jobs
 
 api_router = APIRouter()
 
@@ -14,4 +14,6 @@ api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(agents.router, prefix="/agents", tags=["ai-agents"])
 api_router.include_router(google_ads.router, tags=["google-ads"])
-api_router.include_router(meta_ads.router, tags=["meta-ads"]) 
\ No newline at end of file
+api_router.include_router(meta_ads.router, tags=["meta-ads"])
+api_router.include_router(performance.router, tags=["performance"])
+api_router.include_router(jobs.router, tags=["jobs"])
\ No newline at end of file
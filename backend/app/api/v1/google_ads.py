@@ -1,11 +1,47 @@
-from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, Query, Depends, BackgroundTasks
+import json
+import asyncio
+import numpy as np
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from datetime import datetime
+from dataclasses import asdict, replace
 
-from app.services.google_ads_service import google_ads_service, CampaignData
+from app.services.google_ads_service import (
+    google_ads_service,
+    AdGroupData,
+    CampaignData,
+    KeywordData,
+    LIST_STATUSES,
+    CAMPAIGN_LIST_FIELDS,
+    AD_GROUP_LIST_FIELDS,
+    KEYWORD_LIST_FIELDS,
+)
 from app.services.ai_agent_service import ai_agent_service, AIInsight
+from app.services.llm_cache import llm_response_cache
+from app.services.rules_engine import rule_to_dict
+from app.services.insight_store import insight_store, insight_scope
+from app.services.insights import data_window, unique_ids
+from app.services.scheduler import optimization_scheduler
+from app.services.response_cache import response_cache
+from app.services.currency import format_money
+from app.services.jobs import ProgressCallback, ignore_progress, register_job
+from app.api.deps import get_tenant_id, get_list_params, get_date_range, ListParams
+from app.api.v1.jobs import get_tenant_job, submit_job
+from app.core.cache import TTLCache, hash_key
 from app.core.config import get_settings
+from app.core.date_ranges import DateRange, resolve_date_range
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    ListQuery,
+    decode_page_token,
+    encode_page_token,
+    parse_sort,
+    parse_statuses,
+    select_rows,
+)
+from app.core.responses import FastJSONResponse, fast_response, record_columns
 
 settings = get_settings()
 
@@ -52,6 +88,46 @@ class OptimizationRequest(BaseModel):
     optimization_type: str
     campaign_ids: Optional[List[str]] = None
     auto_apply: bool = False
+    background: bool = False  # run as a job: return a job id to poll instead of waiting
+
+
+def serialize_insight(insight: AIInsight) -> Dict[str, Any]:
+    """Convert an AIInsight into the API response shape"""
+    return {
+        "id": insight.id,
+        "type": insight.type,
+        "title": insight.title,
+        "description": insight.description,
+        "impact": insight.impact,
+        "confidence": insight.confidence,
+        "campaign_id": insight.campaign_id,
+        "actionable": insight.actionable,
+        "action_type": insight.action_type,
+        "action_data": insight.action_data,
+        "created_at": insight.created_at,
+        "priority": insight.priority
+    }
+
+
+async def store_insights(scope: str, insights: List[AIInsight], since: Optional[int] = None):
+    """
+    Upsert insights into the insight store
+
+    Stamps each insight with when it was first seen and, if ``since`` is given,
+    drops the ones that have not changed after that cursor. Returns the
+    remaining insights and the cursor to send back.
+    """
+    # Repeats of a finding are dropped; distinct findings sharing an id are kept under their own ids
+    insights = unique_ids(insights)
+    stored = await asyncio.to_thread(insight_store.upsert, scope, insights)
+    for insight in insights:
+        insight.created_at = stored[insight.id].first_seen
+    
+    cursor = max((entry.seq for entry in stored.values()), default=0)
+    if since is not None:
+        insights = [insight for insight in insights if stored[insight.id].seq > since]
+        cursor = max(cursor, since)
+    return insights, cursor
 
 
 # Authentication & Setup Endpoints
@@ -106,37 +182,123 @@ async def get_accessible_customers():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Paginated list endpoints
+# Pages ending within this many rows are fetched with GAQL LIMIT; deeper pages
+# are served from a columnar snapshot of the whole list
+PUSHDOWN_MAX_ROWS = 1000
+LIST_COLUMN_DTYPES = {
+    "budget_amount": np.float64,
+    "cpc_bid": np.float64,
+    "impressions": np.int64,
+    "clicks": np.int64,
+    "conversions": np.float64,
+    "cost": np.float64,
+    "ctr": np.float64,
+    "cpc": np.float64,
+}
+list_snapshots = TTLCache(max_entries=64)
+
+
+async def load_list_page(route: str, items_key: str, tenant_id: str, customer_id: str, parent: Dict[str, Any],
+                         params: ListParams, fields: Dict[str, str], default_sort: Optional[str],
+                         fetch: Callable[[Optional[ListQuery]], Awaitable[list]],
+                         to_dict: Callable[[Any], Dict[str, Any]], refresh: bool = False) -> Dict[str, Any]:
+    """
+    One page of a list endpoint
+
+    Filters, sort order and a LIMIT covering the page are pushed into GAQL.
+    Past ``PUSHDOWN_MAX_ROWS``, or while a snapshot is cached, the whole list
+    is held as columns and pages are filtered, sorted and sliced in memory.
+    Both snapshots and pages are keyed through the response cache, so
+    mutations invalidate them with the rest of the customer's responses.
+    """
+    sort, descending = parse_sort(params.sort or default_sort, [f for f in fields if f != "status"])
+    query = ListQuery(sort, descending, parse_statuses(params.status, LIST_STATUSES), params.min_cost, params.min_clicks)
+    scope = hash_key(route, customer_id, json.dumps(parent, sort_keys=True), query.fingerprint)
+    offset = decode_page_token(params.page_token, scope)
+    page_size = params.page_size or DEFAULT_PAGE_SIZE
+    end = offset + page_size
+
+    snapshot_key = await response_cache.make_key(f"{route}_snapshot", tenant_id, customer_id, parent)
+
+    async def load_page() -> Dict[str, Any]:
+        snapshot = None if refresh else list_snapshots.get(snapshot_key)
+        if snapshot is None and end <= PUSHDOWN_MAX_ROWS:
+            records = await fetch(replace(query, limit=end + 1))
+            page, has_more, total = records[offset:end], len(records) > end, None
+        else:
+            if snapshot is None:
+                records = await fetch(None)
+                snapshot = (records, record_columns(records, fields, LIST_COLUMN_DTYPES))
+                list_snapshots.set(snapshot_key, snapshot, ttl=response_cache.ttl_for(route))
+            records, columns = snapshot
+            rows = select_rows(columns, query)
+            page, has_more, total = [records[i] for i in rows[offset:end]], len(rows) > end, len(rows)
+        return {
+            items_key: [to_dict(record) for record in page],
+            "page_size": page_size,
+            "next_page_token": encode_page_token(end, scope) if has_more else None,
+            "total": total
+        }
+
+    return await response_cache.get_or_load(
+        route, tenant_id, customer_id,
+        {**parent, "query": query.fingerprint, "offset": offset, "page_size": page_size},
+        load_page, refresh=refresh
+    )
+
+
 # Campaign Management Endpoints
+def campaign_to_dict(c: CampaignData) -> Dict[str, Any]:
+    return {
+        "id": c.id,
+        "name": c.name,
+        "status": c.status,
+        "budget_amount": c.budget_amount,
+        "start_date": c.start_date,
+        "end_date": c.end_date,
+        "currency": c.currency,
+        "metrics": {
+            "impressions": c.impressions,
+            "clicks": c.clicks,
+            "conversions": c.conversions,
+            "cost": c.cost,
+            "ctr": c.ctr,
+            "cpc": c.cpc,
+            "conversion_rate": c.conversion_rate
+        }
+    }
+
+
+async def load_campaigns(customer_id: str, date_range: DateRange) -> Dict[str, Any]:
+    """Campaigns response body, as cached by the response cache"""
+    campaigns = await google_ads_service.get_campaigns(customer_id, date_range=date_range)
+    return {"campaigns": [campaign_to_dict(c) for c in campaigns], "date_range": date_range.to_params()}
+
+
 @router.get("/campaigns")
 async def get_campaigns(
-    customer_id: str = Query(..., description="Google Ads Customer ID")
+    customer_id: str = Query(..., description="Google Ads Customer ID"),
+    refresh: bool = Query(False, description="Bypass the response cache"),
+    date_range: DateRange = Depends(get_date_range()),
+    params: ListParams = Depends(get_list_params),
+    tenant_id: str = Depends(get_tenant_id)
 ):
-    """Get all campaigns for a customer"""
+    """Get all campaigns for a customer, or one page of them when paginating, sorting or filtering"""
     try:
-        campaigns = await google_ads_service.get_campaigns(customer_id)
-        return {
-            "campaigns": [
-                {
-                    "id": c.id,
-                    "name": c.name,
-                    "status": c.status,
-                    "budget_amount": c.budget_amount,
-                    "start_date": c.start_date,
-                    "end_date": c.end_date,
-                    "currency": c.currency,
-                    "metrics": {
-                        "impressions": c.impressions,
-                        "clicks": c.clicks,
-                        "conversions": c.conversions,
-                        "cost": c.cost,
-                        "ctr": c.ctr,
-                        "cpc": c.cpc,
-                        "conversion_rate": c.conversion_rate
-                    }
-                }
-                for c in campaigns
-            ]
-        }
+        if params.requested:
+            return await load_list_page(
+                "google_campaigns", "campaigns", tenant_id, customer_id, date_range.to_params(), params,
+                CAMPAIGN_LIST_FIELDS, "-cost",
+                lambda query: google_ads_service.get_campaigns(customer_id, query, date_range),
+                campaign_to_dict, refresh
+            )
+        return await response_cache.get_or_load(
+            "google_campaigns", tenant_id, customer_id, date_range.to_params(),
+            lambda: load_campaigns(customer_id, date_range), refresh=refresh
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -156,6 +318,7 @@ async def create_campaign(
         }
         
         campaign_id = await google_ads_service.create_campaign(customer_id, campaign_data)
+        await response_cache.invalidate(customer_id)
         return {"success": True, "campaign_id": campaign_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -171,6 +334,7 @@ async def update_campaign(
     try:
         update_data = {k: v for k, v in updates.dict().items() if v is not None}
         success = await google_ads_service.update_campaign(customer_id, campaign_id, update_data)
+        await response_cache.invalidate(customer_id)
         return {"success": success}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -184,124 +348,389 @@ async def delete_campaign(
     """Delete a campaign"""
     try:
         success = await google_ads_service.delete_campaign(customer_id, campaign_id)
+        await response_cache.invalidate(customer_id)
         return {"success": success}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # Ad Groups Endpoints
+def ad_group_to_dict(ag: AdGroupData) -> Dict[str, Any]:
+    return {
+        "id": ag.id,
+        "name": ag.name,
+        "campaign_id": ag.campaign_id,
+        "status": ag.status,
+        "cpc_bid": ag.cpc_bid,
+        "metrics": {
+            "impressions": ag.impressions,
+            "clicks": ag.clicks,
+            "conversions": ag.conversions,
+            "cost": ag.cost
+        }
+    }
+
+
+async def load_ad_groups(customer_id: str, campaign_id: Optional[str],
+                         date_range: Optional[DateRange] = None) -> Dict[str, Any]:
+    """Ad groups response body, as cached by the response cache"""
+    ad_groups = await google_ads_service.get_ad_groups(customer_id, campaign_id, date_range=date_range)
+    response = {"ad_groups": [ad_group_to_dict(ag) for ag in ad_groups]}
+    if date_range is not None:
+        response["date_range"] = date_range.to_params()
+    return response
+
+
 @router.get("/ad-groups")
 async def get_ad_groups(
     customer_id: str = Query(..., description="Google Ads Customer ID"),
-    campaign_id: Optional[str] = Query(None, description="Filter by campaign ID")
+    campaign_id: Optional[str] = Query(None, description="Filter by campaign ID"),
+    refresh: bool = Query(False, description="Bypass the response cache"),
+    date_range: Optional[DateRange] = Depends(get_date_range(default=None)),
+    params: ListParams = Depends(get_list_params),
+    tenant_id: str = Depends(get_tenant_id)
 ):
-    """Get ad groups"""
+    """Get ad groups, or one page of them when paginating, sorting or filtering"""
     try:
-        ad_groups = await google_ads_service.get_ad_groups(customer_id, campaign_id)
-        return {
-            "ad_groups": [
-                {
-                    "id": ag.id,
-                    "name": ag.name,
-                    "campaign_id": ag.campaign_id,
-                    "status": ag.status,
-                    "cpc_bid": ag.cpc_bid,
-                    "metrics": {
-                        "impressions": ag.impressions,
-                        "clicks": ag.clicks,
-                        "conversions": ag.conversions,
-                        "cost": ag.cost
-                    }
-                }
-                for ag in ad_groups
-            ]
-        }
+        parent = {"campaign_id": campaign_id, **(date_range.to_params() if date_range else {})}
+        if params.requested:
+            response = await load_list_page(
+                "google_ad_groups", "ad_groups", tenant_id, customer_id, parent, params,
+                AD_GROUP_LIST_FIELDS, None,
+                lambda query: google_ads_service.get_ad_groups(customer_id, campaign_id, query, date_range),
+                ad_group_to_dict, refresh
+            )
+        else:
+            response = await response_cache.get_or_load(
+                "google_ad_groups", tenant_id, customer_id, parent,
+                lambda: load_ad_groups(customer_id, campaign_id, date_range), refresh=refresh
+            )
+        return fast_response(response)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # Keywords Endpoints
+KEYWORD_COLUMNS = (
+    "id", "text", "match_type", "ad_group_id", "status", "cpc_bid", "quality_score",
+    "impressions", "clicks", "conversions", "cost"
+)
+KEYWORD_COLUMN_DTYPES = {
+    "cpc_bid": np.float64,
+    "impressions": np.int64,
+    "clicks": np.int64,
+    "conversions": np.float64,
+    "cost": np.float64,
+}
+
+
+def keyword_to_dict(kw: KeywordData) -> Dict[str, Any]:
+    return {
+        "id": kw.id,
+        "text": kw.text,
+        "match_type": kw.match_type,
+        "ad_group_id": kw.ad_group_id,
+        "status": kw.status,
+        "cpc_bid": kw.cpc_bid,
+        "quality_score": kw.quality_score,
+        "metrics": {
+            "impressions": kw.impressions,
+            "clicks": kw.clicks,
+            "conversions": kw.conversions,
+            "cost": kw.cost
+        }
+    }
+
+
 @router.get("/keywords")
 async def get_keywords(
     customer_id: str = Query(..., description="Google Ads Customer ID"),
-    ad_group_id: Optional[str] = Query(None, description="Filter by ad group ID")
+    ad_group_id: Optional[str] = Query(None, description="Filter by ad group ID"),
+    format: str = Query("rows", pattern="^(rows|columns)$", description="rows (one object per keyword) or columns (one array per field)"),
+    refresh: bool = Query(False, description="Bypass the response cache (paginated requests)"),
+    date_range: Optional[DateRange] = Depends(get_date_range(default=None)),
+    params: ListParams = Depends(get_list_params),
+    tenant_id: str = Depends(get_tenant_id)
 ):
-    """Get keywords"""
+    """Get keywords, or one page of them when paginating, sorting or filtering"""
     try:
-        keywords = await google_ads_service.get_keywords(customer_id, ad_group_id)
-        return {
-            "keywords": [
-                {
-                    "id": kw.id,
-                    "text": kw.text,
-                    "match_type": kw.match_type,
-                    "ad_group_id": kw.ad_group_id,
-                    "status": kw.status,
-                    "cpc_bid": kw.cpc_bid,
-                    "quality_score": kw.quality_score,
-                    "metrics": {
-                        "impressions": kw.impressions,
-                        "clicks": kw.clicks,
-                        "conversions": kw.conversions,
-                        "cost": kw.cost
-                    }
-                }
-                for kw in keywords
-            ]
-        }
+        date_params = date_range.to_params() if date_range else {}
+        if params.requested:
+            return fast_response(await load_list_page(
+                "google_keywords", "keywords", tenant_id, customer_id, {"ad_group_id": ad_group_id, **date_params},
+                params, KEYWORD_LIST_FIELDS, None,
+                lambda query: google_ads_service.get_keywords(customer_id, ad_group_id, query, date_range),
+                keyword_to_dict, refresh
+            ))
+        keywords = await google_ads_service.get_keywords(customer_id, ad_group_id, date_range=date_range)
+        if format == "columns":
+            return FastJSONResponse({
+                "count": len(keywords),
+                "columns": record_columns(keywords, KEYWORD_COLUMNS, KEYWORD_COLUMN_DTYPES),
+                **({"date_range": date_params} if date_params else {})
+            })
+        response = {"keywords": [keyword_to_dict(kw) for kw in keywords]}
+        if date_params:
+            response["date_range"] = date_params
+        return fast_response(response)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # AI Agent Endpoints
+async def load_ai_insights(customer_id: str, campaign_id: Optional[str], time_budget: Optional[float],
+                           since: Optional[int], tenant_id: str, date_range: DateRange,
+                           progress: ProgressCallback = ignore_progress) -> Dict[str, Any]:
+    """``/insights`` response body, also produced by insights jobs"""
+    # Get campaign data
+    progress(0.1, "Loading campaigns")
+    campaigns = await google_ads_service.get_campaigns(customer_id, date_range=date_range)
+    
+    if campaign_id:
+        campaigns = [c for c in campaigns if c.id == campaign_id]
+    
+    # Keep the daily anomaly baselines current for the next request
+    ai_agent_service.schedule_anomaly_refresh(customer_id)
+    
+    # Generate insights
+    progress(0.3, f"Analyzing {len(campaigns)} campaigns")
+    insights = await ai_agent_service.analyze_campaigns(
+        customer_id, campaigns, time_budget, tenant_id, data_window(date_range.days, date_range.end)
+    )
+    progress(0.9, "Storing insights")
+    insights, cursor = await store_insights(insight_scope(tenant_id, customer_id, "campaigns"), insights, since)
+    
+    return {
+        "insights": [serialize_insight(insight) for insight in insights],
+        "cursor": cursor,
+        "date_range": date_range.to_params()
+    }
+
+
+@register_job("google_ads.insights")
+async def insights_job(params: Dict[str, Any], tenant_id: str, progress: ProgressCallback) -> Dict[str, Any]:
+    params = dict(params)
+    # Resolved to concrete dates on submission, so a job queued before midnight reports the requested days
+    date_range = resolve_date_range(**params.pop("date_range"))
+    return await load_ai_insights(**params, tenant_id=tenant_id, date_range=date_range, progress=progress)
+
+
 @router.get("/insights")
 async def get_ai_insights(
+    request: Request,
     customer_id: str = Query(..., description="Google Ads Customer ID"),
-    campaign_id: Optional[str] = Query(None, description="Filter by campaign ID")
+    campaign_id: Optional[str] = Query(None, description="Filter by campaign ID"),
+    time_budget: Optional[float] = Query(None, gt=0, description="Max seconds to wait for AI insights"),
+    since: Optional[int] = Query(None, ge=0, description="Cursor from a previous response; only new or changed insights are returned"),
+    background: bool = Query(False, description="Run as a job: answer 202 with a job id to poll (see /jobs)"),
+    date_range: DateRange = Depends(get_date_range()),
+    tenant_id: str = Depends(get_tenant_id)
 ):
-    """Get AI-generated insights and recommendations"""
+    """
+    Get AI-generated insights and recommendations
+    
+    Campaign metrics cover ``period`` or ``start_date``/``end_date`` (last 30
+    days by default). Insight ids are stable across runs over the same dates.
+    Pass the returned ``cursor`` back as ``since`` to receive only insights
+    that are new or changed.
+    """
+    if background:
+        return submit_job(request, "google_ads.insights", tenant_id, {
+            "customer_id": customer_id, "campaign_id": campaign_id, "time_budget": time_budget, "since": since,
+            "date_range": date_range.to_params()
+        })
+    try:
+        return await load_ai_insights(customer_id, campaign_id, time_budget, since, tenant_id, date_range)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/insights/stream")
+async def stream_ai_insights(
+    customer_id: str = Query(..., description="Google Ads Customer ID"),
+    campaign_id: Optional[str] = Query(None, description="Filter by campaign ID"),
+    since: Optional[int] = Query(None, ge=0, description="Cursor from a previous response; only new or changed insights are returned"),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """
+    Stream AI insights as Server-Sent Events
+    
+    Rule-based insights are sent as soon as they are computed; LLM insights
+    follow one event at a time while the completion is still generating.
+    Ends with a ``done`` event carrying the total count and the cursor to
+    pass as ``since`` next time.
+    """
     try:
-        # Get campaign data
         campaigns = await google_ads_service.get_campaigns(customer_id)
-        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if campaign_id:
+        campaigns = [c for c in campaigns if c.id == campaign_id]
+    
+    scope = insight_scope(tenant_id, customer_id, "campaigns")
+    
+    async def event_stream():
+        count = 0
+        cursor = since or 0
+        try:
+            async for stage, insights in ai_agent_service.stream_campaign_insights(customer_id, campaigns, tenant_id):
+                insights, stage_cursor = await store_insights(scope, insights, since)
+                cursor = max(cursor, stage_cursor)
+                for insight in insights:
+                    count += 1
+                    payload = {"stage": stage, **serialize_insight(insight)}
+                    yield f"event: insight\ndata: {json.dumps(payload)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        yield f"event: done\ndata: {json.dumps({'count': count, 'cursor': cursor})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/anomalies")
+async def get_daily_anomalies(
+    customer_id: str = Query(..., description="Google Ads Customer ID"),
+    campaign_id: Optional[str] = Query(None, description="Filter by campaign ID")
+):
+    """Get campaigns whose latest day is out of line with their own recent baseline"""
+    anomalies = ai_agent_service.current_anomalies(customer_id, [campaign_id] if campaign_id else None)
+    last = ai_agent_service.anomaly_detector.last_date(customer_id)
+    return {
+        "anomalies": [asdict(anomaly) for anomaly in anomalies],
+        "through": last.isoformat() if last else None
+    }
+
+
+@router.post("/anomalies/refresh")
+async def refresh_daily_anomalies(
+    customer_ids: List[str] = Query(..., description="Google Ads Customer IDs")
+):
+    """Fetch new daily metrics and update the anomaly baselines"""
+    try:
+        return await ai_agent_service.refresh_daily_anomalies(customer_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/insights/latest")
+async def get_latest_insights(
+    customer_id: str = Query(..., description="Google Ads Customer ID"),
+    kind: str = Query("campaigns", pattern="^(campaigns|keywords)$", description="Insight kind"),
+    campaign_id: Optional[str] = Query(None, description="Filter by campaign ID"),
+    since: Optional[int] = Query(None, ge=0, description="Cursor from a previous response; only new or changed insights are returned"),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """
+    Get the insights last written by the background scheduler, without running an analysis
+    
+    Returns immediately from the insight store; schedule the account with
+    ``POST /google-ads/schedule`` to keep it fresh. Each scheduled run
+    replaces the previous run's insights, so without ``since`` this is what
+    the latest run found.
+    """
+    try:
+        scope = insight_scope(tenant_id, customer_id, kind)
+        insights = await asyncio.to_thread(insight_store.changes, scope, since or 0)
+        cursor = max(since or 0, await asyncio.to_thread(insight_store.cursor, scope))
         if campaign_id:
-            campaigns = [c for c in campaigns if c.id == campaign_id]
-        
-        # Generate insights
-        insights = await ai_agent_service.analyze_campaigns(customer_id, campaigns)
+            insights = [insight for insight in insights if insight.campaign_id == campaign_id]
+        if since is None:
+            insights.sort(key=lambda x: (x.priority, -x.confidence))
         
+        jobs = optimization_scheduler.jobs(customer_id, tenant_id)
         return {
-            "insights": [
-                {
-                    "id": insight.id,
-                    "type": insight.type,
-                    "title": insight.title,
-                    "description": insight.description,
-                    "impact": insight.impact,
-                    "confidence": insight.confidence,
-                    "campaign_id": insight.campaign_id,
-                    "actionable": insight.actionable,
-                    "action_type": insight.action_type,
-                    "action_data": insight.action_data,
-                    "created_at": insight.created_at,
-                    "priority": insight.priority
-                }
-                for insight in insights
-            ]
+            "insights": [serialize_insight(insight) for insight in insights],
+            "cursor": cursor,
+            "last_run": max((job["last_run"] for job in jobs if job["last_run"]), default=None)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/schedule")
+async def schedule_optimization_jobs(
+    customer_id: str = Query(..., description="Google Ads Customer ID"),
+    jobs: Optional[List[str]] = Query(None, description="Job kinds (anomalies, analysis, keywords); defaults to settings.scheduler_jobs"),
+    interval_seconds: Optional[int] = Query(None, ge=300, description="Seconds between runs"),
+    run_now: bool = Query(False, description="Run the jobs immediately instead of within the jitter window"),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """Schedule recurring background analysis and sync jobs for a customer"""
+    try:
+        scheduled = await ai_agent_service.schedule_optimization_tasks(
+            customer_id, tenant_id, jobs, interval_seconds, run_now
+        )
+        return {"jobs": scheduled}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/schedule")
+async def get_scheduled_jobs(
+    customer_id: Optional[str] = Query(None, description="Google Ads Customer ID"),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """Get scheduled jobs with the outcome of their last run"""
+    try:
+        return {
+            "jobs": optimization_scheduler.jobs(customer_id, tenant_id),
+            "scheduler": optimization_scheduler.stats()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.delete("/schedule")
+async def unschedule_optimization_jobs(
+    customer_id: str = Query(..., description="Google Ads Customer ID"),
+    jobs: Optional[List[str]] = Query(None, description="Job kinds to stop; all if omitted"),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """Stop a customer's recurring background jobs"""
+    try:
+        return {"removed": optimization_scheduler.unschedule(customer_id, tenant_id, jobs)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/insights/cache-stats")
+async def get_insights_cache_stats():
+    """Get hit-rate metrics for the AI analysis response cache"""
+    return {"enabled": settings.llm_cache_enabled, **llm_response_cache.stats()}
+
+
+@router.get("/insights/prompt-stats")
+async def get_insights_prompt_stats():
+    """Get prompt token counts for recent AI analysis requests"""
+    return ai_agent_service.get_prompt_stats()
+
+
 @router.get("/insights/keywords")
 async def get_keyword_insights(
     customer_id: str = Query(..., description="Google Ads Customer ID"),
-    ad_group_id: Optional[str] = Query(None, description="Filter by ad group ID")
+    ad_group_id: Optional[str] = Query(None, description="Filter by ad group ID"),
+    since: Optional[int] = Query(None, ge=0, description="Cursor from a previous response; only new or changed insights are returned"),
+    date_range: DateRange = Depends(get_date_range()),
+    tenant_id: str = Depends(get_tenant_id)
 ):
-    """Get keyword-specific AI insights"""
+    """Get the most important keyword AI insights (``keyword_insights_limit``; see ``/insights`` for dates and the ``since`` cursor)"""
     try:
-        keywords = await google_ads_service.get_keywords(customer_id, ad_group_id)
-        insights = await ai_agent_service.analyze_keywords(customer_id, keywords)
+        keywords = await google_ads_service.get_keywords(customer_id, ad_group_id, date_range=date_range)
+        insights = await ai_agent_service.analyze_keywords(
+            customer_id, keywords, tenant_id, data_window(date_range.days, date_range.end)
+        )
+        insights, cursor = await store_insights(insight_scope(tenant_id, customer_id, "keywords"), insights, since)
         
         return {
             "insights": [
@@ -316,86 +745,199 @@ async def get_keyword_insights(
                     "actionable": insight.actionable,
                     "action_type": insight.action_type,
                     "action_data": insight.action_data,
+                    "created_at": insight.created_at,
                     "priority": insight.priority
                 }
                 for insight in insights
-            ]
+            ],
+            "cursor": cursor,
+            "date_range": date_range.to_params()
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/rules")
+async def get_insight_rules(tenant_id: str = Depends(get_tenant_id)):
+    """Get the effective insight rules for the current tenant"""
+    return {
+        "rules": [rule_to_dict(rule) for rule in ai_agent_service.rules_engine.rules_for(tenant_id)],
+        "overrides": ai_agent_service.rules_engine.get_tenant_overrides(tenant_id)
+    }
+
+
+@router.put("/rules")
+async def update_insight_rules(
+    overrides: Dict[str, Dict[str, Any]],
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """
+    Replace the current tenant's rule overrides
+    
+    Body maps rule id to overridden fields, e.g.
+    ``{"high_cpc": {"params": {"max_cpc": 5.0}}, "budget_low": {"enabled": false}}``.
+    Params must be numbers and ``enabled`` a boolean; ``title`` and
+    ``description`` templates may only use the entity's columns and the
+    rule's params. Anything else is a 400.
+    """
+    try:
+        ai_agent_service.rules_engine.set_tenant_overrides(tenant_id, overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "overrides": ai_agent_service.rules_engine.get_tenant_overrides(tenant_id)}
+
+
+@router.get("/keywords/cannibalization")
+async def get_keyword_cannibalization(
+    customer_id: str = Query(..., description="Google Ads Customer ID"),
+    min_similarity: Optional[float] = Query(None, gt=0, le=1, description="Minimum estimated Jaccard similarity (default ~0.5)"),
+    date_range: DateRange = Depends(get_date_range())
+):
+    """Get clusters of near-duplicate keywords that compete with each other across ad groups (metrics over ``period``)"""
+    try:
+        keywords = await google_ads_service.get_keywords(customer_id, date_range=date_range)
+        clusters = await ai_agent_service.find_keyword_cannibalization(customer_id, keywords, min_similarity)
+        
+        return {
+            "clusters": clusters,
+            "total_clusters": len(clusters),
+            "keywords_indexed": len(ai_agent_service.keyword_dedup_index(customer_id)),
+            "date_range": date_range.to_params()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def load_keyword_suggestions(customer_id: str, campaign_id: str, limit: int, rerank: bool, tenant_id: str,
+                                   date_range: DateRange, progress: ProgressCallback = ignore_progress) -> Dict[str, Any]:
+    """``/keyword-suggestions`` response body, also produced by keyword suggestion jobs"""
+    # Get existing keywords (with their clicks and conversions over the range) and the campaign's ad groups
+    progress(0.1, "Loading keywords")
+    keywords, ad_groups = await asyncio.gather(
+        google_ads_service.get_keywords(customer_id, date_range=date_range),
+        google_ads_service.get_ad_groups(customer_id, campaign_id)
+    )
+    existing_keywords = [kw.text for kw in keywords]
+    campaign_ad_groups = {ad_group.id for ad_group in ad_groups}
+    seed_keywords = [kw.text for kw in keywords if kw.ad_group_id in campaign_ad_groups]
+    
+    progress(0.4, f"Indexing {len(keywords)} keywords")
+    await asyncio.gather(
+        ai_agent_service.index_keyword_terms(customer_id, keywords, tenant_id),
+        ai_agent_service.sync_keyword_dedup(customer_id, keywords)
+    )
+    progress(0.7, "Ranking suggestions")
+    suggestions = await ai_agent_service.generate_keyword_suggestions(
+        customer_id, campaign_id, existing_keywords,
+        seed_keywords=seed_keywords, tenant_id=tenant_id, limit=limit, rerank=rerank
+    )
+    
+    return {
+        "suggestions": [suggestion.keyword for suggestion in suggestions],
+        "details": [asdict(suggestion) for suggestion in suggestions]
+    }
+
+
+@register_job("google_ads.keyword_suggestions")
+async def keyword_suggestions_job(params: Dict[str, Any], tenant_id: str, progress: ProgressCallback) -> Dict[str, Any]:
+    params = dict(params)
+    date_range = resolve_date_range(**params.pop("date_range"))
+    return await load_keyword_suggestions(**params, tenant_id=tenant_id, date_range=date_range, progress=progress)
+
+
 @router.post("/keyword-suggestions")
 async def get_keyword_suggestions(
+    request: Request,
     customer_id: str = Query(..., description="Google Ads Customer ID"),
     campaign_id: str = Query(..., description="Campaign ID"),
+    limit: int = Query(10, ge=1, le=100, description="Number of suggestions"),
+    rerank: bool = Query(False, description="Let the LLM reorder the nearest-neighbour candidates"),
+    background: bool = Query(False, description="Run as a job: answer 202 with a job id to poll (see /jobs)"),
+    date_range: DateRange = Depends(get_date_range()),
+    tenant_id: str = Depends(get_tenant_id)
 ):
-    """Get AI-generated keyword suggestions"""
+    """Get keyword suggestions from the tenant's keyword and search-term index (keyword stats over ``period``)"""
+    if background:
+        return submit_job(request, "google_ads.keyword_suggestions", tenant_id, {
+            "customer_id": customer_id, "campaign_id": campaign_id, "limit": limit, "rerank": rerank,
+            "date_range": date_range.to_params()
+        })
     try:
-        # Get existing keywords
-        keywords = await google_ads_service.get_keywords(customer_id)
-        existing_keywords = [kw.text for kw in keywords]
-        
-        suggestions = await ai_agent_service.generate_keyword_suggestions(
-            customer_id, campaign_id, existing_keywords
-        )
-        
-        return {"suggestions": suggestions}
+        return await load_keyword_suggestions(customer_id, campaign_id, limit, rerank, tenant_id, date_range)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def run_optimization(customer_id: str, optimization: OptimizationRequest, tenant_id: str,
+                           progress: ProgressCallback = ignore_progress) -> Dict[str, Any]:
+    """``/optimize`` response body, also produced by optimization jobs"""
+    if optimization.auto_apply:
+        # One account snapshot and one grouped set of mutations for all campaigns
+        progress(0.1, "Planning changes")
+        outcome = await ai_agent_service.auto_optimize_campaigns(
+            customer_id, optimization.optimization_type, optimization.campaign_ids
+        )
+        if outcome["plan"]["budget_changes"] or outcome["plan"]["bid_changes"]:
+            await response_cache.invalidate(customer_id)
+        results = [
+            {"campaign_id": campaign_id, "result": result}
+            for campaign_id, result in outcome["results"].items()
+        ]
+        return {"results": results, "plan": outcome["plan"]}
+    
+    # Generate recommendations only
+    progress(0.1, "Analyzing campaigns")
+    results = await ai_agent_service.recommend_campaign_optimizations(
+        customer_id, optimization.campaign_ids, tenant_id
+    )
+    
+    return {"results": results}
+
+
+@register_job("google_ads.optimize")
+async def optimization_job(params: Dict[str, Any], tenant_id: str, progress: ProgressCallback) -> Dict[str, Any]:
+    return await run_optimization(params["customer_id"], OptimizationRequest(**params["optimization"]), tenant_id, progress)
+
+
 @router.post("/optimize")
 async def optimize_campaigns(
+    request: Request,
     customer_id: str = Query(..., description="Google Ads Customer ID"),
     optimization: OptimizationRequest = None,
-    background_tasks: BackgroundTasks = None
+    tenant_id: str = Depends(get_tenant_id)
 ):
-    """Trigger AI-powered campaign optimization"""
+    """
+    Trigger AI-powered campaign optimization
+    
+    With ``auto_apply`` the changes are planned and applied in bulk. Otherwise
+    recommendations for all requested campaigns come from one analysis of the
+    account. Set ``background`` to get a job id (202) to poll at
+    ``/jobs/{job_id}`` instead of waiting.
+    """
+    if optimization.background:
+        return submit_job(request, "google_ads.optimize", tenant_id, {
+            "customer_id": customer_id, "optimization": optimization.model_dump()
+        })
     try:
-        results = []
-        
-        campaign_ids = optimization.campaign_ids or []
-        if not campaign_ids:
-            # Get all campaigns if none specified
-            campaigns = await google_ads_service.get_campaigns(customer_id)
-            campaign_ids = [c.id for c in campaigns]
-        
-        for campaign_id in campaign_ids:
-            if optimization.auto_apply:
-                # Apply optimizations automatically
-                result = await ai_agent_service.auto_optimize_campaign(
-                    customer_id, campaign_id, optimization.optimization_type
-                )
-                results.append({
-                    "campaign_id": campaign_id,
-                    "result": result
-                })
-            else:
-                # Generate recommendations only
-                campaigns = await google_ads_service.get_campaigns(customer_id)
-                campaign = next((c for c in campaigns if c.id == campaign_id), None)
-                if campaign:
-                    insights = await ai_agent_service.analyze_campaigns(customer_id, [campaign])
-                    results.append({
-                        "campaign_id": campaign_id,
-                        "recommendations": len(insights),
-                        "insights": [
-                            {
-                                "title": insight.title,
-                                "description": insight.description,
-                                "impact": insight.impact,
-                                "action_type": insight.action_type
-                            }
-                            for insight in insights[:5]  # Top 5 recommendations
-                        ]
-                    })
-        
-        return {"results": results}
+        return await run_optimization(customer_id, optimization, tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/optimize/jobs/{job_id}")
+async def get_optimization_job(job_id: str, tenant_id: str = Depends(get_tenant_id)):
+    """Get the status and results of a background optimization job (see also ``/jobs/{job_id}``)"""
+    job = get_tenant_job(job_id, tenant_id)
+    return {
+        "job_id": job_id,
+        "status": job.status,
+        "results": job.result["results"] if job.result else None,
+        "error": job.error
+    }
+
+
 @router.get("/recommendations")
 async def get_google_recommendations(
     customer_id: str = Query(..., description="Google Ads Customer ID"),
@@ -409,100 +951,101 @@ async def get_google_recommendations(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def load_performance_summary(customer_id: str, date_range: DateRange) -> Dict[str, Any]:
+    """Performance summary response body, as cached by the response cache"""
+    # Use the optimized performance summary method
+    summary_data = await google_ads_service.get_performance_summary(customer_id, date_range)
+    
+    # Generate simple insights based on real data
+    insights_count = {
+        "campaign_insights": summary_data["active_campaigns"],
+        "high_priority": 0,
+        "actionable": 0
+    }
+    
+    top_insights = []
+    
+    # CTR insights
+    if summary_data["avg_ctr"] < 0.02:
+        insights_count["high_priority"] += 1
+        insights_count["actionable"] += 1
+        top_insights.append({
+            "title": "Low CTR Alert",
+            "description": f"Average CTR is {summary_data['avg_ctr']:.3f}% - consider optimizing ad copy and targeting",
+            "impact": "high",
+            "type": "optimization",
+            "priority": 1
+        })
+    
+    # CPC insights
+    if summary_data["avg_cpc"] > 1.0:
+        insights_count["actionable"] += 1
+        formatted_cpc = format_money(summary_data['avg_cpc'], summary_data['currency'])
+        top_insights.append({
+            "title": "High CPC Warning",
+            "description": f"Average CPC is {formatted_cpc} - review keyword bidding strategy",
+            "impact": "medium",
+            "type": "optimization",
+            "priority": 2
+        })
+    
+    # Conversion rate insights
+    if summary_data["conversion_rate"] < 0.01:
+        insights_count["high_priority"] += 1
+        insights_count["actionable"] += 1
+        top_insights.append({
+            "title": "Low Conversion Rate",
+            "description": f"Conversion rate is {summary_data['conversion_rate']:.3f}% - optimize landing pages and ad relevance",
+            "impact": "high",
+            "type": "optimization",
+            "priority": 1
+        })
+    
+    # Spend insights
+    if summary_data["total_spend"] > 1000:
+        formatted_spend = format_money(summary_data['total_spend'], summary_data['currency'])
+        top_insights.append({
+            "title": "High Spend Volume",
+            "description": f"{formatted_spend} spent ({summary_data['period']}) - monitor budget allocation",
+            "impact": "medium",
+            "type": "budget_alert",
+            "priority": 3
+        })
+    
+    return {
+        "summary": {
+            "total_campaigns": summary_data["total_campaigns"],
+            "active_campaigns": summary_data["active_campaigns"],
+            "total_cost": summary_data["total_spend"],
+            "total_impressions": summary_data["total_impressions"],
+            "total_clicks": summary_data["total_clicks"],
+            "total_conversions": summary_data["total_conversions"],
+            "avg_ctr": summary_data["avg_ctr"] * 100,  # Convert to percentage
+            "avg_cpc": summary_data["avg_cpc"],
+            "conversion_rate": summary_data["conversion_rate"] * 100,  # Convert to percentage
+            "conversion_value": summary_data["conversion_value"],
+            "currency": summary_data["currency"],
+            "period": summary_data["period"],
+            "start_date": summary_data["start_date"],
+            "end_date": summary_data["end_date"]
+        },
+        "insights": insights_count,
+        "top_insights": sorted(top_insights, key=lambda x: x["priority"])[:5]
+    }
+
+
 @router.get("/performance-summary")
 async def get_performance_summary(
-    customer_id: str = Query(..., description="Google Ads Customer ID")
+    customer_id: str = Query(..., description="Google Ads Customer ID"),
+    refresh: bool = Query(False, description="Bypass the response cache"),
+    date_range: DateRange = Depends(get_date_range()),
+    tenant_id: str = Depends(get_tenant_id)
 ):
     """Get optimized performance summary with real Google Ads data"""
     try:
-        # Use the optimized performance summary method
-        summary_data = await google_ads_service.get_performance_summary(customer_id)
-        
-        # Generate simple insights based on real data
-        insights_count = {
-            "campaign_insights": summary_data["active_campaigns"],
-            "high_priority": 0,
-            "actionable": 0
-        }
-        
-        top_insights = []
-        
-        # CTR insights
-        if summary_data["avg_ctr"] < 0.02:
-            insights_count["high_priority"] += 1
-            insights_count["actionable"] += 1
-            top_insights.append({
-                "title": "Low CTR Alert",
-                "description": f"Average CTR is {summary_data['avg_ctr']:.3f}% - consider optimizing ad copy and targeting",
-                "impact": "high",
-                "type": "optimization",
-                "priority": 1
-            })
-        
-        # Helper function to format currency
-        def format_currency(amount: float, currency: str) -> str:
-            currency_symbols = {
-                'USD': '$', 'AED': 'د.إ', 'SAR': 'ر.س', 'EUR': '€', 'GBP': '£', 'JPY': '¥'
-            }
-            symbol = currency_symbols.get(currency, currency)
-            formatted_amount = f"{amount:,.2f}"
-            if currency in ['AED', 'SAR']:
-                return f"{formatted_amount} {symbol}"
-            else:
-                return f"{symbol}{formatted_amount}"
-        
-        # CPC insights
-        if summary_data["avg_cpc"] > 1.0:
-            insights_count["actionable"] += 1
-            formatted_cpc = format_currency(summary_data['avg_cpc'], summary_data['currency'])
-            top_insights.append({
-                "title": "High CPC Warning",
-                "description": f"Average CPC is {formatted_cpc} - review keyword bidding strategy",
-                "impact": "medium",
-                "type": "optimization",
-                "priority": 2
-            })
-        
-        # Conversion rate insights
-        if summary_data["conversion_rate"] < 0.01:
-            insights_count["high_priority"] += 1
-            insights_count["actionable"] += 1
-            top_insights.append({
-                "title": "Low Conversion Rate",
-                "description": f"Conversion rate is {summary_data['conversion_rate']:.3f}% - optimize landing pages and ad relevance",
-                "impact": "high",
-                "type": "optimization",
-                "priority": 1
-            })
-        
-        # Spend insights
-        if summary_data["total_spend"] > 1000:
-            formatted_spend = format_currency(summary_data['total_spend'], summary_data['currency'])
-            top_insights.append({
-                "title": "High Spend Volume",
-                "description": f"{formatted_spend} spent in the last 30 days - monitor budget allocation",
-                "impact": "medium",
-                "type": "budget_alert",
-                "priority": 3
-            })
-        
-        return {
-            "summary": {
-                "total_campaigns": summary_data["total_campaigns"],
-                "active_campaigns": summary_data["active_campaigns"],
-                "total_cost": summary_data["total_spend"],
-                "total_impressions": summary_data["total_impressions"],
-                "total_clicks": summary_data["total_clicks"],
-                "total_conversions": summary_data["total_conversions"],
-                "avg_ctr": summary_data["avg_ctr"] * 100,  # Convert to percentage
-                "avg_cpc": summary_data["avg_cpc"],
-                "conversion_rate": summary_data["conversion_rate"] * 100,  # Convert to percentage
-                "conversion_value": summary_data["conversion_value"],
-                "currency": summary_data["currency"],
-                "period": summary_data["period"]
-            },
-            "insights": insights_count,
-            "top_insights": sorted(top_insights, key=lambda x: x["priority"])[:5]
-        }
+        return await response_cache.get_or_load(
+            "google_performance_summary", tenant_id, customer_id, date_range.to_params(),
+            lambda: load_performance_summary(customer_id, date_range), refresh=refresh
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Asynchronous job endpoints
+
+Endpoints that accept ``background=true`` (``/google-ads/optimize``,
+``/google-ads/insights``, ``/google-ads/keyword-suggestions``) answer 202
+with a job id. Poll ``/jobs/{job_id}`` or follow ``/jobs/{job_id}/events``
+for progress; the finished job carries the endpoint's usual response body
+as ``result``.
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.api.deps import get_tenant_id
+from app.services.jobs import Job, JobLimitError, job_queue
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def submit_job(request: Request, kind: str, tenant_id: str, params: Optional[Dict[str, Any]] = None) -> JSONResponse:
+    """Submit a job and answer 202 with where to follow it (429 when the tenant is at its limit)"""
+    try:
+        job = job_queue.submit(kind, tenant_id, params)
+    except JobLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": request.app.url_path_for("get_job", job_id=job.id),
+        "events_url": request.app.url_path_for("stream_job_events", job_id=job.id),
+    })
+
+
+def get_tenant_job(job_id: str, tenant_id: str) -> Job:
+    job = job_queue.get(job_id)
+    # Other tenants' jobs are reported as missing
+    if job is None or job.tenant_id != tenant_id:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+
+@router.get("")
+async def list_jobs(
+    include_results: bool = Query(False, description="Include results of finished jobs"),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """The current tenant's recent jobs, newest first"""
+    return {
+        "jobs": [job.to_dict(include_result=include_results) for job in job_queue.jobs(tenant_id)],
+        "stats": job_queue.stats()
+    }
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, tenant_id: str = Depends(get_tenant_id)):
+    """Status, progress and (once completed) result of a job"""
+    return get_tenant_job(job_id, tenant_id).to_dict()
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str, tenant_id: str = Depends(get_tenant_id)):
+    """
+    Follow a job as Server-Sent Events
+
+    Sends a ``progress`` event on every change (status, progress, message)
+    and a comment as heartbeat while nothing changes. Ends with a ``done``
+    event carrying the finished job, result included.
+    """
+    get_tenant_job(job_id, tenant_id)
+
+    async def event_stream():
+        last_version = None
+        async for job in job_queue.watch(job_id):
+            if job.finished:
+                yield f"event: done\ndata: {json.dumps(job.to_dict(), default=str)}\n\n"
+                return
+            if job.version == last_version:
+                yield ": heartbeat\n\n"
+                continue
+            last_version = job.version
+            yield f"event: progress\ndata: {json.dumps(job.to_dict(include_result=False))}\n\n"
+        # Expired while being watched
+        yield f"event: error\ndata: {json.dumps({'detail': 'Job not found or expired'})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str, tenant_id: str = Depends(get_tenant_id)):
+    """Cancel a queued or running job"""
+    get_tenant_job(job_id, tenant_id)
+    if not job_queue.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job already finished")
+    return {"job_id": job_id, "cancelled": True}
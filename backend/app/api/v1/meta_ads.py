@@ -9,16 +9,21 @@ This module provides REST API endpoints for:
 """
 
 import os
+import asyncio
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import uuid
 
-from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 
 from app.services.meta_ads_service import meta_ads_service
+from app.services.meta_insights import rollup, to_records
 from app.services.ai_agent_service import ai_agent_service
+from app.services.response_cache import response_cache
+from app.api.deps import get_tenant_id
+from app.core.cache import hash_key
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -193,7 +198,8 @@ async def validate_token(token_request: TokenRequest):
         Connection status and user information
     """
     try:
-        status = meta_ads_service.test_connection(token_request.access_token)
+        # Validation must probe the token now, not return a cached status
+        status = meta_ads_service.test_connection(token_request.access_token, force_refresh=True)
         
         if status['connected']:
             return StatusResponse(
@@ -216,15 +222,18 @@ async def validate_token(token_request: TokenRequest):
         )
 
 @router.get("/status", response_model=StatusResponse)
-async def get_connection_status():
+async def get_connection_status(refresh: bool = Query(False, description="Bypass the cached status")):
     """
     Get current Meta Ads connection status
     
+    Args:
+        refresh: Probe the Graph API even if a cached status is available
+    
     Returns:
         Current connection status and configuration
     """
     try:
-        status = meta_ads_service.test_connection()
+        status = meta_ads_service.test_connection(force_refresh=refresh)
         
         if status['connected']:
             return StatusResponse(
@@ -247,18 +256,28 @@ async def get_connection_status():
         )
 
 @router.get("/accounts", response_model=List[Dict[str, Any]])
-async def get_ad_accounts(access_token: Optional[str] = Query(None)):
+async def get_ad_accounts(
+    access_token: Optional[str] = Query(None),
+    refresh: bool = Query(False, description="Bypass the cached account list"),
+    tenant_id: str = Depends(get_tenant_id)
+):
     """
     Get all Meta ad accounts accessible to the user
     
     Args:
         access_token: Optional access token (uses configured token if not provided)
+        refresh: Fetch from the Graph API even if the list is cached
         
     Returns:
         List of ad account information
     """
     try:
-        accounts = meta_ads_service.get_ad_accounts(access_token)
+        # The token decides which accounts are visible, so it stands in for the customer
+        accounts = await response_cache.get_or_load(
+            "meta_accounts", tenant_id, hash_key("meta_token", access_token or ""), {},
+            lambda: asyncio.to_thread(meta_ads_service.get_ad_accounts, access_token, force_refresh=True),
+            refresh=refresh
+        )
         
         if not accounts:
             # Return demo data if no real accounts available
@@ -386,6 +405,98 @@ async def get_campaigns(
             detail=f"Failed to get campaigns: {str(e)}"
         )
 
+@router.get("/accounts/{ad_account_id}/campaigns/insights")
+async def get_campaigns_insights(
+    ad_account_id: str,
+    access_token: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    action_types: Optional[str] = Query(None, description="Comma-separated action types to keep as columns")
+):
+    """
+    Get flattened insights for all campaigns of an account
+    
+    Actions, conversions and conversion values are returned as numeric
+    columns (``conversions__purchase``, ...) alongside the account rollup.
+    The rollup has no reach or frequency, which cannot be summed over
+    campaigns; ``/accounts/{id}/insights`` reports them for the account.
+    
+    Args:
+        ad_account_id: Meta ad account ID
+        access_token: Optional access token
+        start_date: Start date for insights (YYYY-MM-DD)
+        end_date: End date for insights (YYYY-MM-DD)
+        action_types: Optional action type whitelist (defaults to the configured one)
+        
+    Returns:
+        Per-campaign rows, column names and account totals
+    """
+    try:
+        time_range = None
+        if start_date and end_date:
+            time_range = {'since': start_date, 'until': end_date}
+        
+        whitelist = [t.strip() for t in action_types.split(',') if t.strip()] if action_types else None
+        table = meta_ads_service.get_campaigns_insights(ad_account_id, access_token, time_range, whitelist)
+        
+        return {
+            'success': True,
+            'columns': ['campaign_id'] + list(table.columns),
+            'campaigns': to_records(table),
+            'totals': rollup(table),
+            'total_count': len(table)
+        }
+    
+    except Exception as e:
+        logger.error(f"Error getting campaigns insights: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get campaigns insights: {str(e)}"
+        )
+
+@router.get("/accounts/{ad_account_id}/tree")
+async def get_account_ad_tree(
+    ad_account_id: str,
+    access_token: Optional[str] = Query(None),
+    campaign_ids: Optional[str] = Query(None, description="Comma-separated campaign IDs to include"),
+    statuses: Optional[str] = Query(None, description="Comma-separated effective statuses to include")
+):
+    """
+    Get the full campaign → ad set → ad tree for a Meta ad account
+    
+    Args:
+        ad_account_id: Meta ad account ID
+        access_token: Optional access token
+        campaign_ids: Optional campaign filter
+        statuses: Optional effective status filter (e.g. ACTIVE,PAUSED)
+        
+    Returns:
+        Nested campaigns with their ad sets and ads
+    """
+    try:
+        campaign_filter = [c.strip() for c in campaign_ids.split(',') if c.strip()] if campaign_ids else None
+        status_filter = [s.strip().upper() for s in statuses.split(',') if s.strip()] if statuses else None
+        
+        tree = await asyncio.to_thread(
+            meta_ads_service.get_account_ad_tree, ad_account_id, access_token, campaign_filter, status_filter
+        )
+        
+        return {
+            'success': True,
+            'campaigns': tree,
+            'total_count': len(tree),
+            'ad_sets_count': sum(c['ad_sets_count'] for c in tree),
+            'ads_count': sum(c['ads_count'] for c in tree),
+            'message': 'Account tree retrieved successfully'
+        }
+    
+    except Exception as e:
+        logger.error(f"Error getting account ad tree: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get account ad tree: {str(e)}"
+        )
+
 @router.get("/campaigns/{campaign_id}/insights", response_model=InsightsResponse)
 async def get_campaign_insights(
     campaign_id: str,
@@ -468,7 +579,9 @@ async def get_account_insights(
     ad_account_id: str,
     access_token: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
-    end_date: Optional[str] = Query(None)
+    end_date: Optional[str] = Query(None),
+    refresh: bool = Query(False, description="Bypass the response cache"),
+    tenant_id: str = Depends(get_tenant_id)
 ):
     """
     Get account-level performance insights
@@ -487,7 +600,12 @@ async def get_account_insights(
         if start_date and end_date:
             time_range = {'since': start_date, 'until': end_date}
         
-        insights = meta_ads_service.get_account_insights(ad_account_id, access_token, time_range)
+        insights = await response_cache.get_or_load(
+            "meta_account_insights", tenant_id, ad_account_id,
+            {"time_range": time_range, "token": hash_key(access_token or "")},
+            lambda: asyncio.to_thread(meta_ads_service.get_account_insights, ad_account_id, access_token, time_range),
+            refresh=refresh
+        )
         
         if not insights:
             # Return demo insights if no real data available
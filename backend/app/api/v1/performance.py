@@ -0,0 +1,90 @@
+"""
+Cross-platform performance endpoints
+"""
+
+import asyncio
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.api.deps import get_date_range, get_tenant_id
+from app.core.date_ranges import DateRange
+from app.services.currency import fx_rates
+from app.services.unified_performance import unified_performance_service
+
+router = APIRouter(prefix="/performance", tags=["Performance"])
+
+
+@router.get("/unified")
+async def get_unified_performance(
+    google_customer_id: Optional[str] = Query(None, description="Google Ads Customer ID"),
+    meta_ad_account_id: Optional[str] = Query(None, description="Meta ad account ID"),
+    meta_access_token: Optional[str] = Query(None, description="Meta access token (defaults to the connected token)"),
+    timeout: Optional[float] = Query(None, gt=0, le=60, description="Deadline per source in seconds"),
+    refresh: bool = Query(False, description="Bypass cached Meta insights"),
+    currency: Optional[str] = Query(None, description="Currency of the totals (defaults to the reporting currency)"),
+    date_range: DateRange = Depends(get_date_range()),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """
+    Google Ads and Meta Ads performance in one schema
+
+    Both platforms are queried concurrently. A platform that misses its
+    deadline or fails is reported in ``sources`` while the others are
+    still returned; ``complete`` is false in that case. Totals are
+    converted to ``currency`` with the FX rates of the range's last day.
+    """
+    if not google_customer_id and not meta_ad_account_id:
+        raise HTTPException(status_code=400, detail="Provide google_customer_id and/or meta_ad_account_id")
+    try:
+        return await unified_performance_service.get_performance(
+            date_range, tenant_id,
+            google_customer_id=google_customer_id,
+            meta_ad_account_id=meta_ad_account_id,
+            meta_access_token=meta_access_token,
+            timeout=timeout,
+            refresh=refresh,
+            currency=currency
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/rollup")
+async def get_performance_rollup(
+    google_customer_ids: str = Query(..., description="Comma-separated Google Ads Customer IDs"),
+    currency: Optional[str] = Query(None, description="Currency of the totals (defaults to the reporting currency)"),
+    timeout: Optional[float] = Query(None, gt=0, le=60, description="Deadline per account in seconds"),
+    date_range: DateRange = Depends(get_date_range())
+):
+    """
+    Agency rollup: totals across Google Ads accounts in one currency
+
+    Each account is reported in its own currency alongside its converted
+    spend; accounts that miss the deadline or fail are reported per account.
+    """
+    customer_ids = list(dict.fromkeys(c.strip() for c in google_customer_ids.split(",") if c.strip()))
+    if not customer_ids:
+        raise HTTPException(status_code=400, detail="Provide at least one Google Ads Customer ID")
+    try:
+        return await unified_performance_service.get_google_rollup(
+            date_range, customer_ids, timeout=timeout, currency=currency
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/fx-rates")
+async def get_fx_rates(
+    day: Optional[date] = Query(None, alias="date", description="Day of the snapshot (YYYY-MM-DD, default today)")
+):
+    """FX snapshot used for conversions on a day (units per 1 USD)"""
+    try:
+        return (await asyncio.to_thread(fx_rates.snapshot, day)).to_dict()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,114 @@
+"""
+In-process caching primitives
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional
+
+
+@dataclass
+class CacheEntry:
+    """A cached value with its freshness deadlines (monotonic seconds)"""
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.fresh_until
+
+    @property
+    def is_expired(self) -> bool:
+        return time.monotonic() >= self.stale_until
+
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache with per-entry TTL.
+
+    Entries are fresh for ``ttl`` seconds and may then be served stale for a
+    further ``stale_ttl`` seconds while the caller revalidates them
+    (stale-while-revalidate). After that they are dropped.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0, stale_ttl: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return the entry for ``key`` (fresh or stale), or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.is_expired:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if entry.is_fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key`` whether fresh or stale"""
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None,
+            stale_ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entry if full"""
+        ttl = self.ttl if ttl is None else ttl
+        stale_ttl = self.stale_ttl if stale_ttl is None else stale_ttl
+        now = time.monotonic()
+
+        with self._lock:
+            self._entries[key] = CacheEntry(
+                value=value,
+                fresh_until=now + ttl,
+                stale_until=now + ttl + stale_ttl
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for metrics endpoints"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+
+def hash_key(*parts: Any) -> str:
+    """Build a compact cache key from arbitrary parts (e.g. to avoid keeping raw tokens)"""
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8"))
+    return digest.hexdigest()[:32]
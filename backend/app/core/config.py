@@ -2,7 +2,7 @@
 Application configuration settings
 """
 
-from typing import List
+from typing import Dict, List
 from pydantic import Field
 from pydantic_settings import BaseSettings
 import os
@@ -40,6 +40,122 @@ class Settings(BaseSettings):
     pinecone_api_key: str = Field("", env="PINECONE_API_KEY")
     pinecone_environment: str = Field("", env="PINECONE_ENVIRONMENT")
     
+    # LLM response cache
+    llm_cache_enabled: bool = True
+    llm_cache_ttl: int = 3600  # seconds
+    llm_cache_max_entries: int = 512
+    llm_cache_backend: str = "memory"  # "memory" or "redis" (uses redis_url)
+    
+    # Response cache for read endpoints (in-process LRU, optionally backed by Redis)
+    response_cache_enabled: bool = True
+    response_cache_backend: str = "memory"  # "memory" or "redis" (uses redis_url)
+    response_cache_max_entries: int = 1024
+    response_cache_stale_seconds: int = 3600  # serve stale this long past the TTL while refreshing
+    # Per-route TTLs in seconds (route=ttl, comma-separated)
+    response_cache_ttls: str = (
+        "google_campaigns=900,google_ad_groups=900,google_keywords=900,google_performance_summary=900,"
+        "meta_accounts=3600,meta_account_insights=900"
+    )
+    
+    @property
+    def response_cache_ttls_map(self) -> Dict[str, int]:
+        """Convert route=ttl pairs to a dict"""
+        pairs = (item.split("=", 1) for item in self.response_cache_ttls.split(",") if "=" in item)
+        return {route.strip(): int(ttl) for route, ttl in pairs}
+    
+    # Per-day metric cache behind date-ranged Google Ads reads
+    google_daily_cache_max_days: int = 5000  # (customer, level, day) entries
+    google_daily_cache_ttl: int = 86400
+    google_daily_cache_recent_days: int = 3  # days this recent keep changing (late conversions)
+    google_daily_cache_recent_ttl: int = 900
+    # Threads for blocking Google Ads reads (sync gRPC); a slow API queues here instead of taking every worker thread
+    google_ads_max_threads: int = 8
+    
+    # Per-source deadlines (seconds) for /performance/unified
+    unified_google_timeout: float = 10.0
+    unified_meta_timeout: float = 10.0
+    
+    # Currencies: cross-account totals are converted to reporting_currency with daily FX snapshots
+    reporting_currency: str = "USD"
+    currency_locale: str = "en"  # separators and symbol position of formatted amounts (en, de, fr, es, it, ar)
+    fx_provider: str = "static"  # "static" (built-in table), "file" (fx_rates_path) or "http" (fx_rates_url)
+    fx_rates_path: str = ""  # JSON or CSV rate table
+    fx_rates_url: str = ""  # JSON endpoint returning base + rates; {date} is replaced with the day
+    fx_snapshot_path: str = ""  # JSON file to persist daily snapshots across restarts
+    
+    # Per-tenant token buckets in front of routes that spend upstream API quota (requests/seconds)
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # "memory" or "redis" (uses redis_url, shared by all workers)
+    rate_limit_tenant: str = "300/60"  # one tenant across all limited routes (empty = no tenant-wide bucket)
+    rate_limit_global_factor: float = 10  # all callers together on one route: this many times its limit (0 = none)
+    # X-Tenant-ID values buckets may be keyed on; other callers are limited by client IP (empty = any well-formed id)
+    rate_limit_tenant_ids: str = ""
+    # path_glob=requests/seconds, comma-separated; the first matching glob applies
+    rate_limit_routes: str = (
+        "/api/v1/google-ads/campaigns=60/60,/api/v1/google-ads/ad-groups=60/60,/api/v1/google-ads/keywords*=60/60,"
+        "/api/v1/google-ads/performance-summary=60/60,/api/v1/google-ads/insights=30/60,"
+        "/api/v1/google-ads/insights/stream=30/60,/api/v1/google-ads/insights/keywords=30/60,"
+        "/api/v1/google-ads/keyword-suggestions=20/60,/api/v1/google-ads/optimize=10/60,"
+        "/api/v1/google-ads/anomalies/refresh=10/60,/api/v1/google-ads/customers=30/60,"
+        "/api/v1/meta-ads/*insights=60/60,/api/v1/meta-ads/accounts/*=60/60,/api/v1/meta-ads/accounts=30/60,"
+        "/api/v1/performance/*=30/60"
+    )
+    
+    # Serialize large row responses (keywords, ad groups) with orjson instead of FastAPI's encoder
+    fast_json_responses: bool = False
+    
+    # Seconds to wait for the LLM before returning rule-based insights only (0 = no limit)
+    ai_analysis_time_budget: float = 0
+    # Token budget for the campaign table in analysis prompts, and how campaigns are ranked when trimming
+    ai_prompt_token_budget: int = 3000
+    ai_prompt_rank_by: str = "spend"  # "spend" or "impact"
+    # Keyword insights built per analysis, most important first (0 = all matches)
+    keyword_insights_limit: int = 500
+    
+    # Daily anomaly detection (robust EWMA z-scores per campaign)
+    anomaly_span_days: int = 14
+    anomaly_z_threshold: float = 3.5
+    anomaly_min_history_days: int = 7
+    anomaly_backfill_days: int = 60
+    anomaly_state_path: str = ""  # .npz file to persist detector state across restarts
+    
+    # Keyword suggestion index
+    keyword_embedder: str = "hashing"  # "hashing" (offline, deterministic) or "sentence-transformers"
+    keyword_embedding_model: str = "all-MiniLM-L6-v2"
+    keyword_embedding_dim: int = 256  # hashing embedder only
+    keyword_index_refresh_seconds: int = 3600  # re-read an account's keywords/search terms at most this often
+    
+    # SQLite file holding upserted insights (drives the /insights change cursor); empty for the user state directory
+    insight_store_path: str = ""
+    
+    # Background optimization scheduler
+    scheduler_backend: str = "local"  # "local" (asyncio shard workers), "celery" (uses redis_url for job state), or "disabled"
+    scheduler_shards: int = 8
+    scheduler_interval_seconds: int = 21600
+    scheduler_jitter: float = 0.1  # fraction of the interval
+    scheduler_jobs: str = "anomalies,analysis,keywords"
+    scheduler_customer_ids: str = ""  # accounts scheduled at startup (comma-separated)
+    
+    @property
+    def scheduler_jobs_list(self) -> List[str]:
+        return [job.strip() for job in self.scheduler_jobs.split(",") if job.strip()]
+    
+    @property
+    def scheduler_customer_ids_list(self) -> List[str]:
+        return [customer_id.strip() for customer_id in self.scheduler_customer_ids.split(",") if customer_id.strip()]
+    
+    @property
+    def rate_limit_tenant_ids_list(self) -> List[str]:
+        return [tenant_id.strip() for tenant_id in self.rate_limit_tenant_ids.split(",") if tenant_id.strip()]
+    
+    # Asynchronous jobs (/jobs): "memory" (asyncio tasks in the API process) or "celery" (Redis state, Celery workers)
+    job_backend: str = "memory"
+    job_queue: str = "jobs"  # Celery queue the job workers consume
+    job_max_concurrent_per_tenant: int = 2
+    job_max_pending_per_tenant: int = 20  # unfinished jobs; further submissions get 429
+    job_result_ttl: int = 3600  # seconds a finished job and its result are kept
+    job_slot_lease_seconds: int = 300  # celery: a running job's slot lease, renewed while it runs
+    
     # Email
     smtp_server: str = Field("", env="SMTP_SERVER")
     smtp_port: int = Field(587, env="SMTP_PORT")
@@ -72,6 +188,10 @@ class Settings(BaseSettings):
     google_ads_customer_id: str = ""
     google_api_key: str = ""
     google_oauth_redirect_uri: str = "http://localhost:3000/api/auth/google-ads/callback"
+    # Alternative API endpoint (host:port), e.g. a local stand-in server (python -m stand_ins)
+    google_ads_endpoint: str = ""
+    # Plaintext channel without OAuth to google_ads_endpoint; for local stand-ins only
+    google_ads_insecure: bool = False
     
     # Meta (Facebook) Ads Configuration
     meta_app_id: str = ""
@@ -79,6 +199,20 @@ class Settings(BaseSettings):
     meta_access_token: str = ""
     meta_oauth_redirect_uri_prod: str = "https://takeclient.com/api/auth/meta/callback"
     meta_oauth_redirect_uri_dev: str = "http://localhost:3000/api/auth/meta/callback"
+    # Graph API host, without version; point at a local stand-in server to run offline
+    meta_graph_url: str = "https://graph.facebook.com"
+    meta_api_version: str = "v18.0"
+    # Action types kept when flattening insights (comma-separated, empty keeps all)
+    meta_action_types: str = (
+        "link_click,landing_page_view,post_engagement,page_engagement,video_view,"
+        "lead,purchase,add_to_cart,initiate_checkout,complete_registration,"
+        "offsite_conversion.fb_pixel_purchase,offsite_conversion.fb_pixel_lead"
+    )
+    
+    @property
+    def meta_action_types_list(self) -> List[str]:
+        """Convert comma-separated action types to list"""
+        return [t.strip() for t in self.meta_action_types.split(",") if t.strip()]
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,105 @@
+"""
+Reporting date ranges
+
+Requests name either a predefined period (``LAST_7_DAYS``, ``THIS_MONTH``,
+...) or explicit ``start_date``/``end_date``. Both resolve to concrete,
+inclusive dates before anything is queried or cached, so a cached
+``LAST_7_DAYS`` response never outlives the day it was computed for.
+Periods follow Google Ads semantics: ``LAST_N_DAYS`` ends yesterday.
+"""
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+DEFAULT_PERIOD = "LAST_30_DAYS"
+MAX_RANGE_DAYS = 1095
+
+PERIODS = (
+    "TODAY",
+    "YESTERDAY",
+    "LAST_7_DAYS",
+    "LAST_14_DAYS",
+    "LAST_30_DAYS",
+    "LAST_90_DAYS",
+    "THIS_MONTH",
+    "LAST_MONTH",
+)
+
+
+@dataclass(frozen=True)
+class DateRange:
+    """Inclusive range of reporting days"""
+    start: date
+    end: date
+    period: Optional[str] = None
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days + 1
+
+    def dates(self) -> List[date]:
+        return [self.start + timedelta(days=i) for i in range(self.days)]
+
+    @property
+    def gaql(self) -> str:
+        """GAQL condition selecting the range"""
+        return f"segments.date BETWEEN '{self.start.isoformat()}' AND '{self.end.isoformat()}'"
+
+    @property
+    def label(self) -> str:
+        if self.period:
+            return self.period.replace("_", " ").capitalize()
+        return f"{self.start.isoformat()} to {self.end.isoformat()}"
+
+    def to_params(self) -> Dict[str, str]:
+        """Concrete dates, for cache keys and responses"""
+        return {"start_date": self.start.isoformat(), "end_date": self.end.isoformat()}
+
+
+def period_range(period: str, today: Optional[date] = None) -> DateRange:
+    today = today or date.today()
+    yesterday = today - timedelta(days=1)
+    if period == "TODAY":
+        return DateRange(today, today, period)
+    if period == "YESTERDAY":
+        return DateRange(yesterday, yesterday, period)
+    if period.startswith("LAST_") and period.endswith("_DAYS"):
+        days = int(period[len("LAST_"):-len("_DAYS")])
+        return DateRange(today - timedelta(days=days), yesterday, period)
+    if period == "THIS_MONTH":
+        return DateRange(today.replace(day=1), today, period)
+    if period == "LAST_MONTH":
+        end = today.replace(day=1) - timedelta(days=1)
+        return DateRange(end.replace(day=1), end, period)
+    raise ValueError(f"Unknown period '{period}'; expected one of: {', '.join(PERIODS)}")
+
+
+def resolve_date_range(period: Optional[str] = None, start_date: Optional[str] = None,
+                       end_date: Optional[str] = None, default: Optional[str] = DEFAULT_PERIOD,
+                       today: Optional[date] = None) -> Optional[DateRange]:
+    """
+    Resolve request parameters to a DateRange
+
+    Explicit dates win over ``period``. Without either, ``default`` is used
+    (None returns None). Raises ValueError on invalid input.
+    """
+    if start_date or end_date:
+        if not (start_date and end_date):
+            raise ValueError("start_date and end_date must be given together")
+        try:
+            date_range = DateRange(date.fromisoformat(start_date), date.fromisoformat(end_date))
+        except ValueError:
+            raise ValueError("Dates must be YYYY-MM-DD")
+        if date_range.start > date_range.end:
+            raise ValueError("start_date must not be after end_date")
+        if date_range.days > MAX_RANGE_DAYS:
+            raise ValueError(f"Date ranges are limited to {MAX_RANGE_DAYS} days")
+        return date_range
+
+    period = (period or default or "").upper()
+    if not period:
+        return None
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period '{period}'; expected one of: {', '.join(PERIODS)}")
+    return period_range(period, today)
@@ -0,0 +1,348 @@
+"""
+Per-tenant token-bucket rate limiting for upstream-heavy routes
+
+Routes that spend Google Ads developer-token or Meta app quota are listed as
+rules (a path glob plus ``requests/seconds``). Each tenant gets a token
+bucket per rule, holding up to ``requests`` tokens and refilling at
+``requests / seconds`` per second, plus one tenant-wide bucket shared by all
+limited routes. Every rule also has a global bucket shared by all callers,
+``global_factor`` times its size, since the upstream quota is shared too.
+A request takes one token from its route's bucket, the tenant bucket and the
+route's global bucket; if any is empty it is answered with 429 and a
+``Retry-After`` header saying when a token will be available.
+
+``X-Tenant-ID`` comes from the client, so it is only used as the bucket key
+when it is one of the configured tenant ids (or, with none configured, at
+least well-formed). Other requests, and requests without the header, are
+keyed on the client IP; rotating the header therefore neither escapes the
+limits nor floods the bucket store.
+
+Buckets live in this process, or in Redis (one hash per bucket, updated by a
+Lua script) so that all API workers share them. If Redis is unreachable,
+requests are let through rather than failed.
+
+``RateLimitMiddleware`` is plain ASGI. It belongs inside ``CORSMiddleware``,
+so that 429 responses still carry CORS headers and browsers can read
+``Retry-After``.
+"""
+
+import fnmatch
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+from app.core.config import get_settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - redis is an optional backend
+    aioredis = None
+
+settings = get_settings()
+
+TENANT_ID = re.compile(r"[A-Za-z0-9_.:@-]{1,64}")
+GLOBAL_KEY = "*"  # bucket owner of the all-callers buckets
+
+
+@dataclass(frozen=True)
+class BucketRule:
+    """``requests`` per ``seconds``, with bursts of up to ``requests``"""
+    name: str  # path glob, "tenant" for the tenant-wide bucket, or "global:<glob>" for a route's global bucket
+    requests: int
+    seconds: float
+
+    @property
+    def capacity(self) -> float:
+        return float(self.requests)
+
+    @property
+    def rate(self) -> float:
+        """Tokens added per second"""
+        return self.requests / self.seconds
+
+
+def parse_limit(name: str, limit: str) -> BucketRule:
+    """Parse ``requests/seconds`` (e.g. ``60/60``)"""
+    try:
+        requests, seconds = limit.split("/", 1)
+        rule = BucketRule(name, int(requests), float(seconds))
+    except ValueError:
+        raise ValueError(f"Invalid rate limit '{limit}' for {name}; expected requests/seconds, e.g. 60/60")
+    if rule.requests <= 0 or rule.seconds <= 0:
+        raise ValueError(f"Rate limit for {name} must be positive")
+    return rule
+
+
+def parse_rules(rules: str) -> List[BucketRule]:
+    """Parse comma-separated ``path_glob=requests/seconds`` pairs (first match wins)"""
+    pairs = (item.split("=", 1) for item in rules.split(",") if "=" in item)
+    return [parse_limit(pattern.strip(), limit.strip()) for pattern, limit in pairs]
+
+
+@dataclass
+class Decision:
+    """Outcome of taking a token from a request's buckets"""
+    allowed: bool
+    rule: BucketRule
+    remaining: float  # tokens left in the emptiest of the request's buckets
+    retry_after: float = 0.0  # seconds until a token is available
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": f"{self.rule.requests};w={self.rule.seconds:g}",
+            "X-RateLimit-Remaining": str(max(int(self.remaining), 0)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(math.ceil(self.retry_after), 1))
+        return headers
+
+
+def refill(tokens: float, updated: float, rule: BucketRule, now: float) -> float:
+    return min(rule.capacity, tokens + max(0.0, now - updated) * rule.rate)
+
+
+class MemoryBuckets:
+    """Token buckets in this process (LRU-bounded)"""
+
+    backend = "memory"
+
+    def __init__(self, max_buckets: int = 10000):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Tuple[str, str], Tuple[float, float]]" = OrderedDict()  # -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    async def take(self, buckets: List[Tuple[Tuple[str, str], BucketRule]]) -> Tuple[bool, List[float], float]:
+        """Take a token from every bucket, or from none; returns (allowed, levels after, retry after)"""
+        now = time.time()
+        with self._lock:
+            levels = []
+            for key, rule in buckets:
+                tokens, updated = self._buckets.get(key, (rule.capacity, now))
+                levels.append(refill(tokens, updated, rule, now))
+            waits = [(1 - level) / rule.rate for level, (_, rule) in zip(levels, buckets) if level < 1]
+            allowed = not waits
+            if allowed:
+                levels = [level - 1 for level in levels]
+            for (key, _), level in zip(buckets, levels):
+                self._buckets[key] = (level, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return allowed, levels, max(waits, default=0.0)
+
+    async def levels(self, rules: Dict[str, BucketRule]) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entries = list(self._buckets.items())
+        return [
+            {"tenant_id": tenant_id, "bucket": name, "level": round(refill(tokens, updated, rules[name], now), 2),
+             "capacity": rules[name].requests}
+            for (tenant_id, name), (tokens, updated) in entries if name in rules
+        ]
+
+
+# KEYS: bucket hashes; ARGV: now, then capacity and rate per key.
+# Takes a token from every bucket or none; returns allowed, retry after, levels.
+TAKE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity, rate = tonumber(ARGV[i * 2]), tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    if tokens < 1 then wait = math.max(wait, (1 - tokens) / rate) end
+    levels[i] = tokens
+end
+local result = {wait == 0 and 1 or 0, tostring(wait)}
+for i, key in ipairs(KEYS) do
+    local capacity, rate = tonumber(ARGV[i * 2]), tonumber(ARGV[i * 2 + 1])
+    if wait == 0 then levels[i] = levels[i] - 1 end
+    redis.call('HSET', key, 'tokens', tostring(levels[i]), 'updated', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+    result[i + 2] = tostring(levels[i])
+end
+return result
+"""
+
+
+class RedisBuckets:
+    """Token buckets in Redis, shared by all API workers"""
+
+    backend = "redis"
+
+    def __init__(self, redis_url: Optional[str] = None, namespace: str = "ratelimit", max_tracked: int = 1000):
+        if aioredis is None:
+            raise RuntimeError("The redis rate limit backend needs the redis package")
+        self.namespace = namespace
+        self._redis = aioredis.from_url(redis_url or settings.redis_url, decode_responses=True)
+        self._script = self._redis.register_script(TAKE_SCRIPT)
+        # Buckets this process touched recently, for the metrics endpoint
+        self._tracked: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self.max_tracked = max_tracked
+        self.errors = 0
+
+    def _key(self, key: Tuple[str, str]) -> str:
+        return f"{self.namespace}:{key[0]}:{key[1]}"
+
+    async def take(self, buckets: List[Tuple[Tuple[str, str], BucketRule]]) -> Tuple[bool, List[float], float]:
+        args: List[Any] = [time.time()]
+        for _, rule in buckets:
+            args.extend([rule.capacity, rule.rate])
+        try:
+            result = await self._script(keys=[self._key(key) for key, _ in buckets], args=args)
+        except Exception as e:
+            # Fail open: an unreachable Redis must not take the API down with it
+            self.errors += 1
+            print(f"⚠️ Rate limiter: Redis unavailable, letting request through: {e}")
+            return True, [rule.capacity for _, rule in buckets], 0.0
+        for key, _ in buckets:
+            self._tracked[key] = None
+            self._tracked.move_to_end(key)
+        while len(self._tracked) > self.max_tracked:
+            self._tracked.popitem(last=False)
+        return bool(int(result[0])), [float(level) for level in result[2:]], float(result[1])
+
+    async def levels(self, rules: Dict[str, BucketRule]) -> List[Dict[str, Any]]:
+        keys = [key for key in list(self._tracked) if key[1] in rules]
+        if not keys:
+            return []
+        pipe = self._redis.pipeline()
+        for key in keys:
+            pipe.hmget(self._key(key), "tokens", "updated")
+        states = await pipe.execute()
+        now = time.time()
+        levels = []
+        for (tenant_id, name), (tokens, updated) in zip(keys, states):
+            rule = rules[name]
+            level = rule.capacity if tokens is None else refill(float(tokens), float(updated), rule, now)
+            levels.append({"tenant_id": tenant_id, "bucket": name, "level": round(level, 2), "capacity": rule.requests})
+        return levels
+
+
+class RateLimiter:
+    """Route rules, the tenant-wide rule, the routes' global rules and the bucket store"""
+
+    def __init__(self, rules: List[BucketRule], tenant_rule: Optional[BucketRule] = None,
+                 backend: str = "memory", enabled: bool = True, global_factor: float = 0):
+        self.rules = rules
+        self.tenant_rule = tenant_rule
+        self.enabled = enabled
+        self.global_rules: Dict[str, BucketRule] = {
+            rule.name: BucketRule(f"global:{rule.name}", max(1, round(rule.requests * global_factor)), rule.seconds)
+            for rule in rules
+        } if global_factor > 0 else {}
+        self.store = MemoryBuckets()
+        if backend == "redis":
+            try:
+                self.store = RedisBuckets()
+            except RuntimeError as e:
+                print(f"⚠️ {e}; using in-process rate limit buckets")
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def match(self, path: str) -> Optional[BucketRule]:
+        return next((rule for rule in self.rules if fnmatch.fnmatchcase(path, rule.name)), None)
+
+    async def check(self, tenant_id: str, path: str) -> Optional[Decision]:
+        """Take a token for a request; None if the route is not limited"""
+        rule = self.match(path) if self.enabled else None
+        if rule is None:
+            return None
+        buckets = [((tenant_id, rule.name), rule)]
+        if self.tenant_rule is not None:
+            buckets.append(((tenant_id, self.tenant_rule.name), self.tenant_rule))
+        global_rule = self.global_rules.get(rule.name)
+        if global_rule is not None:
+            buckets.append(((GLOBAL_KEY, global_rule.name), global_rule))
+        allowed, levels, retry_after = await self.store.take(buckets)
+
+        counts = self._counts.setdefault(rule.name, {"allowed": 0, "limited": 0})
+        counts["allowed" if allowed else "limited"] += 1
+        return Decision(allowed, rule, min(levels), retry_after)
+
+    async def stats(self, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+        rules = {rule.name: rule for rule in self.rules}
+        if self.tenant_rule is not None:
+            rules[self.tenant_rule.name] = self.tenant_rule
+        rules.update((rule.name, rule) for rule in self.global_rules.values())
+        levels = await self.store.levels(rules)
+        return {
+            "enabled": self.enabled,
+            "backend": self.store.backend,
+            "tenant_limit": f"{self.tenant_rule.requests}/{self.tenant_rule.seconds:g}" if self.tenant_rule else None,
+            "routes": {
+                rule.name: {
+                    "limit": f"{rule.requests}/{rule.seconds:g}",
+                    "global_limit": f"{self.global_rules[rule.name].requests}/{rule.seconds:g}" if rule.name in self.global_rules else None,
+                    **self._counts.get(rule.name, {"allowed": 0, "limited": 0})
+                }
+                for rule in self.rules
+            },
+            "buckets": [level for level in levels if tenant_id is None or level["tenant_id"] == tenant_id],
+        }
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 with ``Retry-After`` when a tenant's bucket is empty"""
+
+    def __init__(self, app, limiter: RateLimiter, tenant_header: str = "X-Tenant-ID", default_tenant: str = "default",
+                 tenant_ids: Iterable[str] = ()):
+        self.app = app
+        self.limiter = limiter
+        self.tenant_header = tenant_header
+        self.default_tenant = default_tenant
+        self.tenant_ids = frozenset(tenant_ids)
+
+    def bucket_owner(self, scope) -> str:
+        """The tenant from the header if it is recognized, else the client IP"""
+        tenant_id = Headers(scope=scope).get(self.tenant_header)
+        if tenant_id and TENANT_ID.fullmatch(tenant_id) and (not self.tenant_ids or tenant_id in self.tenant_ids):
+            return tenant_id
+        client = scope.get("client")
+        return f"ip:{client[0]}" if client else self.default_tenant
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        decision = await self.limiter.check(self.bucket_owner(scope), scope["path"])
+        if decision is None:
+            await self.app(scope, receive, send)
+            return
+        if not decision.allowed:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": f"Rate limit exceeded; retry in {decision.headers()['Retry-After']}s"},
+                headers=decision.headers()
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in decision.headers().items():
+                    headers.append(name, value)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+# Singleton instance
+rate_limiter = RateLimiter(
+    parse_rules(settings.rate_limit_routes),
+    tenant_rule=parse_limit("tenant", settings.rate_limit_tenant) if settings.rate_limit_tenant else None,
+    backend=settings.rate_limit_backend,
+    enabled=settings.rate_limit_enabled,
+    global_factor=settings.rate_limit_global_factor
+)
@@ -0,0 +1,99 @@
+"""
+Fast JSON responses for large payloads
+
+Returning a ``FastJSONResponse`` from a route skips FastAPI's
+``jsonable_encoder`` walk and the stdlib encoder: the content is serialized
+once, by orjson when it is installed. NumPy arrays and scalars are encoded
+natively, so columnar payloads (a dict of arrays) cost little more than a
+memory copy. Pydantic models and DataFrames are converted in the fallback hook.
+
+The fast path for existing row-shaped responses is opt-in
+(``settings.fast_json_responses``); columnar responses always use it.
+"""
+
+import json
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+from app.core.config import get_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+settings = get_settings()
+
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+def _default(value: Any) -> Any:
+    """Types orjson (or json) cannot encode natively"""
+    if isinstance(value, np.ndarray):
+        # Object/string arrays, and any array the stdlib fallback sees
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.DataFrame):
+        return {name: _default(column.to_numpy()) for name, column in value.items()}
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _default_stdlib(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    return _default(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize ``content`` to JSON bytes on the fastest available encoder"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(
+        content, default=_default_stdlib, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by ``dumps``"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_response(content: Any) -> Any:
+    """Wrap ``content`` in a FastJSONResponse when the fast path is enabled"""
+    if settings.fast_json_responses:
+        return FastJSONResponse(content)
+    return content
+
+
+def record_columns(records: Sequence[Any], fields: Iterable[str], dtypes: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Columnar view of dataclass records for a columnar response
+
+    Fields in ``dtypes`` become typed NumPy arrays (None -> 0); the rest are
+    object arrays.
+    """
+    count = len(records)
+    columns = {}
+    for name in fields:
+        dtype = dtypes.get(name)
+        if dtype is not None:
+            columns[name] = np.fromiter((getattr(r, name) or 0 for r in records), dtype=dtype, count=count)
+        else:
+            values = np.empty(count, dtype=object)
+            values[:] = [getattr(r, name) for r in records]
+            columns[name] = values
+    return columns
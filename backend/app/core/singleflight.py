@@ -0,0 +1,153 @@
+"""
+Single-flight coalescing of identical concurrent calls
+
+While a call with a given key (method, arguments) is in flight, further
+callers with the same key wait for that call instead of starting their own,
+and all of them get its result or exception. Nothing is kept after the call
+finishes, so this is not a cache: it only collapses bursts, e.g. a team
+opening the same dashboard at once.
+
+Coroutine functions share an ``asyncio`` task (shielded, so a cancelled
+caller does not cancel the call for the others); plain functions, such as the
+blocking Graph API client run in worker threads, share a
+``concurrent.futures.Future``.
+"""
+
+import asyncio
+import concurrent.futures
+import copy
+import functools
+import inspect
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import pandas as pd
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable stand-in for call arguments (lists, dicts and sets included)"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(v) for v in value))
+    hash(value)
+    return value
+
+
+def _share(result: Any) -> Any:
+    """Followers get their own container so they cannot reorder, append to or add columns to the leader's result"""
+    if isinstance(result, (list, dict)):
+        return copy.copy(result)
+    if isinstance(result, pd.DataFrame):
+        return result.copy(deep=False)
+    return result
+
+
+class SingleFlight:
+    """Collapse identical concurrent calls into one"""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._futures: Dict[Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, name: str, leader: bool) -> None:
+        stats = self._stats.setdefault(name, {"calls": 0, "executions": 0, "collapsed": 0})
+        stats["calls"] += 1
+        stats["executions" if leader else "collapsed"] += 1
+
+    async def do(self, name: str, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn()``, or the in-flight call with the same key"""
+        # Tasks belong to one event loop (the Celery worker runs its own)
+        key = (id(asyncio.get_running_loop()), name, key)
+        with self._lock:
+            task = self._tasks.get(key)
+            leader = task is None
+            if leader:
+                task = asyncio.ensure_future(fn())
+                self._tasks[key] = task
+                task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self._count(name, leader)
+        result = await asyncio.shield(task)
+        return result if leader else _share(result)
+
+    def do_sync(self, name: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Call ``fn()``, or wait for the in-flight call with the same key from another thread"""
+        key = (name, key)
+        with self._lock:
+            future = self._futures.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._futures[key] = future
+            self._count(name, leader)
+
+        if not leader:
+            return _share(future.result())
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._futures.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            methods = {name: dict(stats) for name, stats in self._stats.items()}
+            in_flight = len(self._tasks) + len(self._futures)
+        calls = sum(stats["calls"] for stats in methods.values())
+        collapsed = sum(stats["collapsed"] for stats in methods.values())
+        return {
+            "calls": calls,
+            "collapsed": collapsed,
+            "collapse_rate": collapsed / calls if calls else 0.0,
+            "in_flight": in_flight,
+            "methods": methods,
+        }
+
+
+def coalesce(flight: Optional["SingleFlight"] = None, name: Optional[str] = None):
+    """
+    Decorate a service method so identical concurrent calls share one execution
+
+    The key is the method name plus its arguments (``self`` excluded, since
+    services are singletons). Calls with unhashable arguments run normally.
+    """
+    def decorator(fn):
+        method = name or fn.__qualname__
+
+        def make_key(args, kwargs) -> Optional[Hashable]:
+            try:
+                return (_freeze(args[1:]), _freeze(kwargs))
+            except TypeError:
+                return None
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                if key is None:
+                    return await fn(*args, **kwargs)
+                return await (flight or single_flight).do(method, key, lambda: fn(*args, **kwargs))
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                key = make_key(args, kwargs)
+                if key is None:
+                    return fn(*args, **kwargs)
+                return (flight or single_flight).do_sync(method, key, lambda: fn(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+# Shared instance used by the service decorators
+single_flight = SingleFlight()
@@ -6,11 +6,20 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
+from typing import Optional
 
 from app.core.config import get_settings
 
 settings = get_settings()
 from app.api.v1.api import api_router
+from app.api.deps import DEFAULT_TENANT_ID
+from app.services.ai_agent_service import ai_agent_service
+from app.services.scheduler import optimization_scheduler
+from app.services.response_cache import response_cache
+from app.services.daily_metrics_cache import daily_metrics_cache
+from app.services.currency import fx_rates
+from app.core.singleflight import single_flight
+from app.core.rate_limit import RateLimitMiddleware, rate_limiter
 
 
 @asynccontextmanager
@@ -20,9 +29,14 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     print("🚀 Starting CRM Backend API...")
+    if optimization_scheduler.backend != "disabled":
+        optimization_scheduler.start()
+        for customer_id in settings.scheduler_customer_ids_list:
+            await ai_agent_service.schedule_optimization_tasks(customer_id, DEFAULT_TENANT_ID)
     yield
     # Shutdown
     print("🛑 Shutting down CRM Backend API...")
+    await optimization_scheduler.stop()
 
 
 # Create FastAPI app
@@ -35,6 +49,14 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Per-tenant rate limits on upstream-heavy routes. Added first so it runs
+# innermost: untrusted hosts are rejected before they spend tokens, and 429s
+# pass back through CORS and keep their CORS headers.
+app.add_middleware(
+    RateLimitMiddleware, limiter=rate_limiter, default_tenant=DEFAULT_TENANT_ID,
+    tenant_ids=settings.rate_limit_tenant_ids_list
+)
+
 # Add security middleware
 app.add_middleware(
     TrustedHostMiddleware, 
@@ -48,6 +70,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining"],
 )
 
 # Include API router
@@ -74,6 +97,32 @@ async def health_check():
     return {"status": "healthy", "service": "crm-backend"}
 
 
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    """
+    Response cache hit rates and refresh/invalidation counters, plus the
+    per-day metric cache behind date-ranged Google Ads reads and the FX snapshots
+    """
+    return {**response_cache.stats(), "google_daily_metrics": daily_metrics_cache.stats(), "fx": fx_rates.stats()}
+
+
+@app.get("/metrics/ratelimit")
+async def ratelimit_metrics(tenant_id: Optional[str] = None):
+    """
+    Rate limit rules, allowed/limited counts per route and current bucket levels
+    (optionally for one tenant)
+    """
+    return await rate_limiter.stats(tenant_id)
+
+
+@app.get("/metrics/singleflight")
+async def singleflight_metrics():
+    """
+    Upstream calls collapsed into an identical in-flight call, per service method
+    """
+    return single_flight.stats()
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -82,4 +131,4 @@ if __name__ == "__main__":
         host=settings.api_host,
         port=settings.api_port,
         reload=settings.debug,
-    ) 
\ No newline at end of file
+    ) 
@@ -1,9 +1,12 @@
+import os
 import json
+import time
 import asyncio
-from typing import List, Dict, Any, Optional
+from functools import partial
+from collections import deque
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
-import numpy as np
 import pandas as pd
 from openai import AsyncOpenAI
 
@@ -14,159 +17,244 @@ from app.services.google_ads_service import (
     AdGroupData, 
     KeywordData
 )
+from app.services.insights import AIInsight, data_window, insight_id, text_key
+from app.services.meta_insights import flatten_campaigns
+from app.services.llm_cache import llm_response_cache
+from app.services.json_stream import JSONArrayStreamParser
+from app.services.prompt_builder import CampaignPromptBuilder
+from app.services.rules_engine import ENTITY_COLUMNS, NUMERIC_COLUMNS, Columns, RulesEngine, to_columns
+from app.services.anomaly_detector import Anomaly, DailyAnomalyDetector
+from app.services.keyword_index import KeywordSuggestion, KeywordSuggestionEngine, create_embedder
+from app.services.keyword_minhash import KeywordMinHashIndex
+from app.services.insight_store import insight_store, insight_scope
+from app.services.scheduler import optimization_scheduler
+from app.services.bulk_optimizer import AccountSnapshot, apply_plan, build_plan
+from app.services.currency import format_money
 
 settings = get_settings()
 
+# Bump whenever the campaign analysis prompt changes so cached responses are not reused
+CAMPAIGN_ANALYSIS_PROMPT_VERSION = "3"
+CAMPAIGN_ANALYSIS_MODEL = "gpt-4"
 
-@dataclass
-class AIInsight:
-    id: str
-    type: str  # 'optimization', 'budget_alert', 'keyword', 'recommendation', 'anomaly'
-    title: str
-    description: str
-    impact: str  # 'high', 'medium', 'low'
-    confidence: float  # 0.0 to 1.0
-    campaign_id: Optional[str] = None
-    ad_group_id: Optional[str] = None
-    actionable: bool = True
-    action_type: Optional[str] = None  # 'increase_budget', 'pause_keyword', 'adjust_bid', etc.
-    action_data: Optional[Dict[str, Any]] = None
-    created_at: str = None
-    priority: int = 1  # 1 (highest) to 5 (lowest)
+# Daily metrics fetched concurrently per nightly/on-demand anomaly refresh
+ANOMALY_REFRESH_CONCURRENCY = 8
+# Anomalies are only reported while the day they were found on is this recent
+ANOMALY_MAX_AGE_DAYS = 3
 
-    def __post_init__(self):
-        if self.created_at is None:
-            self.created_at = datetime.now().isoformat()
+ANOMALY_METRIC_LABELS = {
+    'cost': "Spend",
+    'clicks': "Clicks",
+    'ctr': "CTR",
+    'cpc': "CPC",
+    'conversion_rate': "Conversion Rate",
+}
+
+
+def campaign_columns(campaigns: List[CampaignData]) -> Columns:
+    """Columnar view of campaigns for the rules engine (read lazily, see ``RecordColumn``)"""
+    return to_columns(campaigns, ENTITY_COLUMNS["campaign"], numeric=NUMERIC_COLUMNS["campaign"], lazy=True)
+
+
+def keyword_columns(keywords: List[KeywordData]) -> Columns:
+    """Columnar view of keywords for the rules engine (read lazily, see ``RecordColumn``)"""
+    return to_columns(keywords, ENTITY_COLUMNS["keyword"], numeric=NUMERIC_COLUMNS["keyword"], lazy=True)
 
 
 class AIAgentService:
     def __init__(self):
         self.openai_client = AsyncOpenAI(api_key=settings.openai_api_key) if settings.openai_api_key else None
-        self.performance_thresholds = {
-            'low_ctr': 0.02,  # 2%
-            'high_cpc': 2.0,  # $2
-            'low_conversion_rate': 0.01,  # 1%
-            'high_cost_per_conversion': 50.0,  # $50
-            'budget_utilization_high': 0.85,  # 85%
-            'budget_utilization_low': 0.3,  # 30%
-        }
+        self.rules_engine = RulesEngine()
+        self._background_tasks = set()
+        self.prompt_builder = CampaignPromptBuilder(
+            model=CAMPAIGN_ANALYSIS_MODEL,
+            token_budget=settings.ai_prompt_token_budget,
+            rank_by=settings.ai_prompt_rank_by
+        )
+        self.prompt_stats = deque(maxlen=200)
+        self.anomaly_detector = DailyAnomalyDetector(
+            span=settings.anomaly_span_days,
+            threshold=settings.anomaly_z_threshold,
+            min_history=settings.anomaly_min_history_days
+        )
+        self._anomaly_refreshes: Dict[str, asyncio.Task] = {}
+        self.keyword_embedder = create_embedder(
+            settings.keyword_embedder,
+            settings.keyword_embedding_model,
+            settings.keyword_embedding_dim
+        )
+        self._keyword_engines: Dict[str, KeywordSuggestionEngine] = {}
+        self._keyword_terms_indexed: Dict[Tuple[str, str], float] = {}
+        self._keyword_dedup: Dict[str, KeywordMinHashIndex] = {}
+        self._anomaly_state_mtime: Optional[float] = None
+        self.sync_anomaly_state()
     
-    async def analyze_campaigns(self, customer_id: str, campaigns: List[CampaignData]) -> List[AIInsight]:
-        """Comprehensive campaign analysis using AI and rule-based insights"""
-        insights = []
-        
-        if not campaigns:
-            return insights
+    def sync_anomaly_state(self) -> None:
+        """
+        Load the persisted anomaly state if another process (e.g. a Celery
+        worker running the anomalies job) wrote it since this one last did
+        """
+        path = settings.anomaly_state_path
+        if not path or not os.path.exists(path):
+            return
+        mtime = os.path.getmtime(path)
+        if mtime == self._anomaly_state_mtime:
+            return
+        try:
+            self.anomaly_detector.load(path)
+            self._anomaly_state_mtime = mtime
+            print(f"✅ Loaded anomaly state for {len(self.anomaly_detector)} campaigns")
+        except Exception as e:
+            print(f"⚠️ Failed to load anomaly state, keeping the current one: {e}")
+    
+    async def analyze_campaigns(self, customer_id: str, campaigns: List[CampaignData],
+                                time_budget: Optional[float] = None,
+                                tenant_id: Optional[str] = None, window: Optional[str] = None) -> List[AIInsight]:
+        """
+        Comprehensive campaign analysis using AI and rule-based insights
         
-        # Rule-based analysis
-        insights.extend(await self._analyze_budget_performance(campaigns))
-        insights.extend(await self._analyze_campaign_performance(campaigns))
-        insights.extend(await self._detect_anomalies(campaigns))
+        If ``time_budget`` (seconds) runs out before the LLM answers, only the
+        rule-based insights are returned. ``window`` is the data window the
+        campaigns' metrics cover (``data_window()`` by default), part of every
+        insight id.
+        """
+        insights = []
         
-        # AI-powered analysis
-        if self.openai_client:
-            insights.extend(await self._ai_campaign_analysis(customer_id, campaigns))
+        async for _, stage_insights in self.iter_campaign_insights(customer_id, campaigns, time_budget, tenant_id, window):
+            insights.extend(stage_insights)
         
         # Sort by priority and confidence
         insights.sort(key=lambda x: (x.priority, -x.confidence))
         
         return insights
     
-    async def _analyze_budget_performance(self, campaigns: List[CampaignData]) -> List[AIInsight]:
-        """Analyze budget utilization and spending patterns"""
-        insights = []
+    async def iter_campaign_insights(self, customer_id: str, campaigns: List[CampaignData],
+                                     time_budget: Optional[float] = None, tenant_id: Optional[str] = None,
+                                     window: Optional[str] = None) -> AsyncIterator[Tuple[str, List[AIInsight]]]:
+        """
+        Run the analysis stages concurrently and yield ``(stage, insights)`` as each completes
         
-        for campaign in campaigns:
-            if campaign.budget_amount <= 0:
-                continue
-            
-            utilization = campaign.cost / campaign.budget_amount if campaign.budget_amount > 0 else 0
-            
-            # High budget utilization alert
-            if utilization > self.performance_thresholds['budget_utilization_high']:
-                insights.append(AIInsight(
-                    id=f"budget_high_{campaign.id}_{int(datetime.now().timestamp())}",
-                    type="budget_alert",
-                    title=f"High Budget Utilization: {campaign.name}",
-                    description=f"Campaign has used {utilization:.1%} of its budget. Consider increasing budget or monitoring closely to avoid early exhaustion.",
-                    impact="high" if utilization > 0.95 else "medium",
-                    confidence=0.9,
-                    campaign_id=campaign.id,
-                    action_type="increase_budget",
-                    action_data={"current_budget": campaign.budget_amount, "suggested_increase": campaign.budget_amount * 0.2},
-                    priority=1 if utilization > 0.95 else 2
-                ))
-            
-            # Low budget utilization
-            elif utilization < self.performance_thresholds['budget_utilization_low']:
-                insights.append(AIInsight(
-                    id=f"budget_low_{campaign.id}_{int(datetime.now().timestamp())}",
-                    type="optimization",
-                    title=f"Low Budget Utilization: {campaign.name}",
-                    description=f"Campaign is only using {utilization:.1%} of its budget. Consider increasing bids or expanding targeting.",
-                    impact="medium",
-                    confidence=0.8,
-                    campaign_id=campaign.id,
-                    action_type="optimize_targeting",
-                    priority=3
-                ))
+        The LLM request is put in flight first; the rule-based analyzers then run
+        in worker threads so their pandas/NumPy work stays off the event loop.
+        The time budget only limits how long we wait for the LLM: when it runs
+        out the LLM request is left to finish in the background so its response
+        still lands in the response cache for the next request.
+        """
+        if not campaigns:
+            return
         
-        return insights
+        if time_budget is None:
+            time_budget = settings.ai_analysis_time_budget or None
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + time_budget if time_budget else None
+        
+        stages: Dict[asyncio.Task, str] = {}
+        if self.openai_client:
+            stages[asyncio.create_task(self._ai_campaign_analysis(customer_id, campaigns, window))] = "ai"
+        stages[asyncio.create_task(asyncio.to_thread(self._analyze_budget_performance, campaigns, tenant_id, window))] = "budget"
+        stages[asyncio.create_task(asyncio.to_thread(self._analyze_campaign_performance, campaigns, tenant_id, window))] = "performance"
+        stages[asyncio.create_task(asyncio.to_thread(self._detect_anomalies, campaigns, tenant_id, customer_id, window))] = "anomalies"
+        
+        pending = set(stages)
+        try:
+            while pending:
+                timeout = None
+                if deadline is not None and all(stages[task] == "ai" for task in pending):
+                    timeout = max(0.0, deadline - loop.time())
+                
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"⏱️ AI analysis exceeded {time_budget}s budget, returning rule-based insights")
+                    break
+                
+                for task in done:
+                    yield stages[task], task.result()
+        finally:
+            # Keep unfinished stages referenced until they complete on their own
+            for task in pending:
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
     
-    async def _analyze_campaign_performance(self, campaigns: List[CampaignData]) -> List[AIInsight]:
-        """Analyze campaign performance metrics"""
-        insights = []
+    async def stream_campaign_insights(self, customer_id: str, campaigns: List[CampaignData],
+                                       tenant_id: Optional[str] = None) -> AsyncIterator[Tuple[str, List[AIInsight]]]:
+        """
+        Like ``iter_campaign_insights`` but with the LLM stage streamed
         
-        for campaign in campaigns:
-            # Low CTR analysis
-            if campaign.ctr > 0 and campaign.ctr < self.performance_thresholds['low_ctr']:
-                insights.append(AIInsight(
-                    id=f"low_ctr_{campaign.id}_{int(datetime.now().timestamp())}",
-                    type="optimization",
-                    title=f"Low CTR Alert: {campaign.name}",
-                    description=f"Campaign CTR is {campaign.ctr:.2%}, below recommended threshold. Consider improving ad copy or refining targeting.",
-                    impact="high",
-                    confidence=0.85,
-                    campaign_id=campaign.id,
-                    action_type="improve_ads",
-                    priority=2
-                ))
-            
-            # High CPC analysis
-            if campaign.cpc > self.performance_thresholds['high_cpc']:
-                insights.append(AIInsight(
-                    id=f"high_cpc_{campaign.id}_{int(datetime.now().timestamp())}",
-                    type="optimization",
-                    title=f"High CPC Alert: {campaign.name}",
-                    description=f"Campaign CPC is ${campaign.cpc:.2f}, consider optimizing bids or improving Quality Score.",
-                    impact="medium",
-                    confidence=0.8,
-                    campaign_id=campaign.id,
-                    action_type="optimize_bids",
-                    priority=3
-                ))
-            
-            # Low conversion rate
-            if campaign.conversion_rate > 0 and campaign.conversion_rate < self.performance_thresholds['low_conversion_rate']:
-                cost_per_conversion = campaign.cost / campaign.conversions if campaign.conversions > 0 else 0
-                insights.append(AIInsight(
-                    id=f"low_conv_{campaign.id}_{int(datetime.now().timestamp())}",
-                    type="optimization",
-                    title=f"Low Conversion Rate: {campaign.name}",
-                    description=f"Conversion rate is {campaign.conversion_rate:.2%} with cost per conversion of ${cost_per_conversion:.2f}. Consider landing page optimization.",
-                    impact="high",
-                    confidence=0.9,
-                    campaign_id=campaign.id,
-                    action_type="optimize_landing_page",
-                    priority=1
-                ))
+        Rule-based stages are yielded as whole batches when their worker thread
+        finishes; AI insights are yielded one at a time as the completion is
+        parsed incrementally.
+        """
+        if not campaigns:
+            return
         
-        return insights
+        queue: asyncio.Queue = asyncio.Queue()
+        done_marker = object()
+        
+        async def run_rules(stage: str, analyzer) -> None:
+            try:
+                await queue.put((stage, await asyncio.to_thread(analyzer, campaigns, tenant_id)))
+            finally:
+                await queue.put(done_marker)
+        
+        async def run_ai() -> None:
+            try:
+                async for insight in self._stream_ai_campaign_analysis(customer_id, campaigns):
+                    await queue.put(("ai", [insight]))
+            finally:
+                await queue.put(done_marker)
+        
+        producers = [
+            asyncio.create_task(run_rules("budget", self._analyze_budget_performance)),
+            asyncio.create_task(run_rules("performance", self._analyze_campaign_performance)),
+            asyncio.create_task(run_rules("anomalies", partial(self._detect_anomalies, customer_id=customer_id))),
+        ]
+        if self.openai_client:
+            producers.append(asyncio.create_task(run_ai()))
+        
+        remaining = len(producers)
+        try:
+            while remaining:
+                item = await queue.get()
+                if item is done_marker:
+                    remaining -= 1
+                    continue
+                yield item
+            
+            # Surface analyzer errors the same way the batch pipeline does
+            for producer in producers:
+                producer.result()
+        finally:
+            for producer in producers:
+                if not producer.done():
+                    producer.cancel()
+    
+    def _analyze_budget_performance(self, campaigns: List[CampaignData], tenant_id: Optional[str] = None,
+                                    window: Optional[str] = None) -> List[AIInsight]:
+        """Analyze budget utilization and spending patterns"""
+        return self.rules_engine.evaluate(
+            "campaign", campaign_columns(campaigns), tenant_id=tenant_id, groups=["budget"], window=window
+        )
+    
+    def _analyze_campaign_performance(self, campaigns: List[CampaignData], tenant_id: Optional[str] = None,
+                                      window: Optional[str] = None) -> List[AIInsight]:
+        """Analyze campaign performance metrics"""
+        return self.rules_engine.evaluate(
+            "campaign", campaign_columns(campaigns), tenant_id=tenant_id, groups=["performance"], window=window
+        )
     
-    async def _detect_anomalies(self, campaigns: List[CampaignData]) -> List[AIInsight]:
+    def _detect_anomalies(self, campaigns: List[CampaignData], tenant_id: Optional[str] = None,
+                          customer_id: Optional[str] = None, window: Optional[str] = None) -> List[AIInsight]:
         """Detect anomalies in campaign performance"""
         insights = []
         
+        # Day-over-baseline anomalies from the incremental daily detector
+        if customer_id:
+            anomalies = self.current_anomalies(customer_id, [c.id for c in campaigns])
+            currency = campaigns[0].currency if campaigns else None
+            insights.extend(self._anomaly_insight(anomaly, currency) for anomaly in anomalies)
+        
+        # Cross-campaign outliers over the window's totals
         if len(campaigns) < 2:
             return insights
         
@@ -177,6 +265,7 @@ class AIAgentService:
                 campaign_data.append({
                     'id': campaign.id,
                     'name': campaign.name,
+                    'currency': campaign.currency,
                     'ctr': campaign.ctr,
                     'cpc': campaign.cpc,
                     'conversion_rate': campaign.conversion_rate,
@@ -188,6 +277,7 @@ class AIAgentService:
             return insights
         
         df = pd.DataFrame(campaign_data)
+        window = window or data_window()
         
         # Detect outliers using IQR method
         for metric in ['ctr', 'cpc', 'conversion_rate']:
@@ -203,7 +293,7 @@ class AIAgentService:
                 for _, outlier in outliers.iterrows():
                     if metric == 'ctr' and outlier[metric] < lower_bound:
                         insights.append(AIInsight(
-                            id=f"anomaly_ctr_{outlier['id']}_{int(datetime.now().timestamp())}",
+                            id=insight_id("anomaly_ctr", outlier['id'], window),
                             type="anomaly",
                             title=f"Unusually Low CTR: {outlier['name']}",
                             description=f"CTR of {outlier[metric]:.2%} is significantly below other campaigns. Investigate ad relevance.",
@@ -214,10 +304,10 @@ class AIAgentService:
                         ))
                     elif metric == 'cpc' and outlier[metric] > upper_bound:
                         insights.append(AIInsight(
-                            id=f"anomaly_cpc_{outlier['id']}_{int(datetime.now().timestamp())}",
+                            id=insight_id("anomaly_cpc", outlier['id'], window),
                             type="anomaly",
                             title=f"Unusually High CPC: {outlier['name']}",
-                            description=f"CPC of ${outlier[metric]:.2f} is significantly higher than other campaigns. Review bidding strategy.",
+                            description=f"CPC of {format_money(outlier[metric], outlier['currency'])} is significantly higher than other campaigns. Review bidding strategy.",
                             impact="medium",
                             confidence=0.8,
                             campaign_id=outlier['id'],
@@ -226,242 +316,549 @@ class AIAgentService:
         
         return insights
     
-    async def _ai_campaign_analysis(self, customer_id: str, campaigns: List[CampaignData]) -> List[AIInsight]:
+    def _anomaly_insight(self, anomaly: Anomaly, currency: Optional[str] = None) -> AIInsight:
+        """Turn a daily anomaly into an insight (money amounts in the account ``currency``)"""
+        label = ANOMALY_METRIC_LABELS.get(anomaly.metric, anomaly.metric)
+        if anomaly.metric in ('cost', 'cpc'):
+            value, expected = format_money(anomaly.value, currency), format_money(anomaly.expected, currency)
+        elif anomaly.metric in ('ctr', 'conversion_rate'):
+            value, expected = f"{anomaly.value:.2%}", f"{anomaly.expected:.2%}"
+        else:
+            value, expected = f"{anomaly.value:,.0f}", f"{anomaly.expected:,.0f}"
+        
+        severe = abs(anomaly.z_score) >= 2 * self.anomaly_detector.threshold
+        return AIInsight(
+            id=insight_id(f"anomaly_daily_{anomaly.metric}", anomaly.campaign_id, anomaly.date),
+            type="anomaly",
+            title=f"{label} {'Spike' if anomaly.direction == 'up' else 'Drop'}: {anomaly.name or anomaly.campaign_id}",
+            description=f"{label} was {value} on {anomaly.date} against a recent baseline of {expected} "
+                        f"({anomaly.z_score:+.1f} robust z-score). Check recent changes to bids, budgets, ads or tracking.",
+            impact="high" if severe else "medium",
+            confidence=min(0.95, 0.6 + abs(anomaly.z_score) / 20),
+            campaign_id=anomaly.campaign_id,
+            priority=1 if severe else 2
+        )
+    
+    def current_anomalies(self, customer_id: str, campaign_ids: Optional[List[str]] = None) -> List[Anomaly]:
+        """
+        Anomalies on the customer's latest ingested day
+        
+        Nothing is reported once that day is more than ``ANOMALY_MAX_AGE_DAYS``
+        old: a flag from a refresh that has since stopped is not current.
+        """
+        self.sync_anomaly_state()
+        last = self.anomaly_detector.last_date(customer_id)
+        if last is None or last < datetime.now().date() - timedelta(days=ANOMALY_MAX_AGE_DAYS):
+            return []
+        return self.anomaly_detector.anomalies(customer_id=customer_id, campaign_ids=campaign_ids, since=last)
+    
+    async def refresh_daily_anomalies(self, customer_ids: List[str]) -> Dict[str, Any]:
+        """
+        Fetch new daily metrics for customers and fold them into the anomaly detector
+        
+        Each customer only fetches the days after its last ingested day (or a
+        backfill window the first time). Days a campaign has no row for count
+        as zeros, so one that goes dark is flagged. Rows from all customers are
+        ingested in one vectorized pass per day.
+        """
+        end = datetime.now().date() - timedelta(days=1)  # today is still incomplete
+        semaphore = asyncio.Semaphore(ANOMALY_REFRESH_CONCURRENCY)
+        
+        async def fetch(customer_id: str) -> Optional[List[Dict[str, Any]]]:
+            """The customer's new rows; None when up to date or the fetch failed"""
+            last = self.anomaly_detector.last_date(customer_id)
+            start = last + timedelta(days=1) if last else end - timedelta(days=settings.anomaly_backfill_days - 1)
+            if start > end:
+                return None
+            async with semaphore:
+                try:
+                    return await google_ads_service.get_campaign_daily_metrics(
+                        customer_id, start.isoformat(), end.isoformat()
+                    )
+                except Exception as e:
+                    print(f"⚠️ Skipping anomaly refresh for customer {customer_id}: {e}")
+                    return None
+        
+        results = await asyncio.gather(*(fetch(customer_id) for customer_id in customer_ids))
+        rows = [row for customer_rows in results if customer_rows for row in customer_rows]
+        # Only customers read through ``end`` are zero-filled; a failed fetch is not a dark account
+        fetched = [customer_id for customer_id, customer_rows in zip(customer_ids, results) if customer_rows is not None]
+        
+        anomalies = []
+        if fetched:
+            daily = await asyncio.to_thread(self.anomaly_detector.zero_filled, pd.DataFrame(rows), fetched, end)
+            anomalies = await asyncio.to_thread(self.anomaly_detector.ingest, daily)
+            if settings.anomaly_state_path:
+                await asyncio.to_thread(self.anomaly_detector.save, settings.anomaly_state_path)
+                self._anomaly_state_mtime = os.path.getmtime(settings.anomaly_state_path)
+        
+        return {
+            "customers": len(customer_ids),
+            "rows": len(rows),
+            "series": len(self.anomaly_detector),
+            "through": end.isoformat(),
+            "anomalies": len(anomalies)
+        }
+    
+    def schedule_anomaly_refresh(self, customer_id: str) -> None:
+        """Refresh a customer's daily anomalies in the background unless already up to date"""
+        last = self.anomaly_detector.last_date(customer_id)
+        if last and last >= datetime.now().date() - timedelta(days=1):
+            return
+        running = self._anomaly_refreshes.get(customer_id)
+        if running and not running.done():
+            return
+        
+        task = asyncio.create_task(self.refresh_daily_anomalies([customer_id]))
+        self._anomaly_refreshes[customer_id] = task
+        task.add_done_callback(lambda _: self._anomaly_refreshes.pop(customer_id, None))
+    
+    async def _ai_campaign_analysis(self, customer_id: str, campaigns: List[CampaignData],
+                                    window: Optional[str] = None) -> List[AIInsight]:
         """Use OpenAI to analyze campaigns and provide advanced recommendations"""
         if not self.openai_client:
             return []
         
         try:
-            # Prepare campaign data for AI analysis
-            campaign_summary = []
-            for campaign in campaigns:
-                campaign_summary.append({
-                    "name": campaign.name,
-                    "status": campaign.status,
-                    "budget": campaign.budget_amount,
-                    "spent": campaign.cost,
-                    "impressions": campaign.impressions,
-                    "clicks": campaign.clicks,
-                    "conversions": campaign.conversions,
-                    "ctr": campaign.ctr,
-                    "cpc": campaign.cpc,
-                    "conversion_rate": campaign.conversion_rate
-                })
+            cache_key, messages = self._build_campaign_analysis_request(campaigns, customer_id)
+            ai_insights_raw = await llm_response_cache.get(cache_key) if settings.llm_cache_enabled else None
             
-            prompt = f"""
-            Analyze the following Google Ads campaigns and provide strategic recommendations:
-            
-            Campaign Data:
-            {json.dumps(campaign_summary, indent=2)}
-            
-            Please provide insights in the following areas:
-            1. Performance optimization opportunities
-            2. Budget reallocation suggestions
-            3. Targeting refinement recommendations
-            4. Bidding strategy improvements
-            5. Campaign structure optimization
+            if ai_insights_raw is None:
+                response = await self.openai_client.chat.completions.create(
+                    model=CAMPAIGN_ANALYSIS_MODEL,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=2000
+                )
+                
+                ai_insights_raw = response.choices[0].message.content
+                
+                insights = self._parse_ai_insights(ai_insights_raw, campaigns, window)
+                # Only cache responses that actually contained insights
+                if insights and settings.llm_cache_enabled:
+                    await llm_response_cache.set(cache_key, ai_insights_raw)
+                return insights
             
-            Focus on actionable insights that can improve ROI and campaign performance.
-            Format your response as a JSON array of insights with the following structure:
-            {{
-                "title": "Insight title",
-                "description": "Detailed description",
-                "impact": "high|medium|low",
-                "confidence": 0.0-1.0,
-                "campaign_name": "Campaign name if specific",
-                "action_type": "specific action type",
-                "recommendation": "Specific recommendation"
-            }}
-            """
+            return self._parse_ai_insights(ai_insights_raw, campaigns, window)
+                
+        except Exception as e:
+            print(f"AI analysis failed: {e}")
+            return []
+    
+    async def _stream_ai_campaign_analysis(self, customer_id: str, campaigns: List[CampaignData]) -> AsyncIterator[AIInsight]:
+        """
+        Stream AI insights one at a time as the completion is generated
+        
+        Each array element is decoded as soon as its closing brace arrives, so
+        the first insight is available long before the completion finishes.
+        """
+        if not self.openai_client:
+            return
+        
+        try:
+            cache_key, messages = self._build_campaign_analysis_request(campaigns, customer_id)
+            cached = await llm_response_cache.get(cache_key) if settings.llm_cache_enabled else None
+            if cached is not None:
+                for insight in self._parse_ai_insights(cached, campaigns):
+                    yield insight
+                return
             
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert Google Ads strategist and data analyst. Provide actionable, data-driven recommendations for campaign optimization."},
-                    {"role": "user", "content": prompt}
-                ],
+            stream = await self.openai_client.chat.completions.create(
+                model=CAMPAIGN_ANALYSIS_MODEL,
+                messages=messages,
                 temperature=0.3,
-                max_tokens=2000
+                max_tokens=2000,
+                stream=True
             )
             
-            ai_insights_raw = response.choices[0].message.content
+            parser = JSONArrayStreamParser()
+            chunks = []
+            count = 0
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                chunks.append(delta)
+                for insight_data in parser.feed(delta):
+                    if isinstance(insight_data, dict):
+                        yield self._ai_insight_from_data(insight_data, campaigns)
+                        count += 1
             
-            # Parse AI response
-            try:
-                # Extract JSON from response
-                start_idx = ai_insights_raw.find('[')
-                end_idx = ai_insights_raw.rfind(']') + 1
-                if start_idx != -1 and end_idx != 0:
-                    json_str = ai_insights_raw[start_idx:end_idx]
-                    ai_insights = json.loads(json_str)
-                else:
-                    return []
-                
-                insights = []
-                for insight_data in ai_insights:
-                    # Find campaign ID by name
-                    campaign_id = None
-                    if insight_data.get('campaign_name'):
-                        for campaign in campaigns:
-                            if campaign.name == insight_data['campaign_name']:
-                                campaign_id = campaign.id
-                                break
-                    
-                    insights.append(AIInsight(
-                        id=f"ai_{int(datetime.now().timestamp())}_{len(insights)}",
-                        type="recommendation",
-                        title=insight_data.get('title', 'AI Recommendation'),
-                        description=insight_data.get('description', ''),
-                        impact=insight_data.get('impact', 'medium'),
-                        confidence=float(insight_data.get('confidence', 0.7)),
-                        campaign_id=campaign_id,
-                        action_type=insight_data.get('action_type', 'optimize'),
-                        priority=2
-                    ))
-                
-                return insights
-                
-            except json.JSONDecodeError:
-                return []
+            if count and settings.llm_cache_enabled:
+                await llm_response_cache.set(cache_key, "".join(chunks))
                 
         except Exception as e:
-            print(f"AI analysis failed: {e}")
-            return []
+            print(f"AI analysis stream failed: {e}")
     
-    async def analyze_keywords(self, customer_id: str, keywords: List[KeywordData]) -> List[AIInsight]:
-        """Analyze keyword performance and provide recommendations"""
-        insights = []
+    def _build_campaign_analysis_request(self, campaigns: List[CampaignData],
+                                         customer_id: Optional[str] = None) -> Tuple[str, List[Dict[str, str]]]:
+        """Build the response-cache key and chat messages for a campaign analysis"""
+        # Compact, ranked CSV table trimmed to the prompt token budget
+        table = self.prompt_builder.build_table(campaigns)
+        currency = campaigns[0].currency if campaigns else "account currency"
         
-        if not keywords:
-            return insights
+        prompt = f"""Analyze the following Google Ads campaigns and provide strategic recommendations.
+
+Campaign data (CSV, largest first; money in {currency}, rates in %):
+{table.text}
+Please provide insights in the following areas:
+1. Performance optimization opportunities
+2. Budget reallocation suggestions
+3. Targeting refinement recommendations
+4. Bidding strategy improvements
+5. Campaign structure optimization
+
+Focus on actionable insights that can improve ROI and campaign performance.
+Format your response as a JSON array of insights with the following structure:
+{{"title": "Insight title", "description": "Detailed description", "impact": "high|medium|low", "confidence": 0.0-1.0, "campaign_name": "Campaign name if specific", "action_type": "specific action type", "recommendation": "Specific recommendation"}}
+"""
+        
+        system_prompt = "You are an expert Google Ads strategist and data analyst. Provide actionable, data-driven recommendations for campaign optimization."
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
         
-        # Keyword performance analysis
-        for keyword in keywords:
-            # Low performing keywords
-            if keyword.clicks > 10 and keyword.conversions == 0:
-                insights.append(AIInsight(
-                    id=f"keyword_poor_{keyword.id}_{int(datetime.now().timestamp())}",
-                    type="keyword",
-                    title=f"Poor Performing Keyword: {keyword.text}",
-                    description=f"Keyword '{keyword.text}' has {keyword.clicks} clicks but no conversions. Consider pausing or lowering bids.",
-                    impact="medium",
-                    confidence=0.8,
-                    ad_group_id=keyword.ad_group_id,
-                    action_type="pause_keyword",
-                    action_data={"keyword_id": keyword.id, "keyword_text": keyword.text},
-                    priority=3
-                ))
+        self.prompt_stats.append({
+            "customer_id": customer_id,
+            "prompt_tokens": self.prompt_builder.count_tokens(system_prompt) + self.prompt_builder.count_tokens(prompt),
+            "table_tokens": table.tokens,
+            "token_budget": self.prompt_builder.token_budget,
+            "campaigns_included": table.included,
+            "campaigns_omitted": table.omitted,
+            "created_at": datetime.now().isoformat()
+        })
+        
+        # Everything the model sees: rows, the omitted-campaigns note, the currency and the instructions
+        cache_key = llm_response_cache.make_key(
+            CAMPAIGN_ANALYSIS_MODEL, CAMPAIGN_ANALYSIS_PROMPT_VERSION, messages
+        )
+        return cache_key, messages
+    
+    def get_prompt_stats(self) -> Dict[str, Any]:
+        """Prompt token counts for recent campaign analysis requests"""
+        recent = list(self.prompt_stats)
+        tokens = [entry["prompt_tokens"] for entry in recent]
+        return {
+            "requests": len(recent),
+            "avg_prompt_tokens": sum(tokens) / len(tokens) if tokens else 0,
+            "max_prompt_tokens": max(tokens) if tokens else 0,
+            "token_budget": self.prompt_builder.token_budget,
+            "recent": recent[-20:]
+        }
+    
+    def _parse_ai_insights(self, ai_insights_raw: str, campaigns: List[CampaignData],
+                           window: Optional[str] = None) -> List[AIInsight]:
+        """Parse the JSON array of insights out of a completion"""
+        try:
+            # Extract JSON from response
+            start_idx = ai_insights_raw.find('[')
+            end_idx = ai_insights_raw.rfind(']') + 1
+            if start_idx != -1 and end_idx != 0:
+                json_str = ai_insights_raw[start_idx:end_idx]
+                ai_insights = json.loads(json_str)
+            else:
+                return []
             
-            # High cost, low performance
-            if keyword.cost > 50 and keyword.conversions == 0:
-                insights.append(AIInsight(
-                    id=f"keyword_expensive_{keyword.id}_{int(datetime.now().timestamp())}",
-                    type="keyword",
-                    title=f"Expensive Non-Converting Keyword: {keyword.text}",
-                    description=f"Keyword '{keyword.text}' has spent ${keyword.cost:.2f} without conversions. Review and consider pausing.",
-                    impact="high",
-                    confidence=0.9,
-                    ad_group_id=keyword.ad_group_id,
-                    action_type="pause_keyword",
-                    priority=1
-                ))
+            return [
+                self._ai_insight_from_data(insight_data, campaigns, window)
+                for insight_data in ai_insights
+            ]
             
-            # High performing keywords
-            if keyword.conversions > 0 and keyword.cost / keyword.conversions < 10:  # Good cost per conversion
-                insights.append(AIInsight(
-                    id=f"keyword_good_{keyword.id}_{int(datetime.now().timestamp())}",
-                    type="keyword",
-                    title=f"High-Performing Keyword: {keyword.text}",
-                    description=f"Keyword '{keyword.text}' has excellent performance with cost per conversion of ${keyword.cost / keyword.conversions:.2f}. Consider increasing bids.",
-                    impact="medium",
-                    confidence=0.85,
-                    ad_group_id=keyword.ad_group_id,
-                    action_type="increase_bid",
-                    action_data={"keyword_id": keyword.id, "current_bid": keyword.cpc_bid, "suggested_increase": 0.2},
-                    priority=2
-                ))
+        except json.JSONDecodeError:
+            return []
+    
+    def _ai_insight_from_data(self, insight_data: Dict[str, Any], campaigns: List[CampaignData],
+                              window: Optional[str] = None) -> AIInsight:
+        """Build an AIInsight from one element of the LLM's JSON array"""
+        # Find campaign ID by name
+        campaign_id = None
+        if insight_data.get('campaign_name'):
+            for campaign in campaigns:
+                if campaign.name == insight_data['campaign_name']:
+                    campaign_id = campaign.id
+                    break
         
-        return insights
+        action_type = insight_data.get('action_type', 'optimize')
+        title = insight_data.get('title', 'AI Recommendation')
+        return AIInsight(
+            # Several recommendations of one action type can target the same campaign; the title tells them apart
+            id=insight_id(f"ai_{action_type}", f"{campaign_id or ''}|{text_key(title)}", window or data_window()),
+            type="recommendation",
+            title=title,
+            description=insight_data.get('description', ''),
+            impact=insight_data.get('impact', 'medium'),
+            confidence=float(insight_data.get('confidence', 0.7)),
+            campaign_id=campaign_id,
+            action_type=action_type,
+            priority=2
+        )
     
-    async def generate_keyword_suggestions(self, customer_id: str, campaign_id: str, existing_keywords: List[str]) -> List[str]:
-        """Generate keyword suggestions using AI"""
-        if not self.openai_client:
+    async def analyze_keywords(self, customer_id: str, keywords: List[KeywordData],
+                               tenant_id: Optional[str] = None, window: Optional[str] = None) -> List[AIInsight]:
+        """Analyze keyword performance; returns the ``keyword_insights_limit`` most important recommendations"""
+        if not keywords:
             return []
         
         try:
-            prompt = f"""
-            Based on the existing keywords: {', '.join(existing_keywords[:10])}
-            
-            Suggest 10 additional relevant keywords for a Google Ads campaign.
-            Focus on:
-            1. Long-tail variations
-            2. Related terms
-            3. Intent-based keywords
-            4. Seasonal opportunities
-            
-            Return only the keywords, one per line, without explanations.
-            """
-            
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a Google Ads keyword research expert."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.4,
-                max_tokens=300
-            )
+            currency = await google_ads_service.get_customer_currency(customer_id)
+        except Exception:
+            currency = None
+        
+        # Column building and mask evaluation are CPU-bound on large accounts
+        return await asyncio.to_thread(
+            lambda: self.rules_engine.evaluate("keyword", keyword_columns(keywords), tenant_id=tenant_id,
+                                               window=window, currency=currency, limit=settings.keyword_insights_limit)
+        )
+    
+    def keyword_engine(self, tenant_id: Optional[str] = None) -> KeywordSuggestionEngine:
+        """Suggestion index shared by all of a tenant's accounts"""
+        key = tenant_id or "default"
+        engine = self._keyword_engines.get(key)
+        if engine is None:
+            engine = self._keyword_engines.setdefault(key, KeywordSuggestionEngine(self.keyword_embedder))
+        return engine
+    
+    def keyword_dedup_index(self, customer_id: str) -> KeywordMinHashIndex:
+        """Near-duplicate index over one account's keywords"""
+        index = self._keyword_dedup.get(customer_id)
+        if index is None:
+            index = self._keyword_dedup.setdefault(customer_id, KeywordMinHashIndex())
+        return index
+    
+    async def sync_keyword_dedup(self, customer_id: str, keywords: List[KeywordData]) -> Dict[str, int]:
+        """Update the account's near-duplicate index; only new or renamed keywords are hashed"""
+        return await asyncio.to_thread(self.keyword_dedup_index(customer_id).sync, keywords)
+    
+    async def find_keyword_cannibalization(self, customer_id: str, keywords: List[KeywordData],
+                                           min_similarity: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Clusters of near-duplicate keywords competing across ad groups"""
+        await self.sync_keyword_dedup(customer_id, keywords)
+        return await asyncio.to_thread(self.keyword_dedup_index(customer_id).cannibalization_clusters, min_similarity)
+    
+    async def index_keyword_terms(self, customer_id: str, keywords: List[KeywordData],
+                                  tenant_id: Optional[str] = None, force: bool = False) -> int:
+        """
+        Add an account's keywords and recent search terms to the tenant's suggestion index
+        
+        Search terms are re-read at most every ``keyword_index_refresh_seconds``;
+        only texts the index hasn't seen are embedded. Returns the number of new terms.
+        """
+        engine = self.keyword_engine(tenant_id)
+        terms = [(kw.text, "keyword", kw.clicks, kw.conversions) for kw in keywords]
+        
+        refresh_key = (tenant_id or "default", customer_id)
+        last = self._keyword_terms_indexed.get(refresh_key)
+        if force or last is None or time.monotonic() - last > settings.keyword_index_refresh_seconds:
+            try:
+                search_terms = await google_ads_service.get_search_terms(customer_id)
+                terms.extend(
+                    (row['search_term'], "search_term", row['clicks'], row['conversions'])
+                    for row in search_terms
+                )
+                self._keyword_terms_indexed[refresh_key] = time.monotonic()
+            except Exception as e:
+                print(f"⚠️ Search terms unavailable for customer {customer_id}, indexing keywords only: {e}")
+        
+        return await asyncio.to_thread(engine.add_terms, terms)
+    
+    async def generate_keyword_suggestions(self, customer_id: str, campaign_id: str, existing_keywords: List[str],
+                                           seed_keywords: Optional[List[str]] = None,
+                                           tenant_id: Optional[str] = None, limit: int = 10,
+                                           rerank: bool = False) -> List[KeywordSuggestion]:
+        """
+        Suggest keywords from the local index: neighbours of the campaign's
+        keywords (``seed_keywords``, or all existing keywords) that the account
+        does not target yet. With ``rerank`` the LLM reorders the candidates.
+        """
+        seeds = seed_keywords or existing_keywords
+        engine = self.keyword_engine(tenant_id)
+        candidate_limit = limit * 3 if rerank and self.openai_client else limit
+        # Over-fetch: near-duplicates of existing keywords are filtered out below
+        suggestions = await asyncio.to_thread(engine.suggest, seeds, existing_keywords, candidate_limit * 2)
+        
+        dedup = self._keyword_dedup.get(customer_id)
+        if dedup is not None and len(dedup):
+            kept = set(await asyncio.to_thread(dedup.filter_new, [s.keyword for s in suggestions]))
+            suggestions = [s for s in suggestions if s.keyword in kept]
+        suggestions = suggestions[:candidate_limit]
+        
+        if rerank and self.openai_client and len(suggestions) > 1:
+            suggestions = await self._rerank_keyword_suggestions(seeds, suggestions)
+        
+        return suggestions[:limit]
+    
+    async def _rerank_keyword_suggestions(self, seeds: List[str],
+                                          suggestions: List[KeywordSuggestion]) -> List[KeywordSuggestion]:
+        """Ask the LLM to order nearest-neighbour candidates by relevance; keeps the original order on failure"""
+        candidates = "\n".join(f"{i}. {s.keyword}" for i, s in enumerate(suggestions))
+        prompt = f"""
+        A Google Ads campaign targets these keywords: {', '.join(seeds[:20])}
+        
+        Order the candidate keywords below from most to least worth adding, dropping irrelevant ones:
+        {candidates}
+        
+        Return only a JSON array of candidate numbers, e.g. [3, 0, 7].
+        """
+        
+        try:
+            cache_key = llm_response_cache.make_key("gpt-3.5-turbo", "keyword-rerank-1", prompt)
+            raw = await llm_response_cache.get(cache_key) if settings.llm_cache_enabled else None
+            if raw is None:
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": "You are a Google Ads keyword research expert."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0,
+                    max_tokens=300
+                )
+                raw = response.choices[0].message.content
             
-            suggestions = response.choices[0].message.content.strip().split('\n')
-            return [kw.strip() for kw in suggestions if kw.strip()]
+            order = json.loads(raw[raw.find('['):raw.rfind(']') + 1])
+            ranked = [suggestions[i] for i in dict.fromkeys(order) if isinstance(i, int) and 0 <= i < len(suggestions)]
+            if ranked and settings.llm_cache_enabled:
+                await llm_response_cache.set(cache_key, raw)
+            return ranked or suggestions
             
         except Exception as e:
-            print(f"Keyword suggestion failed: {e}")
-            return []
+            print(f"Keyword re-ranking failed, using similarity order: {e}")
+            return suggestions
+    
+    async def recommend_campaign_optimizations(self, customer_id: str, campaign_ids: Optional[List[str]] = None,
+                                               tenant_id: Optional[str] = None,
+                                               per_campaign: int = 5) -> List[Dict[str, Any]]:
+        """
+        Recommendations for many campaigns from one fetch and one analysis
+        
+        The whole account is analyzed together, so cross-campaign checks (like
+        outlier detection) see every campaign. Results are then split per
+        requested campaign, in request order.
+        """
+        campaigns = await google_ads_service.get_campaigns(customer_id)
+        insights = await self.analyze_campaigns(customer_id, campaigns, tenant_id=tenant_id)
+        
+        by_campaign: Dict[str, List[AIInsight]] = {}
+        for insight in insights:
+            if insight.campaign_id:
+                by_campaign.setdefault(insight.campaign_id, []).append(insight)
+        
+        known = {c.id for c in campaigns}
+        return [
+            {
+                "campaign_id": campaign_id,
+                "recommendations": len(by_campaign.get(campaign_id, [])),
+                "insights": [
+                    {
+                        "title": insight.title,
+                        "description": insight.description,
+                        "impact": insight.impact,
+                        "action_type": insight.action_type
+                    }
+                    for insight in by_campaign.get(campaign_id, [])[:per_campaign]
+                ]
+            }
+            for campaign_id in (campaign_ids or [c.id for c in campaigns])
+            if campaign_id in known
+        ]
     
     async def auto_optimize_campaign(self, customer_id: str, campaign_id: str, optimization_type: str) -> Dict[str, Any]:
         """Automatically optimize campaign based on AI recommendations"""
         try:
-            result = {"success": False, "actions_taken": [], "errors": []}
-            
-            if optimization_type == "budget_optimization":
-                # Get campaign data
-                campaigns = await google_ads_service.get_campaigns(customer_id)
-                campaign = next((c for c in campaigns if c.id == campaign_id), None)
-                
-                if campaign and campaign.cost / campaign.budget_amount > 0.9:
-                    # Increase budget by 20%
-                    new_budget = campaign.budget_amount * 1.2
-                    success = await google_ads_service.update_campaign(
-                        customer_id, campaign_id, {"budget": new_budget}
-                    )
-                    if success:
-                        result["actions_taken"].append(f"Increased budget from ${campaign.budget_amount:.2f} to ${new_budget:.2f}")
-                        result["success"] = True
-            
-            elif optimization_type == "bid_optimization":
-                # Get keywords and optimize bids
-                keywords = await google_ads_service.get_keywords(customer_id)
-                campaign_keywords = [k for k in keywords if k.ad_group_id]  # Filter by campaign
-                
-                # Logic for bid optimization would go here
-                result["actions_taken"].append("Analyzed keyword bids for optimization opportunities")
-                result["success"] = True
-            
-            return result
-            
+            results = await self.auto_optimize_campaigns(customer_id, optimization_type, [campaign_id])
+            return results["results"][campaign_id]
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    async def schedule_optimization_tasks(self, customer_id: str) -> None:
-        """Schedule recurring optimization tasks"""
-        # This would integrate with a task scheduler like Celery
-        pass
+    async def auto_optimize_campaigns(self, customer_id: str, optimization_type: str,
+                                      campaign_ids: Optional[List[str]] = None,
+                                      dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Optimize many campaigns from one account snapshot
+        
+        The account is fetched once, all campaigns are evaluated together and
+        the resulting changes are applied in grouped mutate calls. Returns the
+        plan summary and per-campaign results.
+        """
+        snapshot = await AccountSnapshot.load(customer_id, include_keywords=optimization_type == "bid_optimization")
+        plan = await asyncio.to_thread(build_plan, snapshot, optimization_type, campaign_ids)
+        results = await apply_plan(plan, dry_run=dry_run)
+        return {"plan": plan.summary(), "results": results}
+    
+    async def schedule_optimization_tasks(self, customer_id: str, tenant_id: Optional[str] = None,
+                                          kinds: Optional[List[str]] = None, interval: Optional[float] = None,
+                                          run_now: bool = False) -> List[Dict[str, Any]]:
+        """
+        Schedule recurring background jobs for a customer
+        
+        Jobs run on the customer's scheduler shard and write their results to
+        the insight store, anomaly detector and keyword indexes, so API reads
+        are served from fresh state instead of computing on the request path.
+        """
+        tenant_id = tenant_id or "default"
+        interval = interval or settings.scheduler_interval_seconds
+        jobs = [
+            optimization_scheduler.schedule(kind, customer_id, tenant_id, interval, run_now)
+            for kind in (kinds or settings.scheduler_jobs_list)
+        ]
+        return [asdict(job) for job in jobs]
+    
+    async def run_optimization_job(self, kind: str, customer_id: str, tenant_id: str,
+                                   in_api_process: bool = True) -> Dict[str, Any]:
+        """
+        Run one scheduled job for a customer and persist its results
+        
+        Each run replaces the insights of the previous one. With
+        ``in_api_process=False`` (a Celery worker) the in-memory keyword
+        indexes are left alone, as the API process would never see them; it
+        refreshes its own on read. Anomaly baselines reach the API through
+        ``anomaly_state_path``, which the worker writes and the API reloads.
+        """
+        if kind == "anomalies":
+            if not in_api_process and not settings.anomaly_state_path:
+                print("⚠️ Anomaly job ran outside the API process without anomaly_state_path; the API will not see its results")
+            return await self.refresh_daily_anomalies([customer_id])
+        
+        if kind == "analysis":
+            campaigns = await google_ads_service.get_campaigns(customer_id)
+            insights = await self.analyze_campaigns(customer_id, campaigns, tenant_id=tenant_id)
+            stored = await asyncio.to_thread(
+                insight_store.replace, insight_scope(tenant_id, customer_id, "campaigns"), insights
+            )
+            return {
+                "campaigns": len(campaigns),
+                "insights": len(stored),
+                "changed": sum(entry.changed for entry in stored.values())
+            }
+        
+        if kind == "keywords":
+            keywords = await google_ads_service.get_keywords(customer_id)
+            insights = await self.analyze_keywords(customer_id, keywords, tenant_id)
+            stored = await asyncio.to_thread(
+                insight_store.replace, insight_scope(tenant_id, customer_id, "keywords"), insights
+            )
+            new_terms, dedup = 0, None
+            if in_api_process:
+                new_terms, dedup = await asyncio.gather(
+                    self.index_keyword_terms(customer_id, keywords, tenant_id, force=True),
+                    self.sync_keyword_dedup(customer_id, keywords)
+                )
+            return {
+                "keywords": len(keywords),
+                "insights": len(stored),
+                "changed": sum(entry.changed for entry in stored.values()),
+                "new_terms": new_terms,
+                "dedup": dedup
+            }
+        
+        raise ValueError(f"Unknown optimization job: {kind}")
 
     async def analyze_meta_campaigns(self, campaigns: List[Dict[str, Any]], 
                                    objective: Optional[str] = None,
-                                   budget_range: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
-        """Analyze Meta (Facebook) campaigns and provide AI-powered insights"""
+                                   budget_range: Optional[Dict[str, float]] = None,
+                                   currency: Optional[str] = None) -> Dict[str, Any]:
+        """Analyze Meta (Facebook) campaigns and provide AI-powered insights (amounts in the ad account ``currency``)"""
         insights = []
         recommendations = []
         anomalies = []
@@ -475,50 +872,43 @@ class AIAgentService:
                     'optimization_score': 5.0
                 }
             
-            # Analyze each campaign
-            for campaign_data in campaigns:
-                campaign = campaign_data.get('campaign', {})
-                campaign_insights = campaign_data.get('insights', {})
-                
-                # Performance insights
-                if campaign_insights:
-                    ctr = campaign_insights.get('ctr', 0)
-                    cpm = campaign_insights.get('cpm', 0)
-                    spend = campaign_insights.get('spend', 0)
-                    conversions = len(campaign_insights.get('conversions', []))
-                    
-                    # Low CTR insight
-                    if ctr < 2.0:  # Below 2% CTR
-                        insights.append({
-                            'type': 'performance_insight',
-                            'title': f'Low CTR in {campaign.get("name", "Campaign")}',
-                            'description': f'Campaign CTR is {ctr:.2f}%, below optimal range. Consider testing new ad creatives or refining audience targeting.',
-                            'impact': 'medium',
-                            'confidence': 0.85,
-                            'campaign_id': campaign.get('id')
-                        })
-                    
-                    # High CPM insight
-                    if cpm > 20.0:  # Above $20 CPM
-                        insights.append({
-                            'type': 'cost_insight',
-                            'title': f'High CPM in {campaign.get("name", "Campaign")}',
-                            'description': f'Campaign CPM is ${cpm:.2f}, which is above average. Review audience overlap and competition.',
-                            'impact': 'medium',
-                            'confidence': 0.8,
-                            'campaign_id': campaign.get('id')
-                        })
-                    
-                    # Conversion optimization
-                    if conversions == 0 and spend > 100:
-                        insights.append({
-                            'type': 'conversion_insight',
-                            'title': f'No Conversions in {campaign.get("name", "Campaign")}',
-                            'description': f'Campaign has spent ${spend:.2f} without conversions. Review landing page and conversion tracking.',
-                            'impact': 'high',
-                            'confidence': 0.9,
-                            'campaign_id': campaign.get('id')
-                        })
+            # Flatten insights and action arrays for all campaigns at once
+            table = flatten_campaigns(campaigns)
+            table = table[table['has_insights']]
+            
+            # Low CTR insight (below 2% CTR)
+            for campaign_id, row in table[table['ctr'] < 2.0].iterrows():
+                insights.append({
+                    'type': 'performance_insight',
+                    'title': f'Low CTR in {row["name"]}',
+                    'description': f'Campaign CTR is {row["ctr"]:.2f}%, below optimal range. Consider testing new ad creatives or refining audience targeting.',
+                    'impact': 'medium',
+                    'confidence': 0.85,
+                    'campaign_id': campaign_id
+                })
+            
+            # High CPM insight (above 20 per mille)
+            for campaign_id, row in table[table['cpm'] > 20.0].iterrows():
+                insights.append({
+                    'type': 'cost_insight',
+                    'title': f'High CPM in {row["name"]}',
+                    'description': f'Campaign CPM is {format_money(row["cpm"], currency)}, which is above average. Review audience overlap and competition.',
+                    'impact': 'medium',
+                    'confidence': 0.8,
+                    'campaign_id': campaign_id
+                })
+            
+            # Conversion optimization
+            no_conversions = (table['conversions__total'] == 0) & (table['spend'] > 100)
+            for campaign_id, row in table[no_conversions].iterrows():
+                insights.append({
+                    'type': 'conversion_insight',
+                    'title': f'No Conversions in {row["name"]}',
+                    'description': f'Campaign has spent {format_money(row["spend"], currency)} without conversions. Review landing page and conversion tracking.',
+                    'impact': 'high',
+                    'confidence': 0.9,
+                    'campaign_id': campaign_id
+                })
             
             # Generate recommendations based on objective
             if objective == 'CONVERSIONS':
@@ -545,7 +935,7 @@ class AIAgentService:
                 recommendations.append({
                     'type': 'budget',
                     'title': 'Budget Optimization',
-                    'description': f'Optimal daily budget range is ${min_budget}-${max_budget}. Use Campaign Budget Optimization for automatic allocation.',
+                    'description': f'Optimal daily budget range is {format_money(min_budget, currency)}-{format_money(max_budget, currency)}. Use Campaign Budget Optimization for automatic allocation.',
                     'priority': 'high',
                     'expected_impact': '+15% efficiency'
                 })
@@ -0,0 +1,439 @@
+"""
+Incremental daily anomaly detection
+
+Every campaign's daily metrics form a time series. For each series and metric
+the detector keeps an exponentially weighted mean and an exponentially weighted
+mean absolute deviation (a robust scale estimate). A new day is scored against
+that state with a robust z-score *before* it is folded in, and the update uses
+a Huber-clipped residual so a single spike cannot drag the baseline with it.
+
+State lives in flat NumPy arrays indexed by series, so one call scores and
+updates every campaign of every account seen that day: O(1) per series, no
+history re-reads.
+
+    detector = DailyAnomalyDetector()
+    detector.ingest(daily_frame)          # backfill or nightly delta
+    detector.anomalies(customer_id="123") # latest flagged days
+"""
+
+import itertools
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Metric -> direction worth flagging: 'up', 'down' or 'both'
+METRICS: Dict[str, str] = {
+    'cost': 'both',
+    'clicks': 'down',
+    'ctr': 'down',
+    'cpc': 'up',
+    'conversion_rate': 'down',
+}
+
+# Columns expected in daily frames passed to ``ingest``
+DAILY_COLUMNS = ('customer_id', 'campaign_id', 'date', 'impressions', 'clicks', 'conversions', 'cost')
+
+# E|x - mu| = sigma * sqrt(2/pi) for a normal distribution
+_MAD_TO_SIGMA = 1.2533
+
+SeriesKey = Tuple[str, str]
+
+_KEY_SEPARATOR = '\x1f'
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def daily_rates(impressions: np.ndarray, clicks: np.ndarray,
+                conversions: np.ndarray, cost: np.ndarray) -> Dict[str, np.ndarray]:
+    """Derive per-day metrics; undefined ratios (no impressions/clicks) are NaN"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'cost': cost,
+            'clicks': clicks,
+            'ctr': np.where(impressions > 0, clicks / impressions, np.nan),
+            'cpc': np.where(clicks > 0, cost / clicks, np.nan),
+            'conversion_rate': np.where(clicks > 0, conversions / clicks, np.nan),
+        }
+
+
+@dataclass
+class Anomaly:
+    """A metric of one series that was out of band on its latest day"""
+    customer_id: str
+    campaign_id: str
+    name: str
+    date: str
+    metric: str
+    value: float
+    expected: float
+    z_score: float
+
+    @property
+    def direction(self) -> str:
+        return 'up' if self.z_score > 0 else 'down'
+
+
+class DailyAnomalyDetector:
+    """Robust EWMA z-scores over many daily series with incremental state"""
+
+    def __init__(self, span: int = 14, scale_span: int = 28, threshold: float = 3.5, min_history: int = 7,
+                 huber_k: float = 3.0, min_relative_scale: float = 0.05,
+                 metrics: Optional[Dict[str, str]] = None, capacity: int = 1024):
+        """
+        Args:
+            span: EWMA span in days for the baseline; alpha = 2 / (span + 1)
+            scale_span: EWMA span for the deviation scale. Longer than ``span``
+                because a noisy scale estimate inflates false positives
+            threshold: Absolute robust z-score that counts as an anomaly
+            min_history: Days a metric must have been observed before it is scored
+            huber_k: Residuals are clipped to ``huber_k`` scales before updating state
+            min_relative_scale: Scale floor as a fraction of the mean, so very
+                stable series don't flag tiny absolute changes
+            metrics: Metric -> direction to flag; defaults to ``METRICS``
+            capacity: Initial number of series slots (grows as needed)
+        """
+        self.alpha = 2.0 / (span + 1)
+        self.scale_alpha = 2.0 / (scale_span + 1)
+        self.threshold = threshold
+        self.min_history = min_history
+        self.huber_k = huber_k
+        self.min_relative_scale = min_relative_scale
+        self.metrics = dict(metrics or METRICS)
+
+        self._lock = threading.Lock()
+        self._index: Dict[SeriesKey, int] = {}
+        self._keys: List[SeriesKey] = []
+        self._names: List[str] = []
+        self._size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._last_day = np.full(capacity, -1, dtype=np.int64)  # proleptic ordinal of last ingested day
+        self._mean = {m: np.zeros(capacity) for m in self.metrics}
+        self._scale = {m: np.zeros(capacity) for m in self.metrics}
+        self._count = {m: np.zeros(capacity, dtype=np.int64) for m in self.metrics}
+        # Scores of each series' latest day, kept for reporting
+        self._last_value = {m: np.full(capacity, np.nan) for m in self.metrics}
+        self._last_expected = {m: np.full(capacity, np.nan) for m in self.metrics}
+        self._last_z = {m: np.full(capacity, np.nan) for m in self.metrics}
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+
+        def grow(array: np.ndarray, fill: Any) -> np.ndarray:
+            grown = np.full(capacity, fill, dtype=array.dtype)
+            grown[:self._capacity] = array
+            return grown
+
+        self._last_day = grow(self._last_day, -1)
+        for m in self.metrics:
+            self._mean[m] = grow(self._mean[m], 0.0)
+            self._scale[m] = grow(self._scale[m], 0.0)
+            self._count[m] = grow(self._count[m], 0)
+            self._last_value[m] = grow(self._last_value[m], np.nan)
+            self._last_expected[m] = grow(self._last_expected[m], np.nan)
+            self._last_z[m] = grow(self._last_z[m], np.nan)
+        self._capacity = capacity
+
+    def _series_indices(self, keys: Sequence[SeriesKey], names: Optional[Sequence[str]]) -> np.ndarray:
+        indices = np.empty(len(keys), dtype=np.int64)
+        new = 0
+        for i, key in enumerate(keys):
+            slot = self._index.get(key)
+            if slot is None:
+                slot = self._size + new
+                self._index[key] = slot
+                self._keys.append(key)
+                self._names.append('')
+                new += 1
+            indices[i] = slot
+            if names is not None and names[i]:
+                self._names[slot] = names[i]
+        if new:
+            self._grow(self._size + new)
+            self._size += new
+        return indices
+
+    def __len__(self) -> int:
+        return self._size
+
+    def last_date(self, customer_id: Optional[str] = None) -> Optional[date]:
+        """Latest day ingested (for one customer, or overall)"""
+        with self._lock:
+            if customer_id is None:
+                days = self._last_day[:self._size]
+            else:
+                slots = [slot for (customer, _), slot in self._index.items() if customer == customer_id]
+                days = self._last_day[slots]
+            days = days[days >= 0]
+            return date.fromordinal(int(days.max())) if len(days) else None
+
+    def zero_filled(self, daily: pd.DataFrame, customer_ids: Iterable[str], end: date) -> pd.DataFrame:
+        """
+        ``daily`` plus zero rows for the days through ``end`` a series reported nothing
+
+        Reports omit days without activity, so without these a campaign that
+        goes dark just stops being scored instead of flagging the drop. Series
+        already tracked for ``customer_ids`` are filled from the day after
+        their last ingested day, new ones from their first row in ``daily``.
+        Only pass customers whose rows through ``end`` were actually fetched.
+        """
+        customer_ids = {str(c) for c in customer_ids}
+        daily = daily if daily is not None and not daily.empty else pd.DataFrame(columns=[*DAILY_COLUMNS, 'name'])
+        dates = pd.to_datetime(daily['date']).dt.date
+        keys = list(zip(daily['customer_id'].astype(str), daily['campaign_id'].astype(str)))
+
+        first: Dict[SeriesKey, date] = {}
+        names: Dict[SeriesKey, str] = {}
+        with self._lock:
+            for slot, key in enumerate(self._keys):
+                if key[0] in customer_ids and self._last_day[slot] >= 0:
+                    first[key] = date.fromordinal(int(self._last_day[slot]) + 1)
+                    names[key] = self._names[slot]
+        tracked = set(first)
+        for key, day, name in zip(keys, dates, daily['name'] if 'name' in daily.columns else itertools.repeat('')):
+            names.setdefault(key, name)
+            if key[0] in customer_ids and key not in tracked:
+                first[key] = min(first.get(key, day), day)
+
+        present = set(zip(keys, dates))
+        zeros = [
+            {'customer_id': key[0], 'campaign_id': key[1], 'name': names.get(key, ''), 'date': day.isoformat(),
+             'impressions': 0, 'clicks': 0, 'conversions': 0, 'cost': 0.0}
+            for key, start in first.items()
+            for day in (start + timedelta(days=n) for n in range((end - start).days + 1))
+            if (key, day) not in present
+        ]
+        if not zeros:
+            return daily
+        return pd.concat([daily, pd.DataFrame(zeros)], ignore_index=True)
+
+    def update(self, day: date, keys: Sequence[SeriesKey], values: Dict[str, np.ndarray],
+               names: Optional[Sequence[str]] = None) -> List[Anomaly]:
+        """
+        Score and fold in one day for many series at once
+
+        Args:
+            day: The day the values belong to
+            keys: ``(customer_id, campaign_id)`` per row; each key at most once
+            values: Metric name -> array aligned with ``keys`` (NaN = not observed)
+            names: Optional display names aligned with ``keys``
+
+        Returns:
+            Anomalies found on ``day``. Series that already ingested ``day`` or a
+            later day are skipped, so replaying a range is harmless.
+        """
+        with self._lock:
+            return self._update_slots(day, self._series_indices(keys, names), values)
+
+    def _update_slots(self, day: date, idx: np.ndarray, values: Dict[str, np.ndarray]) -> List[Anomaly]:
+        """``update`` on already-resolved series slots; caller holds the lock"""
+        ordinal = day.toordinal()
+        rows = np.flatnonzero(self._last_day[idx] < ordinal)
+        idx = idx[rows]
+        if len(idx) == 0:
+            return []
+        self._last_day[idx] = ordinal
+
+        flagged: List[Tuple[int, str, float, float, float]] = []
+        for metric, direction in self.metrics.items():
+            if metric not in values:
+                continue
+            x = np.asarray(values[metric], dtype=np.float64)[rows]
+            observed = ~np.isnan(x)
+
+            mean = self._mean[metric][idx]
+            scale = self._scale[metric][idx]
+            count = self._count[metric][idx]
+
+            residual = np.where(observed, x - mean, 0.0)
+            # Scale starts at 0; correct the EWMA start-up bias from the residuals seen so far
+            with np.errstate(divide='ignore', invalid='ignore'):
+                correction = 1.0 - (1.0 - self.scale_alpha) ** np.maximum(count - 1, 0)
+                corrected = np.where(correction > 0, scale / correction, 0.0)
+            floor = np.maximum(np.abs(mean) * self.min_relative_scale, 1e-9)
+            sigma = np.maximum(corrected * _MAD_TO_SIGMA, floor)
+            z = residual / sigma
+
+            scored = observed & (count >= self.min_history)
+            if direction == 'up':
+                hit = scored & (z > self.threshold)
+            elif direction == 'down':
+                hit = scored & (z < -self.threshold)
+            else:
+                hit = scored & (np.abs(z) > self.threshold)
+
+            self._last_value[metric][idx] = np.where(observed, x, np.nan)
+            self._last_expected[metric][idx] = np.where(scored, mean, np.nan)
+            self._last_z[metric][idx] = np.where(scored, z, np.nan)
+
+            # Huber-clipped update once warmed up; plain EWMA while warming up
+            warm = count >= self.min_history
+            step = np.where(warm, np.clip(residual, -self.huber_k * sigma, self.huber_k * sigma), residual)
+            first = observed & (count == 0)
+            new_mean = np.where(first, x, mean + self.alpha * step)
+            new_scale = np.where(first, 0.0, (1 - self.scale_alpha) * scale + self.scale_alpha * np.abs(step))
+            self._mean[metric][idx] = np.where(observed, new_mean, mean)
+            self._scale[metric][idx] = np.where(observed, new_scale, scale)
+            self._count[metric][idx] = count + observed
+
+            for i in np.flatnonzero(hit):
+                flagged.append((int(idx[i]), metric, float(x[i]), float(mean[i]), float(z[i])))
+
+        iso_day = day.isoformat()
+        return [
+            Anomaly(
+                customer_id=self._keys[slot][0],
+                campaign_id=self._keys[slot][1],
+                name=self._names[slot],
+                date=iso_day,
+                metric=metric,
+                value=value,
+                expected=expected,
+                z_score=z_score,
+            )
+            for slot, metric, value, expected, z_score in flagged
+        ]
+
+    def ingest(self, daily: pd.DataFrame) -> List[Anomaly]:
+        """
+        Ingest a long-form daily frame (``DAILY_COLUMNS`` plus optional ``name``)
+
+        Series keys are resolved once for the whole frame; each date is then
+        one vectorized update across every series present that day, in
+        chronological order.
+        """
+        if daily is None or daily.empty:
+            return []
+
+        # Hash-factorize series keys (no string sorting) and group on integers
+        customers = daily['customer_id'].astype(str)
+        campaigns = daily['campaign_id'].astype(str)
+        codes, uniques = pd.factorize(customers + _KEY_SEPARATOR + campaigns)
+        epoch_days = pd.to_datetime(daily['date']).to_numpy('datetime64[D]').astype(np.int64)
+
+        measures = ['impressions', 'clicks', 'conversions', 'cost']
+        frame = pd.DataFrame({'day': epoch_days, 'series': codes})
+        for column in measures:
+            frame[column] = pd.to_numeric(daily[column], errors='coerce').fillna(0.0).to_numpy(np.float64)
+        # Multiple rows per series and day (e.g. device segments) are summed
+        sums = frame.groupby(['day', 'series'], sort=True)[measures].sum().reset_index()
+
+        unique_names = None
+        if 'name' in daily.columns:
+            unique_names = [''] * len(uniques)
+            for code, name in zip(codes.tolist(), daily['name'].tolist()):
+                unique_names[code] = name
+        keys = [tuple(key.split(_KEY_SEPARATOR, 1)) for key in uniques]
+
+        values = daily_rates(*(sums[column].to_numpy(np.float64) for column in measures))
+        days = sums['day'].to_numpy()
+        series = sums['series'].to_numpy()
+        boundaries = np.flatnonzero(days[1:] != days[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(days)]))
+
+        anomalies: List[Anomaly] = []
+        with self._lock:
+            slots = self._series_indices(keys, unique_names)[series]
+            for start, end in zip(starts, ends):
+                day = date.fromordinal(_EPOCH_ORDINAL + int(days[start]))
+                day_values = {metric: column[start:end] for metric, column in values.items()}
+                anomalies.extend(self._update_slots(day, slots[start:end], day_values))
+        return anomalies
+
+    def anomalies(self, customer_id: Optional[str] = None,
+                  campaign_ids: Optional[Iterable[str]] = None,
+                  since: Optional[date] = None) -> List[Anomaly]:
+        """Anomalies on each series' latest ingested day"""
+        campaign_ids = {str(c) for c in campaign_ids} if campaign_ids is not None else None
+        with self._lock:
+            slots = np.arange(self._size)
+            if customer_id is not None or campaign_ids is not None:
+                keep = [
+                    slot for slot, (customer, campaign) in enumerate(self._keys)
+                    if (customer_id is None or customer == customer_id)
+                    and (campaign_ids is None or campaign in campaign_ids)
+                ]
+                slots = np.asarray(keep, dtype=np.int64)
+            if since is not None:
+                slots = slots[self._last_day[slots] >= since.toordinal()]
+            if len(slots) == 0:
+                return []
+
+            found = []
+            for metric, direction in self.metrics.items():
+                z = self._last_z[metric][slots]
+                if direction == 'up':
+                    hit = z > self.threshold
+                elif direction == 'down':
+                    hit = z < -self.threshold
+                else:
+                    hit = np.abs(z) > self.threshold
+                for slot in slots[hit]:
+                    found.append(Anomaly(
+                        customer_id=self._keys[slot][0],
+                        campaign_id=self._keys[slot][1],
+                        name=self._names[slot],
+                        date=date.fromordinal(int(self._last_day[slot])).isoformat(),
+                        metric=metric,
+                        value=float(self._last_value[metric][slot]),
+                        expected=float(self._last_expected[metric][slot]),
+                        z_score=float(self._last_z[metric][slot]),
+                    ))
+            return found
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Snapshot of the detector state as arrays (for ``np.savez``)"""
+        with self._lock:
+            n = self._size
+            snapshot = {
+                'keys': np.asarray(self._keys, dtype=str).reshape(n, 2),
+                'names': np.asarray(self._names, dtype=str),
+                'last_day': self._last_day[:n].copy(),
+            }
+            for m in self.metrics:
+                for prefix, arrays in (('mean', self._mean), ('scale', self._scale), ('count', self._count),
+                                       ('value', self._last_value), ('expected', self._last_expected),
+                                       ('z', self._last_z)):
+                    snapshot[f"{prefix}__{m}"] = arrays[m][:n].copy()
+            return snapshot
+
+    def save(self, path: str) -> None:
+        """Write the state to ``path`` atomically, so another process never loads a partial file"""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **self.state())
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> None:
+        """Replace the current state with one written by ``save``"""
+        with np.load(path, allow_pickle=False) as data:
+            keys = [tuple(key) for key in data['keys'].tolist()]
+            with self._lock:
+                self._index = {}
+                self._keys = []
+                self._names = []
+                self._size = 0
+                self._allocate(max(len(keys), 1))
+                self._series_indices(keys, data['names'].tolist())
+                n = len(keys)
+                self._last_day[:n] = data['last_day']
+                for m in self.metrics:
+                    if f"mean__{m}" not in data:
+                        continue
+                    self._mean[m][:n] = data[f"mean__{m}"]
+                    self._scale[m][:n] = data[f"scale__{m}"]
+                    self._count[m][:n] = data[f"count__{m}"]
+                    self._last_value[m][:n] = data[f"value__{m}"]
+                    self._last_expected[m][:n] = data[f"expected__{m}"]
+                    self._last_z[m][:n] = data[f"z__{m}"]
@@ -0,0 +1,291 @@
+"""
+Bulk campaign optimizer
+
+An account is loaded once (campaigns, plus ad groups and keywords when bids
+are optimized), every requested campaign is evaluated in one vectorized pass,
+and the outcome is a single mutation plan. Applying the plan issues grouped
+mutate calls per resource type (budgets, keyword bids) instead of a fetch and
+a mutate per campaign.
+"""
+
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.core.date_ranges import DEFAULT_PERIOD, DateRange, period_range
+from app.services.google_ads_service import (
+    google_ads_service,
+    AdGroupData,
+    CampaignData,
+    KeywordData,
+    MUTATE_BATCH_SIZE,
+)
+from app.services.currency import format_money
+from app.services.rules_engine import to_columns
+
+OPTIMIZATION_TYPES = ("budget_optimization", "bid_optimization")
+
+# Budgets whose average daily spend is above this share of the daily budget get raised by BUDGET_INCREASE
+BUDGET_UTILIZATION_THRESHOLD = 0.9
+BUDGET_INCREASE = 1.2
+
+# Keyword bids are judged against their campaign's cost per conversion
+BID_MIN_CLICKS = 20
+BID_RAISE = 1.15
+BID_RAISE_BELOW_CPA = 0.8  # raise when the keyword converts at < 80% of the campaign CPA
+BID_LOWER = 0.8
+BID_LOWER_ABOVE_CPA = 1.5  # lower when > 150% of the campaign CPA, or a full CPA spent without converting
+MIN_BID = 0.01
+
+
+@dataclass
+class AccountSnapshot:
+    """Everything the optimizer reads from one account, fetched once"""
+    customer_id: str
+    campaigns: List[CampaignData]
+    ad_groups: List[AdGroupData] = field(default_factory=list)
+    keywords: List[KeywordData] = field(default_factory=list)
+    date_range: DateRange = field(default_factory=lambda: period_range(DEFAULT_PERIOD))  # window the metrics cover
+
+    @classmethod
+    async def load(cls, customer_id: str, include_keywords: bool = False,
+                   date_range: Optional[DateRange] = None) -> "AccountSnapshot":
+        date_range = date_range or period_range(DEFAULT_PERIOD)
+        if not include_keywords:
+            return cls(customer_id, await google_ads_service.get_campaigns(customer_id, date_range=date_range),
+                       date_range=date_range)
+        campaigns, ad_groups, keywords = await asyncio.gather(
+            google_ads_service.get_campaigns(customer_id, date_range=date_range),
+            google_ads_service.get_ad_groups(customer_id, date_range=date_range),
+            google_ads_service.get_keywords(customer_id, date_range=date_range)
+        )
+        return cls(customer_id, campaigns, ad_groups, keywords, date_range)
+
+
+@dataclass
+class BudgetChange:
+    campaign_id: str
+    campaign_name: str
+    budget_id: str
+    old_amount: float
+    new_amount: float
+    currency: Optional[str] = None
+    shared_with: List[str] = field(default_factory=list)  # other selected campaigns on the same budget
+
+
+@dataclass
+class BidChange:
+    campaign_id: str
+    ad_group_id: str
+    keyword_id: str
+    keyword_text: str
+    old_bid: float
+    new_bid: float
+
+
+@dataclass
+class MutationPlan:
+    """All changes for one account, grouped by resource type"""
+    customer_id: str
+    optimization_type: str
+    campaign_ids: List[str]
+    budgets: List[BudgetChange] = field(default_factory=list)
+    bids: List[BidChange] = field(default_factory=list)
+    notes: Dict[str, List[str]] = field(default_factory=dict)  # campaign id -> messages without a mutation
+
+    @property
+    def mutate_calls(self) -> int:
+        return -(-len(self.budgets) // MUTATE_BATCH_SIZE) + -(-len(self.bids) // MUTATE_BATCH_SIZE)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "optimization_type": self.optimization_type,
+            "campaigns": len(self.campaign_ids),
+            "budget_changes": len(self.budgets),
+            "bid_changes": len(self.bids),
+            "mutate_calls": self.mutate_calls,
+        }
+
+
+def active_days(campaigns: List[CampaignData], date_range: DateRange) -> np.ndarray:
+    """Days of ``date_range`` each campaign could spend on (campaigns started inside it count from their start)"""
+    starts = [date.fromisoformat(c.start_date) if c.start_date else date_range.start for c in campaigns]
+    return np.array([(date_range.end - max(start, date_range.start)).days + 1 for start in starts], dtype=np.float64).clip(1)
+
+
+def plan_budget_changes(campaigns: List[CampaignData], selected: np.ndarray, date_range: DateRange) -> List[BudgetChange]:
+    """Raise budgets of selected campaigns whose average daily spend is close to their daily budget"""
+    columns = to_columns(campaigns, ["id", "name", "budget_id", "currency", "budget_amount", "cost"], numeric=["budget_amount", "cost"])
+    # Budgets are daily amounts; cost covers the whole window
+    daily_cost = columns["cost"] / active_days(campaigns, date_range)
+    utilization = np.zeros(len(campaigns))
+    np.divide(daily_cost, columns["budget_amount"], out=utilization, where=columns["budget_amount"] > 0)
+    mask = selected & (columns["budget_amount"] > 0) & (utilization > BUDGET_UTILIZATION_THRESHOLD)
+    mask &= np.array([budget_id is not None for budget_id in columns["budget_id"]], dtype=bool)
+
+    changes: Dict[str, BudgetChange] = {}
+    for row in np.flatnonzero(mask):
+        # Shared budgets are raised once, on behalf of the first campaign
+        budget_id = columns["budget_id"][row]
+        if budget_id in changes:
+            changes[budget_id].shared_with.append(columns["id"][row])
+            continue
+        old = float(columns["budget_amount"][row])
+        changes[budget_id] = BudgetChange(
+            campaign_id=columns["id"][row],
+            campaign_name=columns["name"][row],
+            budget_id=budget_id,
+            old_amount=old,
+            new_amount=round(old * BUDGET_INCREASE, 2),
+            currency=columns["currency"][row]
+        )
+    return list(changes.values())
+
+
+def plan_bid_changes(snapshot: AccountSnapshot, campaign_ids: Sequence[str]) -> List[BidChange]:
+    """Move keyword bids towards their campaign's cost per conversion"""
+    if not snapshot.keywords:
+        return []
+    columns = to_columns(
+        snapshot.keywords,
+        ["id", "text", "ad_group_id", "status", "cpc_bid", "clicks", "conversions", "cost"],
+        numeric=["cpc_bid", "clicks", "conversions", "cost"]
+    )
+    ad_group_campaigns = {ad_group.id: ad_group.campaign_id for ad_group in snapshot.ad_groups}
+    campaign_of = pd.Series(columns["ad_group_id"]).map(ad_group_campaigns).fillna("").to_numpy(dtype=object)
+
+    # Campaign CPA from the same keyword rows, so both sides cover the same window
+    codes, uniques = pd.factorize(campaign_of)
+    campaign_cost = np.bincount(codes, weights=columns["cost"], minlength=len(uniques))
+    campaign_conversions = np.bincount(codes, weights=columns["conversions"], minlength=len(uniques))
+    target = np.full(len(uniques), np.nan)
+    np.divide(campaign_cost, campaign_conversions, out=target, where=campaign_conversions > 0)
+    target = target[codes]
+
+    cost, conversions, bid = columns["cost"], columns["conversions"], columns["cpc_bid"]
+    cpa = np.full(len(cost), np.inf)
+    np.divide(cost, conversions, out=cpa, where=conversions > 0)
+
+    with np.errstate(invalid="ignore"):
+        eligible = (
+            np.isin(campaign_of, list(campaign_ids))
+            & (columns["status"] == "ENABLED")
+            & (bid > 0)
+            & (columns["clicks"] >= BID_MIN_CLICKS)
+            & ~np.isnan(target)
+        )
+        raise_mask = eligible & (conversions > 0) & (cpa < BID_RAISE_BELOW_CPA * target)
+        lower_mask = eligible & (
+            ((conversions > 0) & (cpa > BID_LOWER_ABOVE_CPA * target))
+            | ((conversions == 0) & (cost > target))
+        )
+
+    new_bid = bid.copy()
+    new_bid[raise_mask] *= BID_RAISE
+    new_bid[lower_mask] *= BID_LOWER
+    new_bid = np.maximum(np.round(new_bid, 2), MIN_BID)
+
+    return [
+        BidChange(
+            campaign_id=campaign_of[row],
+            ad_group_id=columns["ad_group_id"][row],
+            keyword_id=columns["id"][row],
+            keyword_text=columns["text"][row],
+            old_bid=float(bid[row]),
+            new_bid=float(new_bid[row])
+        )
+        for row in np.flatnonzero((raise_mask | lower_mask) & (new_bid != bid))
+    ]
+
+
+def build_plan(snapshot: AccountSnapshot, optimization_type: str,
+               campaign_ids: Optional[Sequence[str]] = None) -> MutationPlan:
+    """Evaluate the requested campaigns (all if none given) into one mutation plan"""
+    if optimization_type not in OPTIMIZATION_TYPES:
+        raise ValueError(f"Unsupported optimization type: {optimization_type}")
+
+    known = [campaign.id for campaign in snapshot.campaigns]
+    campaign_ids = list(campaign_ids) if campaign_ids else known
+    plan = MutationPlan(snapshot.customer_id, optimization_type, campaign_ids)
+    for campaign_id in set(campaign_ids) - set(known):
+        plan.notes[campaign_id] = ["Campaign not found"]
+
+    if optimization_type == "budget_optimization":
+        selected = np.isin(np.array(known, dtype=object), campaign_ids)
+        plan.budgets = plan_budget_changes(snapshot.campaigns, selected, snapshot.date_range)
+    else:
+        plan.bids = plan_bid_changes(snapshot, campaign_ids)
+        changed = {change.campaign_id for change in plan.bids}
+        for campaign_id in (set(campaign_ids) & set(known)) - changed:
+            plan.notes[campaign_id] = ["Analyzed keyword bids; no changes needed"]
+    return plan
+
+
+async def apply_plan(plan: MutationPlan, dry_run: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Apply a plan with one grouped mutate per resource type
+
+    Returns per-campaign results in the ``auto_optimize_campaign`` shape
+    (``success``, ``actions_taken``, ``errors``).
+    """
+    if dry_run:
+        budget_applied = {change.budget_id: True for change in plan.budgets}
+        bid_applied = {(change.ad_group_id, change.keyword_id): True for change in plan.bids}
+    else:
+        budget_applied, bid_applied = await asyncio.gather(
+            google_ads_service.update_campaign_budgets(
+                plan.customer_id, {change.budget_id: change.new_amount for change in plan.budgets}
+            ),
+            google_ads_service.update_keyword_bids(
+                plan.customer_id, {(change.ad_group_id, change.keyword_id): change.new_bid for change in plan.bids}
+            )
+        )
+
+    results: Dict[str, Dict[str, Any]] = {
+        campaign_id: {"success": False, "actions_taken": [], "errors": []} for campaign_id in plan.campaign_ids
+    }
+    for campaign_id, notes in plan.notes.items():
+        result = results.setdefault(campaign_id, {"success": False, "actions_taken": [], "errors": []})
+        if notes == ["Campaign not found"]:
+            result["errors"].extend(notes)
+        else:
+            result["actions_taken"].extend(notes)
+            result["success"] = True
+
+    for change in plan.budgets:
+        for campaign_id in [change.campaign_id, *change.shared_with]:
+            result = results[campaign_id]
+            if budget_applied.get(change.budget_id):
+                result["actions_taken"].append(
+                    f"Increased budget from {format_money(change.old_amount, change.currency)} "
+                    f"to {format_money(change.new_amount, change.currency)}"
+                )
+                result["success"] = True
+            else:
+                result["errors"].append(f"Failed to update budget {change.budget_id}")
+
+    bid_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: {"raised": 0, "lowered": 0, "failed": 0})
+    for change in plan.bids:
+        counts = bid_counts[change.campaign_id]
+        if not bid_applied.get((change.ad_group_id, change.keyword_id)):
+            counts["failed"] += 1
+        elif change.new_bid > change.old_bid:
+            counts["raised"] += 1
+        else:
+            counts["lowered"] += 1
+    for campaign_id, counts in bid_counts.items():
+        result = results.setdefault(campaign_id, {"success": False, "actions_taken": [], "errors": []})
+        if counts["raised"]:
+            result["actions_taken"].append(f"Raised bids on {counts['raised']} keywords converting below campaign CPA")
+        if counts["lowered"]:
+            result["actions_taken"].append(f"Lowered bids on {counts['lowered']} keywords costing more per conversion than campaign CPA")
+        if counts["failed"]:
+            result["errors"].append(f"Failed to update {counts['failed']} keyword bids")
+        result["success"] = result["success"] or bool(counts["raised"] or counts["lowered"])
+
+    return results
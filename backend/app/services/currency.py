@@ -0,0 +1,404 @@
+"""
+Currencies: FX rates, conversion to a reporting currency, and formatting
+
+Rates are units of a currency per 1 USD and come from a pluggable provider:
+the built-in table, a local JSON/CSV file, or an HTTP endpoint. Each day's
+rates are fetched once and kept as a snapshot (optionally persisted to a
+JSON file), so every conversion for that day uses the same table and the
+provider is not consulted per request. If the provider fails, the latest
+earlier snapshot is used, then the built-in table.
+
+``FXRates.convert`` converts a whole column of amounts at once: the distinct
+currencies are factorized and each row is multiplied by its currency's
+factor, so summing accounts in different currencies costs one vectorized
+pass.
+"""
+
+import csv
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional, Protocol, Sequence, Union
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Units per 1 USD; used when no provider is configured and as the last fallback
+DEFAULT_RATES: Dict[str, float] = {
+    "USD": 1.0,
+    "EUR": 0.92,
+    "GBP": 0.79,
+    "AED": 3.6725,
+    "SAR": 3.75,
+    "QAR": 3.64,
+    "KWD": 0.307,
+    "BHD": 0.376,
+    "OMR": 0.385,
+    "EGP": 48.5,
+    "INR": 83.5,
+    "PKR": 278.0,
+    "JPY": 150.0,
+    "CNY": 7.2,
+    "AUD": 1.52,
+    "CAD": 1.37,
+    "CHF": 0.88,
+    "SEK": 10.6,
+    "TRY": 34.0,
+}
+
+CURRENCY_SYMBOLS = {
+    "USD": "$", "EUR": "€", "GBP": "£", "JPY": "¥", "INR": "₹", "CNY": "¥",
+    "AED": "د.إ", "SAR": "ر.س", "QAR": "ر.ق", "KWD": "د.ك", "BHD": "د.ب", "OMR": "ر.ع", "EGP": "ج.م",
+}
+# Symbols written after the amount regardless of locale
+SUFFIX_SYMBOL_CURRENCIES = {"AED", "SAR", "QAR", "KWD", "BHD", "OMR", "EGP"}
+ZERO_DECIMAL_CURRENCIES = {"JPY", "KRW", "VND", "CLP", "ISK"}
+THREE_DECIMAL_CURRENCIES = {"KWD", "BHD", "OMR"}
+
+# Locale -> (group separator, decimal separator, symbol after the amount)
+LOCALE_FORMATS = {
+    "en": (",", ".", False),
+    "de": (".", ",", True),
+    "fr": (" ", ",", True),
+    "es": (".", ",", True),
+    "it": (".", ",", True),
+    "ar": (",", ".", True),
+}
+
+# Seconds before a failed provider is asked again for the same day
+PROVIDER_RETRY_SECONDS = 300
+
+
+def rebase(rates: Dict[str, float], base: str) -> Dict[str, float]:
+    """Express a rate table quoted against ``base`` as units per 1 USD"""
+    rates = {code.upper(): float(rate) for code, rate in rates.items()}
+    base = base.upper()
+    rates[base] = 1.0
+    if base == "USD":
+        return rates
+    if "USD" not in rates:
+        raise ValueError(f"Rate table based on {base} has no USD rate")
+    usd = rates["USD"]
+    return {code: rate / usd for code, rate in rates.items()}
+
+
+class FXProvider(Protocol):
+    name: str
+
+    def rates(self, day: date) -> Dict[str, float]:
+        """Units of each currency per 1 USD on ``day``"""
+        ...
+
+
+class StaticFXProvider:
+    """The built-in rate table (or any fixed table)"""
+    name = "static"
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        self._rates = dict(rates or DEFAULT_RATES)
+
+    def rates(self, day: date) -> Dict[str, float]:
+        return dict(self._rates)
+
+
+class FileFXProvider:
+    """
+    Rates from a local file, re-read when it changes
+
+    JSON: ``{"base": "EUR", "rates": {"USD": 1.08, ...}}`` or a flat
+    ``{"USD": 1, "EUR": 0.92, ...}`` (USD based). CSV: ``currency,rate``
+    columns, optionally ``date`` (the latest table dated on or before the
+    requested day is used) and ``base``.
+    """
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._tables: Dict[str, Dict[str, float]] = {}  # ISO date ('' = undated) -> rates per USD
+
+    def _load(self) -> None:
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return
+        tables: Dict[str, Dict[str, float]] = {}
+        if self.path.endswith(".csv"):
+            grouped: Dict[tuple, Dict[str, float]] = {}
+            with open(self.path, newline="") as f:
+                for row in csv.DictReader(f):
+                    key = ((row.get("date") or "").strip(), (row.get("base") or "USD").strip())
+                    grouped.setdefault(key, {})[row["currency"].strip()] = float(row["rate"])
+            for (day, base), rates in grouped.items():
+                tables[day] = rebase(rates, base)
+        else:
+            with open(self.path) as f:
+                payload = json.load(f)
+            if "rates" in payload:
+                tables[""] = rebase(payload["rates"], payload.get("base", "USD"))
+            else:
+                tables[""] = rebase(payload, "USD")
+        self._tables, self._mtime = tables, mtime
+
+    def rates(self, day: date) -> Dict[str, float]:
+        self._load()
+        dated = sorted(d for d in self._tables if d and d <= day.isoformat())
+        if dated:
+            return dict(self._tables[dated[-1]])
+        if "" in self._tables:
+            return dict(self._tables[""])
+        raise ValueError(f"{self.path} has no rates on or before {day.isoformat()}")
+
+
+class HTTPFXProvider:
+    """
+    Rates from an HTTP endpoint returning ``{"base": ..., "rates": {...}}``
+
+    ``{date}`` in the URL is replaced with the requested day, for providers
+    with historical tables.
+    """
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    def rates(self, day: date) -> Dict[str, float]:
+        response = httpx.get(self.url.replace("{date}", day.isoformat()), timeout=self.timeout)
+        response.raise_for_status()
+        payload = response.json()
+        rates = payload.get("rates") or payload.get("conversion_rates")
+        if not rates:
+            raise ValueError(f"No rates in response from {self.url}")
+        return rebase(rates, payload.get("base") or payload.get("base_code") or "USD")
+
+
+def create_fx_provider(kind: str = "static", path: str = "", url: str = "") -> FXProvider:
+    """Build the configured FX provider"""
+    if kind == "static":
+        return StaticFXProvider()
+    if kind == "file":
+        if not path:
+            raise ValueError("fx_rates_path is required for the file FX provider")
+        return FileFXProvider(path)
+    if kind == "http":
+        if not url:
+            raise ValueError("fx_rates_url is required for the http FX provider")
+        return HTTPFXProvider(url)
+    raise ValueError(f"Unknown FX provider '{kind}'")
+
+
+@dataclass
+class FXSnapshot:
+    """The rates used for one day"""
+    day: date
+    rates: Dict[str, float]  # units per 1 USD
+    source: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"date": self.day.isoformat(), "source": self.source, "rates": self.rates}
+
+
+class FXRates:
+    """Daily FX snapshots and vectorized conversion"""
+
+    def __init__(self, provider: FXProvider, snapshot_path: str = "", max_snapshots: int = 400):
+        self.provider = provider
+        self.snapshot_path = snapshot_path
+        self.max_snapshots = max_snapshots
+        self._snapshots: Dict[date, FXSnapshot] = {}
+        self._fallbacks: Dict[date, tuple] = {}  # day -> (snapshot, monotonic time of the failure)
+        self._lock = threading.Lock()
+        self.provider_calls = 0
+        self.provider_failures = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path) as f:
+                stored = json.load(f)
+            for day, entry in stored.items():
+                self._snapshots[date.fromisoformat(day)] = FXSnapshot(date.fromisoformat(day), entry["rates"], entry["source"])
+            print(f"✅ Loaded {len(self._snapshots)} FX snapshots from {self.snapshot_path}")
+        except Exception as e:
+            print(f"⚠️ Failed to load FX snapshots from {self.snapshot_path}: {e}")
+
+    def _save(self) -> None:
+        if not self.snapshot_path:
+            return
+        try:
+            stored = {day.isoformat(): {"rates": s.rates, "source": s.source} for day, s in sorted(self._snapshots.items())}
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            print(f"⚠️ Failed to save FX snapshots to {self.snapshot_path}: {e}")
+
+    def snapshot(self, day: Optional[date] = None) -> FXSnapshot:
+        """
+        Rates for ``day`` (today by default; future days use today's)
+
+        The provider is asked once per day. Blocking for HTTP providers, so
+        call from a worker thread in async code when the day may be new.
+        """
+        day = min(day or date.today(), date.today())
+        with self._lock:
+            cached = self._snapshots.get(day)
+            if cached is not None:
+                return cached
+            fallback = self._fallbacks.get(day)
+            if fallback is not None and time.monotonic() - fallback[1] < PROVIDER_RETRY_SECONDS:
+                return fallback[0]
+
+            self.provider_calls += 1
+            try:
+                rates = self.provider.rates(day)
+            except Exception as e:
+                self.provider_failures += 1
+                earlier = [d for d in self._snapshots if d < day]
+                if earlier:
+                    fallback = FXSnapshot(day, self._snapshots[max(earlier)].rates, f"fallback:{max(earlier).isoformat()}")
+                else:
+                    fallback = FXSnapshot(day, dict(DEFAULT_RATES), "fallback:static")
+                self._fallbacks[day] = (fallback, time.monotonic())
+                print(f"⚠️ FX provider '{self.provider.name}' failed for {day.isoformat()}, using {fallback.source}: {e}")
+                return fallback
+
+            snapshot = FXSnapshot(day, rates, self.provider.name)
+            self._snapshots[day] = snapshot
+            self._fallbacks.pop(day, None)
+            while len(self._snapshots) > self.max_snapshots:
+                del self._snapshots[min(self._snapshots)]
+            self._save()
+            return snapshot
+
+    def rate(self, from_currency: str, to_currency: str, day: Optional[date] = None) -> float:
+        """Units of ``to_currency`` per unit of ``from_currency``"""
+        return float(self._factors([from_currency], to_currency, self.snapshot(day).rates)[0])
+
+    @staticmethod
+    def _factors(codes: Sequence[str], to_currency: str, rates: Dict[str, float]) -> np.ndarray:
+        to_currency = to_currency.upper()
+        missing = sorted({code.upper() for code in codes if code.upper() not in rates} | ({to_currency} - set(rates)))
+        if missing:
+            raise ValueError(f"No FX rate for {', '.join(missing)}")
+        return np.array([rates[to_currency] / rates[code.upper()] for code in codes], dtype=np.float64)
+
+    def convert(self, amounts: Union[Sequence[float], np.ndarray], currencies: Union[str, Sequence[Optional[str]], np.ndarray],
+                to_currency: Optional[str] = None, day: Optional[date] = None) -> np.ndarray:
+        """
+        Convert a column of amounts to ``to_currency`` (the reporting currency by default)
+
+        ``currencies`` is one code for the whole column or one per row; rows
+        without a currency are taken to be in ``to_currency`` already.
+        Raises ValueError for a currency without a rate.
+        """
+        to_currency = (to_currency or settings.reporting_currency).upper()
+        amounts = np.asarray(amounts, dtype=np.float64)
+        rates = self.snapshot(day).rates
+        if isinstance(currencies, str):
+            return amounts * self._factors([currencies], to_currency, rates)[0]
+        inverse, codes = pd.factorize(np.asarray(currencies, dtype=object))
+        # Missing currencies factorize to -1, which picks the trailing target-currency factor
+        return amounts * self._factors([*codes, to_currency], to_currency, rates)[inverse]
+
+    def convert_frame(self, frame: pd.DataFrame, columns: Iterable[str], currency_column: str = "currency",
+                      to_currency: Optional[str] = None, day: Optional[date] = None) -> pd.DataFrame:
+        """Copy of ``frame`` with the money ``columns`` converted and ``currency_column`` set to the target"""
+        to_currency = (to_currency or settings.reporting_currency).upper()
+        converted = frame.copy()
+        currencies = frame[currency_column].to_numpy()
+        for column in columns:
+            converted[column] = self.convert(frame[column].to_numpy(), currencies, to_currency, day)
+        converted[currency_column] = to_currency
+        return converted
+
+    def stats(self) -> Dict[str, Any]:
+        latest = self._snapshots[max(self._snapshots)] if self._snapshots else None
+        return {
+            "provider": self.provider.name,
+            "reporting_currency": settings.reporting_currency,
+            "snapshots": len(self._snapshots),
+            "latest": latest.day.isoformat() if latest else None,
+            "currencies": sorted(latest.rates) if latest else [],
+            "provider_calls": self.provider_calls,
+            "provider_failures": self.provider_failures,
+        }
+
+
+def format_money(amount: float, currency: Optional[str] = None, locale: Optional[str] = None) -> str:
+    """
+    Format an amount with its currency for display
+
+    ``locale`` ('en', 'de', 'fr-FR', ...) picks the separators and symbol
+    position; Gulf currencies always put their symbol after the amount.
+    """
+    return money_formatter((currency or settings.reporting_currency).upper(), locale or settings.currency_locale)(amount)
+
+
+@lru_cache(maxsize=256)
+def money_formatter(currency: str, locale: str) -> Callable[[float], str]:
+    """``format_money`` for one currency and locale, with the lookups done once"""
+    group, decimal, symbol_after = LOCALE_FORMATS.get(
+        locale.replace("_", "-").split("-")[0].lower(), LOCALE_FORMATS["en"]
+    )
+    digits = 0 if currency in ZERO_DECIMAL_CURRENCIES else 3 if currency in THREE_DECIMAL_CURRENCIES else 2
+    separators = None if (group, decimal) == (",", ".") else str.maketrans({",": group, ".": decimal})
+
+    symbol = CURRENCY_SYMBOLS.get(currency)
+    if symbol is None:
+        prefix, suffix = (f"{currency} ", "") if not symbol_after else ("", f" {currency}")
+    elif symbol_after or currency in SUFFIX_SYMBOL_CURRENCIES:
+        prefix, suffix = "", f" {symbol}"
+    else:
+        prefix, suffix = symbol, ""
+
+    def format_amount(amount: float) -> str:
+        number = f"{abs(amount):,.{digits}f}"
+        if separators is not None:
+            number = number.translate(separators)
+        sign = "-" if round(amount, digits) < 0 else ""
+        return f"{sign}{prefix}{number}{suffix}"
+
+    return format_amount
+
+
+class Money:
+    """
+    An amount that formats itself with its currency
+
+    ``format(Money(12.5, "EUR"), "money")`` gives ``€12.50``; any other
+    format spec applies to the bare amount. Lets ``str.format`` templates
+    write ``{cost:money}``.
+    """
+    __slots__ = ("amount", "currency")
+
+    def __init__(self, amount: float, currency: Optional[str] = None):
+        self.amount = amount
+        self.currency = currency
+
+    def __format__(self, spec: str) -> str:
+        if spec == "money":
+            return format_money(self.amount, self.currency)
+        return format(self.amount, spec)
+
+    def __str__(self) -> str:
+        return format_money(self.amount, self.currency)
+
+
+# Singleton instance
+fx_rates = FXRates(
+    create_fx_provider(settings.fx_provider, settings.fx_rates_path, settings.fx_rates_url),
+    snapshot_path=settings.fx_snapshot_path
+)
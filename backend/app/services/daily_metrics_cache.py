@@ -0,0 +1,120 @@
+"""
+Per-day metric aggregates for date-ranged Google Ads reads
+
+Metrics are cached per (customer, level, day) as one small frame of
+per-entity totals. A date-ranged request sums the cached days and only
+queries the days it is missing, in contiguous spans. A 7-day view after a
+30-day view, or two overlapping custom ranges, reuse the days already held.
+
+Recent days keep changing as conversions are attributed, so they expire
+after ``recent_ttl``; older days are kept for ``ttl``. Entity attributes
+(names, statuses, bids) are cached briefly per level and dropped whenever
+the service mutates the account.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.date_ranges import DateRange
+
+settings = get_settings()
+
+LEVELS = ("customer", "campaign", "ad_group", "keyword")
+METRICS = ["impressions", "clicks", "conversions", "cost", "conversions_value"]
+
+
+def contiguous_spans(days: List[date]) -> List[DateRange]:
+    """Group sorted days into inclusive ranges of consecutive days"""
+    spans: List[DateRange] = []
+    for day in days:
+        if spans and day == spans[-1].end + timedelta(days=1):
+            spans[-1] = DateRange(spans[-1].start, day)
+        else:
+            spans.append(DateRange(day, day))
+    return spans
+
+
+class DailyMetricsCache:
+    """Per-day, per-entity metrics and entity attributes"""
+
+    def __init__(self, max_days: int = 5000, ttl: int = 86400,
+                 recent_days: int = 3, recent_ttl: int = 900):
+        self.ttl = ttl
+        self.recent_days = recent_days
+        self.recent_ttl = recent_ttl
+        self._days = TTLCache(max_entries=max_days)
+        self._attributes = TTLCache(max_entries=256, ttl=recent_ttl)
+        self.upstream_queries = 0
+        self.upstream_days = 0
+        self.cached_days = 0
+
+    def _ttl(self, day: date) -> int:
+        return self.recent_ttl if (date.today() - day).days <= self.recent_days else self.ttl
+
+    async def totals(self, customer_id: str, level: str, date_range: DateRange,
+                     fetch: Callable[[DateRange], Awaitable[List[Dict[str, Any]]]]) -> pd.DataFrame:
+        """
+        Per-entity metric totals over ``date_range``, indexed by entity key
+
+        ``fetch(span)`` returns daily rows (``key``, ``date``, metrics) for a
+        span of missing days.
+        """
+        days: Dict[date, Optional[pd.DataFrame]] = {
+            day: self._days.get((customer_id, level, day)) for day in date_range.dates()
+        }
+        missing = [day for day, frame in days.items() if frame is None]
+        self.cached_days += len(days) - len(missing)
+
+        for span in contiguous_spans(missing):
+            rows = pd.DataFrame(await fetch(span), columns=["key", "date", *METRICS])
+            self.upstream_queries += 1
+            self.upstream_days += span.days
+            by_day = {day: frame for day, frame in rows.groupby("date")}
+            for day in span.dates():
+                frame = by_day.get(day.isoformat(), rows.iloc[0:0])[["key", *METRICS]].reset_index(drop=True)
+                days[day] = frame
+                self._days.set((customer_id, level, day), frame, ttl=self._ttl(day))
+
+        frames = [frame for frame in days.values() if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=METRICS, index=pd.Index([], name="key"), dtype=float)
+        return pd.concat(frames, ignore_index=True).groupby("key")[METRICS].sum()
+
+    async def attributes(self, customer_id: str, level: str,
+                         load: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """Entity attributes of a level, loaded on a miss"""
+        key = (customer_id, level)
+        cached = self._attributes.get(key)
+        if cached is None:
+            cached = await load()
+            self._attributes.set(key, cached)
+        return cached
+
+    def invalidate_attributes(self, customer_id: str) -> None:
+        """Forget a customer's entity attributes (after a mutation)"""
+        for level in LEVELS:
+            self._attributes.delete((customer_id, level))
+
+    def stats(self) -> Dict[str, Any]:
+        requested = self.cached_days + self.upstream_days
+        return {
+            "days_cached": len(self._days),
+            "max_days": self._days.max_entries,
+            "cached_days_served": self.cached_days,
+            "upstream_days": self.upstream_days,
+            "upstream_queries": self.upstream_queries,
+            "day_hit_rate": self.cached_days / requested if requested else 0.0,
+        }
+
+
+# Singleton instance
+daily_metrics_cache = DailyMetricsCache(
+    max_days=settings.google_daily_cache_max_days,
+    ttl=settings.google_daily_cache_ttl,
+    recent_days=settings.google_daily_cache_recent_days,
+    recent_ttl=settings.google_daily_cache_recent_ttl
+)
@@ -1,21 +1,123 @@
 import os
 import json
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime, timedelta
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from importlib import import_module
 
-from google.ads.googleads.client import GoogleAdsClient
+import grpc
+from google.ads.googleads import util
+from google.ads.googleads.client import GoogleAdsClient, _DEFAULT_VERSION
 from google.ads.googleads.errors import GoogleAdsException
+from google.ads.googleads.interceptors import ExceptionInterceptor, MetadataInterceptor
+from google.api_core import protobuf_helpers
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
 import httpx
 
+from app.core.cache import TTLCache
 from app.core.config import get_settings
+from app.core.date_ranges import DateRange
+from app.core.pagination import ListQuery
+from app.core.singleflight import coalesce
+from app.services.daily_metrics_cache import daily_metrics_cache
+from app.services.insights import keyword_key
 
 settings = get_settings()
 
+# Seconds an account's currency code is cached
+CURRENCY_CACHE_TTL = 86400
+
+# Operations per mutate request (the API caps a request at 10,000)
+MUTATE_BATCH_SIZE = 5000
+
+# Largest response accepted over a plaintext channel (the library's limit for its own channels)
+PLAINTEXT_MAX_RECEIVE_BYTES = 64 * 1024 * 1024
+
+# GAQL fields behind the sortable/filterable list columns (CampaignData etc. attribute names)
+LIST_STATUSES = ("ENABLED", "PAUSED")
+CAMPAIGN_LIST_FIELDS = {
+    "id": "campaign.id",
+    "name": "campaign.name",
+    "budget_amount": "campaign_budget.amount_micros",
+    "impressions": "metrics.impressions",
+    "clicks": "metrics.clicks",
+    "conversions": "metrics.conversions",
+    "cost": "metrics.cost_micros",
+    "ctr": "metrics.ctr",
+    "cpc": "metrics.average_cpc",
+    "status": "campaign.status",
+}
+AD_GROUP_LIST_FIELDS = {
+    "id": "ad_group.id",
+    "name": "ad_group.name",
+    "cpc_bid": "ad_group.cpc_bid_micros",
+    "impressions": "metrics.impressions",
+    "clicks": "metrics.clicks",
+    "conversions": "metrics.conversions",
+    "cost": "metrics.cost_micros",
+    "status": "ad_group.status",
+}
+KEYWORD_LIST_FIELDS = {
+    "id": "ad_group_criterion.criterion_id",
+    "text": "ad_group_criterion.keyword.text",
+    "cpc_bid": "ad_group_criterion.cpc_bid_micros",
+    "impressions": "metrics.impressions",
+    "clicks": "metrics.clicks",
+    "conversions": "metrics.conversions",
+    "cost": "metrics.cost_micros",
+    "status": "ad_group_criterion.status",
+}
+
+
+# Where each level's daily metrics come from (daily_metrics_cache levels)
+DAILY_METRICS_SOURCES = {
+    "customer": ("customer.id", "FROM customer WHERE"),
+    "campaign": ("campaign.id", "FROM campaign WHERE campaign.status IN ('ENABLED', 'PAUSED') AND"),
+    "ad_group": ("ad_group.id", "FROM ad_group WHERE ad_group.status != 'REMOVED' AND"),
+    "keyword": (
+        "ad_group_criterion.ad_group, ad_group_criterion.criterion_id",
+        "FROM keyword_view WHERE ad_group_criterion.status != 'REMOVED' AND"
+    ),
+}
+
+
+def daily_entity_key(level: str, row) -> str:
+    """Cache key of the entity a daily metrics row belongs to"""
+    if level == "customer":
+        return str(row.customer.id)
+    if level == "campaign":
+        return str(row.campaign.id)
+    if level == "ad_group":
+        return str(row.ad_group.id)
+    # Criterion ids are only unique within their ad group
+    return keyword_key(row.ad_group_criterion.ad_group.split("/")[-1], str(row.ad_group_criterion.criterion_id))
+
+
+def gaql_list_clauses(query: Optional[ListQuery], fields: Dict[str, str], default_order: str = "") -> str:
+    """``AND ...`` conditions plus ``ORDER BY``/``LIMIT`` for a list query"""
+    if query is None:
+        return f" ORDER BY {default_order}" if default_order else ""
+
+    clauses = ""
+    if query.statuses:
+        clauses += f" AND {fields['status']} IN ({', '.join(repr(s) for s in query.statuses)})"
+    if query.min_cost is not None:
+        clauses += f" AND {fields['cost']} >= {int(round(query.min_cost * 1_000_000))}"
+    if query.min_clicks is not None:
+        clauses += f" AND {fields['clicks']} >= {int(query.min_clicks)}"
+
+    order = [fields["id"]]
+    if query.sort is not None:
+        order.insert(0, f"{fields[query.sort]} {'DESC' if query.descending else 'ASC'}")
+    clauses += f" ORDER BY {', '.join(order)}"
+    if query.limit is not None:
+        clauses += f" LIMIT {int(query.limit)}"
+    return clauses
+
 
 @dataclass
 class CampaignData:
@@ -34,6 +136,7 @@ class CampaignData:
     ctr: float = 0
     cpc: float = 0
     conversion_rate: float = 0
+    budget_id: Optional[str] = None
 
 
 @dataclass
@@ -64,13 +167,47 @@ class KeywordData:
     cost: float = 0
 
 
+class PlaintextGoogleAdsClient(GoogleAdsClient):
+    """
+    GoogleAdsClient over plaintext channels, without OAuth
+
+    For local stand-in servers (``google_ads_insecure``); the library itself
+    only builds TLS channels carrying OAuth call credentials.
+    """
+
+    def get_service(self, name: str, version: str = _DEFAULT_VERSION, interceptors: list = None,
+                    is_async: bool = False):
+        if is_async:
+            raise ValueError("Async services are not available over plaintext channels")
+        version = self.version or version
+        module = import_module(
+            f"google.ads.googleads.{version}.services.services.{util.convert_upper_case_to_snake_case(name)}"
+        )
+        service_client_class = getattr(module, f"{name}Client")
+        channel = grpc.intercept_channel(
+            grpc.insecure_channel(self.endpoint, options=[("grpc.max_receive_message_length", PLAINTEXT_MAX_RECEIVE_BYTES)]),
+            *(interceptors or []),
+            MetadataInterceptor(self.developer_token, self.login_customer_id, self.linked_customer_id),
+            ExceptionInterceptor(version, use_proto_plus=self.use_proto_plus)
+        )
+        return service_client_class(transport=service_client_class.get_transport_class()(channel=channel))
+
+
 class GoogleAdsService:
     def __init__(self):
         self.client = None
         self.customer_id = None
         self.refresh_token = None
+        # Account currencies never change; cached instead of queried per request
+        self._currencies = TTLCache(max_entries=1024, ttl=CURRENCY_CACHE_TTL)
+        # The client is sync gRPC; reads that page through many rows run here, off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=settings.google_ads_max_threads, thread_name_prefix="google-ads")
         self._setup_client()
     
+    async def _run_blocking(self, fn, *args):
+        """Run a blocking client call on the service's own bounded thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+    
     def set_refresh_token(self, refresh_token: str):
         """Set refresh token and reinitialize client"""
         self.refresh_token = refresh_token
@@ -89,6 +226,21 @@ class GoogleAdsService:
                 "refresh_token": refresh_token,
                 "use_proto_plus": True,
             }
+            if settings.google_ads_endpoint:
+                config["endpoint"] = settings.google_ads_endpoint
+            
+            if settings.google_ads_endpoint and settings.google_ads_insecure:
+                # Local stand-in server: no OAuth, so no refresh token needed
+                self.client = PlaintextGoogleAdsClient(
+                    credentials=None,
+                    developer_token=settings.google_ads_developer_token,
+                    endpoint=settings.google_ads_endpoint,
+                    use_proto_plus=True
+                )
+                self.refresh_token = refresh_token
+                self.customer_id = settings.google_ads_customer_id
+                print(f"✅ Google Ads client using plaintext endpoint {settings.google_ads_endpoint}")
+                return
             
             # Check if we have minimum required configs (developer token, client_id, client_secret)
             required_configs = [
@@ -194,6 +346,7 @@ class GoogleAdsService:
         except Exception as e:
             print(f"❌ Failed to save refresh token to .env: {e}")
     
+    @coalesce()
     async def get_accessible_customers(self) -> List[Dict[str, str]]:
         """Get list of Google Ads accounts accessible to the user"""
         if not self.client:
@@ -232,6 +385,8 @@ class GoogleAdsService:
                             "currency": row.customer.currency_code,
                             "timezone": row.customer.time_zone
                         })
+                        if row.customer.currency_code:
+                            self._currencies.set(str(row.customer.id), row.customer.currency_code)
                         break  # Only need the first (and only) result
                 except Exception as e:
                     print(f"⚠️ Skipping customer {customer_id}: {e}")
@@ -250,43 +405,73 @@ class GoogleAdsService:
             print(f"❌ Failed to get accessible customers: {e}")
             raise Exception(f"Failed to get accessible customers: {str(e)}")
     
-    async def get_campaigns(self, customer_id: str = None) -> List[CampaignData]:
-        """Get all campaigns for a customer"""
+    @coalesce()
+    async def get_customer_currency(self, customer_id: str) -> str:
+        """Currency code of an account (USD if it cannot be read)"""
+        cached = self._currencies.get(customer_id)
+        if cached is not None:
+            return cached
+        if not self.client:
+            raise Exception("Google Ads client not initialized. Please complete OAuth authentication.")
+        
+        try:
+            ga_service = self.client.get_service("GoogleAdsService")
+            currency_code = "USD"
+            for row in ga_service.search(customer_id=customer_id, query="SELECT customer.currency_code FROM customer"):
+                currency_code = row.customer.currency_code or "USD"
+                break
+            self._currencies.set(customer_id, currency_code)
+            print(f"🔍 Currency for customer {customer_id}: {currency_code}")
+            return currency_code
+        except Exception as e:
+            print(f"⚠️ Failed to fetch currency for customer {customer_id}, using USD: {e}")
+            return "USD"
+    
+    def _campaign_date_fields(self) -> Tuple[str, str]:
+        """Campaign start/end fields of the client's API version (newer versions only have the *_date_time ones)"""
+        fields = type(self.client.get_type("Campaign")).pb().DESCRIPTOR.fields_by_name
+        return ("start_date_time", "end_date_time") if "start_date_time" in fields else ("start_date", "end_date")
+    
+    @staticmethod
+    def _campaign_date(campaign, field: str) -> Optional[str]:
+        """A campaign start/end date as YYYY-MM-DD (None when unset), whichever field the version has"""
+        value = getattr(campaign, field)
+        return value[:10] if value else None
+    
+    @coalesce()
+    async def get_campaigns(self, customer_id: str = None, query: Optional[ListQuery] = None,
+                            date_range: Optional[DateRange] = None) -> List[CampaignData]:
+        """
+        Get all campaigns for a customer, or those matching ``query``
+
+        Metrics cover ``date_range`` (the last 30 days by default). Without a
+        ``query``, ranged metrics come from the per-day cache.
+        """
         if not self.client:
             raise Exception("Google Ads client not initialized. Please complete OAuth authentication.")
 
         customer_id = customer_id or self.customer_id
         if not customer_id:
             raise Exception("Customer ID not provided")
+        if date_range is not None and query is None:
+            return await self._get_campaigns_for_range(customer_id, date_range)
 
         try:
             ga_service = self.client.get_service("GoogleAdsService")
             
-            # First get customer currency
-            currency_code = "USD"  # Default fallback
-            try:
-                customer_query = """
-                    SELECT customer.currency_code
-                    FROM customer
-                """
-                customer_response = ga_service.search(customer_id=customer_id, query=customer_query)
-                for row in customer_response:
-                    if hasattr(row.customer, 'currency_code') and row.customer.currency_code:
-                        currency_code = row.customer.currency_code
-                    break
-                print(f"🔍 Currency for customer {customer_id}: {currency_code}")
-            except Exception as e:
-                print(f"⚠️ Failed to fetch currency for customer {customer_id}, using USD: {e}")
-                currency_code = "USD"
+            currency_code = await self.get_customer_currency(customer_id)
             
             # Optimized query with date filtering for better performance
-            query = """
+            date_condition = date_range.gaql if date_range else "segments.date DURING LAST_30_DAYS"
+            start_field, end_field = self._campaign_date_fields()
+            gaql = f"""
                 SELECT 
                     campaign.id,
                     campaign.name,
                     campaign.status,
-                    campaign.start_date,
-                    campaign.end_date,
+                    campaign.{start_field},
+                    campaign.{end_field},
+                    campaign.campaign_budget,
                     campaign_budget.amount_micros,
                     metrics.impressions,
                     metrics.clicks,
@@ -296,11 +481,10 @@ class GoogleAdsService:
                     metrics.average_cpc
                 FROM campaign 
                 WHERE campaign.status IN ('ENABLED', 'PAUSED')
-                AND segments.date DURING LAST_30_DAYS
-                ORDER BY metrics.cost_micros DESC
-            """
+                AND {date_condition}
+            """ + gaql_list_clauses(query, CAMPAIGN_LIST_FIELDS, default_order="metrics.cost_micros DESC")
             
-            response = ga_service.search(customer_id=customer_id, query=query)
+            response = ga_service.search(customer_id=customer_id, query=gaql)
             
             campaigns = []
             campaign_data = {}
@@ -347,8 +531,8 @@ class GoogleAdsService:
                     status=campaign.status.name,
                     budget_amount=data['budget_amount'],
                     budget_type="STANDARD",
-                    start_date=campaign.start_date,
-                    end_date=campaign.end_date if campaign.end_date else None,
+                    start_date=self._campaign_date(campaign, start_field),
+                    end_date=self._campaign_date(campaign, end_field),
                     currency=currency_code,
                     impressions=data['impressions'],
                     clicks=data['clicks'],
@@ -356,7 +540,8 @@ class GoogleAdsService:
                     cost=data['cost'],
                     ctr=avg_ctr,
                     cpc=avg_cpc,
-                    conversion_rate=data['conversions'] / data['clicks'] if data['clicks'] > 0 else 0
+                    conversion_rate=data['conversions'] / data['clicks'] if data['clicks'] > 0 else 0,
+                    budget_id=campaign.campaign_budget.split("/")[-1] if campaign.campaign_budget else None
                 ))
             
             print(f"✅ Found {len(campaigns)} campaigns for customer {customer_id}")
@@ -365,30 +550,309 @@ class GoogleAdsService:
             print(f"❌ Failed to get campaigns for customer {customer_id}: {e}")
             raise Exception(f"Failed to get campaigns: {str(e)}")
     
-    async def get_performance_summary(self, customer_id: str) -> Dict[str, Any]:
-        """Get performance summary for analytics dashboard"""
+    @coalesce()
+    async def get_campaign_daily_metrics(self, customer_id: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Get per-campaign, per-day metrics for a date range (YYYY-MM-DD, inclusive)"""
         if not self.client:
             raise Exception("Google Ads client not initialized. Please complete OAuth authentication.")
         
+        # The search and its paging block, and a backfill reads many pages
+        return await self._run_blocking(self._campaign_daily_metrics, customer_id, start_date, end_date)
+    
+    def _campaign_daily_metrics(self, customer_id: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
         try:
             ga_service = self.client.get_service("GoogleAdsService")
             
-            # First get customer currency
-            currency_code = "USD"  # Default fallback
-            try:
-                customer_query = """
-                    SELECT customer.currency_code
-                    FROM customer
-                """
-                customer_response = ga_service.search(customer_id=customer_id, query=customer_query)
-                for row in customer_response:
-                    if hasattr(row.customer, 'currency_code') and row.customer.currency_code:
-                        currency_code = row.customer.currency_code
-                    break
-                print(f"🔍 Performance summary currency for customer {customer_id}: {currency_code}")
-            except Exception as e:
-                print(f"⚠️ Failed to fetch currency for performance summary customer {customer_id}, using USD: {e}")
-                currency_code = "USD"
+            query = f"""
+                SELECT 
+                    campaign.id,
+                    campaign.name,
+                    segments.date,
+                    metrics.impressions,
+                    metrics.clicks,
+                    metrics.conversions,
+                    metrics.cost_micros
+                FROM campaign 
+                WHERE campaign.status IN ('ENABLED', 'PAUSED')
+                AND segments.date BETWEEN '{start_date}' AND '{end_date}'
+                ORDER BY segments.date
+            """
+            
+            rows = []
+            for row in ga_service.search(customer_id=customer_id, query=query):
+                metrics = row.metrics
+                rows.append({
+                    'customer_id': customer_id,
+                    'campaign_id': str(row.campaign.id),
+                    'name': row.campaign.name,
+                    'date': row.segments.date,
+                    'impressions': metrics.impressions or 0,
+                    'clicks': metrics.clicks or 0,
+                    'conversions': metrics.conversions or 0,
+                    'cost': (metrics.cost_micros or 0) / 1_000_000
+                })
+            
+            print(f"✅ Fetched {len(rows)} daily campaign rows for customer {customer_id} ({start_date} to {end_date})")
+            return rows
+        except Exception as e:
+            print(f"❌ Failed to get daily metrics for customer {customer_id}: {e}")
+            raise Exception(f"Failed to get daily metrics: {str(e)}")
+    
+    @coalesce()
+    async def get_daily_metrics(self, customer_id: str, level: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Per-entity, per-day metrics of one level (customer, campaign, ad_group or keyword) for a date range"""
+        if not self.client:
+            raise Exception("Google Ads client not initialized. Please complete OAuth authentication.")
+        if level not in DAILY_METRICS_SOURCES:
+            raise ValueError(f"Unknown metrics level: {level}")
+        
+        return await self._run_blocking(self._daily_metrics, customer_id, level, start_date, end_date)
+    
+    def _daily_metrics(self, customer_id: str, level: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        try:
+            ga_service = self.client.get_service("GoogleAdsService")
+            key_fields, source = DAILY_METRICS_SOURCES[level]
+            query = f"""
+                SELECT 
+                    {key_fields},
+                    segments.date,
+                    metrics.impressions,
+                    metrics.clicks,
+                    metrics.conversions,
+                    metrics.cost_micros,
+                    metrics.conversions_value
+                {source} segments.date BETWEEN '{start_date}' AND '{end_date}'
+            """
+            
+            rows = []
+            for row in ga_service.search(customer_id=customer_id, query=query):
+                metrics = row.metrics
+                rows.append({
+                    'key': daily_entity_key(level, row),
+                    'date': row.segments.date,
+                    'impressions': metrics.impressions or 0,
+                    'clicks': metrics.clicks or 0,
+                    'conversions': metrics.conversions or 0,
+                    'cost': (metrics.cost_micros or 0) / 1_000_000,
+                    'conversions_value': metrics.conversions_value or 0
+                })
+            
+            print(f"✅ Fetched {len(rows)} daily {level} rows for customer {customer_id} ({start_date} to {end_date})")
+            return rows
+        except Exception as e:
+            print(f"❌ Failed to get daily {level} metrics for customer {customer_id}: {e}")
+            raise Exception(f"Failed to get daily metrics: {str(e)}")
+    
+    async def _get_entity_attributes(self, customer_id: str, level: str) -> List[Dict[str, Any]]:
+        """Non-metric fields of every entity of a level (no date segmentation, so one light query)"""
+        return await self._run_blocking(self._entity_attributes, customer_id, level)
+    
+    def _entity_attributes(self, customer_id: str, level: str) -> List[Dict[str, Any]]:
+        ga_service = self.client.get_service("GoogleAdsService")
+        attributes = []
+        if level == "customer":
+            for row in ga_service.search(customer_id=customer_id, query="SELECT customer.id, customer.currency_code FROM customer"):
+                attributes.append({'key': str(row.customer.id), 'currency': row.customer.currency_code or "USD"})
+                self._currencies.set(customer_id, row.customer.currency_code or "USD")
+        elif level == "campaign":
+            start_field, end_field = self._campaign_date_fields()
+            query = f"""
+                SELECT 
+                    campaign.id,
+                    campaign.name,
+                    campaign.status,
+                    campaign.{start_field},
+                    campaign.{end_field},
+                    campaign.campaign_budget,
+                    campaign_budget.amount_micros,
+                    customer.currency_code
+                FROM campaign 
+                WHERE campaign.status IN ('ENABLED', 'PAUSED')
+            """
+            for row in ga_service.search(customer_id=customer_id, query=query):
+                campaign = row.campaign
+                budget = getattr(row, 'campaign_budget', None)
+                attributes.append({
+                    'key': str(campaign.id),
+                    'name': campaign.name,
+                    'status': campaign.status.name,
+                    'start_date': self._campaign_date(campaign, start_field),
+                    'end_date': self._campaign_date(campaign, end_field),
+                    'budget_amount': budget.amount_micros / 1_000_000 if budget and budget.amount_micros else 0,
+                    'budget_id': campaign.campaign_budget.split("/")[-1] if campaign.campaign_budget else None,
+                    'currency': row.customer.currency_code or "USD"
+                })
+        elif level == "ad_group":
+            query = """
+                SELECT 
+                    ad_group.id,
+                    ad_group.name,
+                    ad_group.campaign,
+                    ad_group.status,
+                    ad_group.cpc_bid_micros
+                FROM ad_group 
+                WHERE ad_group.status != 'REMOVED'
+            """
+            for row in ga_service.search(customer_id=customer_id, query=query):
+                ad_group = row.ad_group
+                attributes.append({
+                    'key': str(ad_group.id),
+                    'name': ad_group.name,
+                    'campaign_id': ad_group.campaign.split("/")[-1],
+                    'status': ad_group.status.name,
+                    'cpc_bid': ad_group.cpc_bid_micros / 1_000_000 if ad_group.cpc_bid_micros else 0
+                })
+        else:
+            query = """
+                SELECT 
+                    ad_group_criterion.criterion_id,
+                    ad_group_criterion.keyword.text,
+                    ad_group_criterion.keyword.match_type,
+                    ad_group_criterion.ad_group,
+                    ad_group_criterion.status,
+                    ad_group_criterion.cpc_bid_micros,
+                    ad_group_criterion.quality_info.quality_score
+                FROM keyword_view 
+                WHERE ad_group_criterion.status != 'REMOVED'
+            """
+            for row in ga_service.search(customer_id=customer_id, query=query):
+                criterion = row.ad_group_criterion
+                ad_group_id = criterion.ad_group.split("/")[-1]
+                attributes.append({
+                    'key': keyword_key(ad_group_id, str(criterion.criterion_id)),
+                    'id': str(criterion.criterion_id),
+                    'text': criterion.keyword.text,
+                    'match_type': criterion.keyword.match_type.name,
+                    'ad_group_id': ad_group_id,
+                    'status': criterion.status.name,
+                    'cpc_bid': criterion.cpc_bid_micros / 1_000_000 if criterion.cpc_bid_micros else 0,
+                    'quality_score': criterion.quality_info.quality_score if criterion.quality_info else None
+                })
+        return attributes
+    
+    async def _get_ranged_entities(self, customer_id: str, level: str, date_range: DateRange):
+        """Entity attributes of a level plus their metric totals over ``date_range`` (key -> metrics)"""
+        attributes, totals = await asyncio.gather(
+            daily_metrics_cache.attributes(
+                customer_id, level, lambda: self._get_entity_attributes(customer_id, level)
+            ),
+            daily_metrics_cache.totals(
+                customer_id, level, date_range,
+                lambda span: self.get_daily_metrics(customer_id, level, span.start.isoformat(), span.end.isoformat())
+            )
+        )
+        return attributes, totals.to_dict("index")
+    
+    async def _get_campaigns_for_range(self, customer_id: str, date_range: DateRange) -> List[CampaignData]:
+        """Campaigns with metrics summed from cached days; campaigns without activity are included with zeros"""
+        attributes, totals = await self._get_ranged_entities(customer_id, "campaign", date_range)
+        campaigns = []
+        for attrs in attributes:
+            metrics = totals.get(attrs['key'], {})
+            impressions, clicks = int(metrics.get('impressions', 0)), int(metrics.get('clicks', 0))
+            conversions, cost = float(metrics.get('conversions', 0)), float(metrics.get('cost', 0))
+            campaigns.append(CampaignData(
+                id=attrs['key'],
+                name=attrs['name'],
+                status=attrs['status'],
+                budget_amount=attrs['budget_amount'],
+                budget_type="STANDARD",
+                start_date=attrs['start_date'],
+                end_date=attrs['end_date'],
+                currency=attrs['currency'],
+                impressions=impressions,
+                clicks=clicks,
+                conversions=conversions,
+                cost=cost,
+                ctr=clicks / impressions if impressions > 0 else 0,
+                cpc=cost / clicks if clicks > 0 else 0,
+                conversion_rate=conversions / clicks if clicks > 0 else 0,
+                budget_id=attrs['budget_id']
+            ))
+        campaigns.sort(key=lambda c: c.cost, reverse=True)
+        return campaigns
+    
+    async def _get_ad_groups_for_range(self, customer_id: str, campaign_id: Optional[str],
+                                       date_range: DateRange) -> List[AdGroupData]:
+        attributes, totals = await self._get_ranged_entities(customer_id, "ad_group", date_range)
+        ad_groups = []
+        for attrs in attributes:
+            if campaign_id and attrs['campaign_id'] != campaign_id:
+                continue
+            metrics = totals.get(attrs['key'], {})
+            ad_groups.append(AdGroupData(
+                id=attrs['key'],
+                name=attrs['name'],
+                campaign_id=attrs['campaign_id'],
+                status=attrs['status'],
+                cpc_bid=attrs['cpc_bid'],
+                impressions=int(metrics.get('impressions', 0)),
+                clicks=int(metrics.get('clicks', 0)),
+                conversions=float(metrics.get('conversions', 0)),
+                cost=float(metrics.get('cost', 0))
+            ))
+        return ad_groups
+    
+    async def _get_keywords_for_range(self, customer_id: str, ad_group_id: Optional[str],
+                                      date_range: DateRange) -> List[KeywordData]:
+        attributes, totals = await self._get_ranged_entities(customer_id, "keyword", date_range)
+        keywords = []
+        for attrs in attributes:
+            if ad_group_id and attrs['ad_group_id'] != ad_group_id:
+                continue
+            metrics = totals.get(attrs['key'], {})
+            keywords.append(KeywordData(
+                id=attrs['id'],
+                text=attrs['text'],
+                match_type=attrs['match_type'],
+                ad_group_id=attrs['ad_group_id'],
+                status=attrs['status'],
+                cpc_bid=attrs['cpc_bid'],
+                quality_score=attrs['quality_score'],
+                impressions=int(metrics.get('impressions', 0)),
+                clicks=int(metrics.get('clicks', 0)),
+                conversions=float(metrics.get('conversions', 0)),
+                cost=float(metrics.get('cost', 0))
+            ))
+        return keywords
+    
+    async def _get_performance_summary_for_range(self, customer_id: str, date_range: DateRange) -> Dict[str, Any]:
+        """Account totals summed from cached days"""
+        (customer, totals), campaigns = await asyncio.gather(
+            self._get_ranged_entities(customer_id, "customer", date_range),
+            self.get_campaigns(customer_id, date_range=date_range)
+        )
+        metrics = next(iter(totals.values()), {})
+        impressions, clicks = int(metrics.get('impressions', 0)), int(metrics.get('clicks', 0))
+        conversions, cost = float(metrics.get('conversions', 0)), float(metrics.get('cost', 0))
+        return {
+            "total_spend": cost,
+            "total_impressions": impressions,
+            "total_clicks": clicks,
+            "total_conversions": conversions,
+            "avg_ctr": clicks / impressions if impressions > 0 else 0,
+            "avg_cpc": cost / clicks if clicks > 0 else 0,
+            "conversion_rate": conversions / clicks if clicks > 0 else 0,
+            "conversion_value": float(metrics.get('conversions_value', 0)),
+            "active_campaigns": len([c for c in campaigns if c.status == 'ENABLED']),
+            "total_campaigns": len(campaigns),
+            "currency": customer[0]['currency'] if customer else "USD",
+            "period": date_range.label,
+            **date_range.to_params()
+        }
+    
+    @coalesce()
+    async def get_performance_summary(self, customer_id: str, date_range: Optional[DateRange] = None) -> Dict[str, Any]:
+        """Get performance summary for analytics dashboard (last 30 days unless ``date_range`` is given)"""
+        if not self.client:
+            raise Exception("Google Ads client not initialized. Please complete OAuth authentication.")
+        if date_range is not None:
+            return await self._get_performance_summary_for_range(customer_id, date_range)
+        
+        try:
+            ga_service = self.client.get_service("GoogleAdsService")
+            
+            currency_code = await self.get_customer_currency(customer_id)
             
             # Query for account-level metrics
             query = """
@@ -482,15 +946,19 @@ class GoogleAdsService:
             campaign.advertising_channel_type = self.client.enums.AdvertisingChannelTypeEnum.SEARCH
             campaign.status = self.client.enums.CampaignStatusEnum.ENABLED
             campaign.campaign_budget = budget_resource_name
-            campaign.start_date = campaign_data.get('start_date', datetime.now().strftime('%Y-%m-%d'))
+            start_field, end_field = self._campaign_date_fields()
+            start_date = campaign_data.get('start_date', datetime.now().strftime('%Y-%m-%d'))
+            setattr(campaign, start_field, start_date if start_field == "start_date" else f"{start_date} 00:00:00")
             
             if campaign_data.get('end_date'):
-                campaign.end_date = campaign_data['end_date']
+                end_date = campaign_data['end_date']
+                setattr(campaign, end_field, end_date if end_field == "end_date" else f"{end_date} 23:59:59")
             
             campaign_response = campaign_service.mutate_campaigns(
                 customer_id=customer_id,
                 operations=[campaign_operation]
             )
+            daily_metrics_cache.invalidate_attributes(customer_id)
             
             return campaign_response.results[0].resource_name.split("/")[-1]
         except GoogleAdsException as e:
@@ -516,20 +984,107 @@ class GoogleAdsService:
                     updates['status'].upper()
                 )
             
-            field_mask = self.client.get_service("FieldMaskService").field_mask(
-                campaign.__class__().__dict__.keys()
-            )
-            campaign_operation.update_mask.CopyFrom(field_mask)
+            # Mask exactly the fields set above
+            self.client.copy_from(campaign_operation.update_mask, protobuf_helpers.field_mask(None, campaign._pb))
             
             campaign_service.mutate_campaigns(
                 customer_id=customer_id,
                 operations=[campaign_operation]
             )
+            daily_metrics_cache.invalidate_attributes(customer_id)
             
             return True
         except GoogleAdsException as e:
             raise Exception(f"Failed to update campaign: {e}")
     
+    def _mutate_in_chunks(self, mutate, request_type: str, customer_id: str, operations: list) -> List[bool]:
+        """Send operations in as few partial-failure mutate calls as the API allows; True per applied operation"""
+        applied = []
+        for start in range(0, len(operations), MUTATE_BATCH_SIZE):
+            chunk = operations[start:start + MUTATE_BATCH_SIZE]
+            # partial_failure is not a flattened argument of the mutate methods, so it goes in the request
+            request = self.client.get_type(request_type)
+            request.customer_id = customer_id
+            request.operations.extend(chunk)
+            request.partial_failure = True
+            response = mutate(request=request)
+            
+            failed = self._partial_failure_indexes(response.partial_failure_error)
+            applied.extend(
+                index not in failed and bool(result.resource_name)
+                for index, result in enumerate(response.results)
+            )
+            applied.extend([False] * (len(chunk) - len(response.results)))
+        return applied
+    
+    def _partial_failure_indexes(self, status) -> set:
+        """Indexes of the operations a partial-failure mutate rejected, read from its GoogleAdsFailure details"""
+        failed = set()
+        if not status or not status.details:
+            return failed
+        failure_class = type(self.client.get_type("GoogleAdsFailure"))
+        for detail in status.details:
+            failure = failure_class.deserialize(detail.value)
+            for error in failure.errors:
+                for element in error.location.field_path_elements:
+                    if element.field_name == "operations":
+                        failed.add(element.index)
+                        print(f"⚠️ Mutate operation {element.index} failed: {error.message}")
+                        break
+        return failed
+    
+    async def update_campaign_budgets(self, customer_id: str, budgets: Dict[str, float]) -> Dict[str, bool]:
+        """Set the amount of many campaign budgets (budget id -> amount) in batched mutate calls"""
+        if not self.client:
+            raise Exception("Google Ads client not initialized")
+        if not budgets:
+            return {}
+        
+        try:
+            budget_service = self.client.get_service("CampaignBudgetService")
+            operations = []
+            for budget_id, amount in budgets.items():
+                operation = self.client.get_type("CampaignBudgetOperation")
+                budget = operation.update
+                budget.resource_name = budget_service.campaign_budget_path(customer_id, budget_id)
+                budget.amount_micros = int(round(amount * 1_000_000))
+                operation.update_mask.paths.append("amount_micros")
+                operations.append(operation)
+            
+            applied = self._mutate_in_chunks(
+                budget_service.mutate_campaign_budgets, "MutateCampaignBudgetsRequest", customer_id, operations
+            )
+            daily_metrics_cache.invalidate_attributes(customer_id)
+            return dict(zip(budgets, applied))
+        except GoogleAdsException as e:
+            raise Exception(f"Failed to update campaign budgets: {e}")
+    
+    async def update_keyword_bids(self, customer_id: str, bids: Dict[tuple, float]) -> Dict[tuple, bool]:
+        """Set max CPC of many keywords ((ad group id, criterion id) -> bid) in batched mutate calls"""
+        if not self.client:
+            raise Exception("Google Ads client not initialized")
+        if not bids:
+            return {}
+        
+        try:
+            criterion_service = self.client.get_service("AdGroupCriterionService")
+            operations = []
+            for (ad_group_id, criterion_id), bid in bids.items():
+                operation = self.client.get_type("AdGroupCriterionOperation")
+                criterion = operation.update
+                criterion.resource_name = criterion_service.ad_group_criterion_path(customer_id, ad_group_id, criterion_id)
+                criterion.cpc_bid_micros = int(round(bid * 100)) * 10_000  # whole cents
+                operation.update_mask.paths.append("cpc_bid_micros")
+                operations.append(operation)
+            
+            applied = self._mutate_in_chunks(
+                criterion_service.mutate_ad_group_criteria, "MutateAdGroupCriteriaRequest", customer_id, operations
+            )
+            daily_metrics_cache.invalidate_attributes(customer_id)
+            return dict(zip(bids, applied))
+        except GoogleAdsException as e:
+            raise Exception(f"Failed to update keyword bids: {e}")
+    
     async def delete_campaign(self, customer_id: str, campaign_id: str) -> bool:
         """Delete (remove) a campaign"""
         if not self.client:
@@ -545,19 +1100,30 @@ class GoogleAdsService:
                 customer_id=customer_id,
                 operations=[campaign_operation]
             )
+            daily_metrics_cache.invalidate_attributes(customer_id)
             
             return True
         except GoogleAdsException as e:
             raise Exception(f"Failed to delete campaign: {e}")
     
-    async def get_ad_groups(self, customer_id: str, campaign_id: str = None) -> List[AdGroupData]:
-        """Get ad groups for a campaign or all ad groups"""
+    @coalesce()
+    async def get_ad_groups(self, customer_id: str, campaign_id: str = None,
+                            query: Optional[ListQuery] = None,
+                            date_range: Optional[DateRange] = None) -> List[AdGroupData]:
+        """
+        Get ad groups for a campaign or all ad groups, optionally filtered and sorted by ``query``
+
+        Metrics cover ``date_range`` when given (from the per-day cache unless
+        ``query`` is pushed down), otherwise the API's default window.
+        """
         if not self.client:
             raise Exception("Google Ads client not initialized")
+        if date_range is not None and query is None:
+            return await self._get_ad_groups_for_range(customer_id, campaign_id, date_range)
         
         try:
             ga_service = self.client.get_service("GoogleAdsService")
-            query = """
+            gaql = """
                 SELECT 
                     ad_group.id,
                     ad_group.name,
@@ -573,9 +1139,12 @@ class GoogleAdsService:
             """
             
             if campaign_id:
-                query += f" AND ad_group.campaign = 'customers/{customer_id}/campaigns/{campaign_id}'"
+                gaql += f" AND ad_group.campaign = 'customers/{customer_id}/campaigns/{campaign_id}'"
+            if date_range is not None:
+                gaql += f" AND {date_range.gaql}"
+            gaql += gaql_list_clauses(query, AD_GROUP_LIST_FIELDS)
             
-            response = ga_service.search(customer_id=customer_id, query=query)
+            response = ga_service.search(customer_id=customer_id, query=gaql)
             
             ad_groups = []
             for row in response:
@@ -598,14 +1167,24 @@ class GoogleAdsService:
         except GoogleAdsException as e:
             raise Exception(f"Failed to get ad groups: {e}")
     
-    async def get_keywords(self, customer_id: str, ad_group_id: str = None) -> List[KeywordData]:
-        """Get keywords for an ad group or all keywords"""
+    @coalesce()
+    async def get_keywords(self, customer_id: str, ad_group_id: str = None,
+                           query: Optional[ListQuery] = None,
+                           date_range: Optional[DateRange] = None) -> List[KeywordData]:
+        """
+        Get keywords for an ad group or all keywords, optionally filtered and sorted by ``query``
+
+        Metrics cover ``date_range`` when given (from the per-day cache unless
+        ``query`` is pushed down), otherwise the API's default window.
+        """
         if not self.client:
             raise Exception("Google Ads client not initialized")
+        if date_range is not None and query is None:
+            return await self._get_keywords_for_range(customer_id, ad_group_id, date_range)
         
         try:
             ga_service = self.client.get_service("GoogleAdsService")
-            query = """
+            gaql = """
                 SELECT 
                     ad_group_criterion.criterion_id,
                     ad_group_criterion.keyword.text,
@@ -623,9 +1202,12 @@ class GoogleAdsService:
             """
             
             if ad_group_id:
-                query += f" AND ad_group_criterion.ad_group = 'customers/{customer_id}/adGroups/{ad_group_id}'"
+                gaql += f" AND ad_group_criterion.ad_group = 'customers/{customer_id}/adGroups/{ad_group_id}'"
+            if date_range is not None:
+                gaql += f" AND {date_range.gaql}"
+            gaql += gaql_list_clauses(query, KEYWORD_LIST_FIELDS)
             
-            response = ga_service.search(customer_id=customer_id, query=query)
+            response = ga_service.search(customer_id=customer_id, query=gaql)
             
             keywords = []
             for row in response:
@@ -650,6 +1232,43 @@ class GoogleAdsService:
         except GoogleAdsException as e:
             raise Exception(f"Failed to get keywords: {e}")
     
+    @coalesce()
+    async def get_search_terms(self, customer_id: str, campaign_id: str = None) -> List[Dict[str, Any]]:
+        """Get search terms that triggered ads in the last 30 days"""
+        if not self.client:
+            raise Exception("Google Ads client not initialized")
+        
+        try:
+            ga_service = self.client.get_service("GoogleAdsService")
+            query = """
+                SELECT 
+                    search_term_view.search_term,
+                    metrics.impressions,
+                    metrics.clicks,
+                    metrics.conversions
+                FROM search_term_view 
+                WHERE segments.date DURING LAST_30_DAYS
+                AND metrics.impressions > 0
+            """
+            
+            if campaign_id:
+                query += f" AND campaign.id = {campaign_id}"
+            
+            response = ga_service.search(customer_id=customer_id, query=query)
+            
+            return [
+                {
+                    'search_term': row.search_term_view.search_term,
+                    'impressions': row.metrics.impressions,
+                    'clicks': row.metrics.clicks,
+                    'conversions': row.metrics.conversions
+                }
+                for row in response
+            ]
+        except GoogleAdsException as e:
+            raise Exception(f"Failed to get search terms: {e}")
+    
+    @coalesce()
     async def get_campaign_recommendations(self, customer_id: str, campaign_id: str) -> List[Dict[str, Any]]:
         """Get Google Ads recommendations for a campaign"""
         if not self.client:
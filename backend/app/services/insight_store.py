@@ -0,0 +1,199 @@
+"""
+Persisted insight store
+
+Insights are upserted by their content-addressed id into SQLite. Every insert
+or content change takes the next value of a store-wide sequence, so the
+sequence number doubles as a change cursor: a client that remembers the
+cursor from its last response only needs insights with a higher sequence.
+Re-running an analysis that finds the same things changes nothing.
+
+Full-account runs ``replace`` a scope instead: insights the run no longer
+finds are deleted, so the scope holds the latest run's findings rather than
+everything ever found. Deletions are not part of the change feed; the
+sequence never goes backwards, so cursors stay valid across them.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from app.core.config import get_settings
+from app.services.insights import AIInsight, content_hash, unique_ids
+
+settings = get_settings()
+
+# SQLite caps bound parameters per statement
+_CHUNK = 500
+
+
+def default_store_path() -> str:
+    """``insights.db`` under the user's state directory (``$XDG_STATE_HOME``, else ``~/.local/state``)"""
+    state_home = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(state_home, "crm-backend", "insights.db")
+
+
+@dataclass
+class StoredInsight:
+    """Where an upserted insight stands in the store"""
+    seq: int
+    first_seen: str
+    changed: bool
+
+
+class InsightStore:
+    """Upsert insights per scope and list what changed after a cursor"""
+
+    def __init__(self, path: str = ""):
+        self.path = path or default_store_path()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the database on first use; caller holds the lock"""
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS insights (
+                    scope TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    first_seen TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    PRIMARY KEY (scope, id)
+                );
+                CREATE INDEX IF NOT EXISTS insights_scope_seq ON insights (scope, seq);
+                CREATE TABLE IF NOT EXISTS insight_seq (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    seq INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO insight_seq (id, seq) SELECT 0, COALESCE(MAX(seq), 0) FROM insights;
+            """)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def upsert(self, scope: str, insights: Sequence[AIInsight]) -> Dict[str, StoredInsight]:
+        """
+        Insert new insights and update changed ones
+
+        Args:
+            scope: Partition the insights belong to, e.g. ``tenant:customer:campaigns``
+            insights: Insights with content-addressed ids
+
+        Returns:
+            Insight id -> sequence number, first-seen time and whether this
+            call created or changed it
+        """
+        if not insights:
+            return {}
+
+        batch = {insight.id: insight for insight in unique_ids(insights)}
+        hashes = {insight_id: content_hash(insight) for insight_id, insight in batch.items()}
+        now = datetime.now().isoformat()
+
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                return self._upsert(conn, scope, batch, hashes, now)
+
+    def replace(self, scope: str, insights: Sequence[AIInsight]) -> Dict[str, StoredInsight]:
+        """Upsert ``insights`` as the whole content of ``scope``, deleting the scope's other insights"""
+        batch = {insight.id: insight for insight in unique_ids(insights)}
+        hashes = {insight_id: content_hash(insight) for insight_id, insight in batch.items()}
+        now = datetime.now().isoformat()
+
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                result = self._upsert(conn, scope, batch, hashes, now)
+                stale = [row[0] for row in conn.execute("SELECT id FROM insights WHERE scope = ?", (scope,))
+                         if row[0] not in batch]
+                for start in range(0, len(stale), _CHUNK):
+                    chunk = stale[start:start + _CHUNK]
+                    conn.execute(
+                        f"DELETE FROM insights WHERE scope = ? AND id IN ({','.join('?' * len(chunk))})",
+                        [scope, *chunk]
+                    )
+        return result
+
+    def _upsert(self, conn: sqlite3.Connection, scope: str, batch: Dict[str, AIInsight],
+                hashes: Dict[str, str], now: str) -> Dict[str, StoredInsight]:
+        """Upsert inside an open transaction"""
+        existing = {}
+        ids = list(batch)
+        for start in range(0, len(ids), _CHUNK):
+            chunk = ids[start:start + _CHUNK]
+            rows = conn.execute(
+                f"SELECT id, content_hash, first_seen, seq FROM insights WHERE scope = ? AND id IN ({','.join('?' * len(chunk))})",
+                [scope, *chunk]
+            )
+            existing.update({row[0]: row[1:] for row in rows})
+
+        # Kept apart from the rows, so deleting the newest ones never hands their numbers out again
+        seq = conn.execute("SELECT seq FROM insight_seq WHERE id = 0").fetchone()[0]
+        result: Dict[str, StoredInsight] = {}
+        writes = []
+        for insight_id, insight in batch.items():
+            previous = existing.get(insight_id)
+            if previous is not None and previous[0] == hashes[insight_id]:
+                result[insight_id] = StoredInsight(seq=previous[2], first_seen=previous[1], changed=False)
+                continue
+
+            seq += 1
+            first_seen = previous[1] if previous is not None else now
+            payload = {**asdict(insight), "created_at": first_seen}
+            writes.append((scope, insight_id, hashes[insight_id], json.dumps(payload, default=str), first_seen, now, seq))
+            result[insight_id] = StoredInsight(seq=seq, first_seen=first_seen, changed=True)
+
+        if writes:
+            conn.execute("UPDATE insight_seq SET seq = ? WHERE id = 0", (seq,))
+            conn.executemany("""
+                INSERT INTO insights (scope, id, content_hash, payload, first_seen, updated_at, seq)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (scope, id) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    payload = excluded.payload,
+                    updated_at = excluded.updated_at,
+                    seq = excluded.seq
+            """, writes)
+
+        return result
+
+    def changes(self, scope: str, since: int = 0, limit: Optional[int] = None) -> List[AIInsight]:
+        """Insights in ``scope`` created or changed after cursor ``since``, oldest change first"""
+        query = "SELECT payload FROM insights WHERE scope = ? AND seq > ? ORDER BY seq"
+        params: list = [scope, since]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._connection().execute(query, params).fetchall()
+        return [AIInsight(**json.loads(row[0])) for row in rows]
+
+    def cursor(self, scope: Optional[str] = None) -> int:
+        """Latest sequence number (for one scope, or the whole store)"""
+        with self._lock:
+            conn = self._connection()
+            if scope is None:
+                row = conn.execute("SELECT seq FROM insight_seq WHERE id = 0").fetchone()
+            else:
+                row = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM insights WHERE scope = ?", (scope,)).fetchone()
+        return row[0]
+
+
+def insight_scope(tenant_id: str, customer_id: str, kind: str) -> str:
+    """Store partition for one tenant's view of one ad account"""
+    return f"{tenant_id}:{customer_id}:{kind}"
+
+
+# Singleton instance
+insight_store = InsightStore(settings.insight_store_path)
@@ -0,0 +1,99 @@
+"""
+Insight data model shared by the analysis services
+
+Insight ids are content-addressed: the same rule firing for the same entity
+over the same data window always gets the same id, so repeated analysis runs
+produce stable ids that can be upserted and diffed. Entity ids must be unique
+within the account, which is why keywords are keyed on their ad group too.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+
+@dataclass
+class AIInsight:
+    id: str
+    type: str  # 'optimization', 'budget_alert', 'keyword', 'recommendation', 'anomaly'
+    title: str
+    description: str
+    impact: str  # 'high', 'medium', 'low'
+    confidence: float  # 0.0 to 1.0
+    campaign_id: Optional[str] = None
+    ad_group_id: Optional[str] = None
+    actionable: bool = True
+    action_type: Optional[str] = None  # 'increase_budget', 'pause_keyword', 'adjust_bid', etc.
+    action_data: Optional[Dict[str, Any]] = None
+    created_at: str = None
+    priority: int = 1  # 1 (highest) to 5 (lowest)
+
+    def __post_init__(self):
+        if self.created_at is None:
+            self.created_at = datetime.now().isoformat()
+
+
+def data_window(days: int = 30, end: Optional[date] = None) -> str:
+    """
+    The reporting window analysis runs over, as ``start..end``
+
+    Defaults to the last ``days`` complete days, which is what GAQL's
+    ``LAST_30_DAYS`` covers.
+    """
+    end = end or date.today() - timedelta(days=1)
+    return f"{(end - timedelta(days=days - 1)).isoformat()}..{end.isoformat()}"
+
+
+def keyword_key(ad_group_id: str, criterion_id: str) -> str:
+    """Account-unique keyword id (criterion ids are only unique within their ad group)"""
+    return f"{ad_group_id}~{criterion_id}"
+
+
+def text_key(text: str) -> str:
+    """Case- and punctuation-insensitive form of free text, for ids derived from it"""
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def insight_id(rule: str, entity_id: Any, window: str) -> str:
+    """Deterministic id for ``rule`` firing on ``entity_id`` over ``window``"""
+    digest = hashlib.sha256(f"{rule}|{entity_id}|{window}".encode("utf-8")).hexdigest()[:16]
+    return f"{rule}_{digest}"
+
+
+def insight_ids(rule: str, entity_ids: Iterable[Any], window: str) -> List[str]:
+    """``insight_id`` for many entities at once"""
+    sha256 = hashlib.sha256
+    return [f"{rule}_{sha256(f'{rule}|{entity_id}|{window}'.encode('utf-8')).hexdigest()[:16]}" for entity_id in entity_ids]
+
+
+def content_hash(insight: AIInsight) -> str:
+    """Hash of what an insight says, ignoring its id and creation time"""
+    content = {k: v for k, v in asdict(insight).items() if k not in ("id", "created_at")}
+    body = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def unique_ids(insights: Sequence[AIInsight]) -> List[AIInsight]:
+    """
+    Drop repeats of the same finding and keep distinct findings that share an id
+
+    An insight with an id already seen and the same content is a repeat.
+    One with different content gets its content hash appended to the id, so
+    it is neither dropped nor overwrites the other.
+    """
+    seen: Dict[str, str] = {}
+    unique = []
+    for insight in insights:
+        digest = content_hash(insight)
+        if insight.id in seen:
+            if seen[insight.id] == digest:
+                continue
+            insight.id = f"{insight.id}_{digest[:8]}"
+            if seen.get(insight.id) == digest:
+                continue
+        seen[insight.id] = digest
+        unique.append(insight)
+    return unique
@@ -0,0 +1,399 @@
+"""
+Asynchronous jobs for long-running requests
+
+Heavy endpoints (optimization, insights, keyword suggestions) can submit their
+work as a job instead of holding the request open: the client gets a job id
+right away, then polls ``/jobs/{id}`` or follows ``/jobs/{id}/events`` (SSE)
+for progress, and reads the result from the finished job.
+
+A job kind maps to an async handler registered with ``register_job``. The
+handler receives the job's JSON params, the tenant and a ``progress(fraction,
+message)`` callback, and returns a JSON-serializable result.
+
+Two backends share one interface:
+
+- ``LocalJobQueue``: jobs run as asyncio tasks in the API process, for
+  single-node setups.
+- ``CeleryJobQueue``: job state lives in Redis and jobs run on Celery
+  workers (``app.worker``), so any API node can submit, poll or stream any
+  job.
+
+Each tenant may run ``max_concurrent`` jobs at once; further jobs wait in the
+queue, and submissions beyond ``max_pending`` unfinished jobs are refused.
+Finished jobs are kept for ``result_ttl`` seconds. A finished status is final:
+later writes of a job that was already completed, failed or cancelled (say, a
+worker finishing a job cancelled under it) are dropped.
+
+On Celery, a running job holds a lease on one of its tenant's slots, renewed
+while it runs. A worker killed mid-job (e.g. a cancel with ``terminate``)
+cannot give its slot back, so the lease simply runs out after ``lease_ttl``.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is an optional backend
+    redis = None
+
+settings = get_settings()
+
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+ProgressCallback = Callable[[float, Optional[str]], None]
+JobHandler = Callable[[Dict[str, Any], str, ProgressCallback], Awaitable[Any]]
+
+# Job kind -> handler; filled by the modules that define the work (API routers)
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def register_job(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Decorator registering the handler of a job kind"""
+    def decorator(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def ignore_progress(fraction: float, message: Optional[str] = None) -> None:
+    """Progress callback for work run outside a job"""
+
+
+class JobLimitError(Exception):
+    """The tenant already has the maximum number of unfinished jobs"""
+
+
+@dataclass
+class Job:
+    """A submitted job, its progress and outcome"""
+    id: str
+    kind: str
+    tenant_id: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    status: str = "queued"
+    progress: float = 0.0
+    message: Optional[str] = None
+    result: Any = None
+    error: Optional[str] = None
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    version: int = 0  # bumped on every change, so watchers can tell updates from heartbeats
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {"job_id": self.id, **asdict(self)}
+        del data["id"], data["params"]
+        if not include_result:
+            del data["result"]
+        return data
+
+
+def _new_job(kind: str, tenant_id: str, params: Dict[str, Any]) -> Job:
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    return Job(id=uuid.uuid4().hex, kind=kind, tenant_id=tenant_id, params=params)
+
+
+async def execute(job: Job, progress: ProgressCallback) -> Any:
+    """Run a job's handler"""
+    return await JOB_HANDLERS[job.kind](job.params, job.tenant_id, progress)
+
+
+class LocalJobQueue:
+    """Jobs as asyncio tasks in this process"""
+
+    backend = "memory"
+
+    def __init__(self, max_concurrent: int = 2, max_pending: int = 20,
+                 result_ttl: int = 3600, max_finished: int = 1024):
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._active: Dict[str, Job] = {}
+        self._finished = TTLCache(max_entries=max_finished, ttl=result_ttl)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._updates: Dict[str, asyncio.Event] = {}
+        self._recent: Dict[str, deque] = {}  # tenant -> latest job ids, for listing
+        self.submitted = 0
+        self.rejected = 0
+
+    def _pending(self, tenant_id: str) -> int:
+        return sum(1 for job in self._active.values() if job.tenant_id == tenant_id)
+
+    def submit(self, kind: str, tenant_id: str, params: Optional[Dict[str, Any]] = None) -> Job:
+        """Queue a job on the running event loop; JobLimitError if the tenant is at its limit"""
+        job = _new_job(kind, tenant_id, params or {})
+        if self._pending(tenant_id) >= self.max_pending:
+            self.rejected += 1
+            raise JobLimitError(f"Tenant has {self.max_pending} unfinished jobs; wait for some to finish")
+        self._active[job.id] = job
+        self._recent.setdefault(tenant_id, deque(maxlen=200)).append(job.id)
+        self._tasks[job.id] = asyncio.create_task(self._run(job))
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._active.get(job_id) or self._finished.get(job_id)
+
+    def jobs(self, tenant_id: str) -> List[Job]:
+        """The tenant's unfinished and unexpired jobs, newest first"""
+        jobs = (self.get(job_id) for job_id in reversed(self._recent.get(tenant_id, ())))
+        return [job for job in jobs if job is not None]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if it already finished"""
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    async def watch(self, job_id: str, heartbeat: float = 15.0) -> AsyncIterator[Job]:
+        """Yield the job now, after every change and at least every ``heartbeat`` seconds, until it finishes"""
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            yield job
+            if job.finished:
+                return
+            event = self._updates.setdefault(job_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "queued": sum(1 for job in self._active.values() if job.status == "queued"),
+            "running": sum(1 for job in self._active.values() if job.status == "running"),
+            "finished": len(self._finished),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "max_concurrent_per_tenant": self.max_concurrent,
+            "max_pending_per_tenant": self.max_pending,
+            "result_ttl": self.result_ttl,
+        }
+
+    def _changed(self, job: Job, **changes: Any) -> None:
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.version += 1
+        event = self._updates.pop(job.id, None)
+        if event is not None:
+            event.set()
+
+    async def _run(self, job: Job) -> None:
+        def progress(fraction: float, message: Optional[str] = None) -> None:
+            self._changed(job, progress=round(min(max(fraction, 0.0), 1.0), 4), message=message)
+
+        slot = self._slots.setdefault(job.tenant_id, asyncio.Semaphore(self.max_concurrent))
+        try:
+            async with slot:
+                self._changed(job, status="running", started_at=datetime.now().isoformat())
+                result = await execute(job, progress)
+            self._finish(job, status="completed", result=result, progress=1.0, message=None)
+        except asyncio.CancelledError:
+            self._finish(job, status="cancelled")
+        except Exception as e:
+            print(f"⚠️ {job.kind} job {job.id} failed: {e}")
+            self._finish(job, status="failed", error=str(e))
+
+    def _finish(self, job: Job, **changes: Any) -> None:
+        self._finished.set(job.id, job)
+        self._active.pop(job.id, None)
+        self._tasks.pop(job.id, None)
+        self._changed(job, finished_at=datetime.now().isoformat(), **changes)
+
+
+# KEYS: job key; ARGV: job JSON, TTL, then the finished statuses.
+# Writes the job unless the stored copy has already finished; returns 1 if written.
+SAVE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local status = cjson.decode(current)['status']
+    for i = 3, #ARGV do
+        if status == ARGV[i] then return 0 end
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+# KEYS: tenant's slot leases (sorted set of job id by lease expiry); ARGV: job id, now, lease TTL, max concurrent.
+# Drops expired leases, then takes or renews the job's lease if it holds one or a slot is free; returns 1 if held.
+LEASE_SCRIPT = """
+local now = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) and redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[4]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[3])) + 1)
+return 1
+"""
+
+
+class CeleryJobQueue:
+    """Job state in Redis, execution on Celery workers"""
+
+    backend = "celery"
+
+    def __init__(self, max_concurrent: int = 2, max_pending: int = 20,
+                 result_ttl: int = 3600, redis_url: Optional[str] = None, queue: str = "jobs",
+                 lease_ttl: int = 300):
+        if redis is None:
+            raise RuntimeError("The celery job backend needs the redis package")
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.queue = queue
+        self.lease_ttl = lease_ttl
+        self._redis = redis.Redis.from_url(redis_url or settings.redis_url, decode_responses=True)
+        self._save_script = self._redis.register_script(SAVE_SCRIPT)
+        self._lease_script = self._redis.register_script(LEASE_SCRIPT)
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"jobs:{job_id}"
+
+    @staticmethod
+    def _tenant_key(tenant_id: str) -> str:
+        return f"jobs:tenant:{tenant_id}"  # sorted set of job ids by submission time
+
+    @staticmethod
+    def _active_key(tenant_id: str) -> str:
+        return f"jobs:tenant:{tenant_id}:active"  # unfinished job ids
+
+    @staticmethod
+    def _leases_key(tenant_id: str) -> str:
+        return f"jobs:tenant:{tenant_id}:leases"  # running job ids scored by lease expiry
+
+    def save(self, job: Job) -> bool:
+        """Store the job; False (and nothing written) if the stored job has already finished"""
+        job.version += 1
+        # Unfinished jobs are kept until they finish (a day at most, should a worker die)
+        ttl = self.result_ttl if job.finished else 86400
+        written = self._save_script(
+            keys=[self._job_key(job.id)],
+            args=[json.dumps(asdict(job), default=str), ttl, *FINISHED_STATUSES]
+        )
+        return bool(written)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        raw = self._redis.get(self._job_key(job_id))
+        return Job(**json.loads(raw)) if raw else None
+
+    def submit(self, kind: str, tenant_id: str, params: Optional[Dict[str, Any]] = None) -> Job:
+        from app.worker import run_async_job
+        job = _new_job(kind, tenant_id, params or {})
+        json.dumps(job.params)  # params must survive the trip to the worker
+        if self._redis.scard(self._active_key(tenant_id)) >= self.max_pending:
+            raise JobLimitError(f"Tenant has {self.max_pending} unfinished jobs; wait for some to finish")
+        self.save(job)
+        pipe = self._redis.pipeline()
+        pipe.sadd(self._active_key(tenant_id), job.id)
+        pipe.zadd(self._tenant_key(tenant_id), {job.id: time.time()})
+        pipe.zremrangebyscore(self._tenant_key(tenant_id), 0, time.time() - self.result_ttl - 86400)
+        pipe.execute()
+        run_async_job.apply_async(args=(job.id,), task_id=job.id, queue=self.queue)
+        return job
+
+    def jobs(self, tenant_id: str) -> List[Job]:
+        job_ids = self._redis.zrevrange(self._tenant_key(tenant_id), 0, 199)
+        raws = self._redis.mget([self._job_key(job_id) for job_id in job_ids]) if job_ids else []
+        return [Job(**json.loads(raw)) for raw in raws if raw]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job, or terminate a running one on its worker"""
+        from app.worker import celery_app
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        celery_app.control.revoke(job_id, terminate=job.status == "running")
+        cancelled = self.finish(job, status="cancelled")
+        # A terminated worker never releases its slot itself
+        self.release_slot(job.tenant_id, job_id)
+        return cancelled
+
+    async def watch(self, job_id: str, heartbeat: float = 15.0, interval: float = 0.5) -> AsyncIterator[Job]:
+        """Poll the job, yielding on every change and at least every ``heartbeat`` seconds"""
+        last_version, last_sent = None, 0.0
+        while True:
+            job = await asyncio.to_thread(self.get, job_id)
+            if job is None:
+                return
+            if job.version != last_version or time.monotonic() - last_sent >= heartbeat:
+                last_version, last_sent = job.version, time.monotonic()
+                yield job
+            if job.finished:
+                return
+            await asyncio.sleep(interval)
+
+    # Worker side
+
+    def acquire_slot(self, tenant_id: str, job_id: str) -> bool:
+        """Lease one of the tenant's running slots for the job, or renew its lease (False when all are taken)"""
+        held = self._lease_script(
+            keys=[self._leases_key(tenant_id)],
+            args=[job_id, time.time(), self.lease_ttl, self.max_concurrent]
+        )
+        return bool(held)
+
+    def release_slot(self, tenant_id: str, job_id: str) -> None:
+        self._redis.zrem(self._leases_key(tenant_id), job_id)
+
+    def finish(self, job: Job, **changes: Any) -> bool:
+        """Store the job's outcome; False if it had already finished (the earlier outcome stands)"""
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.finished_at = datetime.now().isoformat()
+        saved = self.save(job)
+        self._redis.srem(self._active_key(job.tenant_id), job.id)
+        return saved
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "queue": self.queue,
+            "max_concurrent_per_tenant": self.max_concurrent,
+            "max_pending_per_tenant": self.max_pending,
+            "result_ttl": self.result_ttl,
+            "lease_ttl": self.lease_ttl,
+        }
+
+
+def create_job_queue(backend: str = "memory"):
+    """Build the job queue for ``settings.job_backend``"""
+    options = dict(
+        max_concurrent=settings.job_max_concurrent_per_tenant,
+        max_pending=settings.job_max_pending_per_tenant,
+        result_ttl=settings.job_result_ttl
+    )
+    if backend == "celery":
+        try:
+            return CeleryJobQueue(**options, queue=settings.job_queue, lease_ttl=settings.job_slot_lease_seconds)
+        except RuntimeError as e:
+            print(f"⚠️ {e}; falling back to in-process jobs")
+    return LocalJobQueue(**options)
+
+
+# Singleton instance
+job_queue = create_job_queue(settings.job_backend)
@@ -0,0 +1,87 @@
+"""
+Incremental JSON parsing for streamed LLM completions
+"""
+
+import json
+from typing import Any, List
+
+
+class JSONArrayStreamParser:
+    """
+    Incrementally extract the objects of the first top-level JSON array in a
+    text stream.
+
+    LLM completions wrap the array in prose (``Here are the insights: [...]``),
+    so everything before the opening ``[`` is skipped. Each ``{...}`` element is
+    decoded as soon as its closing brace arrives; malformed elements and other
+    values (strings, numbers, nested arrays) are skipped, brackets inside
+    strings included.
+
+        parser = JSONArrayStreamParser()
+        for chunk in chunks:
+            for obj in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing ``]`` of the array has been seen"""
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume a chunk of text and return any elements it completed"""
+        completed = []
+
+        for char in chunk:
+            if self._finished:
+                break
+
+            if not self._in_array:
+                if char == '[':
+                    self._in_array = True
+                continue
+
+            if self._depth:
+                self._buffer.append(char)
+
+            # Strings are tracked between elements too, so a "]" or "{" inside one is just text
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif self._depth == 0:
+                # Between elements: an element starts, or the array ends
+                if char in '{[':
+                    self._depth = 1
+                    self._buffer = [char]
+                elif char == ']':
+                    self._finished = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    # Nested arrays are skipped whole; only objects are decoded
+                    if self._buffer[0] == '{':
+                        try:
+                            completed.append(json.loads(''.join(self._buffer)))
+                        except json.JSONDecodeError:
+                            pass
+                    self._buffer = []
+
+        return completed
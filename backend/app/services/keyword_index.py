@@ -0,0 +1,328 @@
+"""
+Local keyword suggestion index
+
+Keywords and search terms seen across a tenant's accounts are embedded and
+kept in an in-process vector index. Suggestions for a campaign are the nearest
+neighbours of its current keywords that it does not already target, so a
+request is answered from memory in milliseconds instead of by an LLM call.
+
+Embeddings come from a pluggable ``Embedder``. ``HashingEmbedder`` needs no
+model download and is deterministic across processes (character n-grams and
+words hashed with CRC32), so it works offline; ``SentenceTransformerEmbedder``
+gives semantic neighbours when the model is available.
+"""
+
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+
+_MATCH_TYPE_CHARS = re.compile(r'[\[\]"+]')
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_keyword(text: str) -> str:
+    """Lowercase and strip match-type punctuation (``[..]``, ``".."``, ``+``)"""
+    return _WHITESPACE.sub(" ", _MATCH_TYPE_CHARS.sub(" ", text.lower())).strip()
+
+
+class Embedder(Protocol):
+    """Turns texts into L2-normalized float32 vectors of a fixed dimension"""
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        ...
+
+
+class HashingEmbedder:
+    """
+    Deterministic feature-hashing embedder
+
+    Character 3-5-grams (with word boundaries) and whole words are hashed into
+    ``dim`` signed buckets. Keywords that share stems and word pieces land
+    close together, which is what keyword expansion mostly needs.
+    """
+
+    def __init__(self, dim: int = 256, ngram_range: Tuple[int, int] = (3, 5), word_weight: float = 2.0):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.word_weight = word_weight
+        # Keyword vocabularies reuse the same n-grams constantly; remember their buckets
+        self._buckets: Dict[str, int] = {}
+
+    def _bucket(self, feature: str) -> int:
+        """Signed bucket for a feature: ``b`` or ``-(b + 1)`` for a negative sign"""
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            hashed = zlib.crc32(feature.encode("utf-8"))
+            # A second hash bit picks the sign so collisions tend to cancel
+            bucket = hashed % self.dim if (hashed >> 16) & 1 else -(hashed % self.dim) - 1
+            if len(self._buckets) < 2_000_000:
+                self._buckets[feature] = bucket
+        return bucket
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        low, high = self.ngram_range
+        rows, buckets, weights = [], [], []
+        for row, text in enumerate(texts):
+            text = normalize_keyword(text)
+            words = text.split()
+            padded = f" {text} "
+            grams = [padded[i:i + n] for n in range(low, high + 1) for i in range(len(padded) - n + 1)]
+            features = [self._bucket(f"w:{word}") for word in words] + [self._bucket(gram) for gram in grams]
+            rows.extend([row] * len(features))
+            buckets.extend(features)
+            weights.extend([self.word_weight] * len(words) + [1.0] * len(grams))
+
+        count = len(texts)
+        if not rows:
+            return np.zeros((count, self.dim), dtype=np.float32)
+        buckets = np.asarray(buckets, dtype=np.int64)
+        signs = np.where(buckets >= 0, 1.0, -1.0)
+        columns = np.where(buckets >= 0, buckets, -buckets - 1)
+        flat = np.asarray(rows, dtype=np.int64) * self.dim + columns
+        vectors = np.bincount(flat, weights=signs * np.asarray(weights), minlength=count * self.dim)
+        vectors = vectors.reshape(count, self.dim).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Semantic embeddings from a sentence-transformers model (loaded on first use)"""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name)
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self._model.encode(
+            [normalize_keyword(t) for t in texts], normalize_embeddings=True, show_progress_bar=False
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def create_embedder(kind: str = "hashing", model_name: str = "all-MiniLM-L6-v2", dim: int = 256) -> Embedder:
+    """Build the configured embedder, falling back to hashing if the model can't load"""
+    if kind == "sentence-transformers":
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception as e:
+            print(f"⚠️ Keyword embedder '{model_name}' unavailable, using hashing embedder: {e}")
+    elif kind != "hashing":
+        raise ValueError(f"Unknown keyword embedder '{kind}'")
+    return HashingEmbedder(dim=dim)
+
+
+class VectorIndex:
+    """
+    Append-only inner-product index over normalized vectors
+
+    Small indexes are searched exactly with one matrix product. Past
+    ``exact_limit`` vectors an IVF layer is trained (k-means centroids over a
+    sample) and a query only scans the ``nprobe`` closest lists. New vectors
+    are assigned to their nearest list as they arrive; the centroids are
+    retrained once the index has grown 4x since the last training.
+    Vectors are stored as float16 to halve memory.
+    """
+
+    def __init__(self, dim: int, exact_limit: int = 20000, nprobe: int = 8, seed: int = 0):
+        self.dim = dim
+        self.exact_limit = exact_limit
+        self.nprobe = nprobe
+        self._rng = np.random.default_rng(seed)
+        self._vectors = np.zeros((0, dim), dtype=np.float16)
+        self._size = 0
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """Append vectors; returns their ids"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        count = len(vectors)
+        if count == 0:
+            return np.zeros(0, dtype=np.int64)
+        if self._size + count > len(self._vectors):
+            grown = np.zeros((max(2 * len(self._vectors), self._size + count, 1024), self.dim), dtype=np.float16)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        ids = np.arange(self._size, self._size + count)
+        self._vectors[ids] = vectors
+        self._size += count
+
+        if self._centroids is not None and self._size < 4 * self._trained_size:
+            self._assign(ids, vectors)
+        elif self._size > self.exact_limit:
+            self._train()
+        return ids
+
+    def _train(self, iterations: int = 10) -> None:
+        data = self._vectors[:self._size].astype(np.float32)
+        nlist = int(min(4096, max(16, 4 * np.sqrt(self._size))))
+        sample = data[self._rng.choice(self._size, size=min(self._size, nlist * 40), replace=False)]
+        centroids = sample[self._rng.choice(len(sample), size=nlist, replace=False)]
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            present, starts = np.unique(labels[order], return_index=True)
+            # Empty clusters keep their previous centroid
+            sums = centroids.copy()
+            sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+        self._centroids = centroids
+        self._lists = [np.zeros(0, dtype=np.int64) for _ in range(nlist)]
+        self._trained_size = self._size
+        self._assign(np.arange(self._size), data)
+
+    def _assign(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        labels = np.argmax(vectors @ self._centroids.T, axis=1)
+        order = np.argsort(labels, kind="stable")
+        labels, ids = labels[order], ids[order]
+        bounds = np.flatnonzero(np.diff(labels)) + 1
+        for chunk in np.split(np.arange(len(ids)), bounds):
+            if len(chunk):
+                label = labels[chunk[0]]
+                self._lists[label] = np.concatenate((self._lists[label], ids[chunk]))
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-``k`` ids and inner-product scores for one query vector, best first"""
+        if self._size == 0 or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32)
+
+        if self._centroids is None:
+            candidates = None
+            vectors = self._vectors[:self._size].astype(np.float32)
+        else:
+            probes = np.argsort(self._centroids @ query)[::-1][:self.nprobe]
+            candidates = np.concatenate([self._lists[p] for p in probes])
+            vectors = self._vectors[candidates].astype(np.float32)
+
+        scores = vectors @ query
+        k = min(k, len(scores))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        ids = top if candidates is None else candidates[top]
+        return ids, scores[top]
+
+
+@dataclass
+class KeywordSuggestion:
+    keyword: str
+    score: float
+    source: str  # 'keyword' or 'search_term'
+    clicks: float = 0
+    conversions: float = 0
+
+
+class KeywordSuggestionEngine:
+    """Nearest-neighbour keyword suggestions over one tenant's keywords and search terms"""
+
+    def __init__(self, embedder: Embedder):
+        self.embedder = embedder
+        self.index = VectorIndex(embedder.dim)
+        self._lock = threading.Lock()
+        self._slots: Dict[str, int] = {}  # normalized text -> index id
+        self._texts: List[str] = []
+        self._sources: List[str] = []
+        self._clicks: List[float] = []
+        self._conversions: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add_terms(self, terms: Iterable[Tuple[str, str, float, float]]) -> int:
+        """
+        Add ``(text, source, clicks, conversions)`` terms
+
+        Only texts not yet indexed are embedded; for known texts the stats are
+        refreshed. Returns the number of new terms.
+        """
+        new_texts, new_rows = [], []
+        with self._lock:
+            pending = set()
+            for text, source, clicks, conversions in terms:
+                normalized = normalize_keyword(text)
+                if not normalized:
+                    continue
+                slot = self._slots.get(normalized)
+                if slot is not None:
+                    self._clicks[slot] = max(self._clicks[slot], float(clicks or 0))
+                    self._conversions[slot] = max(self._conversions[slot], float(conversions or 0))
+                    # A term that is also someone's keyword counts as a keyword
+                    if source == "keyword":
+                        self._sources[slot] = source
+                    continue
+                if normalized in pending:
+                    continue
+                pending.add(normalized)
+                new_texts.append(normalized)
+                new_rows.append((source, float(clicks or 0), float(conversions or 0)))
+
+            if not new_texts:
+                return 0
+
+            ids = self.index.add(self.embedder.embed(new_texts))
+            for slot, text, (source, clicks, conversions) in zip(ids.tolist(), new_texts, new_rows):
+                self._slots[text] = slot
+                self._texts.append(text)
+                self._sources.append(source)
+                self._clicks.append(clicks)
+                self._conversions.append(conversions)
+        return len(new_texts)
+
+    def suggest(self, seeds: Sequence[str], exclude: Iterable[str] = (), limit: int = 10,
+                min_score: float = 0.2) -> List[KeywordSuggestion]:
+        """
+        Nearest neighbours of the seed keywords that aren't already targeted
+
+        Candidates are scored by their best similarity to any seed, with a
+        small boost for terms that have converted.
+        """
+        seeds = [normalize_keyword(s) for s in seeds if s and s.strip()]
+        if not seeds or len(self._texts) == 0:
+            return []
+        excluded = {normalize_keyword(e) for e in exclude} | set(seeds)
+
+        # Long seed lists are capped; each seed's neighbourhood is over-fetched
+        # so excluded (already targeted) terms don't crowd out suggestions
+        seeds = seeds[:200]
+        per_seed = max(limit * 3, 20)
+        fetch = per_seed + min(len(excluded), per_seed)
+        queries = self.embedder.embed(seeds)
+
+        best: Dict[int, float] = {}
+        with self._lock:
+            for query in queries:
+                ids, scores = self.index.search(query, fetch)
+                for slot, score in zip(ids.tolist(), scores.tolist()):
+                    if score > best.get(slot, -1.0):
+                        best[slot] = score
+
+            suggestions = []
+            for slot, score in best.items():
+                text = self._texts[slot]
+                if score < min_score or text in excluded:
+                    continue
+                boosted = score + 0.05 * np.log1p(self._conversions[slot])
+                suggestions.append(KeywordSuggestion(
+                    keyword=text,
+                    score=round(float(boosted), 4),
+                    source=self._sources[slot],
+                    clicks=self._clicks[slot],
+                    conversions=self._conversions[slot],
+                ))
+
+        suggestions.sort(key=lambda s: -s.score)
+        return suggestions[:limit]
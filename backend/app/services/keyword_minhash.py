@@ -0,0 +1,270 @@
+"""
+MinHash/LSH near-duplicate index for keywords
+
+Each keyword is reduced to a set of shingles (its words plus the character
+trigrams of each word, so word order does not matter) and summarized by a
+MinHash signature. Signatures are split into bands; keywords sharing any band
+land in the same LSH bucket, so near-duplicates of a text are found by a
+handful of dictionary lookups instead of a scan over the account.
+
+Pairs that share a bucket are confirmed by the estimated Jaccard similarity
+(fraction of equal signature slots). With 64 permutations in 16 bands of 4,
+pairs above ~0.5 Jaccard are found with high probability.
+"""
+
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.services.google_ads_service import KeywordData
+from app.services.insights import keyword_key
+from app.services.keyword_index import normalize_keyword
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Buckets this large come from very generic bands (e.g. one common word) and
+# carry no near-duplicate signal; they are skipped when clustering
+_MAX_BUCKET = 1000
+
+
+def shingles(text: str, ngram: int = 3) -> Set[str]:
+    """Words plus each word's character n-grams, independent of word order"""
+    shingle_set = set()
+    for word in normalize_keyword(text).split():
+        shingle_set.add(f"w:{word}")
+        padded = f"<{word}>"
+        shingle_set.update(padded[i:i + ngram] for i in range(max(1, len(padded) - ngram + 1)))
+    return shingle_set
+
+
+@dataclass
+class KeywordEntry:
+    id: str
+    text: str
+    ad_group_id: str
+    match_type: str
+    clicks: float
+    conversions: float
+    cost: float
+
+    @property
+    def key(self) -> str:
+        """Index key; criterion ids alone repeat across ad groups"""
+        return keyword_key(self.ad_group_id, self.id)
+
+
+class KeywordMinHashIndex:
+    """Incrementally maintained LSH index over one account's keywords"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, ngram: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, KeywordEntry] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def threshold(self) -> float:
+        """Jaccard similarity at which a pair has a 50% chance of sharing a bucket"""
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def signatures(self, texts: Sequence[str], chunk_size: int = 4096) -> np.ndarray:
+        """MinHash signatures (``len(texts)`` x ``num_perm``), computed in vectorized chunks"""
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for start in range(0, len(texts), chunk_size):
+            chunk = texts[start:start + chunk_size]
+            hashes, lengths = [], []
+            for text in chunk:
+                text_shingles = shingles(text, self.ngram) or {""}
+                hashes.extend(zlib.crc32(s.encode("utf-8")) for s in text_shingles)
+                lengths.append(len(text_shingles))
+            values = np.asarray(hashes, dtype=np.uint64)
+            # Universal hashing (a*x + b) mod p, truncated to 32 bits; the
+            # product can wrap in uint64, which keeps it a fixed random permutation
+            permuted = ((np.outer(self._a, values) + self._b[:, None]) % np.uint64(_MERSENNE_PRIME)) & np.uint64(_MAX_HASH)
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            result[start:start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return result
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def _insert(self, entry: KeywordEntry, signature: np.ndarray) -> None:
+        self._entries[entry.key] = entry
+        self._signatures[entry.key] = signature
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, set()).add(entry.key)
+
+    def _remove(self, entry_key: str) -> None:
+        signature = self._signatures.pop(entry_key, None)
+        self._entries.pop(entry_key, None)
+        if signature is None:
+            return
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(entry_key)
+                if not members:
+                    del bucket[key]
+
+    def sync(self, keywords: Iterable[KeywordData]) -> Dict[str, int]:
+        """
+        Bring the index in line with an account's current keywords
+
+        Only keywords that are new or whose text changed are hashed; keywords
+        no longer present are removed. Metrics are refreshed for all.
+        """
+        current = {keyword_key(kw.ad_group_id, kw.id): kw for kw in keywords}
+        with self._lock:
+            removed = [entry_key for entry_key in self._entries if entry_key not in current]
+            for entry_key in removed:
+                self._remove(entry_key)
+
+            changed = []
+            for entry_key, kw in current.items():
+                entry = KeywordEntry(
+                    id=kw.id,
+                    text=kw.text,
+                    ad_group_id=kw.ad_group_id,
+                    match_type=kw.match_type,
+                    clicks=float(kw.clicks or 0),
+                    conversions=float(kw.conversions or 0),
+                    cost=float(kw.cost or 0),
+                )
+                existing = self._entries.get(entry_key)
+                if existing is not None and normalize_keyword(existing.text) == normalize_keyword(kw.text):
+                    self._entries[entry_key] = entry
+                    continue
+                if existing is not None:
+                    self._remove(entry_key)
+                changed.append(entry)
+
+            if changed:
+                for entry, signature in zip(changed, self.signatures([e.text for e in changed])):
+                    self._insert(entry, signature)
+
+        return {"added": len(changed), "removed": len(removed), "total": len(self._entries)}
+
+    def similarity(self, first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return np.count_nonzero(first == second) / self.num_perm
+
+    def near_duplicates(self, text: str, min_similarity: Optional[float] = None) -> List[Tuple[KeywordEntry, float]]:
+        """Indexed keywords that are near-duplicates of ``text``, most similar first"""
+        min_similarity = self.threshold if min_similarity is None else min_similarity
+        signature = self.signatures([text])[0]
+        with self._lock:
+            candidates: Set[str] = set()
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(bucket.get(key, ()))
+            matches = []
+            for entry_key in candidates:
+                score = self.similarity(signature, self._signatures[entry_key])
+                if score >= min_similarity:
+                    matches.append((self._entries[entry_key], score))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def filter_new(self, texts: Sequence[str], min_similarity: Optional[float] = None) -> List[str]:
+        """Drop texts that duplicate or nearly duplicate an indexed keyword"""
+        min_similarity = self.threshold if min_similarity is None else min_similarity
+        if not texts:
+            return []
+        signatures = self.signatures(list(texts))
+        kept = []
+        with self._lock:
+            for text, signature in zip(texts, signatures):
+                duplicate = False
+                for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                    for entry_key in bucket.get(key, ()):
+                        if self.similarity(signature, self._signatures[entry_key]) >= min_similarity:
+                            duplicate = True
+                            break
+                    if duplicate:
+                        break
+                if not duplicate:
+                    kept.append(text)
+        return kept
+
+    def cannibalization_clusters(self, min_similarity: Optional[float] = None) -> List[Dict[str, object]]:
+        """
+        Groups of near-duplicate keywords that live in different ad groups
+
+        Bucket members are linked to the bucket's first member when their
+        estimated similarity clears ``min_similarity``; connected groups that
+        span more than one ad group are reported, costliest first.
+        """
+        min_similarity = self.threshold if min_similarity is None else min_similarity
+        with self._lock:
+            parent: Dict[str, str] = {}
+
+            def find(node: str) -> str:
+                root = node
+                while parent.get(root, root) != root:
+                    root = parent[root]
+                while node != root:
+                    parent[node], node = root, parent.get(node, node)
+                return root
+
+            for bucket in self._buckets:
+                for members in bucket.values():
+                    if len(members) < 2 or len(members) > _MAX_BUCKET:
+                        continue
+                    members = sorted(members)
+                    anchor = members[0]
+                    anchor_signature = self._signatures[anchor]
+                    for other in members[1:]:
+                        if self.similarity(anchor_signature, self._signatures[other]) >= min_similarity:
+                            parent.setdefault(anchor, anchor)
+                            parent.setdefault(other, other)
+                            root_a, root_b = find(anchor), find(other)
+                            if root_a != root_b:
+                                parent[root_b] = root_a
+
+            groups: Dict[str, List[str]] = {}
+            for entry_key in parent:
+                groups.setdefault(find(entry_key), []).append(entry_key)
+
+            clusters = []
+            for members in groups.values():
+                entries = [self._entries[entry_key] for entry_key in members]
+                ad_groups = sorted({entry.ad_group_id for entry in entries})
+                if len(ad_groups) < 2:
+                    continue
+                entries.sort(key=lambda entry: -entry.cost)
+                clusters.append({
+                    "ad_group_ids": ad_groups,
+                    "keywords": [
+                        {
+                            "id": entry.id,
+                            "text": entry.text,
+                            "ad_group_id": entry.ad_group_id,
+                            "match_type": entry.match_type,
+                            "clicks": entry.clicks,
+                            "conversions": entry.conversions,
+                            "cost": entry.cost,
+                        }
+                        for entry in entries
+                    ],
+                    "total_cost": sum(entry.cost for entry in entries),
+                    "total_conversions": sum(entry.conversions for entry in entries),
+                })
+
+        clusters.sort(key=lambda cluster: -cluster["total_cost"])
+        return clusters
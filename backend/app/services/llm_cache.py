@@ -0,0 +1,118 @@
+"""
+Exact-match cache for LLM responses
+
+Completions are keyed by a hash of the model, the prompt template version and
+a canonicalized payload, so identical analysis requests are answered without
+calling the model again. An in-process LRU with TTL always sits in front; Redis
+(``settings.redis_url``) can be enabled as a shared second tier.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - redis is an optional backend
+    aioredis = None
+
+settings = get_settings()
+
+
+def canonicalize(payload: Any, float_digits: int = 4) -> Any:
+    """Normalize a payload so equal data always serializes identically"""
+    if isinstance(payload, float):
+        return round(payload, float_digits)
+    if isinstance(payload, dict):
+        return {str(k): canonicalize(v, float_digits) for k, v in sorted(payload.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(payload, (list, tuple)):
+        return [canonicalize(v, float_digits) for v in payload]
+    return payload
+
+
+class LLMResponseCache:
+    """Two-tier (memory + optional Redis) cache for raw completion text"""
+
+    def __init__(self, ttl: int = 3600, max_entries: int = 512, backend: str = "memory",
+                 redis_url: Optional[str] = None, namespace: str = "llm"):
+        self.ttl = ttl
+        self.namespace = namespace
+        self._memory = TTLCache(max_entries=max_entries, ttl=ttl)
+        self._redis = None
+        self.redis_hits = 0
+        self.redis_errors = 0
+
+        if backend == "redis":
+            if aioredis is None:
+                print("⚠️ LLM cache: redis package not installed, using in-memory cache only")
+            else:
+                self._redis = aioredis.from_url(redis_url or settings.redis_url, decode_responses=True)
+
+    def make_key(self, model: str, prompt_version: str, payload: Any) -> str:
+        """Hash model, prompt template version and canonical payload into a cache key"""
+        body = json.dumps(
+            {"model": model, "prompt_version": prompt_version, "payload": canonicalize(payload)},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str
+        )
+        return f"{self.namespace}:{hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._memory.get(key)
+        if value is not None or self._redis is None:
+            return value
+
+        try:
+            value = await self._redis.get(key)
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"⚠️ LLM cache: Redis lookup failed: {e}")
+            return None
+
+        if value is not None:
+            self.redis_hits += 1
+            self._memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self._memory.set(key, value)
+        if self._redis is None:
+            return
+
+        try:
+            await self._redis.set(key, value, ex=self.ttl)
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"⚠️ LLM cache: Redis write failed: {e}")
+
+    def clear(self) -> None:
+        """Clear the in-process tier (Redis entries expire on their own TTL)"""
+        self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self._memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + self.redis_hits
+        return {
+            "backend": "redis" if self._redis is not None else "memory",
+            "entries": memory["entries"],
+            "max_entries": memory["max_entries"],
+            "ttl": self.ttl,
+            "memory_hits": memory["hits"],
+            "redis_hits": self.redis_hits,
+            "misses": lookups - hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "redis_errors": self.redis_errors,
+        }
+
+
+# Singleton instance
+llm_response_cache = LLMResponseCache(
+    ttl=settings.llm_cache_ttl,
+    max_entries=settings.llm_cache_max_entries,
+    backend=settings.llm_cache_backend
+)
@@ -0,0 +1,157 @@
+"""
+Meta insights normalization
+
+The Marketing API returns ``actions``, ``conversions`` and ``conversion_values``
+as lists of ``{"action_type": ..., "value": "123"}`` string pairs. This module
+flattens those arrays for many campaigns at once into a numeric, columnar
+``pandas.DataFrame`` with one column per action type, so analysis and rollups
+can run as vectorized column operations instead of re-parsing strings per row.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Fields holding {action_type, value} arrays
+ACTION_FIELDS = ('actions', 'conversions', 'conversion_values')
+
+# Scalar metrics copied from each insight row as numeric columns
+METRIC_FIELDS = (
+    'impressions', 'clicks', 'spend', 'reach', 'frequency', 'ctr', 'cpm', 'cpp',
+    'cpc', 'cost_per_unique_click', 'unique_clicks', 'unique_ctr'
+)
+
+# Metrics counting unique people (or derived from such counts). A person reached
+# by two campaigns is counted by both, so these cannot be summed across rows;
+# account-level figures have to come from an account-level insights query.
+NON_ADDITIVE_FIELDS = ('reach', 'frequency', 'cpp', 'unique_clicks', 'unique_ctr', 'cost_per_unique_click')
+
+
+def _to_float(values: List[Any]) -> np.ndarray:
+    """Parse a list of numeric strings/numbers in one vectorized pass (bad values become NaN)"""
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def action_column(field: str, action_type: str) -> str:
+    """Column name for an action type, e.g. ``conversions__purchase``"""
+    return f"{field}__{action_type.replace('.', '_')}"
+
+
+def flatten_insights(rows: Sequence[Dict[str, Any]],
+                     id_field: str = 'campaign_id',
+                     action_types: Optional[Iterable[str]] = None,
+                     fields: Sequence[str] = ACTION_FIELDS) -> pd.DataFrame:
+    """
+    Flatten Meta insight rows into a numeric columnar table
+
+    Args:
+        rows: Insight dicts, one per entity (campaign, ad set, ...)
+        id_field: Key identifying the entity in each row; used as the index
+        action_types: Action types to keep. Defaults to the configured
+            whitelist; pass an empty iterable to keep every action type
+        fields: Action array fields to flatten
+
+    Returns:
+        DataFrame indexed by ``id_field`` with one float column per metric,
+        one per whitelisted ``<field>__<action_type>`` and a ``<field>__total``
+        per field summing all action types
+    """
+    if action_types is None:
+        action_types = settings.meta_action_types_list
+    whitelist = set(action_types)
+
+    ids = [str(row.get(id_field, i)) for i, row in enumerate(rows)]
+    table = pd.DataFrame(
+        {metric: _to_float([row.get(metric) for row in rows]) for metric in METRIC_FIELDS},
+        index=pd.Index(ids, name=id_field)
+    ).fillna(0.0)
+
+    # One pass over the nested arrays to build long-form columns, then a single
+    # vectorized numeric parse and pivot for the whole batch
+    entity, field_col, action_col, value_col = [], [], [], []
+    for entity_id, row in zip(ids, rows):
+        for field in fields:
+            for action in row.get(field) or ():
+                action_type = action.get('action_type')
+                if action_type is None:
+                    continue
+                entity.append(entity_id)
+                field_col.append(field)
+                action_col.append(action_type)
+                value_col.append(action.get('value'))
+
+    for field in fields:
+        table[f"{field}__total"] = 0.0
+
+    if not entity:
+        return table
+
+    long_form = pd.DataFrame({
+        id_field: entity,
+        'column': [action_column(f, a) for f, a in zip(field_col, action_col)],
+        'field': field_col,
+        'action_type': action_col,
+        'value': np.nan_to_num(_to_float(value_col)),
+    })
+
+    # Totals cover every action type; per-type columns only the whitelist
+    kept = long_form[long_form['action_type'].isin(whitelist)] if whitelist else long_form
+    wide = kept.pivot_table(index=id_field, columns='column', values='value', aggfunc='sum', fill_value=0.0)
+    totals = long_form.pivot_table(index=id_field, columns='field', values='value', aggfunc='sum', fill_value=0.0)
+    totals.columns = [f"{field}__total" for field in totals.columns]
+
+    table = table.drop(columns=list(totals.columns)).join(wide).join(totals)
+    return table.fillna(0.0).astype(np.float64)
+
+
+def flatten_campaigns(campaigns: Sequence[Dict[str, Any]],
+                      action_types: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Flatten the ``[{'campaign': {...}, 'insights': {...}}]`` shape used by
+    ``AIAgentService.analyze_meta_campaigns`` into a columnar table
+
+    A ``name`` column is carried along for building insight text.
+    """
+    rows = []
+    names = []
+    for i, campaign_data in enumerate(campaigns):
+        campaign = campaign_data.get('campaign', {}) or {}
+        insights = campaign_data.get('insights', {}) or {}
+        rows.append({**insights, 'campaign_id': campaign.get('id', str(i))})
+        names.append(campaign.get('name', 'Campaign'))
+
+    table = flatten_insights(rows, action_types=action_types)
+    table.insert(0, 'name', names)
+    table['has_insights'] = [bool(c.get('insights')) for c in campaigns]
+    return table
+
+
+def rollup(table: pd.DataFrame) -> Dict[str, float]:
+    """
+    Roll a flattened table up to account totals
+
+    Counts, spend and action columns are summed; rate metrics (CTR, CPC, CPM)
+    are recomputed from the summed columns rather than added. Reach and the
+    other ``NON_ADDITIVE_FIELDS`` are left out, as summing them double-counts
+    people reached by several campaigns.
+    """
+    additive = [c for c in table.columns if c in ('impressions', 'clicks', 'spend') or '__' in c]
+    totals = {column: float(value) for column, value in table[additive].sum(axis=0).items()}
+
+    impressions = totals.get('impressions', 0.0)
+    clicks = totals.get('clicks', 0.0)
+    spend = totals.get('spend', 0.0)
+    totals['ctr'] = clicks / impressions * 100 if impressions else 0.0
+    totals['cpc'] = spend / clicks if clicks else 0.0
+    totals['cpm'] = spend / impressions * 1000 if impressions else 0.0
+    return totals
+
+
+def to_records(table: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a flattened table back to JSON-ready records"""
+    return table.reset_index().to_dict(orient='records')
@@ -0,0 +1,134 @@
+"""
+Token-budgeted prompt building for campaign analysis
+
+Campaigns are encoded as compact CSV rows with rounded metrics instead of
+indented JSON, ranked by spend (or money at stake) and trimmed so the table
+fits a configurable token budget measured with ``tiktoken``.
+"""
+
+import csv
+import io
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from app.services.google_ads_service import CampaignData
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken is a declared dependency
+    tiktoken = None
+
+
+CSV_COLUMNS = ["name", "status", "budget", "spent", "impressions", "clicks", "conversions", "ctr_pct", "cpc", "conv_rate_pct"]
+
+RANKERS: Dict[str, Callable[[CampaignData], float]] = {
+    # Biggest spenders first
+    "spend": lambda c: c.cost,
+    # Most money at stake first: whichever of spend or budget is larger
+    "impact": lambda c: max(c.cost, c.budget_amount),
+}
+
+
+@dataclass
+class CampaignTable:
+    """A compact campaign table and what was left out of it"""
+    text: str
+    rows: List[List[str]]
+    tokens: int
+    included: int
+    omitted: int
+    omitted_spend: float = 0.0
+    columns: List[str] = field(default_factory=lambda: list(CSV_COLUMNS))
+
+
+class CampaignPromptBuilder:
+    """Encode campaigns as CSV rows trimmed to a token budget"""
+
+    def __init__(self, model: str = "gpt-4", token_budget: int = 3000, rank_by: str = "spend"):
+        if rank_by not in RANKERS:
+            raise ValueError(f"Unknown rank_by '{rank_by}', expected one of {sorted(RANKERS)}")
+        self.model = model
+        self.token_budget = token_budget
+        self.rank_by = rank_by
+        self._encoding = None
+        self._encoding_loaded = False
+
+    def _get_encoding(self):
+        """Load the tokenizer lazily; tiktoken may need to download it on first use"""
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            if tiktoken is not None:
+                try:
+                    try:
+                        self._encoding = tiktoken.encoding_for_model(self.model)
+                    except KeyError:
+                        self._encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    print(f"⚠️ tiktoken encoding unavailable, estimating prompt tokens: {e}")
+        return self._encoding
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens for the configured model (roughly 4 chars/token without tiktoken)"""
+        encoding = self._get_encoding()
+        if encoding is None:
+            return max(1, len(text) // 4)
+        return len(encoding.encode(text))
+
+    @staticmethod
+    def encode_row(campaign: CampaignData) -> List[str]:
+        """Round metrics to what matters for analysis"""
+        return [
+            campaign.name,
+            campaign.status,
+            f"{campaign.budget_amount:.2f}",
+            f"{campaign.cost:.2f}",
+            str(int(campaign.impressions)),
+            str(int(campaign.clicks)),
+            f"{campaign.conversions:.1f}",
+            f"{campaign.ctr * 100:.2f}",
+            f"{campaign.cpc:.2f}",
+            f"{campaign.conversion_rate * 100:.2f}",
+        ]
+
+    @staticmethod
+    def _to_csv(rows: List[List[str]]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue()
+
+    def build_table(self, campaigns: List[CampaignData], token_budget: Optional[int] = None) -> CampaignTable:
+        """Rank campaigns and keep as many rows as fit in the token budget"""
+        budget = self.token_budget if token_budget is None else token_budget
+        ranked = sorted(campaigns, key=RANKERS[self.rank_by], reverse=True)
+
+        header = self._to_csv([CSV_COLUMNS])
+        used = self.count_tokens(header)
+        rows: List[List[str]] = []
+        lines = [header]
+
+        for campaign in ranked:
+            row = self.encode_row(campaign)
+            line = self._to_csv([row])
+            # Tokens rarely merge across a newline, so per-line counts add up
+            line_tokens = self.count_tokens(line)
+            if used + line_tokens > budget:
+                break
+            rows.append(row)
+            lines.append(line)
+            used += line_tokens
+
+        omitted = ranked[len(rows):]
+        omitted_spend = sum(c.cost for c in omitted)
+        if omitted:
+            note = f"# {len(omitted)} smaller campaigns omitted (total spent {omitted_spend:.2f})\n"
+            lines.append(note)
+            used += self.count_tokens(note)
+
+        return CampaignTable(
+            text="".join(lines),
+            rows=rows,
+            tokens=used,
+            included=len(rows),
+            omitted=len(omitted),
+            omitted_spend=omitted_spend,
+        )
@@ -0,0 +1,204 @@
+"""
+Tiered cache for read-endpoint responses
+
+Responses are keyed by route, tenant, customer (ad account) and request
+parameters. An in-process LRU sits in front; Redis (``settings.redis_url``)
+can be enabled as a shared second tier. Each route has its own TTL, after
+which entries are served stale for up to ``response_cache_stale_seconds``
+while one background task per key refreshes them.
+
+Mutations invalidate by customer: every key embeds the customer's cache
+generation, and bumping the generation orphans all of its entries in both
+tiers at once. With Redis the generation is shared, and other processes see
+a bump within ``GENERATION_TTL`` seconds.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.cache import TTLCache, hash_key
+from app.core.config import get_settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover - redis is an optional backend
+    aioredis = None
+
+settings = get_settings()
+
+# Seconds a process trusts its copy of a customer's Redis generation
+GENERATION_TTL = 2.0
+
+
+class ResponseCache:
+    """Two-tier (memory + optional Redis) cache with stale-while-revalidate"""
+
+    def __init__(self, ttls: Dict[str, int], stale_ttl: int = 3600, max_entries: int = 1024,
+                 backend: str = "memory", redis_url: Optional[str] = None,
+                 namespace: str = "resp", enabled: bool = True):
+        self.ttls = ttls
+        self.default_ttl = 300
+        self.stale_ttl = stale_ttl
+        self.namespace = namespace
+        self.enabled = enabled
+        self._memory = TTLCache(max_entries=max_entries, stale_ttl=stale_ttl)
+        self._generations: Dict[str, int] = {}
+        self._generation_checked: Dict[str, float] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._redis = None
+        self.redis_hits = 0
+        self.redis_errors = 0
+        self.refreshes = 0
+        self.invalidations = 0
+
+        if backend == "redis":
+            if aioredis is None:
+                print("⚠️ Response cache: redis package not installed, using in-memory cache only")
+            else:
+                self._redis = aioredis.from_url(redis_url or settings.redis_url, decode_responses=True)
+
+    def ttl_for(self, route: str) -> int:
+        return self.ttls.get(route, self.default_ttl)
+
+    async def _generation(self, customer: str) -> int:
+        if self._redis is None:
+            return self._generations.get(customer, 0)
+
+        now = time.monotonic()
+        if now - self._generation_checked.get(customer, float("-inf")) < GENERATION_TTL:
+            return self._generations.get(customer, 0)
+        try:
+            value = await self._redis.get(f"{self.namespace}:gen:{customer}")
+            self._generations[customer] = int(value or 0)
+            self._generation_checked[customer] = now
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"⚠️ Response cache: Redis generation lookup failed: {e}")
+        return self._generations.get(customer, 0)
+
+    async def make_key(self, route: str, tenant_id: str, customer: str, params: Dict[str, Any]) -> str:
+        generation = await self._generation(customer)
+        body = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{self.namespace}:{route}:{tenant_id}:{customer}:{generation}:{hash_key(body)}"
+
+    async def get_or_load(self, route: str, tenant_id: str, customer: str, params: Dict[str, Any],
+                          loader: Callable[[], Awaitable[Any]], refresh: bool = False) -> Any:
+        """
+        Return the cached response for a request, loading it on a miss
+
+        Stale entries are returned immediately while ``loader`` refreshes them
+        in the background. ``refresh`` skips the lookup and reloads. The
+        loaded value must be JSON-serializable when Redis is enabled.
+        """
+        if not self.enabled:
+            return await loader()
+
+        key = await self.make_key(route, tenant_id, customer, params)
+        ttl = self.ttl_for(route)
+        if not refresh:
+            entry = self._memory.get_entry(key)
+            if entry is not None:
+                if not entry.is_fresh:
+                    self._revalidate(key, ttl, loader)
+                return entry.value
+
+            cached = await self._redis_get(key)
+            if cached is not None:
+                value, fresh_for = cached
+                self._memory.set(key, value, ttl=max(fresh_for, 0))
+                if fresh_for <= 0:
+                    self._revalidate(key, ttl, loader)
+                return value
+
+        value = await loader()
+        await self._store(key, value, ttl)
+        return value
+
+    def _revalidate(self, key: str, ttl: int, loader: Callable[[], Awaitable[Any]]) -> None:
+        """Refresh a stale entry in the background, once per key"""
+        running = self._refreshing.get(key)
+        if running is not None and not running.done():
+            return
+
+        async def refresh() -> None:
+            try:
+                await self._store(key, await loader(), ttl)
+                self.refreshes += 1
+            except Exception as e:
+                # Keep serving the stale value; the next request retries
+                print(f"⚠️ Response cache: background refresh failed for {key}: {e}")
+
+        task = asyncio.create_task(refresh())
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _redis_get(self, key: str):
+        if self._redis is None:
+            return None
+        try:
+            raw = await self._redis.get(key)
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"⚠️ Response cache: Redis lookup failed: {e}")
+            return None
+        if raw is None:
+            return None
+        self.redis_hits += 1
+        payload = json.loads(raw)
+        return payload["value"], payload["fresh_until"] - time.time()
+
+    async def _store(self, key: str, value: Any, ttl: int) -> None:
+        self._memory.set(key, value, ttl=ttl)
+        if self._redis is None:
+            return
+        try:
+            payload = json.dumps({"value": value, "fresh_until": time.time() + ttl}, default=str)
+            await self._redis.set(key, payload, ex=ttl + self.stale_ttl)
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"⚠️ Response cache: Redis write failed: {e}")
+
+    async def invalidate(self, customer: str) -> None:
+        """Drop every cached response for a customer (all routes, tenants and params)"""
+        self.invalidations += 1
+        self._generations[customer] = self._generations.get(customer, 0) + 1
+        if self._redis is None:
+            return
+        try:
+            self._generations[customer] = await self._redis.incr(f"{self.namespace}:gen:{customer}")
+            self._generation_checked[customer] = time.monotonic()
+        except Exception as e:
+            self.redis_errors += 1
+            print(f"⚠️ Response cache: Redis invalidation failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self._memory.stats()
+        lookups = memory["hits"] + memory["stale_hits"] + memory["misses"]
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if self._redis is not None else "memory",
+            "entries": memory["entries"],
+            "max_entries": memory["max_entries"],
+            "ttls": self.ttls,
+            "stale_ttl": self.stale_ttl,
+            "memory_hits": memory["hits"],
+            "stale_hits": memory["stale_hits"],
+            "redis_hits": self.redis_hits,
+            "misses": memory["misses"] - self.redis_hits,
+            "hit_rate": (memory["hits"] + memory["stale_hits"] + self.redis_hits) / lookups if lookups else 0.0,
+            "background_refreshes": self.refreshes,
+            "invalidations": self.invalidations,
+            "redis_errors": self.redis_errors,
+        }
+
+
+# Singleton instance
+response_cache = ResponseCache(
+    ttls=settings.response_cache_ttls_map,
+    stale_ttl=settings.response_cache_stale_seconds,
+    max_entries=settings.response_cache_max_entries,
+    backend=settings.response_cache_backend,
+    enabled=settings.response_cache_enabled
+)
@@ -0,0 +1,580 @@
+"""
+Declarative, vectorized rules engine for rule-based insights
+
+Rules are plain data: a boolean expression over metric columns and named
+parameters, plus severity and text templates. Each rule is evaluated once as a
+NumPy boolean mask over the whole columnar batch (campaigns or keywords), and
+``AIInsight`` objects are only built for the rows that match.
+
+Parameters, severity, texts and enablement can be overridden per tenant
+without touching the rule definitions; override values are type-checked when
+they are set.
+
+Analyzers pass their records in with ``to_columns(..., lazy=True)``: a rule
+only turns the columns its expressions name into arrays, and texts, ids and
+action values are read from the records for matched rows only.
+"""
+
+import copy
+import itertools
+import operator
+import re
+import string
+import threading
+from dataclasses import dataclass, field, fields, replace
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from app.services.currency import format_money
+from app.services.insights import AIInsight, data_window, insight_ids, keyword_key
+
+
+class RecordColumn:
+    """
+    A column still held as an attribute of the source records
+
+    Turned into an array only when an expression uses it; otherwise only the
+    matched rows are read.
+    """
+    __slots__ = ("records", "name", "numeric")
+
+    def __init__(self, records: Sequence[Any], name: str, numeric: bool = False):
+        self.records = records
+        self.name = name
+        self.numeric = numeric
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def materialize(self) -> np.ndarray:
+        get = operator.attrgetter(self.name)
+        if self.numeric:
+            return np.fromiter((value or 0 for value in map(get, self.records)), dtype=np.float64, count=len(self.records))
+        values = np.empty(len(self.records), dtype=object)
+        values[:] = list(map(get, self.records))
+        return values
+
+    def take(self, rows: np.ndarray) -> List[Any]:
+        get, records = operator.attrgetter(self.name), self.records
+        values = [get(records[row]) for row in rows.tolist()]
+        return [float(value or 0) for value in values] if self.numeric else values
+
+
+Columns = Dict[str, Union[np.ndarray, RecordColumn]]
+
+IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+
+
+@dataclass
+class Rule:
+    """A single declarative rule"""
+    id: str
+    entity: str  # 'campaign' or 'keyword'
+    group: str  # analyzer the rule belongs to, e.g. 'budget', 'performance', 'keyword'
+    when: str  # boolean expression over columns and params
+    insight_type: str
+    title: str  # str.format template over row values and params; {field:money} formats in the row's currency
+    description: str
+    impact: str = "medium"
+    confidence: float = 0.8
+    priority: int = 3
+    params: Dict[str, float] = field(default_factory=dict)
+    action_type: Optional[str] = None
+    action_data: Optional[Dict[str, str]] = None  # output key -> column name or expression
+    # Optional stricter condition that raises severity, e.g. utilization > 95%
+    escalate_when: Optional[str] = None
+    escalated_impact: Optional[str] = None
+    escalated_priority: Optional[int] = None
+    enabled: bool = True
+
+
+# Fields a tenant may override on a rule
+OVERRIDABLE_FIELDS = {
+    "params", "impact", "confidence", "priority", "enabled", "escalated_impact", "escalated_priority",
+    "title", "description",
+}
+
+IMPACTS = ("high", "medium", "low")
+
+# Columns the analyzers pass in per entity (see ``to_columns``) and which of them are numeric
+ENTITY_COLUMNS: Dict[str, List[str]] = {
+    "campaign": ["id", "name", "status", "currency", "budget_amount", "cost", "impressions", "clicks",
+                 "conversions", "ctr", "cpc", "conversion_rate"],
+    "keyword": ["id", "text", "ad_group_id", "match_type", "status", "cpc_bid", "impressions", "clicks",
+                "conversions", "cost"],
+}
+NUMERIC_COLUMNS: Dict[str, List[str]] = {
+    "campaign": ["budget_amount", "cost", "impressions", "clicks", "conversions", "ctr", "cpc", "conversion_rate"],
+    "keyword": ["cpc_bid", "impressions", "clicks", "conversions", "cost"],
+}
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise division that yields 0 where the denominator is 0"""
+    out = np.zeros(len(numerator), dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+# Derived metrics added to each entity's columns before rules run
+DERIVED_COLUMNS: Dict[str, Dict[str, Callable[[Columns], np.ndarray]]] = {
+    "campaign": {
+        "utilization": lambda c: _safe_divide(c["cost"], c["budget_amount"]),
+        "cost_per_conversion": lambda c: _safe_divide(c["cost"], c["conversions"]),
+    },
+    "keyword": {
+        "cost_per_conversion": lambda c: _safe_divide(c["cost"], c["conversions"]),
+    },
+}
+
+
+DEFAULT_RULES: List[Rule] = [
+    Rule(
+        id="budget_high",
+        entity="campaign",
+        group="budget",
+        when="(budget_amount > 0) & (utilization > utilization_high)",
+        params={"utilization_high": 0.85, "utilization_critical": 0.95},
+        insight_type="budget_alert",
+        title="High Budget Utilization: {name}",
+        description="Campaign has used {utilization:.1%} of its budget. Consider increasing budget or monitoring closely to avoid early exhaustion.",
+        impact="medium",
+        confidence=0.9,
+        priority=2,
+        action_type="increase_budget",
+        action_data={"current_budget": "budget_amount", "suggested_increase": "budget_amount * 0.2"},
+        escalate_when="utilization > utilization_critical",
+        escalated_impact="high",
+        escalated_priority=1,
+    ),
+    Rule(
+        id="budget_low",
+        entity="campaign",
+        group="budget",
+        when="(budget_amount > 0) & (utilization < utilization_low)",
+        params={"utilization_low": 0.3},
+        insight_type="optimization",
+        title="Low Budget Utilization: {name}",
+        description="Campaign is only using {utilization:.1%} of its budget. Consider increasing bids or expanding targeting.",
+        impact="medium",
+        confidence=0.8,
+        priority=3,
+        action_type="optimize_targeting",
+    ),
+    Rule(
+        id="low_ctr",
+        entity="campaign",
+        group="performance",
+        when="(ctr > 0) & (ctr < max_ctr)",
+        params={"max_ctr": 0.02},
+        insight_type="optimization",
+        title="Low CTR Alert: {name}",
+        description="Campaign CTR is {ctr:.2%}, below recommended threshold. Consider improving ad copy or refining targeting.",
+        impact="high",
+        confidence=0.85,
+        priority=2,
+        action_type="improve_ads",
+    ),
+    Rule(
+        id="high_cpc",
+        entity="campaign",
+        group="performance",
+        when="cpc > max_cpc",
+        params={"max_cpc": 2.0},
+        insight_type="optimization",
+        title="High CPC Alert: {name}",
+        description="Campaign CPC is {cpc:money}, consider optimizing bids or improving Quality Score.",
+        impact="medium",
+        confidence=0.8,
+        priority=3,
+        action_type="optimize_bids",
+    ),
+    Rule(
+        id="low_conv",
+        entity="campaign",
+        group="performance",
+        when="(conversion_rate > 0) & (conversion_rate < min_conversion_rate)",
+        params={"min_conversion_rate": 0.01},
+        insight_type="optimization",
+        title="Low Conversion Rate: {name}",
+        description="Conversion rate is {conversion_rate:.2%} with cost per conversion of {cost_per_conversion:money}. Consider landing page optimization.",
+        impact="high",
+        confidence=0.9,
+        priority=1,
+        action_type="optimize_landing_page",
+    ),
+    Rule(
+        id="keyword_poor",
+        entity="keyword",
+        group="keyword",
+        when="(clicks > min_clicks) & (conversions == 0)",
+        params={"min_clicks": 10},
+        insight_type="keyword",
+        title="Poor Performing Keyword: {text}",
+        description="Keyword '{text}' has {clicks:.0f} clicks but no conversions. Consider pausing or lowering bids.",
+        impact="medium",
+        confidence=0.8,
+        priority=3,
+        action_type="pause_keyword",
+        action_data={"keyword_id": "id", "keyword_text": "text"},
+    ),
+    Rule(
+        id="keyword_expensive",
+        entity="keyword",
+        group="keyword",
+        when="(cost > max_cost) & (conversions == 0)",
+        params={"max_cost": 50.0},
+        insight_type="keyword",
+        title="Expensive Non-Converting Keyword: {text}",
+        description="Keyword '{text}' has spent {cost:money} without conversions. Review and consider pausing.",
+        impact="high",
+        confidence=0.9,
+        priority=1,
+        action_type="pause_keyword",
+    ),
+    Rule(
+        id="keyword_good",
+        entity="keyword",
+        group="keyword",
+        when="(conversions > 0) & (cost_per_conversion < max_cost_per_conversion)",
+        params={"max_cost_per_conversion": 10.0},
+        insight_type="keyword",
+        title="High-Performing Keyword: {text}",
+        description="Keyword '{text}' has excellent performance with cost per conversion of {cost_per_conversion:money}. Consider increasing bids.",
+        impact="medium",
+        confidence=0.85,
+        priority=2,
+        action_type="increase_bid",
+        action_data={"keyword_id": "id", "current_bid": "cpc_bid", "suggested_increase": "0.2"},
+    ),
+]
+
+
+def to_columns(records: Sequence[Any], names: Iterable[str], numeric: Iterable[str] = (), lazy: bool = False) -> Columns:
+    """
+    Turn a sequence of dataclass objects into columnar arrays
+
+    Columns listed in ``numeric`` become float64 arrays (None -> 0); the rest
+    are kept as object arrays (ids, names, text). With ``lazy``, columns are
+    ``RecordColumn`` views that ``RulesEngine.evaluate`` reads as needed.
+    """
+    numeric = set(numeric)
+    columns = {name: RecordColumn(records, name, name in numeric) for name in names}
+    return columns if lazy else {name: column.materialize() for name, column in columns.items()}
+
+
+class _Arrays:
+    """Read access to columns as arrays, materializing record columns on first use"""
+
+    def __init__(self, env: Dict[str, Any]):
+        self.env = env
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        value = self.env[name]
+        if isinstance(value, RecordColumn):
+            value = self.env[name] = value.materialize()
+        return value
+
+
+@lru_cache(maxsize=256)
+def compile_templates(*templates: str) -> Tuple[Tuple[str, ...], Tuple[Tuple[str, bool], ...]]:
+    """
+    Rewrite ``str.format`` templates over named fields as positional ones
+
+    Returns the rewritten templates and the ``(field, is_money)`` each
+    position stands for. ``{field:money}`` becomes a plain position that
+    takes the amount already formatted in its currency, so a row is one
+    ``format(*row)`` call with no per-row dict.
+    """
+    slots: Dict[Tuple[str, bool], int] = {}
+    compiled = []
+    for template in templates:
+        parts = []
+        for literal, field_name, spec, conversion in string.Formatter().parse(template):
+            parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field_name is None:
+                continue
+            money = spec == "money"
+            position = slots.setdefault((field_name, money), len(slots))
+            parts.append(
+                "{" + str(position) + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec and not money else "") + "}"
+            )
+        compiled.append("".join(parts))
+    return tuple(compiled), tuple(slots)
+
+
+class RulesEngine:
+    """Evaluate declarative rules over columnar metrics"""
+
+    def __init__(self, rules: Optional[List[Rule]] = None):
+        self._rules: Dict[str, Rule] = {rule.id: rule for rule in (rules or copy.deepcopy(DEFAULT_RULES))}
+        self._tenant_overrides: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def rules(self) -> List[Rule]:
+        return list(self._rules.values())
+
+    def set_tenant_overrides(self, tenant_id: str, overrides: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Replace a tenant's overrides
+
+        ``overrides`` maps rule id to fields to override, e.g.
+        ``{"high_cpc": {"params": {"max_cpc": 5.0}}, "budget_low": {"enabled": False}}``.
+        Params are merged into the rule's defaults.
+        """
+        for rule_id, rule_overrides in overrides.items():
+            rule = self._rules.get(rule_id)
+            if rule is None:
+                raise ValueError(f"Unknown rule '{rule_id}'")
+            unknown = set(rule_overrides) - OVERRIDABLE_FIELDS
+            if unknown:
+                raise ValueError(f"Rule '{rule_id}' does not allow overriding {sorted(unknown)}")
+            unknown_params = set(rule_overrides.get("params", {})) - set(rule.params)
+            if unknown_params:
+                raise ValueError(f"Rule '{rule_id}' has no params {sorted(unknown_params)}")
+            self._check_override_values(rule, rule_overrides)
+
+        with self._lock:
+            self._tenant_overrides[tenant_id] = copy.deepcopy(overrides)
+
+    @staticmethod
+    def _check_override_values(rule: Rule, overrides: Dict[str, Any]) -> None:
+        """Raise ValueError for override values of the wrong type or range"""
+        def is_number(value: Any) -> bool:
+            return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+        def fail(name: str, expected: str) -> None:
+            raise ValueError(f"Rule '{rule.id}': {name} must be {expected}, got {overrides[name]!r}")
+
+        params = overrides.get("params", {})
+        if not isinstance(params, dict):
+            fail("params", "an object of numbers")
+        for name, value in params.items():
+            if not is_number(value):
+                raise ValueError(f"Rule '{rule.id}': param '{name}' must be a number, got {value!r}")
+        if "enabled" in overrides and not isinstance(overrides["enabled"], bool):
+            fail("enabled", "true or false")
+        if "confidence" in overrides and not (is_number(overrides["confidence"]) and 0 <= overrides["confidence"] <= 1):
+            fail("confidence", "a number from 0 to 1")
+        for name in ("impact", "escalated_impact"):
+            if name in overrides and overrides[name] not in IMPACTS:
+                fail(name, f"one of {', '.join(IMPACTS)}")
+        for name in ("priority", "escalated_priority"):
+            value = overrides.get(name)
+            if name in overrides and not (isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= 5):
+                fail(name, "an integer from 1 to 5")
+
+        # Templates may only use the entity's columns and the rule's params
+        known = {*ENTITY_COLUMNS.get(rule.entity, ()), *DERIVED_COLUMNS.get(rule.entity, {}), *rule.params}
+        for name in ("title", "description"):
+            if name not in overrides:
+                continue
+            template = overrides[name]
+            if not isinstance(template, str):
+                fail(name, "a string")
+            try:
+                parsed = list(string.Formatter().parse(template))
+            except ValueError as e:
+                raise ValueError(f"Rule '{rule.id}': invalid {name} template: {e}")
+            for _, field_name, spec, _ in parsed:
+                if field_name is None:
+                    continue
+                if field_name not in known:
+                    raise ValueError(f"Rule '{rule.id}': {name} template uses unknown field '{field_name}'")
+                if spec and "{" in spec:
+                    raise ValueError(f"Rule '{rule.id}': {name} template has a nested format spec")
+
+    def get_tenant_overrides(self, tenant_id: str) -> Dict[str, Dict[str, Any]]:
+        return copy.deepcopy(self._tenant_overrides.get(tenant_id, {}))
+
+    def rules_for(self, tenant_id: Optional[str] = None) -> List[Rule]:
+        """Effective rules for a tenant after applying its overrides"""
+        overrides = self._tenant_overrides.get(tenant_id, {}) if tenant_id else {}
+        effective = []
+        for rule in self._rules.values():
+            rule_overrides = overrides.get(rule.id)
+            if rule_overrides:
+                changes = {k: v for k, v in rule_overrides.items() if k != "params"}
+                if "params" in rule_overrides:
+                    changes["params"] = {**rule.params, **rule_overrides["params"]}
+                rule = replace(rule, **changes)
+            effective.append(rule)
+        return effective
+
+    def evaluate(self, entity: str, columns: Columns, tenant_id: Optional[str] = None,
+                 groups: Optional[Iterable[str]] = None, id_column: str = "id",
+                 window: Optional[str] = None, currency: Optional[str] = None,
+                 limit: Optional[int] = None, rank_by: str = "cost") -> List[AIInsight]:
+        """
+        Evaluate all enabled rules for ``entity`` over a columnar batch
+
+        Masks are evaluated for every row, but with ``limit`` insights are
+        only built for the most important matches: highest priority first,
+        then largest ``rank_by``. On a large account that is most of the
+        work, so callers that return insights to a client should pass one.
+
+        Args:
+            entity: 'campaign' or 'keyword'
+            columns: Metric arrays of equal length (see ``to_columns``)
+            tenant_id: Apply this tenant's overrides
+            groups: Restrict to rules in these groups
+            id_column: Column used in insight ids
+            window: Data window the metrics cover, part of each insight id
+                (defaults to the last 30 complete days)
+            currency: Currency of money amounts when ``columns`` has no
+                ``currency`` column (defaults to the reporting currency)
+            limit: Build at most this many insights (None or 0 = all)
+            rank_by: Column ranking matches of equal priority under ``limit``
+
+        Returns:
+            Insights for matching rows, in rule order
+        """
+        groups = set(groups) if groups is not None else None
+        rules = [
+            rule for rule in self.rules_for(tenant_id)
+            if rule.entity == entity and rule.enabled and (groups is None or rule.group in groups)
+        ]
+        if not rules or len(columns.get(id_column, ())) == 0:
+            return []
+
+        count = len(columns[id_column])
+        env = dict(columns)
+        env.setdefault("currency", currency)
+        derived = DERIVED_COLUMNS.get(entity, {})
+
+        def prepare(names: Set[str], materialize: bool) -> None:
+            """Derive the named derived columns; with ``materialize``, make the named columns arrays"""
+            arrays = _Arrays(env)
+            for name in names:
+                if name not in env and name in derived:
+                    env[name] = derived[name](arrays)
+                elif materialize and name in env:
+                    arrays[name]
+
+        # Masks first, for every rule
+        matches = []
+        for rule in rules:
+            prepare(self._names(rule.when, rule.escalate_when), materialize=True)
+            scope = {**env, **rule.params}
+            rows = np.flatnonzero(np.broadcast_to(np.asarray(self._eval(rule.when, scope), dtype=bool), (count,)))
+            escalated = None
+            if rule.escalate_when and len(rows):
+                escalated = np.broadcast_to(np.asarray(self._eval(rule.escalate_when, scope), dtype=bool), (count,))[rows]
+            matches.append((rule, rows, escalated))
+
+        if limit and sum(len(rows) for _, rows, _ in matches) > limit:
+            matches = self._top_matches(matches, env, rank_by, limit)
+
+        window = window or data_window()
+        created_at = datetime.now().isoformat()
+        insights: List[AIInsight] = []
+        for rule, rows, escalated in matches:
+            if len(rows) == 0:
+                continue
+            (title, description), slots = compile_templates(rule.title, rule.description)
+            action_expressions = [e for e in (rule.action_data or {}).values() if e not in env and e not in derived]
+            prepare(self._names(*action_expressions), materialize=True)
+            prepare({name for name, _ in slots} | set((rule.action_data or {}).values()), materialize=False)
+            scope = {**env, **rule.params}
+
+            # Gather matched rows once as Python lists; per-row numpy indexing
+            # would dominate on large batches
+            currencies = self._take(scope["currency"], rows) if any(money for _, money in slots) else None
+            field_values = []
+            for name, money in slots:
+                values = self._take(scope[name], rows)
+                if money:
+                    values = [format_money(amount, currency) for amount, currency in zip(values, currencies)]
+                field_values.append(values)
+            action_keys = list(rule.action_data or {})
+            action_rows = [
+                dict(zip(action_keys, values)) for values in zip(*(
+                    self._take(self._eval(expression, scope), rows) for expression in (rule.action_data or {}).values()
+                ))
+            ] if action_keys else None
+            entity_ids = [str(value) for value in self._take(env[id_column], rows)]
+            ad_group_ids = None
+            if entity == "keyword" and "ad_group_id" in env:
+                ad_group_ids = [str(value) for value in self._take(env["ad_group_id"], rows)]
+            escalated_rows = escalated.tolist() if escalated is not None else None
+            # Criterion ids repeat across ad groups, so keyword insights are keyed on both
+            ids = insight_ids(rule.id, entity_ids if ad_group_ids is None else [
+                keyword_key(ad_group_id, entity_id) for ad_group_id, entity_id in zip(ad_group_ids, entity_ids)
+            ], window)
+
+            field_rows = zip(*field_values) if field_values else itertools.repeat(())
+            for n, (entity_id, row_values) in enumerate(zip(entity_ids, field_rows)):
+                is_escalated = escalated_rows is not None and escalated_rows[n]
+
+                insights.append(AIInsight(
+                    id=ids[n],
+                    type=rule.insight_type,
+                    title=title.format(*row_values),
+                    description=description.format(*row_values),
+                    impact=rule.escalated_impact if is_escalated and rule.escalated_impact else rule.impact,
+                    confidence=rule.confidence,
+                    campaign_id=entity_id if entity == "campaign" else None,
+                    ad_group_id=ad_group_ids[n] if ad_group_ids is not None else None,
+                    action_type=rule.action_type,
+                    action_data=action_rows[n] if action_rows is not None else None,
+                    priority=rule.escalated_priority if is_escalated and rule.escalated_priority else rule.priority,
+                    created_at=created_at,
+                ))
+
+        return insights
+
+    @staticmethod
+    def _top_matches(matches: List[Tuple[Rule, np.ndarray, Optional[np.ndarray]]], env: Dict[str, Any],
+                     rank_by: str, limit: int) -> List[Tuple[Rule, np.ndarray, Optional[np.ndarray]]]:
+        """Keep the ``limit`` most important matches: by priority, then largest ``rank_by``, then rule and row order"""
+        ranks = _Arrays(env)[rank_by] if rank_by in env else None
+        priority, rank, rule_index, position = [], [], [], []
+        for n, (rule, rows, escalated) in enumerate(matches):
+            priorities = np.full(len(rows), rule.priority)
+            if escalated is not None and rule.escalated_priority:
+                priorities[escalated] = rule.escalated_priority
+            priority.append(priorities)
+            rank.append(-ranks[rows] if ranks is not None else np.zeros(len(rows)))
+            rule_index.append(np.full(len(rows), n))
+            position.append(np.arange(len(rows)))
+        rule_index, position = np.concatenate(rule_index), np.concatenate(position)
+        order = np.lexsort((position, rule_index, np.concatenate(rank), np.concatenate(priority)))[:limit]
+
+        kept = []
+        for n, (rule, rows, escalated) in enumerate(matches):
+            picked = np.sort(position[order[rule_index[order] == n]])
+            kept.append((rule, rows[picked], escalated[picked] if escalated is not None else None))
+        return kept
+
+    @staticmethod
+    def _names(*expressions: Optional[str]) -> Set[str]:
+        """Identifiers used by expressions (column names, params, and functions, which are ignored)"""
+        return {name for expression in expressions if expression for name in IDENTIFIER.findall(expression)}
+
+    @staticmethod
+    def _eval(expression: str, scope: Dict[str, Any]) -> Any:
+        """Evaluate an expression; bare column names skip the parser"""
+        if expression in scope:
+            return scope[expression]
+        return pd.eval(expression, local_dict=scope, engine="python")
+
+    @staticmethod
+    def _take(value: Any, rows: np.ndarray) -> List[Any]:
+        """Select matched rows of an evaluated expression as JSON-friendly Python values"""
+        if isinstance(value, RecordColumn):
+            return value.take(rows)
+        if isinstance(value, np.ndarray):
+            return value[rows].tolist()
+        if isinstance(value, np.generic):
+            value = value.item()
+        return [value] * len(rows)
+
+
+def rule_to_dict(rule: Rule) -> Dict[str, Any]:
+    """Serialize a rule for API responses"""
+    return {f.name: copy.deepcopy(getattr(rule, f.name)) for f in fields(rule)}
@@ -0,0 +1,354 @@
+"""
+Background scheduler for recurring per-customer optimization jobs
+
+Each (job kind, tenant, customer) is a recurring job. Jobs are sharded by a
+stable hash of the customer ID, so all of one account's jobs run on the same
+shard, one at a time, and never hit its API quota concurrently. Every run is
+rescheduled at ``interval`` +/- ``jitter`` after it finishes, and first runs
+are spread over the jitter window, so accounts registered together drift
+apart instead of firing in lockstep.
+
+Two backends share one interface:
+
+- ``LocalScheduler``: an asyncio worker per shard inside the API process,
+  for single-node setups.
+- ``CeleryScheduler``: one Celery queue per shard (``optimizer.<shard>``);
+  workers in ``app.worker`` run the job and re-enqueue the next run. Job
+  registrations and last-run status live in Redis.
+
+Job results are written by the job itself (insights into the insight store,
+anomaly baselines into the detector and ``anomaly_state_path``), so the API
+reads them without waiting on a run. Celery jobs run in the worker process,
+so only the store and the state file carry their results to the API.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import random
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is an optional backend
+    redis = None
+
+settings = get_settings()
+
+JOB_KINDS = ("anomalies", "analysis", "keywords")
+
+JobRunner = Callable[[str, str, str], Awaitable[Dict[str, Any]]]
+JobKey = Tuple[str, str, str]
+
+
+def shard_for(customer_id: str, shards: int) -> int:
+    """Stable shard of a customer (same on every process and restart)"""
+    return zlib.crc32(customer_id.encode("utf-8")) % shards
+
+
+def jittered(interval: float, jitter: float) -> float:
+    """``interval`` scaled by a random factor in ``[1 - jitter, 1 + jitter]``"""
+    return interval * (1 + random.uniform(-jitter, jitter))
+
+
+async def run_job(kind: str, customer_id: str, tenant_id: str) -> Dict[str, Any]:
+    """Default job runner: the AI agent's optimization jobs"""
+    # Imported lazily: the agent service imports this module
+    from app.services.ai_agent_service import ai_agent_service
+    return await ai_agent_service.run_optimization_job(kind, customer_id, tenant_id)
+
+
+@dataclass
+class ScheduledJob:
+    """A recurring job and the outcome of its last run"""
+    kind: str
+    customer_id: str
+    tenant_id: str
+    interval: float
+    shard: int
+    next_run: Optional[str] = None
+    runs: int = 0
+    failures: int = 0
+    last_run: Optional[str] = None
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+    last_result: Optional[Dict[str, Any]] = None
+
+    @property
+    def key(self) -> JobKey:
+        return (self.kind, self.tenant_id, self.customer_id)
+
+    def record(self, started: float, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        self.runs += 1
+        self.last_run = datetime.now().isoformat()
+        self.last_duration = round(time.monotonic() - started, 3)
+        self.last_error = error
+        if error is None:
+            self.last_result = result
+        else:
+            self.failures += 1
+
+
+def _validate_kinds(kinds: List[str]) -> None:
+    unknown = [kind for kind in kinds if kind not in JOB_KINDS]
+    if unknown:
+        raise ValueError(f"Unknown job kinds {unknown}; expected any of {list(JOB_KINDS)}")
+
+
+class LocalScheduler:
+    """Recurring jobs on asyncio shard workers in this process"""
+
+    backend = "local"
+
+    def __init__(self, shards: int = 8, jitter: float = 0.1, runner: JobRunner = run_job):
+        self.shards = shards
+        self.jitter = jitter
+        self.runner = runner
+        self._jobs: Dict[JobKey, ScheduledJob] = {}
+        self._due: Dict[JobKey, float] = {}  # monotonic time of each job's next run
+        self._heap: List[Tuple[float, int, JobKey]] = []
+        self._counter = itertools.count()
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks) and not all(task.done() for task in self._tasks)
+
+    def start(self) -> None:
+        """Start the dispatcher and shard workers on the running event loop"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._queues = [asyncio.Queue() for _ in range(self.shards)]
+        self._tasks = [asyncio.create_task(self._dispatch())]
+        self._tasks.extend(asyncio.create_task(self._work(queue)) for queue in self._queues)
+        # Jobs registered before start (or on a previous loop) go back on the heap
+        for key in self._jobs:
+            self._push(key, self._due.get(key, time.monotonic()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def schedule(self, kind: str, customer_id: str, tenant_id: str,
+                 interval: float, run_now: bool = False) -> ScheduledJob:
+        """Register (or re-time) a recurring job; the first run lands within the jitter window"""
+        _validate_kinds([kind])
+        key = (kind, tenant_id, customer_id)
+        job = self._jobs.get(key)
+        if job is None:
+            job = ScheduledJob(kind, customer_id, tenant_id, interval, shard_for(customer_id, self.shards))
+            self._jobs[key] = job
+        job.interval = interval
+
+        delay = 0.0 if run_now else random.uniform(0, interval * self.jitter)
+        self._push(key, time.monotonic() + delay)
+        self.start()
+        return job
+
+    def unschedule(self, customer_id: str, tenant_id: str, kinds: Optional[List[str]] = None) -> int:
+        """Stop a customer's recurring jobs; a run in progress finishes but is not rescheduled"""
+        keys = [key for key in self._jobs if key[2] == customer_id and key[1] == tenant_id
+                and (kinds is None or key[0] in kinds)]
+        for key in keys:
+            del self._jobs[key]
+            self._due.pop(key, None)
+        return len(keys)
+
+    def jobs(self, customer_id: Optional[str] = None, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [
+            asdict(job) for job in self._jobs.values()
+            if (customer_id is None or job.customer_id == customer_id)
+            and (tenant_id is None or job.tenant_id == tenant_id)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "running": self.running,
+            "shards": self.shards,
+            "jobs": len(self._jobs),
+            "queued": [queue.qsize() for queue in self._queues],
+        }
+
+    def _push(self, key: JobKey, due: float) -> None:
+        self._due[key] = due
+        self._jobs[key].next_run = datetime.fromtimestamp(time.time() + due - time.monotonic()).isoformat()
+        heapq.heappush(self._heap, (due, next(self._counter), key))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _dispatch(self) -> None:
+        """Move due jobs onto their shard's queue"""
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, key = heapq.heappop(self._heap)
+                # Entries for unscheduled or re-timed jobs are dropped lazily
+                if self._due.get(key) != due:
+                    continue
+                del self._due[key]
+                job = self._jobs[key]
+                self._queues[job.shard].put_nowait(job)
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self, queue: asyncio.Queue) -> None:
+        while True:
+            job = await queue.get()
+            started = time.monotonic()
+            result, error = None, None
+            try:
+                result = await self.runner(job.kind, job.customer_id, job.tenant_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = str(e)
+                print(f"⚠️ Scheduled {job.kind} job failed for customer {job.customer_id}: {e}")
+            job.record(started, result, error)
+
+            # Reschedule from completion so a slow run never overlaps the next one
+            if self._jobs.get(job.key) is job and job.key not in self._due:
+                self._push(job.key, time.monotonic() + jittered(job.interval, self.jitter))
+
+
+class CeleryScheduler:
+    """Recurring jobs on Celery workers, one queue per shard"""
+
+    backend = "celery"
+    queue_prefix = "optimizer."
+
+    def __init__(self, shards: int = 8, jitter: float = 0.1, redis_url: Optional[str] = None):
+        if redis is None:
+            raise RuntimeError("The celery scheduler backend needs the redis package")
+        self.shards = shards
+        self.jitter = jitter
+        self._redis = redis.Redis.from_url(redis_url or settings.redis_url, decode_responses=True)
+
+    @staticmethod
+    def _registry_key() -> str:
+        return "scheduler:jobs"
+
+    @staticmethod
+    def _field(key: JobKey) -> str:
+        return ":".join(key)
+
+    def queue_for(self, customer_id: str) -> str:
+        return f"{self.queue_prefix}{shard_for(customer_id, self.shards)}"
+
+    def start(self) -> None:
+        """Workers run in their own processes (``celery -A app.worker worker -Q optimizer.0,...``)"""
+
+    async def stop(self) -> None:
+        pass
+
+    def load(self, key: JobKey) -> Optional[ScheduledJob]:
+        raw = self._redis.hget(self._registry_key(), self._field(key))
+        return ScheduledJob(**json.loads(raw)) if raw else None
+
+    def save(self, job: ScheduledJob) -> None:
+        self._redis.hset(self._registry_key(), self._field(job.key), json.dumps(asdict(job), default=str))
+
+    def enqueue(self, job: ScheduledJob, delay: float) -> None:
+        from app.worker import run_scheduled_job
+        job.next_run = datetime.fromtimestamp(time.time() + delay).isoformat()
+        self.save(job)
+        run_scheduled_job.apply_async(
+            args=(job.kind, job.customer_id, job.tenant_id, job.next_run),
+            countdown=delay,
+            queue=self.queue_for(job.customer_id)
+        )
+
+    def schedule(self, kind: str, customer_id: str, tenant_id: str,
+                 interval: float, run_now: bool = False) -> ScheduledJob:
+        _validate_kinds([kind])
+        key = (kind, tenant_id, customer_id)
+        job = self.load(key)
+        if job is None:
+            job = ScheduledJob(kind, customer_id, tenant_id, interval, shard_for(customer_id, self.shards))
+        job.interval = interval
+        if run_now or job.next_run is None:
+            # Re-scheduling an already queued job only updates its interval
+            self.enqueue(job, 0.0 if run_now else random.uniform(0, interval * self.jitter))
+        else:
+            self.save(job)
+        return job
+
+    def unschedule(self, customer_id: str, tenant_id: str, kinds: Optional[List[str]] = None) -> int:
+        """Remove registrations; queued runs see the job is gone and do not run"""
+        fields = [self._field((kind, tenant_id, customer_id)) for kind in (kinds or JOB_KINDS)]
+        return self._redis.hdel(self._registry_key(), *fields)
+
+    def jobs(self, customer_id: Optional[str] = None, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        jobs = [json.loads(raw) for raw in self._redis.hvals(self._registry_key())]
+        return [
+            job for job in jobs
+            if (customer_id is None or job["customer_id"] == customer_id)
+            and (tenant_id is None or job["tenant_id"] == tenant_id)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "running": True,
+            "shards": self.shards,
+            "jobs": self._redis.hlen(self._registry_key()),
+        }
+
+
+class DisabledScheduler:
+    """Scheduler stand-in when background jobs are turned off"""
+
+    backend = "disabled"
+    shards = 0
+
+    def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def schedule(self, kind: str, customer_id: str, tenant_id: str,
+                 interval: float, run_now: bool = False) -> ScheduledJob:
+        raise RuntimeError("Background scheduling is disabled (scheduler_backend=disabled)")
+
+    def unschedule(self, customer_id: str, tenant_id: str, kinds: Optional[List[str]] = None) -> int:
+        return 0
+
+    def jobs(self, customer_id: Optional[str] = None, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return []
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "running": False, "shards": 0, "jobs": 0}
+
+
+def create_scheduler(backend: str = "local"):
+    """Build the scheduler for ``settings.scheduler_backend``"""
+    if backend == "celery":
+        try:
+            return CeleryScheduler(settings.scheduler_shards, settings.scheduler_jitter)
+        except RuntimeError as e:
+            print(f"⚠️ {e}; falling back to the local scheduler")
+    if backend == "disabled":
+        return DisabledScheduler()
+    return LocalScheduler(settings.scheduler_shards, settings.scheduler_jitter)
+
+
+# Singleton instance
+optimization_scheduler = create_scheduler(settings.scheduler_backend)
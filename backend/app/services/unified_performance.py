@@ -0,0 +1,263 @@
+"""
+Cross-platform performance
+
+Fetches Google Ads and Meta Ads performance for one date range concurrently
+and normalizes both into a single schema. Each source runs against its own
+deadline; a source that is slow, failing or not configured is reported in
+its status instead of failing the whole response.
+
+The Google Ads service runs its blocking gRPC reads on its own bounded
+thread pool and the Graph API calls run in worker threads, so neither source
+blocks the request's event loop, identical concurrent requests still share
+one call, and a deadline can return without waiting for a stuck call. Source
+calls are shielded: one that misses its deadline still finishes in the
+background and warms the caches (the per-day metric cache, the Meta insights
+response cache) for the next request.
+
+Accounts report in their own currencies. Totals are converted to the
+reporting currency with the FX snapshot of the range's last day, so an
+agency rollup over AED, SAR, EUR and USD accounts sums to one figure.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field, fields, asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from app.core.cache import hash_key
+from app.core.config import get_settings
+from app.core.date_ranges import DateRange
+from app.services.currency import fx_rates
+from app.services.google_ads_service import google_ads_service
+from app.services.meta_ads_service import meta_ads_service
+from app.services.meta_insights import flatten_insights, rollup
+from app.services.response_cache import response_cache
+
+settings = get_settings()
+
+SOURCES = ("google_ads", "meta_ads")
+
+
+@dataclass
+class PlatformMetrics:
+    """Performance of one platform (or the combined total) in the unified schema"""
+    spend: float = 0.0
+    impressions: int = 0
+    clicks: int = 0
+    conversions: float = 0.0
+    conversion_value: float = 0.0
+    currency: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **asdict(self),
+            "ctr": self.clicks / self.impressions if self.impressions else 0.0,
+            "cpc": self.spend / self.clicks if self.clicks else 0.0,
+            "cpm": self.spend / self.impressions * 1000 if self.impressions else 0.0,
+            "conversion_rate": self.conversions / self.clicks if self.clicks else 0.0,
+            "cost_per_conversion": self.spend / self.conversions if self.conversions else 0.0,
+        }
+
+
+@dataclass
+class SourceResult:
+    """Outcome of one source: ok, no_data, timeout, error or skipped"""
+    status: str
+    account_id: Optional[str] = None
+    metrics: Optional[PlatformMetrics] = None
+    error: Optional[str] = None
+    elapsed_ms: Optional[float] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "account_id": self.account_id,
+            "metrics": self.metrics.to_dict() if self.metrics else None,
+            "error": self.error,
+            "elapsed_ms": self.elapsed_ms,
+            **self.details,
+        }
+
+
+def normalize_google(summary: Dict[str, Any]) -> PlatformMetrics:
+    """Map a Google Ads performance summary to the unified schema"""
+    return PlatformMetrics(
+        spend=float(summary.get("total_spend", 0)),
+        impressions=int(summary.get("total_impressions", 0)),
+        clicks=int(summary.get("total_clicks", 0)),
+        conversions=float(summary.get("total_conversions", 0)),
+        conversion_value=float(summary.get("conversion_value", 0)),
+        currency=summary.get("currency"),
+    )
+
+
+def normalize_meta(insights: Dict[str, Any], currency: Optional[str]) -> PlatformMetrics:
+    """Map Meta account insights to the unified schema (conversions summed over the configured action types)"""
+    totals = rollup(flatten_insights([{**insights, "campaign_id": "account"}]))
+    return PlatformMetrics(
+        spend=totals.get("spend", 0.0),
+        impressions=int(totals.get("impressions", 0)),
+        clicks=int(totals.get("clicks", 0)),
+        conversions=totals.get("conversions__total", 0.0),
+        conversion_value=totals.get("conversion_values__total", 0.0),
+        currency=currency,
+    )
+
+
+# Money fields of PlatformMetrics, converted when sources are summed
+MONEY_FIELDS = ["spend", "conversion_value"]
+
+
+def metrics_frame(results: Dict[str, SourceResult]) -> pd.DataFrame:
+    """One row per source that returned data, indexed by source (or account) name"""
+    rows = {name: asdict(result.metrics) for name, result in results.items() if result.status == "ok" and result.metrics}
+    return pd.DataFrame.from_dict(rows, orient="index", columns=[f.name for f in fields(PlatformMetrics)])
+
+
+def combine(frame: pd.DataFrame, currency: str, date_range: DateRange) -> Optional[PlatformMetrics]:
+    """Sum the rows of ``metrics_frame`` in ``currency``; None without rows"""
+    if frame.empty:
+        return None
+    converted = fx_rates.convert_frame(frame, MONEY_FIELDS, to_currency=currency, day=date_range.end)
+    return PlatformMetrics(
+        spend=float(converted["spend"].sum()),
+        impressions=int(converted["impressions"].sum()),
+        clicks=int(converted["clicks"].sum()),
+        conversions=float(converted["conversions"].sum()),
+        conversion_value=float(converted["conversion_value"].sum()),
+        currency=currency,
+    )
+
+
+class UnifiedPerformanceService:
+    """Concurrent fan-out to the ad platforms with per-source deadlines"""
+
+    async def _run_source(self, account_id: Optional[str], timeout: float,
+                          fetch: Callable[[], Awaitable[SourceResult]]) -> SourceResult:
+        if not account_id:
+            return SourceResult(status="skipped", error="No account given")
+        started = time.monotonic()
+        task = asyncio.ensure_future(fetch())
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            # Let it finish in the background so it still warms the caches
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            result = SourceResult(status="timeout", error=f"No response within {timeout:g}s")
+        except Exception as e:
+            result = SourceResult(status="error", error=str(e))
+        result.account_id = account_id
+        result.elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+        return result
+
+    async def _fetch_google(self, customer_id: str, date_range: DateRange) -> SourceResult:
+        summary = await google_ads_service.get_performance_summary(customer_id, date_range)
+        metrics = normalize_google(summary)
+        return SourceResult(
+            status="ok" if metrics.impressions or metrics.spend else "no_data",
+            metrics=metrics,
+            details={"campaigns": summary.get("total_campaigns"), "active_campaigns": summary.get("active_campaigns")}
+        )
+
+    async def _fetch_meta(self, ad_account_id: str, access_token: Optional[str], tenant_id: str,
+                          date_range: DateRange, refresh: bool) -> SourceResult:
+        time_range = {"since": date_range.start.isoformat(), "until": date_range.end.isoformat()}
+        # Same key as /meta-ads/accounts/{id}/insights, so the two endpoints share cached insights
+        insights, accounts = await asyncio.gather(
+            response_cache.get_or_load(
+                "meta_account_insights", tenant_id, ad_account_id,
+                {"time_range": time_range, "token": hash_key(access_token or "")},
+                lambda: asyncio.to_thread(meta_ads_service.get_account_insights, ad_account_id, access_token, time_range),
+                refresh=refresh
+            ),
+            asyncio.to_thread(meta_ads_service.get_ad_accounts, access_token)
+        )
+        # The Meta service reports API failures as empty results
+        if not insights:
+            return SourceResult(status="no_data", error="No insights returned by the Graph API")
+        account_ids = {ad_account_id, f"act_{ad_account_id}", ad_account_id.removeprefix("act_")}
+        currency = next((a.get("currency") for a in accounts if a.get("id") in account_ids), None)
+        return SourceResult(status="ok", metrics=normalize_meta(insights, currency))
+
+    async def _fx(self, currency: Optional[str], date_range: DateRange) -> Dict[str, Any]:
+        """Resolve the reporting currency and load the FX snapshot off the event loop"""
+        currency = (currency or settings.reporting_currency).upper()
+        snapshot = await asyncio.to_thread(fx_rates.snapshot, date_range.end)
+        if currency not in snapshot.rates:
+            raise ValueError(f"No FX rate for {currency}")
+        return {"currency": currency, "rates_date": snapshot.day.isoformat(), "rates_source": snapshot.source}
+
+    async def get_performance(self, date_range: DateRange, tenant_id: str,
+                              google_customer_id: Optional[str] = None,
+                              meta_ad_account_id: Optional[str] = None,
+                              meta_access_token: Optional[str] = None,
+                              timeout: Optional[float] = None,
+                              refresh: bool = False,
+                              currency: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Unified performance for the given accounts
+
+        ``timeout`` overrides the per-source deadlines from settings. Returns
+        per-source status and metrics in each account's currency, plus totals
+        in ``currency`` (the reporting currency by default) when at least one
+        source returned data. Raises ValueError for an unknown currency.
+        """
+        fx = await self._fx(currency, date_range)
+        google, meta = await asyncio.gather(
+            self._run_source(
+                google_customer_id, timeout or settings.unified_google_timeout,
+                lambda: self._fetch_google(google_customer_id, date_range)
+            ),
+            self._run_source(
+                meta_ad_account_id, timeout or settings.unified_meta_timeout,
+                lambda: self._fetch_meta(meta_ad_account_id, meta_access_token, tenant_id, date_range, refresh)
+            )
+        )
+        results = {"google_ads": google, "meta_ads": meta}
+        totals = combine(metrics_frame(results), fx["currency"], date_range)
+        requested = [result for result in results.values() if result.status != "skipped"]
+        return {
+            "date_range": {**date_range.to_params(), "period": date_range.label},
+            "fx": fx,
+            "totals": totals.to_dict() if totals else None,
+            "sources": {name: result.to_dict() for name, result in results.items()},
+            "complete": bool(requested) and all(result.status in ("ok", "no_data") for result in requested),
+        }
+
+    async def get_google_rollup(self, date_range: DateRange, customer_ids: List[str],
+                                timeout: Optional[float] = None,
+                                currency: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Totals across several Google Ads accounts, in ``currency``
+
+        Accounts are fetched concurrently, each against the Google deadline.
+        Every account is reported in its own currency with its spend also
+        converted; totals cover the accounts that returned data.
+        """
+        fx = await self._fx(currency, date_range)
+        deadline = timeout or settings.unified_google_timeout
+        results = dict(zip(customer_ids, await asyncio.gather(*(
+            self._run_source(customer_id, deadline, lambda customer_id=customer_id: self._fetch_google(customer_id, date_range))
+            for customer_id in customer_ids
+        ))))
+        frame = metrics_frame(results)
+        accounts = {customer_id: result.to_dict() for customer_id, result in results.items()}
+        if not frame.empty:
+            converted = fx_rates.convert(frame["spend"].to_numpy(), frame["currency"].to_numpy(), fx["currency"], date_range.end)
+            for customer_id, spend in zip(frame.index, converted.tolist()):
+                accounts[customer_id]["converted_spend"] = spend
+        totals = combine(frame, fx["currency"], date_range)
+        return {
+            "date_range": {**date_range.to_params(), "period": date_range.label},
+            "fx": fx,
+            "totals": totals.to_dict() if totals else None,
+            "accounts": accounts,
+            "complete": all(result.status in ("ok", "no_data") for result in results.values()),
+        }
+
+
+# Singleton instance
+unified_performance_service = UnifiedPerformanceService()
@@ -0,0 +1,132 @@
+"""
+Celery worker for scheduled optimization jobs and submitted async jobs
+
+Each shard queue must be consumed by a single process, so a customer's jobs
+run one at a time; run one single-process worker per group of shard queues,
+e.g.::
+
+    celery -A app.worker worker -Q optimizer.0,optimizer.1 -c 1 -n optimizer-0@%h
+    celery -A app.worker worker -Q optimizer.2,optimizer.3 -c 1 -n optimizer-1@%h
+
+All jobs of a customer land on the same ``optimizer.<shard>`` queue; with
+``-c`` above 1, two jobs from one queue could run at once. After a run the
+task records its outcome in the Redis job registry and enqueues the next run
+with jitter, unless the job was unscheduled in the meantime.
+
+Scheduled runs replace the insights in the shared insight store. Anomaly
+baselines reach the API only through ``anomaly_state_path``, which must point
+at a file both the workers and the API can read; the keyword indexes are
+in-memory and refreshed by the API itself.
+
+Jobs submitted through ``/jobs`` (``job_backend=celery``) go to the
+``job_queue`` queue::
+
+    celery -A app.worker worker -Q jobs -c 8
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+from celery import Celery
+
+from app.core.config import get_settings
+from app.services.scheduler import create_scheduler, jittered
+from app.services.jobs import create_job_queue, execute
+
+settings = get_settings()
+
+celery_app = Celery(
+    "crm_backend",
+    broker=settings.celery_broker_url,
+    backend=settings.celery_result_backend,
+)
+celery_app.conf.update(
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    task_default_queue="optimizer.0",
+)
+
+# One event loop per worker process, so async clients are reused across tasks
+_loop = asyncio.new_event_loop()
+
+
+@celery_app.task(name="optimizer.run_scheduled_job")
+def run_scheduled_job(kind: str, customer_id: str, tenant_id: str, run_at: str):
+    from app.services.ai_agent_service import ai_agent_service
+
+    scheduler = create_scheduler("celery")
+    key = (kind, tenant_id, customer_id)
+    job = scheduler.load(key)
+    # Unscheduled while queued, or superseded by a newer enqueue (e.g. run_now)
+    if job is None or job.next_run != run_at:
+        return None
+
+    started = time.monotonic()
+    result, error = None, None
+    try:
+        result = _loop.run_until_complete(
+            ai_agent_service.run_optimization_job(kind, customer_id, tenant_id, in_api_process=False)
+        )
+    except Exception as e:
+        error = str(e)
+
+    # Re-read: the interval may have changed while the job ran
+    job = scheduler.load(key)
+    if job is None or job.next_run != run_at:
+        return result
+    job.record(started, result, error)
+    scheduler.enqueue(job, jittered(job.interval, scheduler.jitter))
+    if error is not None:
+        raise RuntimeError(error)
+    return result
+
+
+# Seconds before a job retries when its tenant's running slots are all taken
+JOB_SLOT_RETRY_SECONDS = 2
+
+
+async def _execute_leased(queue, job, progress):
+    """Run the job, renewing its slot lease until it returns"""
+    async def renew():
+        while True:
+            await asyncio.sleep(queue.lease_ttl / 3)
+            await asyncio.to_thread(queue.acquire_slot, job.tenant_id, job.id)
+
+    renewer = asyncio.create_task(renew())
+    try:
+        return await execute(job, progress)
+    finally:
+        renewer.cancel()
+
+
+@celery_app.task(name="jobs.run", bind=True, max_retries=None)
+def run_async_job(self, job_id: str):
+    # Importing the routers registers the job handlers
+    import app.api.v1.api  # noqa: F401
+
+    queue = create_job_queue("celery")
+    job = queue.get(job_id)
+    if job is None or job.finished:
+        return None
+    if not queue.acquire_slot(job.tenant_id, job_id):
+        raise self.retry(countdown=JOB_SLOT_RETRY_SECONDS)
+
+    # Saves of a job cancelled meanwhile are dropped, so it never goes back to running or on to completed
+    def progress(fraction: float, message=None):
+        job.progress = round(min(max(fraction, 0.0), 1.0), 4)
+        job.message = message
+        queue.save(job)
+
+    try:
+        job.status, job.started_at = "running", datetime.now().isoformat()
+        if not queue.save(job):
+            return None
+        try:
+            result = _loop.run_until_complete(_execute_leased(queue, job, progress))
+            queue.finish(job, status="completed", result=result, progress=1.0, message=None)
+        except Exception as e:
+            queue.finish(job, status="failed", error=str(e))
+    finally:
+        queue.release_slot(job.tenant_id, job_id)
+    return None
@@ -0,0 +1,66 @@
+"""
+Benchmark the incremental daily anomaly detector
+
+Simulates a nightly pass over many accounts: a one-off backfill, then single
+new days folded into the existing state.
+
+    cd backend && python -m benchmarks.bench_anomaly_detector --accounts 5000 --campaigns 50
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.services.anomaly_detector import DailyAnomalyDetector
+
+
+def synthetic_day(accounts: int, campaigns: int, day: date, rng: np.random.Generator) -> pd.DataFrame:
+    series = accounts * campaigns
+    base_impressions = np.repeat(rng.uniform(200, 20000, accounts), campaigns)
+    impressions = rng.poisson(base_impressions)
+    clicks = rng.binomial(impressions, 0.04)
+    cost = clicks * rng.gamma(4.0, 0.3, series)
+    return pd.DataFrame({
+        "customer_id": np.repeat(np.arange(accounts), campaigns).astype(str),
+        "campaign_id": np.arange(series).astype(str),
+        "date": day,
+        "impressions": impressions,
+        "clicks": clicks,
+        "conversions": rng.binomial(clicks, 0.05),
+        "cost": cost,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the daily anomaly detector")
+    parser.add_argument("--accounts", type=int, default=5000)
+    parser.add_argument("--campaigns", type=int, default=50, help="Campaigns per account")
+    parser.add_argument("--backfill-days", type=int, default=30)
+    parser.add_argument("--nights", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    series = args.accounts * args.campaigns
+    start = date.today() - timedelta(days=args.backfill_days + args.nights)
+    detector = DailyAnomalyDetector()
+
+    backfill = pd.concat(
+        [synthetic_day(args.accounts, args.campaigns, start + timedelta(days=d), rng) for d in range(args.backfill_days)],
+        ignore_index=True
+    )
+    began = time.perf_counter()
+    detector.ingest(backfill)
+    print(f"backfill  {series:>9,} series x {args.backfill_days} days  {time.perf_counter() - began:8.2f}s")
+
+    for night in range(args.nights):
+        frame = synthetic_day(args.accounts, args.campaigns, start + timedelta(days=args.backfill_days + night), rng)
+        began = time.perf_counter()
+        anomalies = detector.ingest(frame)
+        print(f"night {night + 1}   {series:>9,} series x 1 day    {time.perf_counter() - began:8.2f}s  ({len(anomalies):,} anomalies)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark JSON serialization of large keyword responses
+
+Compares FastAPI's default path for a returned dict (``jsonable_encoder`` +
+stdlib ``json``, as ``JSONResponse`` renders it) with ``FastJSONResponse`` on
+the same row-shaped body, and with the columnar body ``/keywords?format=columns``
+returns.
+
+    cd backend && python -m benchmarks.bench_json_responses --rows 100000
+"""
+
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from app.api.v1.google_ads import KEYWORD_COLUMNS, KEYWORD_COLUMN_DTYPES
+from app.core.responses import dumps, orjson, record_columns
+from benchmarks.bench_rules_engine import synthetic_keywords
+
+
+def keyword_rows(keywords):
+    """The row-shaped ``/keywords`` body"""
+    return {
+        "keywords": [
+            {
+                "id": kw.id,
+                "text": kw.text,
+                "match_type": kw.match_type,
+                "ad_group_id": kw.ad_group_id,
+                "status": kw.status,
+                "cpc_bid": kw.cpc_bid,
+                "quality_score": kw.quality_score,
+                "metrics": {
+                    "impressions": kw.impressions,
+                    "clicks": kw.clicks,
+                    "conversions": kw.conversions,
+                    "cost": kw.cost
+                }
+            }
+            for kw in keywords
+        ]
+    }
+
+
+def default_render(content) -> bytes:
+    """What FastAPI does with a dict returned from a route"""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def best_of(repeat: int, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    keywords = synthetic_keywords(args.rows)
+    print(f"{args.rows:,} keywords, encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+
+    cases = {
+        "jsonable_encoder + json (rows)": lambda: default_render(keyword_rows(keywords)),
+        "FastJSONResponse (rows)": lambda: dumps(keyword_rows(keywords)),
+        "FastJSONResponse (columns)": lambda: dumps({
+            "count": len(keywords),
+            "columns": record_columns(keywords, KEYWORD_COLUMNS, KEYWORD_COLUMN_DTYPES)
+        }),
+    }
+
+    baseline = None
+    for name, fn in cases.items():
+        seconds, body = best_of(args.repeat, fn)
+        baseline = baseline or seconds
+        print(
+            f"{name:32s} {seconds * 1000:8.1f} ms  {args.rows / seconds:12,.0f} rows/s  "
+            f"{len(body) / 1e6:6.1f} MB  {baseline / seconds:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark the vectorized rules engine on synthetic keyword data
+
+Compares the rules engine (columnar conversion + mask evaluation) with the
+per-object loop ``analyze_keywords`` ran before the engine existed.
+
+The masks themselves are nearly free, but every matched row that becomes an
+``AIInsight`` costs a content-addressed id and currency-formatted texts, which
+the old loop did not do. When a large share of rows match (about 20% here),
+building all of them is slower than the old loop, so ``analyze_keywords`` only
+builds the ``keyword_insights_limit`` most important ones. Both runs are
+printed; the ratios compare the limited run, which is what the API serves.
+
+    cd backend && python -m benchmarks.bench_rules_engine --rows 1000000
+"""
+
+import argparse
+import time
+from datetime import datetime
+from typing import List
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.services.ai_agent_service import keyword_columns
+from app.services.google_ads_service import KeywordData
+from app.services.insights import AIInsight
+from app.services.rules_engine import RulesEngine
+
+
+def synthetic_keywords(rows: int, seed: int = 42) -> List[KeywordData]:
+    """Keywords with a long tail of clicks and spend, like a large search account"""
+    rng = np.random.default_rng(seed)
+    # Most keywords get a handful of clicks, a few get hundreds
+    clicks = rng.negative_binomial(0.3, 0.03, rows)
+    conversions = rng.binomial(clicks, 0.03)
+    cost = np.round(clicks * rng.gamma(2.0, 0.8, rows), 2)
+    cpc_bid = np.round(rng.uniform(0.2, 5.0, rows), 2)
+    return [
+        KeywordData(
+            id=str(i),
+            text=f"keyword {i}",
+            match_type="BROAD",
+            ad_group_id=str(i // 50),
+            status="ENABLED",
+            cpc_bid=bid,
+            impressions=click * 20,
+            clicks=click,
+            conversions=float(conv),
+            cost=spend,
+        )
+        for i, (click, conv, spend, bid) in enumerate(zip(clicks.tolist(), conversions.tolist(), cost.tolist(), cpc_bid.tolist()))
+    ]
+
+
+def legacy_analyze_keywords(keywords: List[KeywordData]) -> List[AIInsight]:
+    """The pre-engine per-keyword loop with hard-coded thresholds"""
+    insights = []
+    for keyword in keywords:
+        if keyword.clicks > 10 and keyword.conversions == 0:
+            insights.append(AIInsight(
+                id=f"keyword_poor_{keyword.id}_{int(datetime.now().timestamp())}",
+                type="keyword",
+                title=f"Poor Performing Keyword: {keyword.text}",
+                description=f"Keyword '{keyword.text}' has {keyword.clicks} clicks but no conversions. Consider pausing or lowering bids.",
+                impact="medium",
+                confidence=0.8,
+                ad_group_id=keyword.ad_group_id,
+                action_type="pause_keyword",
+                action_data={"keyword_id": keyword.id, "keyword_text": keyword.text},
+                priority=3
+            ))
+        if keyword.cost > 50 and keyword.conversions == 0:
+            insights.append(AIInsight(
+                id=f"keyword_expensive_{keyword.id}_{int(datetime.now().timestamp())}",
+                type="keyword",
+                title=f"Expensive Non-Converting Keyword: {keyword.text}",
+                description=f"Keyword '{keyword.text}' has spent ${keyword.cost:.2f} without conversions. Review and consider pausing.",
+                impact="high",
+                confidence=0.9,
+                ad_group_id=keyword.ad_group_id,
+                action_type="pause_keyword",
+                priority=1
+            ))
+        if keyword.conversions > 0 and keyword.cost / keyword.conversions < 10:
+            insights.append(AIInsight(
+                id=f"keyword_good_{keyword.id}_{int(datetime.now().timestamp())}",
+                type="keyword",
+                title=f"High-Performing Keyword: {keyword.text}",
+                description=f"Keyword '{keyword.text}' has excellent performance with cost per conversion of ${keyword.cost / keyword.conversions:.2f}. Consider increasing bids.",
+                impact="medium",
+                confidence=0.85,
+                ad_group_id=keyword.ad_group_id,
+                action_type="increase_bid",
+                action_data={"keyword_id": keyword.id, "current_bid": keyword.cpc_bid, "suggested_increase": 0.2},
+                priority=2
+            ))
+    return insights
+
+
+def timed(label: str, rows: int, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    count = f"{len(result):>9,} insights" if isinstance(result, list) else ""
+    print(f"{label:<22} {rows:>9,} rows {count} {seconds:8.3f}s")
+    return result, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized rules engine")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=get_settings().keyword_insights_limit, help="Insights to build (0 = all)")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the rules engine")
+    args = parser.parse_args()
+
+    keywords = synthetic_keywords(args.rows)
+    engine = RulesEngine()
+
+    columns, to_columns_seconds = timed("to columns", args.rows, keyword_columns, keywords)
+    # No-match pass: cost of the masks alone, independent of how many insights are built
+    timed("masks only (no match)", args.rows, engine.evaluate, "keyword", {**columns, "clicks": np.zeros(args.rows), "conversions": np.ones(args.rows), "cost": np.full(args.rows, 100.0)})
+    timed("rules engine, all", args.rows, engine.evaluate, "keyword", columns)
+    columns, to_columns_seconds = timed("to columns", args.rows, keyword_columns, keywords)
+    _, evaluate_seconds = timed(f"rules engine, top {args.limit}", args.rows,
+                                lambda: engine.evaluate("keyword", columns, limit=args.limit))
+    engine_seconds = to_columns_seconds + evaluate_seconds
+
+    if not args.skip_legacy:
+        _, legacy_seconds = timed("legacy loop", args.rows, legacy_analyze_keywords, keywords)
+        print(f"legacy / engine, columns in hand   {legacy_seconds / evaluate_seconds:.2f}x")
+        print(f"legacy / engine, incl. to_columns  {legacy_seconds / engine_seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
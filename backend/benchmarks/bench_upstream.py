@@ -0,0 +1,103 @@
+"""
+Benchmark the Google Ads and Meta service calls against the local stand-ins
+
+Starts both stand-in servers in-process with the given account size and
+fault profile, points the backend's settings at them, then times each
+service call twice: cold (first call, nothing cached) and warm (the same call
+again, served from whatever caches the service keeps). Every read and mutate
+path is listed; a call that fails is reported with its error, not skipped.
+
+    cd backend && python -m benchmarks.bench_upstream --accounts 3 --campaigns 20 --latency-ms 80
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from stand_ins.faults import FaultProfile
+from stand_ins.google_ads_data import AccountShape
+from stand_ins.google_ads_server import GoogleAdsStandIn
+from stand_ins.graph_api_data import MetaAccountShape
+from stand_ins.graph_api_server import GraphApiStandIn
+
+
+def timed(fn):
+    started = time.perf_counter()
+    try:
+        result = fn()
+        if asyncio.iscoroutine(result):
+            result = asyncio.run(result)
+        if isinstance(result, dict) and result and all(isinstance(value, bool) for value in result.values()):
+            outcome = f"{sum(result.values()):,}/{len(result):,} applied"
+        elif hasattr(result, "__len__"):
+            outcome = f"{len(result):,} items"
+        else:
+            outcome = repr(result)
+    except Exception as e:
+        outcome = f"failed: {type(e).__name__}: {str(e).splitlines()[0][:80]}"
+    return time.perf_counter() - started, outcome
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--campaigns", type=int, default=10, help="Campaigns per account")
+    parser.add_argument("--days", type=int, default=90)
+    FaultProfile.add_arguments(parser)
+    args = parser.parse_args()
+    faults = FaultProfile.from_args(args)
+
+    google_ads = GoogleAdsStandIn(args.accounts, AccountShape(campaigns=args.campaigns, days=args.days), faults, seed=args.seed)
+    graph = GraphApiStandIn(args.accounts, MetaAccountShape(campaigns=args.campaigns, days=args.days), faults, seed=args.seed)
+    os.environ.update({
+        "GOOGLE_ADS_ENDPOINT": f"127.0.0.1:{google_ads.start()}",
+        "GOOGLE_ADS_INSECURE": "true",
+        "META_GRAPH_URL": f"http://127.0.0.1:{graph.start()}",
+        "META_ACCESS_TOKEN": "stand-in-token",
+    })
+
+    # Imported after the environment is set, as the services read settings on import
+    from app.services.google_ads_service import google_ads_service
+    from app.services.meta_ads_service import meta_ads_service
+
+    customer_id = str(google_ads.accounts.customer_ids[0])
+    account = google_ads.accounts.get(customer_id)
+    campaign_id = str(account.campaigns["campaign.id"].iloc[0])
+    budgets = {str(budget_id): 100.0 for budget_id in account.campaigns["campaign_budget.id"]}
+    bids = {
+        (str(ad_group_id), str(criterion_id)): 1.0
+        for ad_group_id, criterion_id in zip(account.keywords["ad_group.id"], account.keywords["ad_group_criterion.criterion_id"])
+    }
+    ad_account_id = graph.accounts.account_ids[0][len("act_"):]
+    cases = {
+        "google: accessible customers": google_ads_service.get_accessible_customers,
+        "google: campaigns": lambda: google_ads_service.get_campaigns(customer_id),
+        "google: performance summary": lambda: google_ads_service.get_performance_summary(customer_id),
+        "google: keywords": lambda: google_ads_service.get_keywords(customer_id),
+        "google: ad groups": lambda: google_ads_service.get_ad_groups(customer_id),
+        "google: search terms": lambda: google_ads_service.get_search_terms(customer_id),
+        "google: recommendations": lambda: google_ads_service.get_campaign_recommendations(customer_id, campaign_id),
+        "google: update campaign": lambda: google_ads_service.update_campaign(customer_id, campaign_id, {"status": "ENABLED"}),
+        "google: budget mutate (bulk)": lambda: google_ads_service.update_campaign_budgets(customer_id, budgets),
+        "google: keyword bid mutate (bulk)": lambda: google_ads_service.update_keyword_bids(customer_id, bids),
+        "google: create campaign": lambda: google_ads_service.create_campaign(customer_id, {"name": "Bench", "budget": 10}),
+        "meta: ad accounts": meta_ads_service.get_ad_accounts,
+        "meta: campaigns insights": lambda: meta_ads_service.get_campaigns_insights(ad_account_id),
+        "meta: account ad tree": lambda: meta_ads_service.get_account_ad_tree(ad_account_id),
+        "meta: account insights": lambda: meta_ads_service.get_account_insights(ad_account_id),
+    }
+
+    print(f"{args.accounts} accounts x {args.campaigns} campaigns x {args.days} days, faults: {faults}")
+    for name, fn in cases.items():
+        cold, outcome = timed(fn)
+        warm, _ = timed(fn)
+        print(f"{name:34s} cold {cold * 1000:9.1f} ms   warm {warm * 1000:9.1f} ms   {outcome}")
+
+    for stand_in in (google_ads, graph):
+        print(stand_in.stats())
+        stand_in.stop()
+
+
+if __name__ == "__main__":
+    main()
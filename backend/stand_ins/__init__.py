@@ -0,0 +1,14 @@
+"""
+Local stand-ins for the Google Ads API and the Meta Graph API
+
+Both servers serve deterministic synthetic accounts of configurable size and
+inject configurable latency, errors and throttling, so the backend can be run
+and measured offline:
+
+    cd backend && python -m stand_ins --accounts 5 --latency-ms 80 --error-rate 0.01
+
+prints the settings that point the backend at them (``GOOGLE_ADS_ENDPOINT``,
+``GOOGLE_ADS_INSECURE``, ``META_GRAPH_URL``, ``META_ACCESS_TOKEN``). Either
+server can also be started on its own (``python -m stand_ins.google_ads_server``,
+``python -m stand_ins.graph_api_server``) or in-process through their ``start()``.
+"""
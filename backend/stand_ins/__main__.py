@@ -0,0 +1,57 @@
+"""Run both stand-ins with shared account counts and fault injection"""
+
+import argparse
+import threading
+
+from stand_ins.faults import FaultProfile
+from stand_ins.google_ads_data import AccountShape
+from stand_ins.google_ads_server import GoogleAdsStandIn
+from stand_ins.graph_api_data import MetaAccountShape
+from stand_ins.graph_api_server import GraphApiStandIn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in Google Ads and Graph API servers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--google-ads-port", type=int, default=50051)
+    parser.add_argument("--graph-port", type=int, default=8765)
+    parser.add_argument("--accounts", type=int, default=3, help="Accounts per platform")
+    parser.add_argument("--campaigns", type=int, default=10, help="Campaigns per account")
+    parser.add_argument("--days", type=int, default=90, help="Days of daily metrics")
+    parser.add_argument("--access-token", default=None, help="Only accept this Graph API token (any token when unset)")
+    FaultProfile.add_arguments(parser)
+    args = parser.parse_args()
+    faults = FaultProfile.from_args(args)
+
+    google_ads = GoogleAdsStandIn(
+        accounts=args.accounts,
+        shape=AccountShape(campaigns=args.campaigns, days=args.days),
+        faults=faults,
+        seed=args.seed
+    )
+    graph = GraphApiStandIn(
+        accounts=args.accounts,
+        shape=MetaAccountShape(campaigns=args.campaigns, days=args.days),
+        faults=faults,
+        access_token=args.access_token,
+        seed=args.seed
+    )
+    google_ads_port = google_ads.start(args.host, args.google_ads_port)
+    graph_port = graph.start(args.host, args.graph_port)
+
+    print(f"🧪 Google Ads stand-in ({google_ads.version}) on {args.host}:{google_ads_port}, "
+          f"Graph API stand-in on http://{args.host}:{graph_port}")
+    print("   Point the backend at them with:")
+    print(f"   GOOGLE_ADS_ENDPOINT={args.host}:{google_ads_port}")
+    print("   GOOGLE_ADS_INSECURE=true")
+    print(f"   META_GRAPH_URL=http://{args.host}:{graph_port}")
+    print(f"   META_ACCESS_TOKEN={args.access_token or 'stand-in-token'}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        google_ads.stop()
+        graph.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Latency, error and throttling injection shared by the stand-in servers
+
+Every call first waits the configured latency, then may be throttled (once
+the call rate exceeds ``throttle_rps``) or fail (with probability
+``error_rate``). Decisions come from a seeded generator, so a run with the
+same profile and call sequence fails the same calls.
+"""
+
+import argparse
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+# Outcomes of FaultInjector.decide
+THROTTLED = "throttled"
+ERROR = "error"
+
+
+@dataclass
+class FaultProfile:
+    latency_ms: float = 0.0    # added to every call
+    jitter_ms: float = 0.0     # uniform extra latency between 0 and this
+    error_rate: float = 0.0    # share of calls failing with an internal error
+    throttle_rps: float = 0.0  # sustained calls per second before throttling (0 = never)
+    throttle_burst: int = 0    # calls allowed at once above the rate (defaults to the rate)
+    seed: int = 0
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser) -> None:
+        group = parser.add_argument_group("fault injection")
+        group.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to every call")
+        group.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform extra latency up to this")
+        group.add_argument("--error-rate", type=float, default=0.0, help="Share of calls failing (0-1)")
+        group.add_argument("--throttle-rps", type=float, default=0.0, help="Calls per second before throttling")
+        group.add_argument("--throttle-burst", type=int, default=0, help="Burst allowed above the rate")
+        group.add_argument("--seed", type=int, default=0, help="Seed for data and fault decisions")
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "FaultProfile":
+        return cls(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            throttle_rps=args.throttle_rps,
+            throttle_burst=args.throttle_burst,
+            seed=args.seed,
+        )
+
+
+class FaultInjector:
+    """Applies a FaultProfile to calls; thread-safe, as the servers handle calls on worker threads"""
+
+    def __init__(self, profile: Optional[FaultProfile] = None):
+        self.profile = profile or FaultProfile()
+        self._random = random.Random(self.profile.seed)
+        self._lock = threading.Lock()
+        self._tokens = float(self._capacity)
+        self._refilled_at = time.monotonic()
+        self.calls = 0
+        self.throttled = 0
+        self.errors = 0
+
+    @property
+    def _capacity(self) -> float:
+        return float(self.profile.throttle_burst or max(1.0, self.profile.throttle_rps))
+
+    def delay(self) -> float:
+        """Seconds to wait before answering a call"""
+        with self._lock:
+            jitter = self._random.uniform(0, self.profile.jitter_ms) if self.profile.jitter_ms else 0.0
+        return (self.profile.latency_ms + jitter) / 1000
+
+    def retry_after(self) -> float:
+        """Seconds until a throttled caller gets a call through again"""
+        if not self.profile.throttle_rps:
+            return 0.0
+        with self._lock:
+            return max(0.0, (1 - self._tokens) / self.profile.throttle_rps)
+
+    def decide(self) -> Optional[str]:
+        """``THROTTLED``, ``ERROR`` or None for a call that goes through"""
+        with self._lock:
+            self.calls += 1
+            if self.profile.throttle_rps:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._refilled_at) * self.profile.throttle_rps)
+                self._refilled_at = now
+                if self._tokens < 1:
+                    self.throttled += 1
+                    return THROTTLED
+                self._tokens -= 1
+            if self.profile.error_rate and self._random.random() < self.profile.error_rate:
+                self.errors += 1
+                return ERROR
+        return None
+
+    def apply(self) -> Optional[str]:
+        """Wait the injected latency, then decide the call's fate"""
+        delay = self.delay()
+        if delay:
+            time.sleep(delay)
+        return self.decide()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"profile": asdict(self.profile), "calls": self.calls, "throttled": self.throttled, "errors": self.errors}
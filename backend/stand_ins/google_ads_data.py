@@ -0,0 +1,475 @@
+"""
+Synthetic Google Ads accounts and a small GAQL evaluator over them
+
+An account is generated from its index and the seed: campaigns, ad groups
+and keywords with statuses, budgets and bids, plus per-keyword daily metrics
+for the last ``days`` days. Campaign, ad group and account metrics are sums of
+the keyword facts, so every level of a report agrees with the others.
+
+The evaluator covers the GAQL the backend issues: a SELECT list, one FROM
+resource, WHERE conditions joined by AND (``=``, ``!=``, ``<``, ``>``, ``<=``,
+``>=``, ``IN``, ``NOT IN``, ``LIKE``, ``BETWEEN`` and ``DURING``), ORDER BY
+and LIMIT. Metrics are summed over the matching days, per day when
+``segments.date`` is selected. Unsupported queries raise ``GaqlError`` with
+the QueryError the API would answer.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+CUSTOMER_ID_BASE = 5550000001
+CURRENCIES = ("USD", "EUR", "GBP", "AED", "JPY", "INR")
+TIME_ZONES = ("America/New_York", "Europe/Berlin", "Europe/London", "Asia/Dubai", "Asia/Tokyo", "Asia/Kolkata")
+# Currency units per USD, to keep synthetic costs plausible per account
+CURRENCY_SCALE = {"USD": 1.0, "EUR": 0.92, "GBP": 0.79, "AED": 3.67, "JPY": 150.0, "INR": 83.0}
+
+CAMPAIGN_THEMES = ("Brand", "Generic", "Competitor", "Remarketing", "Shopping", "Local", "Seasonal", "Prospecting")
+KEYWORD_WORDS = (
+    "running", "shoes", "trail", "women", "men", "kids", "cheap", "best", "buy", "online",
+    "sale", "store", "near", "me", "waterproof", "leather", "boots", "sandals", "sneakers", "review",
+    "discount", "outlet", "free", "shipping", "size", "wide", "lightweight", "hiking", "gym", "casual",
+)
+MATCH_TYPES = ("EXACT", "PHRASE", "BROAD")
+
+METRIC_FIELDS = (
+    "metrics.impressions", "metrics.clicks", "metrics.conversions",
+    "metrics.cost_micros", "metrics.conversions_value",
+)
+# Date presets of the DURING operator with a fixed span, as (first, last) day offsets from today
+DATE_PRESETS = {
+    "TODAY": (0, 0),
+    "YESTERDAY": (1, 1),
+    "LAST_7_DAYS": (7, 1),
+    "LAST_14_DAYS": (14, 1),
+    "LAST_30_DAYS": (30, 1),
+    "LAST_90_DAYS": (90, 1),
+}
+
+class GaqlError(ValueError):
+    """A query the API would reject; ``code`` is the QueryError enum name"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+@dataclass
+class AccountShape:
+    campaigns: int = 10
+    ad_groups: int = 5   # per campaign
+    keywords: int = 20   # per ad group
+    days: int = 90       # of daily metrics, ending today
+
+
+@dataclass
+class Condition:
+    field: str
+    operator: str
+    value: Any
+
+
+@dataclass
+class Query:
+    fields: List[str]
+    resource: str
+    conditions: List[Condition]
+    order: List[Tuple[str, bool]]  # (field, descending)
+    limit: Optional[int]
+
+
+QUERY_PATTERN = re.compile(
+    r"^\s*SELECT\s+(?P<fields>.+?)\s+FROM\s+(?P<resource>\w+)"
+    r"(?:\s+WHERE\s+(?P<where>.+?))?"
+    r"(?:\s+ORDER\s+BY\s+(?P<order>.+?))?"
+    r"(?:\s+LIMIT\s+(?P<limit>\S+))?"
+    r"(?:\s+PARAMETERS\s+.+?)?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+LITERAL = r"'[^']*'|\"[^\"]*\"|[\w.:/~-]+"
+CONDITION_PATTERN = re.compile(
+    rf"""\s*(?P<field>[\w.]+)\s*(?:
+        (?P<between>BETWEEN)\s+(?P<low>{LITERAL})\s+AND\s+(?P<high>{LITERAL})
+      | (?P<list_op>NOT\s+IN|IN)\s*\((?P<values>[^)]*)\)
+      | (?P<during>DURING)\s+(?P<preset>\w+)
+      | (?P<op>!=|>=|<=|=|>|<|NOT\s+LIKE|LIKE)\s*(?P<value>{LITERAL})
+    )\s*(?:AND\b|$)""",
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+def parse_literal(text: str) -> Any:
+    if text[:1] in ("'", '"'):
+        return text[1:-1]
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_query(gaql: str) -> Query:
+    match = QUERY_PATTERN.match(gaql)
+    if not match:
+        raise GaqlError("UNEXPECTED_INPUT", f"Cannot parse query: {' '.join(gaql.split())[:200]}")
+
+    fields = [field.strip() for field in match["fields"].split(",") if field.strip()]
+    conditions = []
+    where = (match["where"] or "").strip()
+    position = 0
+    while position < len(where):
+        condition = CONDITION_PATTERN.match(where, position)
+        if not condition or condition.end() == position:
+            raise GaqlError("UNEXPECTED_INPUT", f"Cannot parse condition at: {where[position:position + 80]}")
+        position = condition.end()
+        field = condition["field"]
+        if condition["between"]:
+            conditions.append(Condition(field, "BETWEEN", (parse_literal(condition["low"]), parse_literal(condition["high"]))))
+        elif condition["list_op"]:
+            values = [parse_literal(value) for value in re.findall(LITERAL, condition["values"])]
+            conditions.append(Condition(field, " ".join(condition["list_op"].upper().split()), values))
+        elif condition["during"]:
+            conditions.append(Condition(field, "DURING", condition["preset"].upper()))
+        else:
+            conditions.append(Condition(field, " ".join(condition["op"].upper().split()), parse_literal(condition["value"])))
+
+    order = []
+    for term in (match["order"] or "").split(","):
+        parts = term.split()
+        if parts:
+            order.append((parts[0], len(parts) > 1 and parts[1].upper() == "DESC"))
+
+    limit = None
+    if match["limit"]:
+        try:
+            limit = int(match["limit"])
+        except ValueError:
+            raise GaqlError("BAD_LIMIT_VALUE", f"Bad LIMIT: {match['limit']}")
+    return Query(fields, match["resource"].lower(), conditions, order, limit)
+
+
+def preset_dates(preset: str, today: date) -> Tuple[str, str]:
+    if preset == "THIS_MONTH":
+        return today.replace(day=1).isoformat(), today.isoformat()
+    if preset == "LAST_MONTH":
+        last = today.replace(day=1) - timedelta(days=1)
+        return last.replace(day=1).isoformat(), last.isoformat()
+    if preset not in DATE_PRESETS:
+        raise GaqlError("INVALID_VALUE_WITH_DURING_OPERATOR", f"Unsupported date preset: {preset}")
+    first, last = DATE_PRESETS[preset]
+    return (today - timedelta(days=first)).isoformat(), (today - timedelta(days=last)).isoformat()
+
+
+def condition_mask(column: pd.Series, condition: Condition, today: date) -> np.ndarray:
+    operator, value = condition.operator, condition.value
+    if operator == "DURING":
+        low, high = preset_dates(value, today)
+        return ((column >= low) & (column <= high)).to_numpy()
+    if operator == "BETWEEN":
+        return ((column >= value[0]) & (column <= value[1])).to_numpy()
+    if operator in ("IN", "NOT IN"):
+        mask = column.isin(value).to_numpy()
+        return ~mask if operator == "NOT IN" else mask
+    if operator in ("LIKE", "NOT LIKE"):
+        pattern = "^" + re.escape(str(value)).replace("%", ".*").replace("_", ".") + "$"
+        mask = column.astype(str).str.match(pattern).to_numpy()
+        return ~mask if operator == "NOT LIKE" else mask
+    comparisons = {
+        "=": column.__eq__, "!=": column.__ne__, ">": column.__gt__,
+        ">=": column.__ge__, "<": column.__lt__, "<=": column.__le__,
+    }
+    try:
+        return comparisons[operator](value).to_numpy()
+    except TypeError:
+        raise GaqlError("OPERATOR_FIELD_MISMATCH", f"Cannot compare {condition.field} with {value!r}")
+
+
+class GoogleAdsAccount:
+    """One synthetic account: entity tables plus per-keyword daily facts"""
+
+    def __init__(self, index: int, shape: AccountShape, seed: int = 0, today: Optional[date] = None):
+        self.index = index
+        self.customer_id = CUSTOMER_ID_BASE + index
+        self.currency = CURRENCIES[index % len(CURRENCIES)]
+        self.time_zone = TIME_ZONES[index % len(TIME_ZONES)]
+        self.today = today or date.today()
+        self._lock = threading.Lock()
+        self._views: Dict[str, Tuple[pd.DataFrame, Optional[str]]] = {}
+        self._generate(shape, np.random.default_rng((seed, index)))
+
+    def _generate(self, shape: AccountShape, rng: np.random.Generator) -> None:
+        customer_path = f"customers/{self.customer_id}"
+        scale = CURRENCY_SCALE[self.currency]
+        id_base = 10_000_000 * (self.index + 1)
+
+        n_campaigns = shape.campaigns
+        campaign_ids = id_base + np.arange(1, n_campaigns + 1)
+        budget_ids = campaign_ids + 5_000_000
+        themes = rng.choice(CAMPAIGN_THEMES, n_campaigns)
+        self.customer = pd.DataFrame({
+            "customer.id": [self.customer_id],
+            "customer.resource_name": [customer_path],
+            "customer.descriptive_name": [f"Stand-in Account {self.index + 1} ({self.currency})"],
+            "customer.currency_code": [self.currency],
+            "customer.time_zone": [self.time_zone],
+            "customer.manager": [False],
+            "customer.status": ["ENABLED"],
+        })
+        start_dates = [
+            (self.today - timedelta(days=int(days))).isoformat()
+            for days in rng.integers(shape.days, shape.days + 400, n_campaigns)
+        ]
+        self.campaigns = pd.DataFrame({
+            "campaign.id": campaign_ids,
+            "campaign.resource_name": [f"{customer_path}/campaigns/{i}" for i in campaign_ids],
+            "campaign.name": [f"{theme} - Search #{n + 1}" for n, theme in enumerate(themes)],
+            "campaign.status": rng.choice(["ENABLED", "PAUSED", "REMOVED"], n_campaigns, p=[0.75, 0.2, 0.05]),
+            "campaign.advertising_channel_type": "SEARCH",
+            # Newer API versions name the dates start_date_time/end_date_time
+            "campaign.start_date": start_dates,
+            "campaign.start_date_time": [f"{day} 00:00:00" for day in start_dates],
+            "campaign.end_date": "",
+            "campaign.end_date_time": "",
+            "campaign.campaign_budget": [f"{customer_path}/campaignBudgets/{i}" for i in budget_ids],
+            "campaign_budget.id": budget_ids,
+            "campaign_budget.resource_name": [f"{customer_path}/campaignBudgets/{i}" for i in budget_ids],
+            "campaign_budget.amount_micros": (np.round(rng.lognormal(np.log(60 * scale), 0.6, n_campaigns), 2) * 1_000_000).astype(np.int64),
+            "campaign_budget.delivery_method": "STANDARD",
+        })
+
+        n_ad_groups = n_campaigns * shape.ad_groups
+        ad_group_campaign = np.repeat(np.arange(n_campaigns), shape.ad_groups)
+        ad_group_ids = id_base + 1_000_000 + np.arange(1, n_ad_groups + 1)
+        self.ad_groups = pd.DataFrame({
+            "ad_group.id": ad_group_ids,
+            "ad_group.resource_name": [f"{customer_path}/adGroups/{i}" for i in ad_group_ids],
+            "ad_group.name": [f"Ad group {n % shape.ad_groups + 1}" for n in range(n_ad_groups)],
+            "ad_group.campaign": self.campaigns["campaign.resource_name"].to_numpy()[ad_group_campaign],
+            "ad_group.status": rng.choice(["ENABLED", "PAUSED", "REMOVED"], n_ad_groups, p=[0.85, 0.1, 0.05]),
+            "ad_group.cpc_bid_micros": (np.round(rng.uniform(0.4, 3.0, n_ad_groups) * scale, 2) * 1_000_000).astype(np.int64),
+            "campaign.id": campaign_ids[ad_group_campaign],
+        })
+
+        n_keywords = n_ad_groups * shape.keywords
+        keyword_ad_group = np.repeat(np.arange(n_ad_groups), shape.keywords)
+        criterion_ids = id_base + 2_000_000 + np.arange(1, n_keywords + 1)
+        words = rng.choice(KEYWORD_WORDS, (n_keywords, 2))
+        bids = self.ad_groups["ad_group.cpc_bid_micros"].to_numpy()[keyword_ad_group] * rng.uniform(0.7, 1.4, n_keywords)
+        texts = [f"{first} {second}" for first, second in words]
+        self.keywords = pd.DataFrame({
+            "_kw": np.arange(n_keywords),
+            "ad_group_criterion.criterion_id": criterion_ids,
+            "ad_group_criterion.resource_name": [
+                f"{customer_path}/adGroupCriteria/{ad_group_ids[a]}~{c}" for a, c in zip(keyword_ad_group, criterion_ids)
+            ],
+            "ad_group_criterion.keyword.text": texts,
+            "ad_group_criterion.keyword.match_type": rng.choice(MATCH_TYPES, n_keywords),
+            "ad_group_criterion.ad_group": self.ad_groups["ad_group.resource_name"].to_numpy()[keyword_ad_group],
+            "ad_group_criterion.status": rng.choice(["ENABLED", "PAUSED", "REMOVED"], n_keywords, p=[0.85, 0.1, 0.05]),
+            "ad_group_criterion.cpc_bid_micros": (np.round(bids / 10_000) * 10_000).astype(np.int64),
+            "ad_group_criterion.quality_info.quality_score": rng.integers(1, 11, n_keywords),
+            "search_term_view.search_term": [f"{text} {word}" for text, word in zip(texts, rng.choice(KEYWORD_WORDS, n_keywords))],
+            "ad_group.id": ad_group_ids[keyword_ad_group],
+            "campaign.id": campaign_ids[ad_group_campaign[keyword_ad_group]],
+        })
+
+        # Daily facts per keyword; activity stops at a random day for anything not enabled
+        days = np.array([self.today - timedelta(days=d) for d in range(shape.days - 1, -1, -1)])
+        weekday = np.array([day.weekday() for day in days])
+        season = np.where(weekday >= 5, 0.8, 1.05) * rng.uniform(0.85, 1.15, shape.days)
+        volume = rng.lognormal(2.5, 1.2, n_keywords)
+        impressions = rng.poisson(volume[:, None] * season[None, :])
+        enabled = (
+            (self.keywords["ad_group_criterion.status"].to_numpy() == "ENABLED")
+            & (self.ad_groups["ad_group.status"].to_numpy()[keyword_ad_group] == "ENABLED")
+            & (self.campaigns["campaign.status"].to_numpy()[ad_group_campaign[keyword_ad_group]] == "ENABLED")
+        )
+        stopped_at = np.where(enabled, shape.days, rng.integers(0, shape.days, n_keywords))
+        impressions[np.arange(shape.days)[None, :] >= stopped_at[:, None]] = 0
+        clicks = rng.binomial(impressions, rng.beta(2, 40, n_keywords)[:, None])
+        conversions = rng.binomial(clicks, rng.beta(2, 40, n_keywords)[:, None]).astype(np.float64)
+        cpc = bids * rng.uniform(0.5, 1.0, n_keywords)
+        cost = np.round(clicks * cpc[:, None] * rng.gamma(20, 0.05, clicks.shape), -4).astype(np.int64)
+        value = conversions * (rng.lognormal(np.log(80 * scale), 0.4, n_keywords))[:, None]
+
+        keyword_index, day_index = np.nonzero(impressions)
+        self.facts = pd.DataFrame({
+            "_kw": keyword_index,
+            "segments.date": np.array([day.isoformat() for day in days])[day_index],
+            "metrics.impressions": impressions[keyword_index, day_index],
+            "metrics.clicks": clicks[keyword_index, day_index],
+            "metrics.conversions": conversions[keyword_index, day_index],
+            "metrics.cost_micros": cost[keyword_index, day_index],
+            "metrics.conversions_value": np.round(value[keyword_index, day_index], 2),
+            "customer.id": self.customer_id,
+            "campaign.id": self.keywords["campaign.id"].to_numpy()[keyword_index],
+            "ad_group.id": self.keywords["ad_group.id"].to_numpy()[keyword_index],
+        })
+
+    def view(self, resource: str) -> Tuple[pd.DataFrame, Optional[str]]:
+        """Attribute table of a FROM resource and the fact column it aggregates metrics by"""
+        with self._lock:
+            if resource not in self._views:
+                self._views[resource] = self._build_view(resource)
+            return self._views[resource]
+
+    def _build_view(self, resource: str) -> Tuple[pd.DataFrame, Optional[str]]:
+        def with_customer(frame: pd.DataFrame) -> pd.DataFrame:
+            return frame.assign(**{column: self.customer[column].iloc[0] for column in self.customer.columns})
+
+        campaigns = self.campaigns
+        if resource == "customer":
+            return self.customer, "customer.id"
+        if resource == "campaign":
+            return with_customer(campaigns), "campaign.id"
+        if resource == "campaign_budget":
+            budget_columns = [column for column in campaigns.columns if column.startswith("campaign_budget.")]
+            return with_customer(campaigns[budget_columns]), None
+        ad_groups = self.ad_groups.merge(campaigns, on="campaign.id", how="left")
+        if resource == "ad_group":
+            return with_customer(ad_groups), "ad_group.id"
+        if resource in ("keyword_view", "ad_group_criterion", "search_term_view"):
+            keywords = self.keywords.merge(ad_groups.drop(columns=["campaign.id"]), on="ad_group.id", how="left")
+            return with_customer(keywords), ("_kw" if resource != "ad_group_criterion" else None)
+        raise GaqlError("BAD_RESOURCE_TYPE_IN_FROM_CLAUSE", f"Resource not served by the stand-in: {resource}")
+
+    def run(self, query: Query) -> pd.DataFrame:
+        """Rows of a parsed query as a frame of the selected fields, in SELECT order"""
+        frame, grain = self.view(query.resource)
+        referenced = set(query.fields) | {c.field for c in query.conditions} | {field for field, _ in query.order}
+        uses_metrics = any(field.startswith("metrics.") for field in referenced)
+        segmented = "segments.date" in query.fields
+        for field in referenced:
+            if field.startswith("segments.") and field != "segments.date":
+                raise GaqlError("UNRECOGNIZED_FIELD", f"Segment not served by the stand-in: {field}")
+        if (uses_metrics or segmented) and grain is None:
+            raise GaqlError("PROHIBITED_METRIC_IN_SELECT_OR_WHERE_CLAUSE", f"{query.resource} has no metrics or segments")
+
+        attribute_conditions = [c for c in query.conditions if not c.field.startswith(("metrics.", "segments."))]
+        date_conditions = [c for c in query.conditions if c.field == "segments.date"]
+        metric_conditions = [c for c in query.conditions if c.field.startswith("metrics.")]
+
+        frame = frame[self._mask(frame, attribute_conditions)]
+        if uses_metrics or segmented or date_conditions:
+            facts = self.facts[self._mask(self.facts, date_conditions)]
+            keys = [grain, "segments.date"] if segmented else [grain]
+            totals = facts.groupby(keys, sort=False)[list(METRIC_FIELDS)].sum().reset_index()
+            if segmented:
+                frame = frame.merge(totals, on=grain, how="inner")
+            else:
+                frame = frame.merge(totals, on=grain, how="left")
+                frame[list(METRIC_FIELDS)] = frame[list(METRIC_FIELDS)].fillna(0)
+            frame = self._derive(frame)
+        frame = frame[self._mask(frame, metric_conditions)]
+
+        if query.order:
+            for field, _ in query.order:
+                self._require(frame, field)
+            frame = frame.sort_values(
+                [field for field, _ in query.order],
+                ascending=[not descending for _, descending in query.order],
+                kind="stable"
+            )
+        if query.limit is not None:
+            if query.limit <= 0:
+                raise GaqlError("LIMIT_VALUE_TOO_LOW", "LIMIT must be positive")
+            frame = frame.head(query.limit)
+        for field in query.fields:
+            self._require(frame, field)
+        return frame[query.fields].reset_index(drop=True)
+
+    @staticmethod
+    def _derive(frame: pd.DataFrame) -> pd.DataFrame:
+        impressions = frame["metrics.impressions"].to_numpy(dtype=np.float64)
+        clicks = frame["metrics.clicks"].to_numpy(dtype=np.float64)
+        conversions = frame["metrics.conversions"].to_numpy(dtype=np.float64)
+        cost = frame["metrics.cost_micros"].to_numpy(dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return frame.assign(**{
+                "metrics.impressions": frame["metrics.impressions"].astype(np.int64),
+                "metrics.clicks": frame["metrics.clicks"].astype(np.int64),
+                "metrics.cost_micros": frame["metrics.cost_micros"].astype(np.int64),
+                "metrics.ctr": np.where(impressions > 0, clicks / impressions, 0.0),
+                "metrics.average_cpc": np.where(clicks > 0, cost / clicks, 0.0),
+                "metrics.cost_per_conversion": np.where(conversions > 0, cost / conversions, 0.0),
+            })
+
+    def _mask(self, frame: pd.DataFrame, conditions: Sequence[Condition]) -> np.ndarray:
+        mask = np.ones(len(frame), dtype=bool)
+        for condition in conditions:
+            self._require(frame, condition.field)
+            mask &= condition_mask(frame[condition.field], condition, self.today)
+        return mask
+
+    @staticmethod
+    def _require(frame: pd.DataFrame, field: str) -> None:
+        if field not in frame.columns:
+            raise GaqlError("UNRECOGNIZED_FIELD", f"Unrecognized field: {field}")
+
+    def update(self, table: str, key_column: str, key: Any, values: Dict[str, Any]) -> bool:
+        """Set columns of one entity (False if it does not exist); drops the views built from it"""
+        with self._lock:
+            frame = getattr(self, table)
+            rows = frame.index[frame[key_column] == key]
+            if len(rows) == 0:
+                return False
+            for column, value in values.items():
+                frame.loc[rows, column] = value
+            self._views.clear()
+            return True
+
+
+class GoogleAdsAccounts:
+    """The stand-in's accounts, generated on first use, plus a cache of evaluated queries"""
+
+    def __init__(self, accounts: int = 3, shape: Optional[AccountShape] = None, seed: int = 0,
+                 query_cache_size: int = 256):
+        self.count = accounts
+        self.shape = shape or AccountShape()
+        self.seed = seed
+        self._accounts: Dict[int, GoogleAdsAccount] = {}
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[Tuple[int, str], pd.DataFrame]" = OrderedDict()
+        self._cache_size = query_cache_size
+
+    @property
+    def customer_ids(self) -> List[int]:
+        return [CUSTOMER_ID_BASE + index for index in range(self.count)]
+
+    def get(self, customer_id: Any) -> Optional[GoogleAdsAccount]:
+        try:
+            index = int(str(customer_id).replace("-", "")) - CUSTOMER_ID_BASE
+        except ValueError:
+            return None
+        if not 0 <= index < self.count:
+            return None
+        with self._lock:
+            if index not in self._accounts:
+                self._accounts[index] = GoogleAdsAccount(index, self.shape, self.seed)
+            return self._accounts[index]
+
+    def search(self, account: GoogleAdsAccount, gaql: str) -> pd.DataFrame:
+        """Evaluate a query, reusing the result of an identical earlier query until the account changes"""
+        key = (account.customer_id, " ".join(gaql.split()))
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        result = account.run(parse_query(gaql))
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self._cache_size:
+                self._results.popitem(last=False)
+        return result
+
+    def invalidate(self, account: GoogleAdsAccount) -> None:
+        with self._lock:
+            for key in [key for key in self._results if key[0] == account.customer_id]:
+                del self._results[key]
@@ -0,0 +1,400 @@
+"""
+Stand-in Google Ads API gRPC server
+
+Serves ``GoogleAdsService`` (``Search``, ``SearchStream``), ``CustomerService``
+(``ListAccessibleCustomers``) and the mutate calls the optimizer issues
+(``CampaignBudgetService``, ``AdGroupCriterionService``, ``CampaignService``
+updates and removals) over a plaintext channel, using the client library's
+own message types, so responses decode exactly as the real API's do. Errors
+carry a ``GoogleAdsFailure`` in the trailing metadata like the API's: bad
+queries, unknown customers and failed mutates raise ``GoogleAdsException``,
+while throttled calls (``RESOURCE_EXHAUSTED``, with a retry delay) and
+injected errors (``INTERNAL``) reach the caller as the gRPC errors the client
+library passes through unconverted.
+
+    cd backend && python -m stand_ins.google_ads_server --port 50051 --accounts 5 --latency-ms 120
+
+Then set ``GOOGLE_ADS_ENDPOINT=localhost:50051`` and ``GOOGLE_ADS_INSECURE=true``.
+"""
+
+import argparse
+import itertools
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import grpc
+import numpy as np
+import pandas as pd
+from google.ads.googleads.client import _DEFAULT_VERSION
+from google.protobuf.descriptor import FieldDescriptor
+
+from stand_ins.faults import ERROR, THROTTLED, FaultInjector, FaultProfile
+from stand_ins.google_ads_data import AccountShape, GaqlError, GoogleAdsAccount, GoogleAdsAccounts
+
+# Rows per Search page (the API's fixed page size)
+PAGE_SIZE = 10_000
+# Rows per SearchStream message
+STREAM_BATCH_SIZE = 10_000
+# Serialized Search pages kept, so repeated queries cost the stand-in next to nothing
+PAGE_CACHE_SIZE = 512
+
+# Per mutate service: method, types module, resource, mutated account table, GAQL prefix of its columns
+MUTATE_TARGETS = {
+    "CampaignBudgetService": ("MutateCampaignBudgets", "campaign_budget_service", "CampaignBudget", "campaigns", "campaign_budget"),
+    "AdGroupCriterionService": ("MutateAdGroupCriteria", "ad_group_criterion_service", "AdGroupCriterion", "keywords", "ad_group_criterion"),
+    "CampaignService": ("MutateCampaigns", "campaign_service", "Campaign", "campaigns", "campaign"),
+}
+
+
+def enum_number(field: FieldDescriptor, name: str) -> int:
+    return field.enum_type.values_by_name[name].number
+
+
+class RowWriter:
+    """Fills raw ``GoogleAdsRow`` messages from a result frame's GAQL columns"""
+
+    def __init__(self, row_class, fields: List[str]):
+        self.row_class = row_class
+        self.paths = []
+        for field in fields:
+            parts = field.split(".")
+            descriptor = row_class.DESCRIPTOR
+            for part in parts:
+                leaf = descriptor.fields_by_name.get(part) if descriptor is not None else None
+                if leaf is None:
+                    # Fields of other API versions are rejected, as the API itself does
+                    raise GaqlError("UNRECOGNIZED_FIELD", f"Unrecognized field in the query: '{field}'.")
+                descriptor = leaf.message_type
+            self.paths.append((field, parts[:-1], parts[-1], leaf))
+
+    def column(self, values: pd.Series, leaf: FieldDescriptor) -> List[Any]:
+        if leaf.type == FieldDescriptor.TYPE_ENUM:
+            numbers = {value.name: value.number for value in leaf.enum_type.values}
+            return [numbers.get(value, 1) for value in values]  # 1 is UNKNOWN
+        if leaf.cpp_type in (FieldDescriptor.CPPTYPE_INT64, FieldDescriptor.CPPTYPE_INT32):
+            return values.to_numpy(dtype=np.int64).tolist()
+        if leaf.cpp_type in (FieldDescriptor.CPPTYPE_DOUBLE, FieldDescriptor.CPPTYPE_FLOAT):
+            return values.to_numpy(dtype=np.float64).tolist()
+        if leaf.cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+            return values.astype(bool).tolist()
+        return values.astype(str).tolist()
+
+    def write(self, frame: pd.DataFrame, results) -> None:
+        """Append a row per frame row to a repeated ``GoogleAdsRow`` field"""
+        columns = [(parents, name, self.column(frame[field], leaf)) for field, parents, name, leaf in self.paths]
+        for index in range(len(frame)):
+            row = results.add()
+            for parents, name, values in columns:
+                target = row
+                for parent in parents:
+                    target = getattr(target, parent)
+                setattr(target, name, values[index])
+
+
+class GoogleAdsStandIn:
+    """Synthetic accounts behind the Google Ads gRPC services"""
+
+    def __init__(self, accounts: int = 3, shape: Optional[AccountShape] = None,
+                 faults: Optional[FaultProfile] = None, version: str = _DEFAULT_VERSION, seed: int = 0):
+        self.version = version
+        self.accounts = GoogleAdsAccounts(accounts, shape, seed=seed)
+        self.faults = FaultInjector(faults)
+        self.server: Optional[grpc.Server] = None
+        self.port: Optional[int] = None
+        self._request_ids = itertools.count(1)
+        self._calls: Dict[str, int] = {}
+        self._calls_lock = threading.Lock()
+        self._pages: "OrderedDict[Tuple[int, str, str, bool], bytes]" = OrderedDict()
+        self._pages_lock = threading.Lock()
+
+        services = f"google.ads.googleads.{version}.services.types"
+        self._ga = import_module(f"{services}.google_ads_service")
+        self._customers = import_module(f"{services}.customer_service")
+        self._errors = import_module(f"google.ads.googleads.{version}.errors.types.errors")
+        self._row_class = self._ga.GoogleAdsRow.pb()
+        self._failure_class = self._errors.GoogleAdsFailure.pb()
+        self._failure_key = f"google.ads.googleads.{version}.errors.googleadsfailure-bin"
+
+    # Server lifecycle
+
+    def start(self, host: str = "127.0.0.1", port: int = 0, workers: int = 16) -> int:
+        """Start serving (port 0 picks a free port); returns the bound port"""
+        self.server = grpc.server(ThreadPoolExecutor(max_workers=workers, thread_name_prefix="google-ads-stand-in"))
+        self.server.add_generic_rpc_handlers(self._handlers())
+        self.port = self.server.add_insecure_port(f"{host}:{port}")
+        self.server.start()
+        return self.port
+
+    def stop(self, grace: Optional[float] = None) -> None:
+        if self.server is not None:
+            self.server.stop(grace)
+            self.server = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._calls_lock:
+            calls = dict(self._calls)
+        return {"calls": calls, "faults": self.faults.stats()}
+
+    def _handlers(self):
+        prefix = f"google.ads.googleads.{self.version}.services"
+        ga, customers = self._ga, self._customers
+        handlers = [
+            grpc.method_handlers_generic_handler(f"{prefix}.GoogleAdsService", {
+                "Search": grpc.unary_unary_rpc_method_handler(
+                    self._wrap("Search", self.search),
+                    request_deserializer=ga.SearchGoogleAdsRequest.pb().FromString,
+                    response_serializer=bytes  # pages are cached serialized
+                ),
+                "SearchStream": grpc.unary_stream_rpc_method_handler(
+                    self._wrap("SearchStream", self.search_stream),
+                    request_deserializer=ga.SearchGoogleAdsStreamRequest.pb().FromString,
+                    response_serializer=lambda message: message.SerializeToString()
+                ),
+            }),
+            grpc.method_handlers_generic_handler(f"{prefix}.CustomerService", {
+                "ListAccessibleCustomers": grpc.unary_unary_rpc_method_handler(
+                    self._wrap("ListAccessibleCustomers", self.list_accessible_customers),
+                    request_deserializer=customers.ListAccessibleCustomersRequest.pb().FromString,
+                    response_serializer=lambda message: message.SerializeToString()
+                ),
+            }),
+        ]
+        for service, (method, module, resource, table, prefix_name) in MUTATE_TARGETS.items():
+            types = import_module(f"{prefix}.types.{module}")
+            request_class = getattr(types, f"{method}Request").pb()
+            mutate = self._mutate_handler(
+                table, prefix_name,
+                getattr(types, f"{method}Response").pb(),
+                getattr(types, f"Mutate{resource}Result").pb()
+            )
+            handlers.append(grpc.method_handlers_generic_handler(f"{prefix}.{service}", {
+                method: grpc.unary_unary_rpc_method_handler(
+                    self._wrap(method, mutate),
+                    request_deserializer=request_class.FromString,
+                    response_serializer=lambda message: message.SerializeToString()
+                ),
+            }))
+        return handlers
+
+    # Failures
+
+    def _abort(self, context: grpc.ServicerContext, status: grpc.StatusCode, error_field: str,
+               error_name: str, message: str, retry_delay: Optional[float] = None):
+        """End the call with a GoogleAdsFailure the client turns into GoogleAdsException"""
+        request_id = f"stand-in-{next(self._request_ids)}"
+        failure = self._failure_class()
+        failure.request_id = request_id
+        error = failure.errors.add()
+        code_field = error.error_code.DESCRIPTOR.fields_by_name[error_field]
+        setattr(error.error_code, error_field, enum_number(code_field, error_name))
+        error.message = message
+        if retry_delay is not None:
+            error.details.quota_error_details.retry_delay.seconds = math.ceil(retry_delay)
+        context.set_trailing_metadata((
+            (self._failure_key, failure.SerializeToString()),
+            ("request-id", request_id),
+        ))
+        context.abort(status, message)
+
+    def _wrap(self, method: str, handler: Callable) -> Callable:
+        """Count the call, inject latency and faults, and map stand-in errors to API failures"""
+
+        def admit(context: grpc.ServicerContext) -> None:
+            with self._calls_lock:
+                self._calls[method] = self._calls.get(method, 0) + 1
+            outcome = self.faults.apply()
+            if outcome == THROTTLED:
+                self._abort(
+                    context, grpc.StatusCode.RESOURCE_EXHAUSTED, "quota_error", "RESOURCE_EXHAUSTED",
+                    "Too many requests. Retry in a few seconds.", retry_delay=self.faults.retry_after()
+                )
+            if outcome == ERROR:
+                self._abort(context, grpc.StatusCode.INTERNAL, "internal_error", "INTERNAL_ERROR",
+                            "An internal error has occurred.")
+
+        def call(request, context):
+            admit(context)
+            try:
+                return handler(request, context)
+            except GaqlError as e:
+                self._abort(context, grpc.StatusCode.INVALID_ARGUMENT, "query_error", e.code, str(e))
+
+        def stream(request, context):
+            admit(context)
+            try:
+                yield from handler(request, context)
+            except GaqlError as e:
+                self._abort(context, grpc.StatusCode.INVALID_ARGUMENT, "query_error", e.code, str(e))
+
+        return stream if method == "SearchStream" else call
+
+    def _account(self, customer_id: str, context: grpc.ServicerContext) -> GoogleAdsAccount:
+        account = self.accounts.get(customer_id)
+        if account is None:
+            self._abort(
+                context, grpc.StatusCode.PERMISSION_DENIED, "authorization_error", "USER_PERMISSION_DENIED",
+                f"User doesn't have permission to access customer {customer_id}."
+            )
+        return account
+
+    # Handlers
+
+    def list_accessible_customers(self, request, context):
+        response = self._customers.ListAccessibleCustomersResponse.pb()()
+        response.resource_names.extend(f"customers/{customer_id}" for customer_id in self.accounts.customer_ids)
+        return response
+
+    def search(self, request, context) -> bytes:
+        account = self._account(request.customer_id, context)
+        with_total = request.search_settings.return_total_results_count
+        key = (account.customer_id, " ".join(request.query.split()), request.page_token, with_total)
+        with self._pages_lock:
+            if key in self._pages:
+                self._pages.move_to_end(key)
+                return self._pages[key]
+
+        frame = self.accounts.search(account, request.query)
+        offset = 0
+        if request.page_token:
+            try:
+                offset = int(request.page_token)
+            except ValueError:
+                offset = -1
+            if not 0 <= offset < len(frame):
+                self._abort(context, grpc.StatusCode.INVALID_ARGUMENT, "request_error", "INVALID_PAGE_TOKEN",
+                            "Page token is invalid.")
+
+        response = self._ga.SearchGoogleAdsResponse.pb()()
+        RowWriter(self._row_class, list(frame.columns)).write(frame.iloc[offset:offset + PAGE_SIZE], response.results)
+        response.field_mask.paths.extend(frame.columns)
+        if offset + PAGE_SIZE < len(frame):
+            response.next_page_token = str(offset + PAGE_SIZE)
+        if with_total:
+            response.total_results_count = len(frame)
+        page = response.SerializeToString()
+        with self._pages_lock:
+            self._pages[key] = page
+            while len(self._pages) > PAGE_CACHE_SIZE:
+                self._pages.popitem(last=False)
+        return page
+
+    def search_stream(self, request, context):
+        account = self._account(request.customer_id, context)
+        frame = self.accounts.search(account, request.query)
+        writer = RowWriter(self._row_class, list(frame.columns))
+        response_class = self._ga.SearchGoogleAdsStreamResponse.pb()
+        for start in range(0, max(len(frame), 1), STREAM_BATCH_SIZE):
+            response = response_class()
+            writer.write(frame.iloc[start:start + STREAM_BATCH_SIZE], response.results)
+            response.field_mask.paths.extend(frame.columns)
+            yield response
+
+    def _invalidate(self, account: GoogleAdsAccount) -> None:
+        """Forget cached results of an account after a mutation"""
+        self.accounts.invalidate(account)
+        with self._pages_lock:
+            for key in [key for key in self._pages if key[0] == account.customer_id]:
+                del self._pages[key]
+
+    def _mutate_handler(self, table: str, prefix: str, response_class, result_class) -> Callable:
+        """Mutate handler for one resource: updates by field mask and removals, with partial failure"""
+
+        def mutate(request, context):
+            account = self._account(request.customer_id, context)
+            response = response_class()
+            failures = []
+            for index, operation in enumerate(request.operations):
+                resource_name, error = self._apply_operation(account, table, prefix, operation)
+                result = response.results.add()
+                if error is None:
+                    result.resource_name = resource_name
+                else:
+                    failures.append((index, error))
+            if failures:
+                message = "; ".join(f"operations[{index}]: {error}" for index, error in failures)
+                if not request.partial_failure:
+                    self._abort(context, grpc.StatusCode.INVALID_ARGUMENT, "mutate_error", "RESOURCE_NOT_FOUND", message)
+                # Like the API: one GoogleAdsError per failed operation, located by its index
+                failure = self._failure_class()
+                for index, error in failures:
+                    entry = failure.errors.add()
+                    entry.error_code.mutate_error = enum_number(
+                        entry.error_code.DESCRIPTOR.fields_by_name["mutate_error"], "RESOURCE_NOT_FOUND"
+                    )
+                    entry.message = error
+                    element = entry.location.field_path_elements.add()
+                    element.field_name = "operations"
+                    element.index = index
+                response.partial_failure_error.code = grpc.StatusCode.INVALID_ARGUMENT.value[0]
+                response.partial_failure_error.message = message
+                response.partial_failure_error.details.add().Pack(failure)
+            self._invalidate(account)
+            return response
+
+        return mutate
+
+    def _apply_operation(self, account: GoogleAdsAccount, table: str, prefix: str,
+                         operation) -> Tuple[str, Optional[str]]:
+        kind = operation.WhichOneof("operation")
+        if kind == "remove":
+            if f"{prefix}.status" not in getattr(account, table).columns:
+                return operation.remove, "Resource cannot be removed by the stand-in"
+            found = account.update(table, f"{prefix}.resource_name", operation.remove, {f"{prefix}.status": "REMOVED"})
+            return operation.remove, None if found else "Resource not found"
+        if kind != "update":
+            return "", "Only update and remove operations are supported by the stand-in"
+
+        values = {}
+        for path in operation.update_mask.paths:
+            target = operation.update
+            parts = path.split(".")
+            for part in parts[:-1]:
+                target = getattr(target, part)
+            descriptor = target.DESCRIPTOR.fields_by_name.get(parts[-1])
+            column = f"{prefix}.{path}"
+            if descriptor is None or column not in getattr(account, table).columns:
+                return operation.update.resource_name, f"Field not supported by the stand-in: {path}"
+            value = getattr(target, parts[-1])
+            if descriptor.type == FieldDescriptor.TYPE_ENUM:
+                value = descriptor.enum_type.values_by_number[value].name
+            values[column] = value
+        found = account.update(table, f"{prefix}.resource_name", operation.update.resource_name, values)
+        return operation.update.resource_name, None if found else "Resource not found"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in Google Ads API gRPC server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=50051)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--campaigns", type=int, default=10, help="Campaigns per account")
+    parser.add_argument("--ad-groups", type=int, default=5, help="Ad groups per campaign")
+    parser.add_argument("--keywords", type=int, default=20, help="Keywords per ad group")
+    parser.add_argument("--days", type=int, default=90, help="Days of daily metrics")
+    parser.add_argument("--version", default=_DEFAULT_VERSION, help="Google Ads API version to serve")
+    FaultProfile.add_arguments(parser)
+    args = parser.parse_args()
+
+    stand_in = GoogleAdsStandIn(
+        accounts=args.accounts,
+        shape=AccountShape(args.campaigns, args.ad_groups, args.keywords, args.days),
+        faults=FaultProfile.from_args(args),
+        version=args.version,
+        seed=args.seed
+    )
+    port = stand_in.start(args.host, args.port)
+    print(f"🧪 Google Ads stand-in ({args.version}) on {args.host}:{port}, customers: "
+          f"{', '.join(str(c) for c in stand_in.accounts.customer_ids)}")
+    print(f"   GOOGLE_ADS_ENDPOINT={args.host}:{port} GOOGLE_ADS_INSECURE=true")
+    try:
+        stand_in.server.wait_for_termination()
+    except KeyboardInterrupt:
+        stand_in.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,654 @@
+"""
+Synthetic Meta ad accounts and the Marketing API reads and writes over them
+
+An account is generated from its index and the seed: campaigns, ad sets and
+ads with statuses, budgets and targeting, plus per-ad daily metrics and action
+counts for the last ``days`` days. Ad set, campaign and account insights are
+sums of the ad facts, so every level of a report agrees with the others (reach
+is deduplicated across days with a fixed overlap, as it is not additive).
+
+Objects come back as the API shapes them: only the requested ``fields``,
+numbers in insights as strings, budgets in minor currency units, and
+``DELETED`` objects hidden unless a filter asks for them. Unsupported requests
+raise ``GraphError`` with the code and message the API would answer.
+"""
+
+import json
+import re
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ACCOUNT_ID_BASE = 880000001
+# Graph object ids: base + account index, kind and position
+OBJECT_ID_BASE = 120_200_000_000_000_000
+KINDS = {"campaign": 1, "adset": 2, "ad": 3}
+KIND_NAMES = {number: kind for kind, number in KINDS.items()}
+
+CURRENCIES = ("USD", "EUR", "GBP", "AED", "BRL", "INR")
+TIME_ZONES = ("America/Los_Angeles", "Europe/Berlin", "Europe/London", "Asia/Dubai", "America/Sao_Paulo", "Asia/Kolkata")
+# Currency units per USD, to keep synthetic spend plausible per account
+CURRENCY_SCALE = {"USD": 1.0, "EUR": 0.92, "GBP": 0.79, "AED": 3.67, "BRL": 5.0, "INR": 83.0}
+
+OBJECTIVES = ("OUTCOME_SALES", "OUTCOME_LEADS", "OUTCOME_TRAFFIC", "OUTCOME_AWARENESS", "OUTCOME_ENGAGEMENT")
+OPTIMIZATION_GOALS = {
+    "OUTCOME_SALES": "OFFSITE_CONVERSIONS",
+    "OUTCOME_LEADS": "LEAD_GENERATION",
+    "OUTCOME_TRAFFIC": "LINK_CLICKS",
+    "OUTCOME_AWARENESS": "REACH",
+    "OUTCOME_ENGAGEMENT": "POST_ENGAGEMENT",
+}
+AUDIENCES = ("Lookalike 1%", "Broad", "Interests", "Retargeting 30d", "Customers")
+STATUSES = ("ACTIVE", "PAUSED", "DELETED", "ARCHIVED")
+
+ACTION_TYPES = (
+    "link_click", "landing_page_view", "post_engagement", "page_engagement", "video_view",
+    "add_to_cart", "initiate_checkout", "purchase", "lead", "complete_registration",
+    "offsite_conversion.fb_pixel_purchase", "offsite_conversion.fb_pixel_lead",
+)
+CONVERSION_TYPES = ("purchase", "lead", "complete_registration")
+VALUE_TYPES = ("purchase", "offsite_conversion.fb_pixel_purchase")
+
+# Fields each object type can return
+ACCOUNT_FIELDS = (
+    "id", "account_id", "name", "account_status", "currency", "timezone_name",
+    "business", "amount_spent", "balance", "spend_cap", "disable_reason",
+)
+NODE_FIELDS = {
+    "campaign": (
+        "id", "name", "account_id", "objective", "status", "configured_status", "effective_status",
+        "buying_type", "created_time", "updated_time", "start_time", "stop_time", "daily_budget",
+        "lifetime_budget", "budget_remaining", "spend_cap", "special_ad_categories",
+    ),
+    "adset": (
+        "id", "name", "account_id", "campaign_id", "status", "configured_status", "effective_status",
+        "created_time", "updated_time", "start_time", "end_time", "daily_budget", "lifetime_budget",
+        "budget_remaining", "targeting", "optimization_goal", "billing_event", "bid_strategy",
+    ),
+    "ad": (
+        "id", "name", "account_id", "campaign_id", "adset_id", "status", "configured_status",
+        "effective_status", "created_time", "updated_time", "creative",
+    ),
+}
+# Fields a POST may change, per object type
+WRITABLE_FIELDS = {
+    "campaign": ("name", "status", "daily_budget", "lifetime_budget", "spend_cap", "objective"),
+    "adset": ("name", "status", "daily_budget", "lifetime_budget", "optimization_goal", "billing_event"),
+    "ad": ("name", "status"),
+}
+# Filtering fields that name another object's id, by the record key holding it
+FILTER_ALIASES = {"campaign.id": "campaign_id", "adset.id": "adset_id", "ad.id": "id"}
+
+LEVEL_FIELDS = {
+    "account": ("account_id", "account_name"),
+    "campaign": ("account_id", "account_name", "campaign_id", "campaign_name"),
+    "adset": ("account_id", "account_name", "campaign_id", "campaign_name", "adset_id", "adset_name"),
+    "ad": ("account_id", "account_name", "campaign_id", "campaign_name", "adset_id", "adset_name", "ad_id", "ad_name"),
+}
+INSIGHT_METRICS = (
+    "impressions", "clicks", "spend", "reach", "frequency", "ctr", "cpm", "cpp", "cpc",
+    "cost_per_unique_click", "unique_clicks", "unique_ctr", "actions", "conversions", "conversion_values",
+)
+DEFAULT_INSIGHT_FIELDS = ("impressions", "spend")
+# Reach overlap between days: reach over n days is the summed daily reach / (1 + overlap * (n - 1))
+REACH_OVERLAP = 0.08
+
+DATE_PRESET_DAYS = re.compile(r"^last_(\d+)d$")
+
+
+class GraphError(ValueError):
+    """A request the API would reject, shaped as its error payload"""
+
+    def __init__(self, code: int, message: str, status: int = 400, subcode: Optional[int] = None,
+                 transient: bool = False, error_type: str = "OAuthException"):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.subcode = subcode
+        self.transient = transient
+        self.error_type = error_type
+
+    def payload(self, trace_id: str = "") -> Dict[str, Any]:
+        error = {
+            "message": str(self),
+            "type": self.error_type,
+            "code": self.code,
+            "is_transient": self.transient,
+            "fbtrace_id": trace_id,
+        }
+        if self.subcode is not None:
+            error["error_subcode"] = self.subcode
+        return {"error": error}
+
+
+def unsupported(method: str, path: str) -> GraphError:
+    return GraphError(
+        100,
+        f"Unsupported {method.lower()} request. Object with ID '{path}' does not exist, cannot be loaded "
+        f"due to missing permissions, or does not support this operation.",
+        subcode=33,
+        error_type="GraphMethodException",
+    )
+
+
+def invalid_parameter(message: str) -> GraphError:
+    return GraphError(100, f"(#100) {message}")
+
+
+@dataclass
+class MetaAccountShape:
+    campaigns: int = 10
+    ad_sets: int = 3    # per campaign
+    ads: int = 3        # per ad set
+    days: int = 90
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """Top-level names of a ``fields`` parameter (``creative{id,name}`` becomes ``creative``)"""
+    if not value:
+        return None
+    if value.lstrip().startswith("["):
+        return [str(field) for field in json.loads(value)]
+    fields, depth, current = [], 0, ""
+    for char in value:
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            fields.append(current.strip())
+            current = ""
+        elif depth == 0:
+            current += char
+    if current.strip():
+        fields.append(current.strip())
+    return fields
+
+
+def parse_json_param(name: str, value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        raise invalid_parameter(f"Param {name} must be a JSON value")
+
+
+def matches(record: Dict[str, Any], rules: Sequence[Dict[str, Any]]) -> bool:
+    """Whether a record passes every ``filtering`` rule"""
+    for rule in rules:
+        value = record.get(FILTER_ALIASES.get(rule["field"], rule["field"]))
+        operator, expected = rule.get("operator", "EQUAL").upper(), rule.get("value")
+        if operator == "IN":
+            ok = value in [str(item) for item in expected]
+        elif operator == "NOT_IN":
+            ok = value not in [str(item) for item in expected]
+        elif operator == "EQUAL":
+            ok = value == str(expected)
+        elif operator == "NOT_EQUAL":
+            ok = value != str(expected)
+        elif operator == "CONTAIN":
+            ok = str(expected).lower() in str(value or "").lower()
+        elif operator == "NOT_CONTAIN":
+            ok = str(expected).lower() not in str(value or "").lower()
+        elif operator in ("GREATER_THAN", "LESS_THAN"):
+            try:
+                difference = float(value) - float(expected)
+            except (TypeError, ValueError):
+                raise invalid_parameter(f"Filtering field {rule['field']} is not numeric")
+            ok = difference > 0 if operator == "GREATER_THAN" else difference < 0
+        else:
+            raise invalid_parameter(f"Filtering operator {operator} is not supported")
+        if not ok:
+            return False
+    return True
+
+
+def parse_filtering(value: Any, kind: str) -> List[Dict[str, Any]]:
+    rules = parse_json_param("filtering", value) if value else []
+    if not isinstance(rules, list):
+        raise invalid_parameter("Param filtering must be an array")
+    allowed = set(NODE_FIELDS[kind]) | set(FILTER_ALIASES)
+    for rule in rules:
+        if not isinstance(rule, dict) or "field" not in rule:
+            raise invalid_parameter("Filtering rules need a field, an operator and a value")
+        if rule["field"] not in allowed:
+            raise invalid_parameter(f"Filtering field {rule['field']} is invalid")
+    return rules
+
+
+def graph_time(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%S+0000")
+
+
+def number(value: float, digits: int = 6) -> str:
+    """A metric the way insights format it: a string, without trailing zeros"""
+    text = f"{value:.{digits}f}".rstrip("0").rstrip(".")
+    return text or "0"
+
+
+class MetaAccount:
+    """One synthetic ad account: object records plus per-ad daily facts"""
+
+    def __init__(self, index: int, shape: MetaAccountShape, seed: int = 0, today: Optional[date] = None):
+        self.index = index
+        self.account_id = str(ACCOUNT_ID_BASE + index)
+        self.id = f"act_{self.account_id}"
+        self.currency = CURRENCIES[index % len(CURRENCIES)]
+        self.time_zone = TIME_ZONES[index % len(TIME_ZONES)]
+        self.name = f"Stand-in Ad Account {index + 1} ({self.currency})"
+        self.today = today or date.today()
+        self._lock = threading.Lock()
+        self._generate(shape, np.random.default_rng((seed, index, 1)))
+
+    def object_id(self, kind: str, position: int) -> str:
+        return str(OBJECT_ID_BASE + self.index * 10**10 + KINDS[kind] * 10**9 + position + 1)
+
+    def _generate(self, shape: MetaAccountShape, rng: np.random.Generator) -> None:
+        scale = CURRENCY_SCALE[self.currency]
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+
+        n_campaigns = shape.campaigns
+        objectives = rng.choice(OBJECTIVES, n_campaigns)
+        campaign_status = rng.choice(STATUSES, n_campaigns, p=[0.7, 0.2, 0.05, 0.05])
+        campaign_budget = np.round(rng.lognormal(np.log(50 * scale), 0.6, n_campaigns)) * 100
+        campaign_age = rng.integers(shape.days, shape.days + 300, n_campaigns)
+        self.campaigns: List[Dict[str, Any]] = []
+        for n in range(n_campaigns):
+            created = now - timedelta(days=int(campaign_age[n]), hours=int(rng.integers(0, 24)))
+            self.campaigns.append({
+                "id": self.object_id("campaign", n),
+                "name": f"{objectives[n].split('_')[1].title()} | {AUDIENCES[n % len(AUDIENCES)]} #{n + 1}",
+                "account_id": self.account_id,
+                "objective": str(objectives[n]),
+                "status": str(campaign_status[n]),
+                "buying_type": "AUCTION",
+                "created_time": graph_time(created),
+                "updated_time": graph_time(created + timedelta(days=int(rng.integers(0, campaign_age[n])))),
+                "start_time": graph_time(created),
+                "daily_budget": str(int(campaign_budget[n])),
+                "budget_remaining": str(int(campaign_budget[n] * rng.uniform(0, 1))),
+                "special_ad_categories": [],
+            })
+
+        n_ad_sets = n_campaigns * shape.ad_sets
+        ad_set_campaign = np.repeat(np.arange(n_campaigns), shape.ad_sets)
+        ad_set_status = rng.choice(STATUSES[:3], n_ad_sets, p=[0.8, 0.15, 0.05])
+        self.ad_sets: List[Dict[str, Any]] = []
+        for n in range(n_ad_sets):
+            campaign = self.campaigns[ad_set_campaign[n]]
+            self.ad_sets.append({
+                "id": self.object_id("adset", n),
+                "name": f"{AUDIENCES[(n + ad_set_campaign[n]) % len(AUDIENCES)]} - {25 + 5 * (n % 4)}+",
+                "account_id": self.account_id,
+                "campaign_id": campaign["id"],
+                "status": str(ad_set_status[n]),
+                "created_time": campaign["created_time"],
+                "updated_time": campaign["updated_time"],
+                "start_time": campaign["start_time"],
+                "targeting": {
+                    "age_min": int(18 + 5 * (n % 4)),
+                    "age_max": 65,
+                    "geo_locations": {"countries": [["US", "DE", "GB", "AE", "BR", "IN"][self.index % 6]]},
+                    "publisher_platforms": ["facebook", "instagram"],
+                },
+                "optimization_goal": OPTIMIZATION_GOALS[campaign["objective"]],
+                "billing_event": "IMPRESSIONS",
+                "bid_strategy": "LOWEST_COST_WITHOUT_CAP",
+            })
+
+        n_ads = n_ad_sets * shape.ads
+        ad_ad_set = np.repeat(np.arange(n_ad_sets), shape.ads)
+        ad_status = rng.choice(STATUSES[:3], n_ads, p=[0.8, 0.15, 0.05])
+        self.ads: List[Dict[str, Any]] = []
+        for n in range(n_ads):
+            ad_set = self.ad_sets[ad_ad_set[n]]
+            creative_id = str(OBJECT_ID_BASE + self.index * 10**10 + 4 * 10**9 + n + 1)
+            self.ads.append({
+                "id": self.object_id("ad", n),
+                "name": f"Creative {n % shape.ads + 1} - {['Video', 'Carousel', 'Image'][n % 3]}",
+                "account_id": self.account_id,
+                "campaign_id": ad_set["campaign_id"],
+                "adset_id": ad_set["id"],
+                "status": str(ad_status[n]),
+                "created_time": ad_set["created_time"],
+                "updated_time": ad_set["updated_time"],
+                "creative": {"id": creative_id, "name": f"Creative {creative_id[-6:]}"},
+            })
+        self._ad_set_campaign = ad_set_campaign
+        self._ad_campaign = ad_set_campaign[ad_ad_set]
+        self._ad_ad_set = ad_ad_set
+
+        # Daily facts per ad; delivery stops at a random day for anything not active
+        self.days = np.array([(self.today - timedelta(days=d)).isoformat() for d in range(shape.days - 1, -1, -1)])
+        weekday = np.array([date.fromisoformat(day).weekday() for day in self.days])
+        season = np.where(weekday >= 5, 1.1, 0.97) * rng.uniform(0.85, 1.15, shape.days)
+        volume = rng.lognormal(7.0, 1.0, n_ads)
+        impressions = rng.poisson(volume[:, None] * season[None, :])
+        active = (
+            (ad_status == "ACTIVE")
+            & (ad_set_status[ad_ad_set] == "ACTIVE")
+            & (campaign_status[self._ad_campaign] == "ACTIVE")
+        )
+        stopped_at = np.where(active, shape.days, rng.integers(0, shape.days, n_ads))
+        impressions[np.arange(shape.days)[None, :] >= stopped_at[:, None]] = 0
+
+        clicks = rng.binomial(impressions, rng.beta(2, 120, n_ads)[:, None])
+        landing = rng.binomial(clicks, 0.7)
+        engagement = clicks + rng.binomial(impressions, 0.008)
+        cart = rng.binomial(landing, 0.09)
+        checkout = rng.binomial(cart, 0.5)
+        sales = np.isin(objectives[self._ad_campaign], ("OUTCOME_SALES", "OUTCOME_TRAFFIC"))[:, None]
+        purchase = np.where(sales, rng.binomial(checkout, 0.55), rng.binomial(checkout, 0.1))
+        leads = np.where(objectives[self._ad_campaign] == "OUTCOME_LEADS", 0.08, 0.005)
+        lead = rng.binomial(landing, leads[:, None])
+        actions = {
+            "link_click": clicks,
+            "landing_page_view": landing,
+            "post_engagement": engagement,
+            "page_engagement": engagement + rng.binomial(impressions, 0.001),
+            "video_view": rng.binomial(impressions, 0.04),
+            "add_to_cart": cart,
+            "initiate_checkout": checkout,
+            "purchase": purchase,
+            "lead": lead,
+            "complete_registration": rng.binomial(landing, 0.02),
+            "offsite_conversion.fb_pixel_purchase": purchase,
+            "offsite_conversion.fb_pixel_lead": lead,
+        }
+        cpm = rng.lognormal(np.log(9 * scale), 0.35, n_ads)
+        self.facts = {
+            "impressions": impressions,
+            "reach": rng.binomial(impressions, rng.uniform(0.6, 0.9, n_ads)[:, None]),
+            "clicks": clicks,
+            "unique_clicks": rng.binomial(clicks, 0.88),
+            "spend": np.round(impressions * cpm[:, None] / 1000 * rng.gamma(25, 0.04, impressions.shape), 2),
+            "purchase_value": purchase * rng.lognormal(np.log(70 * scale), 0.3, n_ads)[:, None],
+        }
+        self.actions = np.stack([actions[action_type] for action_type in ACTION_TYPES], axis=-1)
+
+    # Objects
+
+    def node(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "account_id": self.account_id,
+            "name": self.name,
+            "account_status": 1,
+            "currency": self.currency,
+            "timezone_name": self.time_zone,
+            "business": {"id": str(3_000_000_000 + self.index), "name": f"Stand-in Business {self.index + 1}"},
+            "amount_spent": str(int(round(self.facts["spend"].sum() * 100))),
+            "balance": "0",
+            "spend_cap": "0",
+            "disable_reason": 0,
+        }
+
+    def records(self, kind: str) -> List[Dict[str, Any]]:
+        return {"campaign": self.campaigns, "adset": self.ad_sets, "ad": self.ads}[kind]
+
+    def find(self, kind: str, object_id: str) -> Optional[Dict[str, Any]]:
+        position = int(object_id) - int(self.object_id(kind, 0))
+        records = self.records(kind)
+        return records[position] if 0 <= position < len(records) else None
+
+    def effective_status(self, kind: str, record: Dict[str, Any]) -> str:
+        """The object's own status, or why a parent keeps it from delivering"""
+        if record["status"] != "ACTIVE" or kind == "campaign":
+            return record["status"]
+        campaign = self.find("campaign", record["campaign_id"])
+        if campaign["status"] != "ACTIVE":
+            return "CAMPAIGN_PAUSED" if campaign["status"] == "PAUSED" else campaign["status"]
+        if kind == "ad":
+            ad_set = self.find("adset", record["adset_id"])
+            if ad_set["status"] != "ACTIVE":
+                return "ADSET_PAUSED" if ad_set["status"] == "PAUSED" else ad_set["status"]
+        return "ACTIVE"
+
+    def shape(self, kind: str, record: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+        """A record restricted to the requested fields (id and name by default)"""
+        allowed = NODE_FIELDS[kind]
+        for field in fields or ():
+            if field not in allowed:
+                raise invalid_parameter(f"Tried accessing nonexisting field ({field}) on node type ({kind.title()})")
+        full = dict(record, configured_status=record["status"], effective_status=self.effective_status(kind, record))
+        return {field: full[field] for field in (fields or ("id", "name")) if full.get(field) is not None}
+
+    def list(self, kind: str, rules: Sequence[Dict[str, Any]], parent: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """Records of a kind passing the filter; deleted ones only when a status filter asks for them"""
+        status_filtered = any(rule["field"] in ("effective_status", "status") for rule in rules)
+        found = []
+        for record in self.records(kind):
+            if parent and record.get(parent[0]) != parent[1]:
+                continue
+            full = dict(record, configured_status=record["status"], effective_status=self.effective_status(kind, record))
+            if not status_filtered and full["effective_status"] == "DELETED":
+                continue
+            if matches(full, rules):
+                found.append(record)
+        return found
+
+    def create_campaign(self, values: Dict[str, Any]) -> str:
+        for required in ("name", "objective"):
+            if not values.get(required):
+                raise invalid_parameter(f"The parameter {required} is required")
+        with self._lock:
+            now = graph_time(datetime.now(timezone.utc))
+            record = {
+                "id": self.object_id("campaign", len(self.campaigns)),
+                "name": values["name"],
+                "account_id": self.account_id,
+                "objective": values["objective"],
+                "status": "PAUSED",
+                "buying_type": "AUCTION",
+                "created_time": now,
+                "updated_time": now,
+                "start_time": now,
+                "special_ad_categories": parse_json_param("special_ad_categories", values.get("special_ad_categories", "[]")),
+            }
+            self._apply(record, "campaign", values)
+            self.campaigns.append(record)
+            return record["id"]
+
+    def update(self, kind: str, record: Dict[str, Any], values: Dict[str, Any]) -> None:
+        with self._lock:
+            self._apply(record, kind, values)
+            record["updated_time"] = graph_time(datetime.now(timezone.utc))
+
+    def _apply(self, record: Dict[str, Any], kind: str, values: Dict[str, Any]) -> None:
+        for field in WRITABLE_FIELDS[kind]:
+            if field not in values:
+                continue
+            value = values[field]
+            if field == "status" and value not in STATUSES:
+                raise invalid_parameter(f"Param status must be one of {{{', '.join(STATUSES)}}}")
+            if field.endswith("budget") or field == "spend_cap":
+                if not str(value).isdigit():
+                    raise invalid_parameter(f"Param {field} must be an integer in minor currency units")
+                value = str(int(value))
+            record[field] = value
+
+    # Insights
+
+    def period(self, params: Dict[str, Any]) -> Tuple[str, str]:
+        """``(since, until)`` of a ``time_range`` or ``date_preset`` (default ``last_30d``)"""
+        if params.get("time_range"):
+            time_range = parse_json_param("time_range", params["time_range"])
+            try:
+                since, until = date.fromisoformat(time_range["since"]), date.fromisoformat(time_range["until"])
+            except (KeyError, TypeError, ValueError):
+                raise invalid_parameter("Param time_range must be an object with since and until dates")
+            if since > until:
+                raise invalid_parameter("Param time_range has since after until")
+            return since.isoformat(), until.isoformat()
+
+        preset = params.get("date_preset", "last_30d")
+        today = self.today
+        days = DATE_PRESET_DAYS.match(preset)
+        if days:
+            since, until = today - timedelta(days=int(days.group(1))), today - timedelta(days=1)
+        elif preset == "today":
+            since = until = today
+        elif preset == "yesterday":
+            since = until = today - timedelta(days=1)
+        elif preset == "this_month":
+            since, until = today.replace(day=1), today
+        elif preset == "last_month":
+            until = today.replace(day=1) - timedelta(days=1)
+            since = until.replace(day=1)
+        elif preset in ("maximum", "data_maximum"):
+            since, until = date.fromisoformat(self.days[0]), today
+        else:
+            raise invalid_parameter(f"Param date_preset must be one of the supported presets, not {preset}")
+        return since.isoformat(), until.isoformat()
+
+    def insights(self, params: Dict[str, Any], scope: Optional[Tuple[str, str]] = None) -> List[Dict[str, Any]]:
+        """
+        Insight rows of the account, or of one campaign, ad set or ad (``scope``)
+
+        Honours ``level``, ``fields``, ``time_range``/``date_preset``,
+        ``time_increment`` and id ``filtering``; rows without impressions are
+        left out, as the API does.
+        """
+        level = params.get("level") or (scope[0] if scope else "account")
+        if level not in LEVEL_FIELDS:
+            raise invalid_parameter(f"Param level must be one of {{{', '.join(LEVEL_FIELDS)}}}")
+        fields = parse_fields(params.get("fields")) or list(DEFAULT_INSIGHT_FIELDS)
+        for field in fields:
+            if field not in INSIGHT_METRICS and field not in LEVEL_FIELDS["ad"]:
+                raise invalid_parameter(f"{field} is not valid for fields param")
+        since, until = self.period(params)
+
+        ads = np.arange(len(self.ads))
+        if scope:
+            key = {"campaign": "campaign_id", "adset": "adset_id", "ad": "id"}[scope[0]]
+            ads = np.array([n for n in ads if self.ads[n][key] == scope[1]], dtype=np.int64)
+        rules = parse_filtering(params.get("filtering"), "ad") if params.get("filtering") else []
+        if rules:
+            ads = np.array([n for n in ads if matches(self.ads[n], rules)], dtype=np.int64)
+        day_index = np.nonzero((self.days >= since) & (self.days <= until))[0]
+        if not len(ads) or not len(day_index):
+            return []
+
+        # Group the selected ads by the level's entity and the days by time increment
+        group_of_ad = {
+            "account": np.zeros(len(self.ads), dtype=np.int64),
+            "campaign": self._ad_campaign,
+            "adset": self._ad_ad_set,
+            "ad": np.arange(len(self.ads)),
+        }[level][ads]
+        groups, group_index = np.unique(group_of_ad, return_inverse=True)
+        increment = params.get("time_increment", "all_days")
+        if increment == "all_days":
+            bucket_index = np.zeros(len(day_index), dtype=np.int64)
+        elif str(increment).isdigit() and 1 <= int(increment) <= 90:
+            bucket_index = np.arange(len(day_index)) // int(increment)
+        else:
+            raise invalid_parameter("Param time_increment must be all_days or a number of days from 1 to 90")
+        n_buckets = int(bucket_index.max()) + 1
+
+        def total(values: np.ndarray) -> np.ndarray:
+            """Sum an ad × day (× action) array into group × bucket (× action)"""
+            selected = values[ads][:, day_index]
+            by_day = np.zeros((len(groups), len(day_index)) + values.shape[2:], dtype=np.float64)
+            np.add.at(by_day, group_index, selected)
+            summed = np.zeros((len(groups), n_buckets) + values.shape[2:], dtype=np.float64)
+            np.add.at(summed, (slice(None), bucket_index), by_day)
+            return summed
+
+        sums = {name: total(values) for name, values in self.facts.items()}
+        actions = total(self.actions)
+        bucket_days = np.bincount(bucket_index, minlength=n_buckets)
+        sums["reach"] = np.round(sums["reach"] / (1 + REACH_OVERLAP * (bucket_days[None, :] - 1)))
+
+        rows = []
+        for group_position, bucket in zip(*np.nonzero(sums["impressions"])):
+            bucket_days_index = day_index[bucket_index == bucket]
+            metric = {name: float(values[group_position, bucket]) for name, values in sums.items()}
+            row = {"date_start": self.days[bucket_days_index[0]], "date_stop": self.days[bucket_days_index[-1]]}
+            row.update(self._insight_fields(fields, level, int(groups[group_position]), metric, actions[group_position, bucket]))
+            rows.append(row)
+        return rows
+
+    def _insight_fields(self, fields: Sequence[str], level: str, group: int, metric: Dict[str, float],
+                        actions: np.ndarray) -> Dict[str, Any]:
+        impressions, clicks, spend = metric["impressions"], metric["clicks"], metric["spend"]
+        reach, unique_clicks = max(metric["reach"], 1.0), metric["unique_clicks"]
+        names = {"account_id": self.account_id, "account_name": self.name}
+        if level in ("campaign", "adset", "ad"):
+            campaign_of = {"campaign": None, "adset": self._ad_set_campaign, "ad": self._ad_campaign}[level]
+            campaign = self.campaigns[group if campaign_of is None else int(campaign_of[group])]
+            names.update(campaign_id=campaign["id"], campaign_name=campaign["name"])
+        if level in ("adset", "ad"):
+            ad_set = self.ad_sets[group if level == "adset" else int(self._ad_ad_set[group])]
+            names.update(adset_id=ad_set["id"], adset_name=ad_set["name"])
+        if level == "ad":
+            names.update(ad_id=self.ads[group]["id"], ad_name=self.ads[group]["name"])
+
+        def action_list(types: Iterable[str], values: Optional[Dict[str, float]] = None) -> List[Dict[str, str]]:
+            counts = values or {action_type: actions[ACTION_TYPES.index(action_type)] for action_type in types}
+            return [{"action_type": action_type, "value": number(count, 2)} for action_type, count in counts.items() if count]
+
+        values = {
+            "impressions": str(int(impressions)),
+            "clicks": str(int(clicks)),
+            "spend": f"{spend:.2f}",
+            "reach": str(int(reach)),
+            "frequency": number(impressions / reach),
+            "ctr": number(clicks / impressions * 100),
+            "cpm": number(spend / impressions * 1000),
+            "cpp": number(spend / reach * 1000),
+            "cpc": number(spend / clicks) if clicks else None,
+            "cost_per_unique_click": number(spend / unique_clicks) if unique_clicks else None,
+            "unique_clicks": str(int(unique_clicks)),
+            "unique_ctr": number(unique_clicks / reach * 100),
+            "actions": action_list(ACTION_TYPES),
+            "conversions": action_list(CONVERSION_TYPES),
+            "conversion_values": action_list(VALUE_TYPES, {action_type: metric["purchase_value"] for action_type in VALUE_TYPES}),
+        }
+        values.update(names)
+        return {field: values[field] for field in fields if values.get(field) not in (None, [])}
+
+
+class MetaAccounts:
+    """The stand-in's ad accounts, generated on first use"""
+
+    def __init__(self, accounts: int = 3, shape: Optional[MetaAccountShape] = None, seed: int = 0):
+        self.count = accounts
+        self.shape = shape or MetaAccountShape()
+        self.seed = seed
+        self._accounts: Dict[int, MetaAccount] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def account_ids(self) -> List[str]:
+        return [f"act_{ACCOUNT_ID_BASE + index}" for index in range(self.count)]
+
+    def _at(self, index: int) -> Optional[MetaAccount]:
+        if not 0 <= index < self.count:
+            return None
+        with self._lock:
+            if index not in self._accounts:
+                self._accounts[index] = MetaAccount(index, self.shape, self.seed)
+            return self._accounts[index]
+
+    def all(self) -> List[MetaAccount]:
+        return [self._at(index) for index in range(self.count)]
+
+    def get(self, account_id: str) -> Optional[MetaAccount]:
+        """An account by ``act_<id>``"""
+        digits = account_id[4:] if account_id.startswith("act_") else ""
+        return self._at(int(digits) - ACCOUNT_ID_BASE) if digits.isdigit() else None
+
+    def find(self, object_id: str) -> Optional[Tuple[MetaAccount, str, Dict[str, Any]]]:
+        """The account, kind and record of a campaign, ad set or ad id"""
+        if not object_id.isdigit() or int(object_id) <= OBJECT_ID_BASE:
+            return None
+        index, rest = divmod(int(object_id) - OBJECT_ID_BASE, 10**10)
+        kind = KIND_NAMES.get(rest // 10**9)
+        account = self._at(index) if kind else None
+        record = account.find(kind, object_id) if account else None
+        return (account, kind, record) if record else None
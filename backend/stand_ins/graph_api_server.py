@@ -0,0 +1,296 @@
+"""
+Stand-in Meta Graph API HTTP server
+
+Serves the Marketing API calls the backend makes, with or without a
+``/vNN.N`` prefix: ``/me``, ``/me/adaccounts``, ``/act_<id>`` with its
+``campaigns``, ``adsets``, ``ads`` and ``insights`` edges, campaign, ad set
+and ad nodes with their ``insights`` and child edges, campaign creation,
+updates (``POST /<id>``) and deletes, and ``/oauth/access_token``. Edges page
+with ``limit`` and ``after`` cursors and an absolute ``paging.next`` URL.
+Errors use the API's JSON error shape: throttled calls answer code 4 with an
+``X-App-Usage`` header at 100%, injected errors a transient code 2 with HTTP
+500, and unknown objects code 100.
+
+    cd backend && python -m stand_ins.graph_api_server --port 8765 --accounts 5 --latency-ms 150
+
+Then set ``META_GRAPH_URL=http://localhost:8765`` (and ``META_ACCESS_TOKEN``
+to any value, or to the server's ``--access-token`` when it checks one).
+"""
+
+import argparse
+import base64
+import itertools
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from stand_ins.faults import ERROR, THROTTLED, FaultInjector, FaultProfile
+from stand_ins.graph_api_data import (
+    ACCOUNT_FIELDS, GraphError, MetaAccount, MetaAccounts, MetaAccountShape,
+    invalid_parameter, parse_fields, parse_filtering, unsupported,
+)
+
+VERSION_PATTERN = re.compile(r"^v\d+\.\d+$")
+# Page size of an edge without a limit, and the largest limit honoured
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 5000
+
+USER = {"id": "100000000000001", "name": "Stand-in User", "email": "stand-in@example.com"}
+# Object edges by kind, and the record key tying them to a parent node
+EDGE_KINDS = {"campaigns": "campaign", "adsets": "adset", "ads": "ad"}
+PARENT_KEYS = {"campaign": "campaign_id", "adset": "adset_id"}
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        raise invalid_parameter("Param after is not a valid cursor")
+
+
+class GraphApiStandIn:
+    """Synthetic ad accounts behind a Graph API compatible HTTP server"""
+
+    def __init__(self, accounts: int = 3, shape: Optional[MetaAccountShape] = None,
+                 faults: Optional[FaultProfile] = None, access_token: Optional[str] = None, seed: int = 0):
+        self.accounts = MetaAccounts(accounts, shape, seed=seed)
+        self.faults = FaultInjector(faults)
+        self.access_token = access_token
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.port: Optional[int] = None
+        self._trace_ids = itertools.count(1)
+        self._calls: Dict[str, int] = {}
+        self._calls_lock = threading.Lock()
+
+    # Server lifecycle
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start serving on a background thread (port 0 picks a free port); returns the bound port"""
+        self.server = ThreadingHTTPServer((host, port), GraphRequestHandler)
+        self.server.daemon_threads = True
+        self.server.stand_in = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name="graph-api-stand-in", daemon=True).start()
+        return self.port
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._calls_lock:
+            calls = dict(self._calls)
+        return {"calls": calls, "faults": self.faults.stats()}
+
+    # Requests
+
+    def handle(self, method: str, path: str, params: Dict[str, Any], base_url: str) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        """Answer one request as ``(status, headers, payload)``"""
+        segments = [segment for segment in path.split("/") if segment]
+        if segments and VERSION_PATTERN.match(segments[0]):
+            segments = segments[1:]
+        route = "/".join(
+            "act_{id}" if segment.startswith("act_") else "{id}" if segment.isdigit() else segment
+            for segment in segments
+        )
+        with self._calls_lock:
+            self._calls[f"{method} /{route}"] = self._calls.get(f"{method} /{route}", 0) + 1
+        trace_id = f"stand-in-{next(self._trace_ids)}"
+
+        outcome = self.faults.apply()
+        if outcome == THROTTLED:
+            usage = {"call_count": 100, "total_cputime": 40, "total_time": 60}
+            error = GraphError(4, "(#4) Application request limit reached", transient=True)
+            return error.status, {"X-App-Usage": json.dumps(usage)}, error.payload(trace_id)
+        if outcome == ERROR:
+            error = GraphError(2, "An unexpected error has occurred. Please retry your request later.",
+                               status=500, transient=True)
+            return error.status, {}, error.payload(trace_id)
+
+        try:
+            if segments == ["oauth", "access_token"]:
+                return 200, {}, self._exchange_token(params)
+            self._check_token(params)
+            return 200, {}, self._route(method, path, segments, params, base_url)
+        except GraphError as e:
+            return e.status, {}, e.payload(trace_id)
+        except Exception as e:
+            error = GraphError(1, f"An unknown error occurred: {e}", status=500)
+            return error.status, {}, error.payload(trace_id)
+
+    def _check_token(self, params: Dict[str, Any]) -> None:
+        token = params.get("access_token")
+        if not token:
+            raise GraphError(104, "An access token is required to request this resource.")
+        if self.access_token and token != self.access_token:
+            raise GraphError(190, "Invalid OAuth access token - Cannot parse access token")
+
+    def _exchange_token(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if not (params.get("code") or params.get("fb_exchange_token")):
+            raise invalid_parameter("Missing authorization code")
+        return {"access_token": self.access_token or "stand-in-token", "token_type": "bearer", "expires_in": 5183944}
+
+    def _route(self, method: str, path: str, segments: List[str], params: Dict[str, Any], base_url: str) -> Dict[str, Any]:
+        fields = parse_fields(params.get("fields"))
+        if segments == ["me"] and method == "GET":
+            return {field: USER[field] for field in (fields or ("id", "name")) if field in USER}
+        if segments == ["me", "adaccounts"] and method == "GET":
+            return self._page([self._account_node(account, fields) for account in self.accounts.all()], params, path, base_url)
+        if not 1 <= len(segments) <= 2:
+            raise unsupported(method, path)
+
+        node_id, edge = segments[0], segments[1] if len(segments) == 2 else None
+        if node_id.startswith("act_"):
+            account = self.accounts.get(node_id)
+            if account is None:
+                raise unsupported(method, node_id)
+            return self._account_route(method, account, edge, params, fields, path, base_url)
+
+        found = self.accounts.find(node_id)
+        if found is None:
+            raise unsupported(method, node_id)
+        account, kind, record = found
+        if edge is None:
+            if method == "GET":
+                return account.shape(kind, record, fields)
+            if method == "POST":
+                account.update(kind, record, params)
+                return {"success": True}
+            if method == "DELETE":
+                account.update(kind, record, {"status": "DELETED"})
+                return {"success": True}
+        elif edge == "insights" and method == "GET":
+            return self._page(account.insights(params, scope=(kind, record["id"])), params, path, base_url)
+        elif edge in EDGE_KINDS and kind in PARENT_KEYS and method == "GET":
+            child = EDGE_KINDS[edge]
+            if child != kind:
+                rules = parse_filtering(params.get("filtering"), child)
+                records = account.list(child, rules, parent=(PARENT_KEYS[kind], record["id"]))
+                return self._page([account.shape(child, item, fields) for item in records], params, path, base_url)
+        raise unsupported(method, f"{node_id}/{edge}" if edge else node_id)
+
+    def _account_route(self, method: str, account: MetaAccount, edge: Optional[str], params: Dict[str, Any],
+                       fields: Optional[Sequence[str]], path: str, base_url: str) -> Dict[str, Any]:
+        if edge is None and method == "GET":
+            return self._account_node(account, fields)
+        if edge == "insights" and method == "GET":
+            return self._page(account.insights(params), params, path, base_url)
+        if edge in EDGE_KINDS and method == "GET":
+            kind = EDGE_KINDS[edge]
+            records = account.list(kind, parse_filtering(params.get("filtering"), kind))
+            return self._page([account.shape(kind, record, fields) for record in records], params, path, base_url)
+        if edge == "campaigns" and method == "POST":
+            return {"id": account.create_campaign(params)}
+        raise unsupported(method, f"{account.id}/{edge}" if edge else account.id)
+
+    @staticmethod
+    def _account_node(account: MetaAccount, fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+        node = account.node()
+        for field in fields or ():
+            if field not in ACCOUNT_FIELDS:
+                raise invalid_parameter(f"Tried accessing nonexisting field ({field}) on node type (AdAccount)")
+        return {field: node[field] for field in (fields or ("id", "account_id"))}
+
+    @staticmethod
+    def _page(items: List[Dict[str, Any]], params: Dict[str, Any], path: str, base_url: str) -> Dict[str, Any]:
+        """One page of an edge, with cursors and an absolute ``next`` URL while more remain"""
+        try:
+            limit = min(int(params.get("limit", DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            raise invalid_parameter("Param limit must be an integer")
+        offset = decode_cursor(params["after"]) if params.get("after") else 0
+        data = items[offset:offset + limit]
+        page: Dict[str, Any] = {"data": data}
+        if data:
+            page["paging"] = {"cursors": {"before": encode_cursor(offset), "after": encode_cursor(offset + len(data))}}
+            if offset + len(data) < len(items):
+                query = dict(params, limit=limit, after=encode_cursor(offset + len(data)))
+                page["paging"]["next"] = f"{base_url}{path}?{urlencode(query)}"
+        return page
+
+
+class GraphRequestHandler(BaseHTTPRequestHandler):
+    """Parses requests for the GraphApiStandIn behind ``self.server.stand_in``"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "GraphApiStandIn/1.0"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        params: Dict[str, Any] = dict(parse_qsl(url.query, keep_blank_values=True))
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length).decode("utf-8", "replace")
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                params.update(json.loads(body or "{}"))
+            else:
+                params.update(parse_qsl(body, keep_blank_values=True))
+        authorization = self.headers.get("Authorization", "")
+        if authorization.startswith(("OAuth ", "Bearer ")) and "access_token" not in params:
+            params["access_token"] = authorization.split(" ", 1)[1]
+
+        status, headers, payload = self.server.stand_in.handle(
+            method, url.path, params, f"http://{self.headers.get('Host', '%s:%s' % self.server.server_address[:2])}"
+        )
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in Meta Graph API HTTP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--campaigns", type=int, default=10, help="Campaigns per account")
+    parser.add_argument("--ad-sets", type=int, default=3, help="Ad sets per campaign")
+    parser.add_argument("--ads", type=int, default=3, help="Ads per ad set")
+    parser.add_argument("--days", type=int, default=90, help="Days of daily metrics")
+    parser.add_argument("--access-token", default=None, help="Only accept this token (any token when unset)")
+    FaultProfile.add_arguments(parser)
+    args = parser.parse_args()
+
+    stand_in = GraphApiStandIn(
+        accounts=args.accounts,
+        shape=MetaAccountShape(args.campaigns, args.ad_sets, args.ads, args.days),
+        faults=FaultProfile.from_args(args),
+        access_token=args.access_token,
+        seed=args.seed
+    )
+    port = stand_in.start(args.host, args.port)
+    print(f"🧪 Graph API stand-in on http://{args.host}:{port}, ad accounts: {', '.join(stand_in.accounts.account_ids)}")
+    print(f"   META_GRAPH_URL=http://{args.host}:{port} META_ACCESS_TOKEN={args.access_token or 'stand-in-token'}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stand_in.stop()
+
+
+if __name__ == "__main__":
+    main()
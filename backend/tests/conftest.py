@@ -0,0 +1,47 @@
+"""
+Shared test setup
+
+Both stand-in servers start before any ``app`` module is imported, since the
+services read their settings (endpoints, tokens, store paths) once on import.
+Tests that talk to an upstream API therefore run against the stand-ins'
+synthetic accounts, offline and deterministically.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+from stand_ins.google_ads_server import GoogleAdsStandIn
+from stand_ins.graph_api_server import GraphApiStandIn
+
+_google_ads = GoogleAdsStandIn(accounts=3)
+_graph = GraphApiStandIn(accounts=2, access_token="test-token")
+_data_dir = tempfile.TemporaryDirectory(prefix="crm-backend-tests-")
+
+
+def pytest_configure(config):
+    os.environ.update({
+        "GOOGLE_ADS_ENDPOINT": f"127.0.0.1:{_google_ads.start()}",
+        "GOOGLE_ADS_INSECURE": "true",
+        "META_GRAPH_URL": f"http://127.0.0.1:{_graph.start()}",
+        "META_ACCESS_TOKEN": "test-token",
+        "INSIGHT_STORE_PATH": os.path.join(_data_dir.name, "insights.db"),
+        "SCHEDULER_BACKEND": "disabled",
+    })
+
+
+def pytest_unconfigure(config):
+    _google_ads.stop()
+    _graph.stop()
+    _data_dir.cleanup()
+
+
+@pytest.fixture(scope="session")
+def google_ads_stand_in() -> GoogleAdsStandIn:
+    return _google_ads
+
+
+@pytest.fixture(scope="session")
+def graph_stand_in() -> GraphApiStandIn:
+    return _graph
@@ -0,0 +1,116 @@
+"""Incremental daily anomaly detection"""
+
+import asyncio
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.services.ai_agent_service import ai_agent_service
+from app.services.anomaly_detector import DailyAnomalyDetector
+
+START = date(2026, 1, 1)
+
+
+def daily_frame(days: int, campaigns=("1", "2"), clicks=None, customer_id="c1", start=START) -> pd.DataFrame:
+    """Steady, slightly noisy series; ``clicks`` overrides (campaign, day index) -> clicks"""
+    rng = np.random.default_rng(0)
+    rows = []
+    for n in range(days):
+        for campaign in campaigns:
+            value = (clicks or {}).get((campaign, n), 100 + rng.integers(-5, 6))
+            if value is None:
+                continue
+            rows.append({
+                "customer_id": customer_id, "campaign_id": campaign, "name": f"Campaign {campaign}",
+                "date": (start + timedelta(days=n)).isoformat(),
+                "impressions": 1000, "clicks": value, "conversions": value / 10, "cost": value * 0.5,
+            })
+    return pd.DataFrame(rows)
+
+
+def test_steady_series_raise_nothing():
+    detector = DailyAnomalyDetector(min_history=7)
+    assert detector.ingest(daily_frame(30)) == []
+    assert len(detector) == 2
+    assert detector.last_date("c1") == START + timedelta(days=29)
+
+
+def test_a_drop_on_the_latest_day_is_flagged_for_that_campaign():
+    detector = DailyAnomalyDetector(min_history=7)
+    detector.ingest(daily_frame(30, clicks={("2", 29): 10}))
+
+    flagged = detector.anomalies(customer_id="c1")
+    assert {(a.campaign_id, a.metric, a.direction) for a in flagged} >= {("2", "clicks", "down"), ("2", "cost", "down")}
+    assert all(a.campaign_id == "2" and a.date == "2026-01-30" for a in flagged)
+
+
+def test_replaying_days_is_harmless():
+    detector = DailyAnomalyDetector()
+    frame = daily_frame(20)
+    detector.ingest(frame)
+    state = detector.state()
+
+    detector.ingest(frame)
+    assert all(
+        np.array_equal(state[name], value, equal_nan=value.dtype.kind == "f") for name, value in detector.state().items()
+    )
+
+
+def test_a_campaign_that_goes_dark_is_flagged_once_zero_filled():
+    detector = DailyAnomalyDetector(min_history=7)
+    detector.ingest(daily_frame(30))
+    # Campaign 2 reports nothing the next day
+    new_day = daily_frame(1, campaigns=("1",), start=START + timedelta(days=30))
+
+    filled = detector.zero_filled(new_day, ["c1"], START + timedelta(days=30))
+    detector.ingest(filled)
+
+    assert len(filled) == 2
+    flagged = detector.anomalies(customer_id="c1", since=START + timedelta(days=30))
+    assert ("2", "clicks", "down") in {(a.campaign_id, a.metric, a.direction) for a in flagged}
+
+
+def test_zero_fill_starts_new_series_at_their_first_row_and_skips_other_customers():
+    detector = DailyAnomalyDetector()
+    frame = daily_frame(5, clicks={("2", n): None for n in range(3)})
+
+    filled = detector.zero_filled(frame, ["c1"], START + timedelta(days=6))
+
+    dates = filled[filled["campaign_id"] == "2"]["date"]
+    assert dates.min() == (START + timedelta(days=3)).isoformat()
+    assert dates.max() == (START + timedelta(days=6)).isoformat()
+    assert len(detector.zero_filled(frame, ["other"], START + timedelta(days=6))) == len(frame)
+
+
+def test_since_drops_series_that_stopped_updating():
+    detector = DailyAnomalyDetector(min_history=7)
+    detector.ingest(daily_frame(30, clicks={("2", 29): 10}))
+    detector.ingest(daily_frame(2, campaigns=("1",), start=START + timedelta(days=30)))
+
+    assert detector.anomalies(customer_id="c1", campaign_ids=["2"])
+    assert detector.anomalies(customer_id="c1", campaign_ids=["2"], since=START + timedelta(days=31)) == []
+
+
+def test_state_round_trips_through_a_file(tmp_path):
+    detector = DailyAnomalyDetector(min_history=7)
+    detector.ingest(daily_frame(30, clicks={("1", 29): 400}))
+    path = str(tmp_path / "anomalies.npz")
+
+    detector.save(path)
+    loaded = DailyAnomalyDetector(min_history=7)
+    loaded.load(path)
+
+    assert loaded.anomalies() == detector.anomalies()
+    assert list(tmp_path.iterdir()) == [tmp_path / "anomalies.npz"]
+
+
+def test_refresh_reads_the_stand_in_through_yesterday(google_ads_stand_in):
+    customer_id = str(google_ads_stand_in.accounts.customer_ids[0])
+
+    result = asyncio.run(ai_agent_service.refresh_daily_anomalies([customer_id]))
+
+    assert result["rows"] > 0
+    yesterday = date.today() - timedelta(days=1)
+    assert ai_agent_service.anomaly_detector.last_date(customer_id) == yesterday
+    assert all(a.date == yesterday.isoformat() for a in ai_agent_service.current_anomalies(customer_id))
@@ -0,0 +1,93 @@
+"""
+Bulk optimizer plans applied against the Google Ads stand-in
+
+These run on their own stand-in customer, as they change its budgets and bids.
+"""
+
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.core.date_ranges import DateRange
+from app.services.bulk_optimizer import AccountSnapshot, BudgetChange, MutationPlan, apply_plan, build_plan
+from app.services.google_ads_service import CampaignData
+
+
+@pytest.fixture(scope="module")
+def customer(google_ads_stand_in):
+    customer_id = google_ads_stand_in.accounts.customer_ids[2]
+    return str(customer_id), google_ads_stand_in.accounts.get(customer_id)
+
+
+def budget_amounts(account):
+    return dict(zip(
+        account.campaigns["campaign_budget.id"].astype(str),
+        account.campaigns["campaign_budget.amount_micros"] / 1_000_000
+    ))
+
+
+def test_budget_plan_applies_and_reports_the_failed_budget(customer):
+    customer_id, account = customer
+    campaigns = asyncio.run(AccountSnapshot.load(customer_id)).campaigns
+    budgets = [
+        BudgetChange(c.id, c.name, c.budget_id, c.budget_amount, round(c.budget_amount * 1.2, 2)) for c in campaigns[:3]
+    ]
+    missing = BudgetChange("404", "Gone", "424242", 10.0, 12.0)
+    plan = MutationPlan(customer_id, "budget_optimization", [c.campaign_id for c in budgets] + ["404"],
+                        budgets=budgets + [missing])
+
+    results = asyncio.run(apply_plan(plan))
+
+    amounts = budget_amounts(account)
+    for change in budgets:
+        assert results[change.campaign_id]["success"]
+        assert amounts[change.budget_id] == pytest.approx(change.new_amount)
+    assert results["404"] == {"success": False, "actions_taken": [], "errors": ["Failed to update budget 424242"]}
+
+
+def test_bid_plan_applies_every_change(customer):
+    customer_id, account = customer
+    snapshot = asyncio.run(AccountSnapshot.load(customer_id, include_keywords=True))
+    plan = build_plan(snapshot, "bid_optimization")
+    assert plan.bids
+
+    results = asyncio.run(apply_plan(plan))
+
+    bids = dict(zip(
+        zip(account.keywords["ad_group.id"].astype(str), account.keywords["ad_group_criterion.criterion_id"].astype(str)),
+        account.keywords["ad_group_criterion.cpc_bid_micros"] / 1_000_000
+    ))
+    for change in plan.bids:
+        assert bids[(change.ad_group_id, change.keyword_id)] == pytest.approx(change.new_bid, abs=0.01)
+    assert not any(result["errors"] for result in results.values())
+
+
+def test_dry_run_leaves_the_account_untouched(customer):
+    customer_id, account = customer
+    before = budget_amounts(account)
+    campaign = asyncio.run(AccountSnapshot.load(customer_id)).campaigns[0]
+    change = BudgetChange(campaign.id, campaign.name, campaign.budget_id, campaign.budget_amount, 9999.0)
+
+    results = asyncio.run(apply_plan(MutationPlan(customer_id, "budget_optimization", [campaign.id], budgets=[change]),
+                                     dry_run=True))
+
+    assert results[campaign.id]["success"]
+    assert budget_amounts(account) == before
+
+
+def test_budgets_are_compared_with_daily_spend():
+    window = DateRange(date(2026, 3, 1), date(2026, 3, 30))
+    campaigns = [
+        # 30 days at $50/day against a $100 daily budget: half used
+        CampaignData("1", "Below", "ENABLED", 100.0, "STANDARD", "2026-01-01", None, cost=1500.0, budget_id="11"),
+        # $95/day against $100
+        CampaignData("2", "Near", "ENABLED", 100.0, "STANDARD", "2026-01-01", None, cost=2850.0, budget_id="12"),
+        # Started on day 21, $95/day over its 10 days
+        CampaignData("3", "New", "ENABLED", 100.0, "STANDARD", "2026-03-21", None, cost=950.0, budget_id="13"),
+    ]
+
+    plan = build_plan(AccountSnapshot("1", campaigns, date_range=window), "budget_optimization")
+
+    assert [change.campaign_id for change in plan.budgets] == ["2", "3"]
+    assert plan.budgets[0].new_amount == 120.0
@@ -0,0 +1,116 @@
+"""FX snapshots, conversion and money formatting"""
+
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from app.services.currency import (
+    FileFXProvider, FXRates, Money, StaticFXProvider, format_money, rebase
+)
+
+RATES = {"USD": 1.0, "EUR": 0.9, "AED": 3.6725, "JPY": 150.0}
+DAY = date(2026, 3, 2)
+
+
+class FlakyProvider:
+    name = "flaky"
+
+    def __init__(self):
+        self.calls = 0
+        self.failing = False
+
+    def rates(self, day):
+        self.calls += 1
+        if self.failing:
+            raise ConnectionError("provider down")
+        return {**RATES, "EUR": 0.9 + day.day / 1000}
+
+
+def test_rebase_quotes_tables_per_usd():
+    assert rebase({"usd": 1.1, "GBP": 0.85}, "eur") == pytest.approx({"USD": 1.0, "GBP": 0.85 / 1.1, "EUR": 1 / 1.1})
+    with pytest.raises(ValueError, match="no USD rate"):
+        rebase({"GBP": 0.85}, "EUR")
+
+
+def test_convert_mixed_currencies_in_one_pass():
+    fx = FXRates(StaticFXProvider(RATES))
+
+    converted = fx.convert([90.0, 367.25, 1500.0, 10.0], ["EUR", "AED", "JPY", None], "USD", DAY)
+
+    assert converted == pytest.approx([100.0, 100.0, 10.0, 10.0])
+    assert fx.rate("USD", "EUR", DAY) == pytest.approx(0.9)
+    with pytest.raises(ValueError, match="No FX rate for XYZ"):
+        fx.convert([1.0], ["XYZ"], "USD", DAY)
+
+
+def test_convert_frame_sets_the_target_currency():
+    fx = FXRates(StaticFXProvider(RATES))
+    frame = pd.DataFrame({"spend": [90.0, 100.0], "clicks": [3, 4], "currency": ["EUR", "USD"]})
+
+    converted = fx.convert_frame(frame, ["spend"], to_currency="eur", day=DAY)
+
+    assert converted["spend"].tolist() == pytest.approx([90.0, 90.0])
+    assert converted["currency"].tolist() == ["EUR", "EUR"]
+    assert frame["currency"].tolist() == ["EUR", "USD"]
+
+
+def test_provider_is_asked_once_per_day_and_snapshots_persist(tmp_path):
+    provider = FlakyProvider()
+    path = str(tmp_path / "fx.json")
+    fx = FXRates(provider, snapshot_path=path)
+
+    first = fx.snapshot(DAY)
+    assert fx.snapshot(DAY) is first
+    assert provider.calls == 1
+
+    reloaded = FXRates(FlakyProvider(), snapshot_path=path)
+    assert reloaded.snapshot(DAY).rates == first.rates
+    assert reloaded.provider.calls == 0
+
+
+def test_failures_fall_back_to_the_latest_earlier_day():
+    provider = FlakyProvider()
+    fx = FXRates(provider)
+    fx.snapshot(DAY)
+    provider.failing = True
+
+    fallback = fx.snapshot(DAY + timedelta(days=3))
+    fx.snapshot(DAY + timedelta(days=3))
+
+    assert fallback.source == f"fallback:{DAY.isoformat()}"
+    assert fallback.rates == fx.snapshot(DAY).rates
+    assert provider.calls == 2  # the failure is not retried on every request
+
+
+def test_future_days_use_todays_rates():
+    fx = FXRates(StaticFXProvider(RATES))
+    assert fx.snapshot(date.today() + timedelta(days=10)).day == date.today()
+
+
+def test_file_provider_picks_the_latest_dated_table(tmp_path):
+    path = tmp_path / "rates.csv"
+    path.write_text("date,base,currency,rate\n2026-03-01,USD,EUR,0.90\n2026-03-05,USD,EUR,0.95\n")
+    provider = FileFXProvider(str(path))
+
+    assert provider.rates(date(2026, 3, 4))["EUR"] == 0.90
+    assert provider.rates(date(2026, 3, 5))["EUR"] == 0.95
+    with pytest.raises(ValueError, match="no rates on or before"):
+        provider.rates(date(2026, 2, 1))
+
+
+@pytest.mark.parametrize("amount, currency, locale, expected", [
+    (1234.5, "USD", "en", "$1,234.50"),
+    (-1234.5, "EUR", "de", "-1.234,50 €"),
+    (1234.5, "AED", "en", "1,234.50 د.إ"),
+    (1234.567, "KWD", "en", "1,234.567 د.ك"),
+    (1234.4, "JPY", "en", "¥1,234"),
+    (-0.001, "USD", "en", "$0.00"),
+    (12.0, "XYZ", "en", "XYZ 12.00"),
+])
+def test_format_money(amount, currency, locale, expected):
+    assert format_money(amount, currency, locale) == expected
+
+
+def test_money_formats_only_for_the_money_spec():
+    assert f"{Money(12.5, 'EUR'):money} / {Money(12.5, 'EUR'):.1f}" == "€12.50 / 12.5"
@@ -0,0 +1,106 @@
+"""Insight ids and the insight store"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import google_ads
+from app.services.ai_agent_service import ai_agent_service, keyword_columns
+from app.services.google_ads_service import CampaignData, KeywordData
+from app.services.insight_store import InsightStore, default_store_path
+from app.services.insights import AIInsight, unique_ids
+from app.services.rules_engine import RulesEngine
+
+
+def insight(id: str, title: str) -> AIInsight:
+    return AIInsight(id=id, type="keyword", title=title, description="", impact="low", confidence=0.5)
+
+
+def test_keyword_insights_are_keyed_on_ad_group_and_criterion():
+    # Criterion ids are only unique within an ad group
+    keywords = [
+        KeywordData(id="7", text=f"shoes {ad_group}", match_type="EXACT", ad_group_id=ad_group, status="ENABLED",
+                    cpc_bid=1.0, clicks=40, cost=80.0)
+        for ad_group in ("100", "200")
+    ]
+    insights = RulesEngine().evaluate("keyword", keyword_columns(keywords), currency="USD")
+
+    poor = [i for i in insights if i.id.startswith("keyword_poor")]
+    assert [i.ad_group_id for i in poor] == ["100", "200"]
+    assert poor[0].id != poor[1].id
+
+
+def test_ai_insights_for_one_campaign_and_action_keep_distinct_ids():
+    campaigns = [CampaignData(id="1", name="Brand", status="ENABLED", budget_amount=10.0, budget_type="STANDARD",
+                              start_date="2026-01-01", end_date=None)]
+    first, second, reworded = (
+        ai_agent_service._ai_insight_from_data({"title": title, "campaign_name": "Brand", "action_type": "adjust_bid"}, campaigns)
+        for title in ("Raise mobile bids", "Lower evening bids", "raise  Mobile bids!")
+    )
+    assert first.id != second.id
+    assert first.id == reworded.id
+
+
+def test_keyword_insight_ids_follow_the_requested_dates(google_ads_stand_in):
+    app = FastAPI()
+    app.include_router(google_ads.router)
+    client = TestClient(app)
+    customer_id = str(google_ads_stand_in.accounts.customer_ids[0])
+
+    def insight_ids(**dates):
+        response = client.get("/google-ads/insights/keywords", params={"customer_id": customer_id, **dates})
+        assert response.status_code == 200
+        body = response.json()
+        return {i["id"] for i in body["insights"]}, body["date_range"]
+
+    last_30, dates = insight_ids()
+    again, _ = insight_ids(period="LAST_30_DAYS")
+    last_7, last_7_dates = insight_ids(period="LAST_7_DAYS")
+
+    assert last_30 and last_30 == again
+    assert last_7_dates["end_date"] == dates["end_date"] and last_7_dates["start_date"] > dates["start_date"]
+    assert not last_30 & last_7
+    assert client.get("/google-ads/insights/keywords", params={"customer_id": customer_id, "period": "LAST_YEAR"}).status_code == 400
+
+
+def test_unique_ids_drops_repeats_and_keeps_distinct_findings():
+    repeat, same, other = insight("a", "x"), insight("a", "x"), insight("a", "y")
+
+    unique = unique_ids([repeat, same, other])
+
+    assert [i.title for i in unique] == ["x", "y"]
+    assert unique[0].id == "a" and unique[1].id.startswith("a_")
+
+
+def test_store_keeps_colliding_insights(tmp_path):
+    store = InsightStore(str(tmp_path / "insights.db"))
+    stored = store.upsert("t:c:keywords", [insight("a", "x"), insight("a", "y")])
+
+    assert len(stored) == 2
+    assert sorted(i.title for i in store.changes("t:c:keywords")) == ["x", "y"]
+
+
+def test_default_store_path_is_outside_the_working_directory(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path))
+    assert default_store_path() == str(tmp_path / "crm-backend" / "insights.db")
+
+
+def test_replace_keeps_only_the_latest_run(tmp_path):
+    store = InsightStore(str(tmp_path / "insights.db"))
+    store.replace("t:c:campaigns", [insight("a", "x"), insight("b", "y")])
+    cursor = store.cursor("t:c:campaigns")
+
+    store.replace("t:c:campaigns", [insight("a", "x")])
+
+    assert [i.id for i in store.changes("t:c:campaigns")] == ["a"]
+    assert store.changes("t:c:campaigns", cursor) == []
+
+
+def test_cursor_never_goes_back_after_deletes(tmp_path):
+    store = InsightStore(str(tmp_path / "insights.db"))
+    store.replace("t:c:campaigns", [insight("a", "x"), insight("b", "y")])
+    cursor = store.cursor()
+    store.replace("t:c:campaigns", [insight("a", "x")])  # deletes the newest row
+
+    store.upsert("t:c:keywords", [insight("c", "z")])
+
+    assert [i.id for i in store.changes("t:c:keywords", cursor)] == ["c"]
@@ -0,0 +1,240 @@
+"""Job queue and the /jobs endpoints"""
+
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import google_ads
+from app.api.v1 import jobs as jobs_api
+from app.services.jobs import JOB_HANDLERS, JobLimitError, LocalJobQueue
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Register test job kinds for the duration of a test"""
+    def register(kind, handler):
+        monkeypatch.setitem(JOB_HANDLERS, kind, handler)
+    return register
+
+
+async def settle(queue: LocalJobQueue, job_id: str):
+    """Wait until the job finishes"""
+    async for job in queue.watch(job_id, heartbeat=1.0):
+        if job.finished:
+            return job
+
+
+def test_submit_runs_the_handler_and_limits_pending_jobs_per_tenant(handlers):
+    release = {}
+
+    async def echo(params, tenant_id, progress):
+        await release["event"].wait()
+        return {"tenant": tenant_id, **params}
+
+    handlers("test.echo", echo)
+
+    async def scenario():
+        release["event"] = asyncio.Event()
+        queue = LocalJobQueue(max_concurrent=1, max_pending=2)
+        first = queue.submit("test.echo", "a", {"n": 1})
+        queue.submit("test.echo", "a", {"n": 2})
+        with pytest.raises(JobLimitError):
+            queue.submit("test.echo", "a", {"n": 3})
+        other = queue.submit("test.echo", "b")  # limits are per tenant
+        with pytest.raises(ValueError, match="Unknown job kind"):
+            queue.submit("test.missing", "a")
+
+        release["event"].set()
+        done = await settle(queue, first.id)
+        await settle(queue, other.id)
+        return queue, done
+
+    queue, done = asyncio.run(scenario())
+    assert (done.status, done.result, done.progress) == ("completed", {"tenant": "a", "n": 1}, 1.0)
+    assert (queue.submitted, queue.rejected) == (3, 1)
+    assert [job.result["n"] for job in queue.jobs("a")] == [2, 1]
+
+
+def test_jobs_beyond_max_concurrent_wait_in_the_queue(handlers):
+    gate = {}
+
+    async def blocked(params, tenant_id, progress):
+        await gate["event"].wait()
+
+    handlers("test.blocked", blocked)
+
+    async def scenario():
+        gate["event"] = asyncio.Event()
+        queue = LocalJobQueue(max_concurrent=1, max_pending=5)
+        first, second = queue.submit("test.blocked", "a"), queue.submit("test.blocked", "a")
+        other = queue.submit("test.blocked", "b")
+        await asyncio.sleep(0.01)
+        statuses = [job.status for job in (first, second, other)]
+        stats = queue.stats()
+
+        gate["event"].set()
+        for job in (first, second, other):
+            await settle(queue, job.id)
+        return statuses, stats, [job.status for job in (first, second, other)]
+
+    statuses, stats, finished = asyncio.run(scenario())
+    assert statuses == ["running", "queued", "running"]
+    assert (stats["running"], stats["queued"]) == (2, 1)
+    assert finished == ["completed"] * 3
+
+
+def test_failed_and_cancelled_jobs_are_final(handlers):
+    async def fails(params, tenant_id, progress):
+        raise ValueError("no such account")
+
+    async def sleeps(params, tenant_id, progress):
+        await asyncio.sleep(10)
+
+    handlers("test.fails", fails)
+    handlers("test.sleeps", sleeps)
+
+    async def scenario():
+        queue = LocalJobQueue()
+        failed = await settle(queue, queue.submit("test.fails", "a").id)
+        sleeping = queue.submit("test.sleeps", "a")
+        await asyncio.sleep(0.01)
+        assert queue.cancel(sleeping.id)
+        cancelled = await settle(queue, sleeping.id)
+        return queue, failed, cancelled
+
+    queue, failed, cancelled = asyncio.run(scenario())
+    assert (failed.status, failed.error) == ("failed", "no such account")
+    assert cancelled.status == "cancelled" and cancelled.finished_at
+    assert not queue.cancel(cancelled.id)
+    assert queue.stats()["finished"] == 2
+
+
+def test_watch_yields_every_change_until_the_job_finishes(handlers):
+    steps = {}
+
+    async def stepped(params, tenant_id, progress):
+        progress(0.5, "Halfway")
+        await steps["event"].wait()
+        return "done"
+
+    handlers("test.stepped", stepped)
+
+    async def scenario():
+        steps["event"] = asyncio.Event()
+        queue = LocalJobQueue()
+        job = queue.submit("test.stepped", "a")
+        seen = []
+        async for update in queue.watch(job.id, heartbeat=0.05):
+            seen.append((update.status, update.progress, update.message, update.version))
+            if len(seen) == 3:
+                steps["event"].set()
+        return seen
+
+    seen = asyncio.run(scenario())
+    assert seen[0][:3] == ("queued", 0.0, None)
+    assert ("running", 0.5, "Halfway") in [state[:3] for state in seen]
+    assert seen[-1][:3] == ("completed", 1.0, None)
+    # Heartbeats repeat the same version; changes bump it
+    assert [state[3] for state in seen] == sorted(state[3] for state in seen)
+
+
+@pytest.fixture
+def client(monkeypatch, handlers):
+    """The /jobs and Google Ads routers on a fresh in-process queue, with recording handlers"""
+    monkeypatch.setattr(jobs_api, "job_queue", LocalJobQueue(max_concurrent=2, max_pending=1))
+    submitted = []
+
+    async def record(params, tenant_id, progress):
+        progress(0.5, "Working")
+        await asyncio.sleep(0.05)
+        submitted.append((tenant_id, params))
+        return {"params": params}
+
+    for kind in ("google_ads.optimize", "google_ads.insights", "google_ads.keyword_suggestions"):
+        handlers(kind, record)
+
+    app = FastAPI()
+    app.include_router(jobs_api.router)
+    app.include_router(google_ads.router)
+    with TestClient(app) as client:
+        client.submitted = submitted
+        yield client
+
+
+def finish(client, job_id, tenant="a"):
+    for _ in range(200):
+        job = client.get(f"/jobs/{job_id}", headers={"X-Tenant-ID": tenant}).json()
+        if job["status"] in ("completed", "failed", "cancelled"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.mark.parametrize("method, path, body, params", [
+    ("post", "/google-ads/optimize?customer_id=1", {"optimization_type": "budget", "background": True}, None),
+    ("get", "/google-ads/insights?customer_id=1&background=true", None, {"customer_id": "1", "campaign_id": None}),
+    ("post", "/google-ads/keyword-suggestions?customer_id=1&campaign_id=7&background=true", None,
+     {"customer_id": "1", "campaign_id": "7", "limit": 10, "rerank": False}),
+])
+def test_background_requests_answer_202_with_a_job(client, method, path, body, params):
+    response = client.request(method.upper(), path, json=body, headers={"X-Tenant-ID": "a"})
+
+    assert response.status_code == 202
+    accepted = response.json()
+    assert accepted["status"] == "queued"
+    assert accepted["status_url"] == f"/jobs/{accepted['job_id']}"
+    assert accepted["events_url"] == f"/jobs/{accepted['job_id']}/events"
+
+    job = finish(client, accepted["job_id"])
+    assert job["status"] == "completed"
+    tenant, submitted = client.submitted[-1]
+    assert tenant == "a"
+    assert params is None or params.items() <= submitted.items()
+    if "optimize" in path:
+        assert submitted["optimization"]["optimization_type"] == "budget"
+
+
+def test_submissions_beyond_max_pending_get_429(client):
+    first = client.get("/google-ads/insights?customer_id=1&background=true", headers={"X-Tenant-ID": "a"})
+    second = client.get("/google-ads/insights?customer_id=1&background=true", headers={"X-Tenant-ID": "a"})
+    other = client.get("/google-ads/insights?customer_id=1&background=true", headers={"X-Tenant-ID": "b"})
+
+    assert (first.status_code, second.status_code, other.status_code) == (202, 429, 202)
+    assert "unfinished jobs" in second.json()["detail"]
+    finish(client, first.json()["job_id"])
+    finish(client, other.json()["job_id"], tenant="b")
+
+
+def test_events_stream_progress_then_done(client):
+    job_id = client.get("/google-ads/insights?customer_id=1&background=true", headers={"X-Tenant-ID": "a"}).json()["job_id"]
+
+    with client.stream("GET", f"/jobs/{job_id}/events", headers={"X-Tenant-ID": "a"}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = [chunk for chunk in body.split("\n\n") if chunk and not chunk.startswith(":")]
+    names = [chunk.split("\n")[0].removeprefix("event: ") for chunk in events]
+    payloads = [json.loads(chunk.split("\n")[1].removeprefix("data: ")) for chunk in events]
+    assert names[-1] == "done" and set(names[:-1]) == {"progress"}
+    assert all("result" not in payload for payload in payloads[:-1])
+    assert [payload["progress"] for payload in payloads] == sorted(payload["progress"] for payload in payloads)
+    assert payloads[-1]["status"] == "completed"
+    assert payloads[-1]["result"]["params"]["customer_id"] == "1"
+
+
+def test_other_tenants_jobs_are_not_found(client):
+    job_id = client.get("/google-ads/insights?customer_id=1&background=true", headers={"X-Tenant-ID": "a"}).json()["job_id"]
+    intruder = {"X-Tenant-ID": "b"}
+
+    assert client.get(f"/jobs/{job_id}", headers=intruder).status_code == 404
+    assert client.get(f"/jobs/{job_id}/events", headers=intruder).status_code == 404
+    assert client.delete(f"/jobs/{job_id}", headers=intruder).status_code == 404
+    assert client.get(f"/google-ads/optimize/jobs/{job_id}", headers=intruder).status_code == 404
+    assert client.get("/jobs", headers=intruder).json()["jobs"] == []
+
+    finish(client, job_id)
+    assert [job["job_id"] for job in client.get("/jobs", headers={"X-Tenant-ID": "a"}).json()["jobs"]] == [job_id]
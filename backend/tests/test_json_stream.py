@@ -0,0 +1,65 @@
+"""Incremental JSON array parsing of streamed completions"""
+
+import json
+
+import pytest
+
+from app.services.json_stream import JSONArrayStreamParser
+
+INSIGHTS = [
+    {"title": "Raise bids", "description": "CTR is {high} and \"rising\" [see chart]", "impact": "high"},
+    {"title": "Pause keyword", "action_data": {"keyword_ids": ["1", "2"], "nested": {"a": [1, {"b": 2}]}}},
+    {"title": "Escapes \\ and \\\" kept", "unicode": "café ✓"},
+]
+COMPLETION = "Here are the insights:\n```json\n" + json.dumps(INSIGHTS, indent=2, ensure_ascii=False) + "\n```\nDone."
+
+
+def feed_all(chunks):
+    parser = JSONArrayStreamParser()
+    emitted = []
+    for chunk in chunks:
+        emitted.append(parser.feed(chunk))
+    return parser, emitted
+
+
+@pytest.mark.parametrize("size", [1, 3, 17, len(COMPLETION)])
+def test_objects_are_decoded_whatever_the_chunking(size):
+    parser, emitted = feed_all(COMPLETION[i:i + size] for i in range(0, len(COMPLETION), size))
+
+    assert [obj for batch in emitted for obj in batch] == INSIGHTS
+    assert parser.finished
+
+
+def test_each_object_is_emitted_as_soon_as_it_closes():
+    first = json.dumps(INSIGHTS[0])
+    parser, emitted = feed_all(["[", first[:-1], first[-1] + ",", json.dumps(INSIGHTS[1])])
+
+    assert emitted == [[], [], [INSIGHTS[0]], [INSIGHTS[1]]]
+    assert not parser.finished
+
+
+def test_malformed_elements_are_dropped_and_text_after_the_array_ignored():
+    parser, emitted = feed_all(['[{"a": 1}, {"b": oops}, "stray", 3, {"c": 2}] and [{"d": 4}]'])
+
+    assert emitted == [[{"a": 1}, {"c": 2}]]
+    assert parser.finished
+
+
+def test_text_without_an_array_yields_nothing():
+    parser, emitted = feed_all(["No insights today {\"a\": 1}"])
+
+    assert emitted == [[]]
+    assert not parser.finished
+
+
+@pytest.mark.parametrize("completion, expected", [
+    ('["a]b", {"x": 1}]', [{"x": 1}]),
+    ('[{"t":"x"}, "{oops", {"y":2}]', [{"t": "x"}, {"y": 2}]),
+    ('["say \\"]\\" twice", [1, "]", {"z": 0}], {"w": 3}]', [{"w": 3}]),
+])
+def test_brackets_in_strings_between_elements_are_text(completion, expected):
+    for size in (1, len(completion)):
+        parser, emitted = feed_all(completion[i:i + size] for i in range(0, len(completion), size))
+
+        assert [obj for batch in emitted for obj in batch] == expected
+        assert parser.finished
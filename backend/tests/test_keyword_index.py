@@ -0,0 +1,87 @@
+"""Keyword suggestion index: hashing embedder, vector index and suggestions"""
+
+import numpy as np
+
+from app.services.keyword_index import HashingEmbedder, KeywordSuggestionEngine, VectorIndex, normalize_keyword
+
+
+class CountingEmbedder(HashingEmbedder):
+    """Hashing embedder that records which texts it embedded"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return super().embed(texts)
+
+
+def test_normalize_keyword_strips_match_type_punctuation():
+    assert normalize_keyword('[Running  Shoes]') == "running shoes"
+    assert normalize_keyword('"+red +shoes"') == "red shoes"
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    texts = ["running shoes", "Running Shoes", "garden hose", ""]
+    vectors = HashingEmbedder(dim=64).embed(texts)
+
+    assert vectors.shape == (4, 64) and vectors.dtype == np.float32
+    assert np.array_equal(vectors, HashingEmbedder(dim=64).embed(texts))
+    assert np.allclose(np.linalg.norm(vectors[:3], axis=1), 1.0)
+    assert not vectors[3].any()
+    assert np.array_equal(vectors[0], vectors[1])
+    assert vectors[0] @ HashingEmbedder(dim=64).embed(["running shoe"])[0] > vectors[0] @ vectors[2]
+
+
+def test_ivf_search_agrees_with_exact_search_on_the_top_hit():
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(3000, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    exact, ivf = VectorIndex(32, exact_limit=10 ** 6), VectorIndex(32, exact_limit=1000)
+    for chunk in np.array_split(vectors, 6):
+        exact.add(chunk)
+        ivf.add(chunk)
+    assert ivf._centroids is not None and exact._centroids is None
+
+    queries = vectors[rng.choice(len(vectors), 50, replace=False)] + rng.normal(scale=0.05, size=(50, 32))
+    for query in queries.astype(np.float32):
+        exact_ids, exact_scores = exact.search(query, 5)
+        ivf_ids, ivf_scores = ivf.search(query, 5)
+        assert ivf_ids[0] == exact_ids[0]
+        assert np.all(np.diff(ivf_scores) <= 0)
+
+
+def test_suggest_excludes_seeds_and_existing_keywords():
+    engine = KeywordSuggestionEngine(HashingEmbedder())
+    engine.add_terms([
+        ("running shoes", "keyword", 50, 5),
+        ("trail running shoes", "search_term", 20, 2),
+        ("running shoes sale", "search_term", 10, 0),
+        ("red running shoes", "keyword", 5, 0),
+        ("garden hose", "keyword", 30, 3),
+    ])
+
+    suggestions = engine.suggest(["[Running Shoes]"], exclude=['"red running shoes"'], limit=5)
+    keywords = [s.keyword for s in suggestions]
+
+    assert "running shoes" not in keywords and "red running shoes" not in keywords
+    assert set(keywords) <= {"trail running shoes", "running shoes sale"}
+    assert keywords and "garden hose" not in keywords
+    assert [s.score for s in suggestions] == sorted((s.score for s in suggestions), reverse=True)
+    assert engine.suggest([], limit=5) == []
+
+
+def test_known_terms_refresh_their_stats_without_being_embedded_again():
+    embedder = CountingEmbedder()
+    engine = KeywordSuggestionEngine(embedder)
+
+    assert engine.add_terms([("running shoes", "search_term", 10, 0), ("trail shoes", "search_term", 3, 1)]) == 2
+    assert engine.add_terms([("Running Shoes", "keyword", 40, 4), ("[trail shoes]", "search_term", 1, 0),
+                             ("hiking boots", "search_term", 2, 0), ("hiking boots", "search_term", 5, 0)]) == 1
+
+    assert embedder.embedded == ["running shoes", "trail shoes", "hiking boots"]
+    assert len(engine) == len(engine.index) == 3
+    suggestion = next(s for s in engine.suggest(["trail shoes"], min_score=0) if s.keyword == "running shoes")
+    # Stats keep the maximum seen, and a term that is also a keyword counts as one
+    assert (suggestion.source, suggestion.clicks, suggestion.conversions) == ("keyword", 40.0, 4.0)
@@ -0,0 +1,65 @@
+"""MinHash/LSH keyword index"""
+
+import numpy as np
+
+from app.services.google_ads_service import KeywordData
+from app.services.keyword_minhash import KeywordMinHashIndex, shingles
+
+
+def keyword(id: str, text: str, ad_group_id: str, cost: float = 1.0) -> KeywordData:
+    return KeywordData(id=id, text=text, match_type="PHRASE", ad_group_id=ad_group_id, status="ENABLED",
+                       cpc_bid=1.0, clicks=10, conversions=1, cost=cost)
+
+
+def test_shingles_ignore_word_order_and_case():
+    assert shingles("Running Shoes") == shingles("shoes running")
+
+
+def test_signatures_are_deterministic_and_estimate_similarity():
+    index = KeywordMinHashIndex()
+    signatures = index.signatures(["red running shoes", "red running shoes", "garden hose"])
+
+    assert np.array_equal(signatures, KeywordMinHashIndex().signatures(["red running shoes", "red running shoes", "garden hose"]))
+    assert index.similarity(signatures[0], signatures[1]) == 1.0
+    assert index.similarity(signatures[0], signatures[2]) < index.threshold
+
+
+def test_same_criterion_id_in_different_ad_groups_is_indexed_twice():
+    index = KeywordMinHashIndex()
+    stats = index.sync([keyword("7", "running shoes", "100"), keyword("7", "running shoes sale", "200")])
+
+    assert stats == {"added": 2, "removed": 0, "total": 2}
+    assert sorted(entry.ad_group_id for entry, _ in index.near_duplicates("running shoes", 0.3)) == ["100", "200"]
+
+
+def test_sync_only_rehashes_new_or_changed_text():
+    index = KeywordMinHashIndex()
+    index.sync([keyword("1", "running shoes", "100"), keyword("2", "trail shoes", "100")])
+
+    stats = index.sync([keyword("1", "Running  Shoes", "100", cost=5.0), keyword("3", "hiking boots", "100")])
+
+    assert stats == {"added": 1, "removed": 1, "total": 2}
+    assert index.near_duplicates("running shoes")[0][0].cost == 5.0
+
+
+def test_filter_new_drops_near_duplicates():
+    index = KeywordMinHashIndex()
+    index.sync([keyword("1", "cheap running shoes", "100")])
+
+    assert index.filter_new(["running shoes cheap", "garden hose"]) == ["garden hose"]
+
+
+def test_cannibalization_clusters_span_ad_groups():
+    index = KeywordMinHashIndex()
+    index.sync([
+        keyword("1", "buy running shoes", "100", cost=30.0),
+        keyword("1", "running shoes buy", "200", cost=10.0),
+        keyword("2", "buy running shoe", "100", cost=5.0),
+        keyword("3", "garden hose", "300"),
+    ])
+
+    clusters = index.cannibalization_clusters()
+
+    assert len(clusters) == 1
+    assert clusters[0]["ad_group_ids"] == ["100", "200"]
+    assert [kw["cost"] for kw in clusters[0]["keywords"]][:2] == [30.0, 10.0]
@@ -0,0 +1,31 @@
+"""Meta Ads routes against the Graph API stand-in"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import meta_ads
+from app.core.cache import hash_key
+from app.services.meta_ads_service import meta_ads_service
+
+
+def client() -> TestClient:
+    app = FastAPI()
+    app.include_router(meta_ads.router)
+    return TestClient(app)
+
+
+def test_validate_probes_the_token_instead_of_trusting_the_cache(graph_stand_in):
+    # A token that was valid when last checked, then revoked
+    meta_ads_service._status_cache.set(hash_key("revoked-token"), {"connected": True, "ad_accounts_count": 2})
+
+    response = client().post("/meta-ads/auth/validate", json={"access_token": "revoked-token"})
+
+    assert response.status_code == 200
+    assert response.json()["connected"] is False
+
+
+def test_validate_accepts_a_live_token(graph_stand_in):
+    response = client().post("/meta-ads/auth/validate", json={"access_token": "test-token"})
+
+    assert response.json()["connected"] is True
+    assert response.json()["ad_accounts_count"] == 2
@@ -0,0 +1,42 @@
+"""Meta insights flattening and rollups"""
+
+import pytest
+
+from app.services.meta_insights import NON_ADDITIVE_FIELDS, flatten_insights, rollup, to_records
+
+
+ROWS = [
+    {"campaign_id": "1", "impressions": "1000", "clicks": "50", "spend": "25.5", "reach": "400", "frequency": "2.5",
+     "actions": [{"action_type": "link_click", "value": "40"}, {"action_type": "offsite_conversion.fb_pixel_purchase", "value": "3"}],
+     "conversions": [{"action_type": "purchase", "value": "3"}]},
+    {"campaign_id": "2", "impressions": "3000", "clicks": "bad", "spend": "74.5", "reach": "1000",
+     "conversions": [{"action_type": "purchase", "value": "2"}, {"action_type": "lead", "value": "5"}]},
+]
+
+
+def test_flatten_parses_numbers_and_pivots_action_types():
+    table = flatten_insights(ROWS, action_types=["purchase", "offsite_conversion.fb_pixel_purchase"])
+
+    assert list(table.index) == ["1", "2"]
+    assert table.loc["2", "clicks"] == 0.0
+    assert table.loc["1", "actions__offsite_conversion_fb_pixel_purchase"] == 3.0
+    assert table["conversions__purchase"].tolist() == [3.0, 2.0]
+    assert "conversions__lead" not in table.columns
+    assert table["conversions__total"].tolist() == [3.0, 7.0]
+    assert to_records(table)[0]["campaign_id"] == "1"
+
+
+def test_rollup_sums_counts_and_recomputes_rates():
+    totals = rollup(flatten_insights(ROWS, action_types=[]))
+
+    assert totals["spend"] == 100.0
+    assert totals["conversions__total"] == 10.0
+    assert totals["ctr"] == pytest.approx(50 / 4000 * 100)
+    assert totals["cpm"] == pytest.approx(25.0)
+
+
+def test_rollup_leaves_out_unique_people_metrics():
+    # The two campaigns may reach the same people; 1400 would overstate reach
+    totals = rollup(flatten_insights(ROWS))
+
+    assert not set(NON_ADDITIVE_FIELDS) & set(totals)
@@ -0,0 +1,75 @@
+"""Token-budgeted campaign tables and the analysis cache key"""
+
+import pytest
+
+from app.services import prompt_builder
+from app.services.ai_agent_service import ai_agent_service
+from app.services.google_ads_service import CampaignData
+from app.services.prompt_builder import CSV_COLUMNS, CampaignPromptBuilder
+
+
+@pytest.fixture(autouse=True)
+def no_tiktoken(monkeypatch):
+    """Estimate tokens offline (chars / 4) so budgets are deterministic"""
+    monkeypatch.setattr(prompt_builder, "tiktoken", None)
+
+
+def campaign(name: str, cost: float, budget: float = 10.0, currency: str = "USD") -> CampaignData:
+    return CampaignData(id=name, name=name, status="ENABLED", budget_amount=budget, budget_type="STANDARD",
+                        start_date="2026-01-01", end_date=None, currency=currency, cost=cost,
+                        impressions=1000, clicks=50, conversions=2.0)
+
+
+def test_token_counts_fall_back_to_four_chars_per_token():
+    builder = CampaignPromptBuilder()
+    assert builder.count_tokens("a" * 40) == 10
+    assert builder.count_tokens("") == 1
+
+
+def test_campaigns_are_ranked_by_spend_or_money_at_stake():
+    campaigns = [campaign("small", 5), campaign("big", 500), campaign("idle", 0, budget=1000)]
+
+    by_spend = CampaignPromptBuilder(rank_by="spend").build_table(campaigns)
+    by_impact = CampaignPromptBuilder(rank_by="impact").build_table(campaigns)
+
+    assert [row[0] for row in by_spend.rows] == ["big", "small", "idle"]
+    assert [row[0] for row in by_impact.rows] == ["idle", "big", "small"]
+    assert by_spend.text.splitlines()[0] == ",".join(CSV_COLUMNS)
+    with pytest.raises(ValueError, match="Unknown rank_by"):
+        CampaignPromptBuilder(rank_by="clicks")
+
+
+def test_rows_past_the_token_budget_are_omitted_with_a_note():
+    builder = CampaignPromptBuilder()
+    campaigns = [campaign(f"campaign {i}", cost=100 - i) for i in range(10)]
+    header = builder.count_tokens(",".join(CSV_COLUMNS) + "\n")
+    row = builder.count_tokens(builder._to_csv([builder.encode_row(campaigns[0])]))
+
+    table = builder.build_table(campaigns, token_budget=header + 3 * row)
+
+    assert (table.included, table.omitted) == (3, 7)
+    assert [r[0] for r in table.rows] == ["campaign 0", "campaign 1", "campaign 2"]
+    assert table.omitted_spend == pytest.approx(sum(100 - i for i in range(3, 10)))
+    assert table.text.endswith(f"# 7 smaller campaigns omitted (total spent {table.omitted_spend:.2f})\n")
+    assert table.tokens == header + 3 * row + builder.count_tokens(table.text.splitlines(keepends=True)[-1])
+    assert builder.build_table(campaigns).omitted == 0
+
+
+def test_cache_key_covers_everything_the_model_sees(monkeypatch):
+    top = [campaign("big", 500), campaign("mid", 50)]
+    builder = CampaignPromptBuilder()
+    builder.token_budget = builder.build_table(top).tokens  # room for exactly these two rows
+    monkeypatch.setattr(ai_agent_service, "prompt_builder", builder)
+
+    def key(campaigns):
+        cache_key, messages = ai_agent_service._build_campaign_analysis_request(campaigns)
+        return cache_key, messages[1]["content"]
+
+    base, prompt = key(top)
+    assert base == key(top)[0]
+    assert "money in USD" in prompt
+    # Same rows in the table, but a different omitted-campaigns note
+    with_tail, tail_prompt = key(top + [campaign("tiny", 1)])
+    assert "omitted" in tail_prompt and with_tail != base
+    # Same numbers in another currency
+    assert key([campaign("big", 500, currency="EUR"), campaign("mid", 50, currency="EUR")])[0] != base
@@ -0,0 +1,135 @@
+"""Per-tenant token buckets"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit
+from app.core.config import get_settings
+from app.core.rate_limit import RateLimiter, RateLimitMiddleware, parse_limit, parse_rules
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "time", clock.time)
+    return clock
+
+
+def check(limiter: RateLimiter, tenant_id: str, path: str):
+    return asyncio.run(limiter.check(tenant_id, path))
+
+
+def test_parse_rejects_malformed_and_non_positive_limits():
+    assert parse_rules("/a=5/10, /b*=1/1") == [parse_limit("/a", "5/10"), parse_limit("/b*", "1/1")]
+    with pytest.raises(ValueError, match="expected requests/seconds"):
+        parse_limit("/a", "five")
+    with pytest.raises(ValueError, match="must be positive"):
+        parse_limit("/a", "0/60")
+
+
+def test_bucket_allows_a_burst_then_refills_at_its_rate(clock):
+    limiter = RateLimiter(parse_rules("/limited=2/10"))
+
+    assert [check(limiter, "t1", "/limited").allowed for _ in range(3)] == [True, True, False]
+    limited = check(limiter, "t1", "/limited")
+    assert limited.headers()["Retry-After"] == "5"
+
+    clock.now += 5
+    assert check(limiter, "t1", "/limited").allowed
+    assert not check(limiter, "t1", "/limited").allowed
+
+
+def test_tenants_have_separate_buckets(clock):
+    limiter = RateLimiter(parse_rules("/limited=1/60"))
+
+    assert check(limiter, "t1", "/limited").allowed
+    assert not check(limiter, "t1", "/limited").allowed
+    assert check(limiter, "t2", "/limited").allowed
+
+
+def test_tenant_bucket_spans_routes_and_a_refusal_takes_no_tokens(clock):
+    limiter = RateLimiter(parse_rules("/a=5/60,/b=1/60"), tenant_rule=parse_limit("tenant", "3/60"))
+
+    assert check(limiter, "t1", "/b").allowed
+    assert not check(limiter, "t1", "/b").allowed  # route bucket empty; tenant bucket untouched
+    assert [check(limiter, "t1", "/a").allowed for _ in range(3)] == [True, True, False]
+
+
+def test_unlisted_routes_and_disabled_limiter_are_not_limited(clock):
+    assert check(RateLimiter(parse_rules("/a=1/60")), "t1", "/b") is None
+    assert check(RateLimiter(parse_rules("/a=1/60"), enabled=False), "t1", "/a") is None
+
+
+def test_default_rules_leave_local_insight_routes_alone():
+    limiter = RateLimiter(parse_rules(get_settings().rate_limit_routes))
+
+    for path in ("/api/v1/google-ads/insights", "/api/v1/google-ads/insights/stream", "/api/v1/google-ads/insights/keywords"):
+        assert limiter.match(path) is not None, path
+    for path in ("/api/v1/google-ads/insights/latest", "/api/v1/google-ads/insights/cache-stats",
+                 "/api/v1/google-ads/insights/prompt-stats"):
+        assert limiter.match(path) is None, path
+
+
+def test_middleware_answers_429_with_retry_after(clock):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=RateLimiter(parse_rules("/limited=1/30")))
+
+    @app.get("/limited")
+    async def limited():
+        return {"ok": True}
+
+    client = TestClient(app)
+    first = client.get("/limited", headers={"X-Tenant-ID": "t1"})
+    second = client.get("/limited", headers={"X-Tenant-ID": "t1"})
+
+    assert first.status_code == 200 and first.headers["X-RateLimit-Remaining"] == "0"
+    assert second.status_code == 429 and second.headers["Retry-After"] == "30"
+    assert client.get("/limited", headers={"X-Tenant-ID": "t2"}).status_code == 200
+
+
+def test_global_bucket_caps_all_tenants_on_a_route(clock):
+    limiter = RateLimiter(parse_rules("/a=2/60,/b=2/60"), global_factor=1.5)
+
+    assert [check(limiter, "t1", "/a").allowed for _ in range(2)] == [True, True]
+    assert check(limiter, "t2", "/a").allowed
+    refused = check(limiter, "t3", "/a")  # t3's own bucket is full, the route's global one is not
+    assert not refused.allowed and refused.headers()["Retry-After"] == "20"
+    assert check(limiter, "t3", "/b").allowed
+    assert asyncio.run(limiter.stats())["routes"]["/a"]["global_limit"] == "3/60"
+
+
+def test_unrecognized_or_missing_tenant_headers_are_limited_by_client_ip(clock):
+    def client_for(**options):
+        app = FastAPI()
+        app.add_middleware(RateLimitMiddleware, limiter=RateLimiter(parse_rules("/limited=1/30")), **options)
+
+        @app.get("/limited")
+        async def limited():
+            return {"ok": True}
+
+        return TestClient(app)
+
+    client = client_for(tenant_ids=["acme", "globex"])
+    assert client.get("/limited", headers={"X-Tenant-ID": "rotated-1"}).status_code == 200
+    # Another made-up tenant, or none, lands in the same per-IP bucket
+    assert client.get("/limited", headers={"X-Tenant-ID": "rotated-2"}).status_code == 429
+    assert client.get("/limited").status_code == 429
+    assert client.get("/limited", headers={"X-Tenant-ID": "acme"}).status_code == 200
+
+    # Without a tenant list any well-formed id is trusted, but malformed ones are not
+    client = client_for()
+    assert client.get("/limited", headers={"X-Tenant-ID": "t1"}).status_code == 200
+    assert client.get("/limited", headers={"X-Tenant-ID": "t2"}).status_code == 200
+    assert client.get("/limited", headers={"X-Tenant-ID": "x" * 65}).status_code == 200
+    assert client.get("/limited", headers={"X-Tenant-ID": "bad id!"}).status_code == 429
@@ -0,0 +1,118 @@
+"""Declarative rules engine"""
+
+import numpy as np
+import pytest
+
+from app.services.ai_agent_service import campaign_columns, keyword_columns
+from app.services.google_ads_service import CampaignData, KeywordData
+from app.services.rules_engine import RulesEngine, compile_templates, to_columns
+
+
+def campaign(id: str, budget: float, cost: float, currency: str = "USD", **metrics) -> CampaignData:
+    return CampaignData(id=id, name=f"Campaign {id}", status="ENABLED", budget_amount=budget, budget_type="STANDARD",
+                        start_date="2026-01-01", end_date=None, currency=currency, cost=cost, **metrics)
+
+
+def keyword(id: str, clicks: int, conversions: float, cost: float) -> KeywordData:
+    return KeywordData(id=id, text=f"keyword {id}", match_type="EXACT", ad_group_id="10", status="ENABLED",
+                       cpc_bid=1.0, clicks=clicks, conversions=conversions, cost=cost)
+
+
+def test_to_columns_fills_missing_numbers_with_zero():
+    columns = to_columns([keyword("1", 3, 0, 1.5), KeywordData("2", "b", "EXACT", "10", "ENABLED", None)],
+                         ["id", "cpc_bid", "clicks"], numeric=["cpc_bid", "clicks"])
+    assert columns["id"].tolist() == ["1", "2"]
+    assert columns["cpc_bid"].tolist() == [1.0, 0.0]
+    assert columns["clicks"].dtype == np.float64
+
+
+def test_compiled_templates_format_like_named_ones():
+    (title,), slots = compile_templates("{{literal}} {text!r} spent {cost:money} at {ctr:.1%}")
+    assert slots == (("text", False), ("cost", True), ("ctr", False))
+    assert title.format("kw", "$5.00", 0.123) == "{literal} 'kw' spent $5.00 at 12.3%"
+
+
+def test_keyword_rules_match_the_old_thresholds():
+    keywords = [keyword("poor", 11, 0, 5), keyword("expensive", 5, 0, 60), keyword("good", 20, 4, 20), keyword("quiet", 2, 0, 1)]
+    insights = RulesEngine().evaluate("keyword", keyword_columns(keywords), currency="EUR")
+
+    fired = {(i.id.rsplit("_", 1)[0], i.action_data and i.action_data.get("keyword_id")) for i in insights}
+    assert fired == {("keyword_poor", "poor"), ("keyword_expensive", None), ("keyword_good", "good")}
+    expensive = next(i for i in insights if i.id.startswith("keyword_expensive"))
+    assert "€60.00" in expensive.description
+
+
+def test_money_is_formatted_in_each_rows_currency():
+    campaigns = [campaign("1", 100, 50, "USD", clicks=10, cpc=5.0), campaign("2", 100, 5000, "JPY", clicks=10, cpc=500.0)]
+    insights = RulesEngine().evaluate("campaign", campaign_columns(campaigns), groups=["performance"])
+
+    by_campaign = {i.campaign_id: i.description for i in insights if i.id.startswith("high_cpc")}
+    assert "$5.00" in by_campaign["1"]
+    assert "¥500" in by_campaign["2"]
+
+
+def test_ids_are_stable_across_runs():
+    columns = keyword_columns([keyword("1", 11, 0, 5)])
+    engine = RulesEngine()
+    assert [i.id for i in engine.evaluate("keyword", columns)] == [i.id for i in engine.evaluate("keyword", columns)]
+
+
+def test_limit_keeps_the_highest_priority_then_costliest_matches():
+    keywords = [keyword("poor", 11, 0, 5), keyword("cheap", 5, 0, 60), keyword("pricey", 5, 0, 80),
+                keyword("good", 20, 4, 20), keyword("poorer", 12, 0, 30)]
+    engine = RulesEngine()
+    insights = engine.evaluate("keyword", keyword_columns(keywords), limit=4)
+
+    # Both priority-1 matches, the priority-2 one, then the costlier of the two priority-3 ones
+    fired = [(i.id.rsplit("_", 1)[0], i.title.rsplit(" ", 1)[-1]) for i in insights]
+    assert sorted(fired) == [("keyword_expensive", "cheap"), ("keyword_expensive", "pricey"),
+                             ("keyword_good", "good"), ("keyword_poor", "poorer")]
+    # Still in rule order, and identical to the unlimited run for what is kept
+    everything = engine.evaluate("keyword", keyword_columns(keywords))
+    assert [i.id for i in insights] == [i.id for i in everything if i.id in {k.id for k in insights}]
+
+
+def test_lazy_columns_give_the_same_insights_as_eager_ones():
+    keywords = [keyword("poor", 11, 0, 5), keyword("expensive", 5, 0, 60), keyword("good", 20, 4, 20)]
+    engine = RulesEngine()
+    eager = to_columns(keywords, list(keyword_columns(keywords)), numeric=["cpc_bid", "impressions", "clicks", "conversions", "cost"])
+
+    def strip(insights):
+        return [{**vars(i), "created_at": None} for i in insights]
+
+    assert strip(engine.evaluate("keyword", eager)) == strip(engine.evaluate("keyword", keyword_columns(keywords)))
+
+
+def test_tenant_overrides_apply_only_to_that_tenant():
+    engine = RulesEngine()
+    engine.set_tenant_overrides("t1", {
+        "keyword_poor": {"params": {"min_clicks": 50}, "title": "Needs review: {text} ({clicks:.0f} clicks)"},
+        "keyword_good": {"enabled": False},
+    })
+    columns = keyword_columns([keyword("1", 20, 0, 5), keyword("2", 60, 0, 5), keyword("3", 20, 4, 20)])
+
+    tenant = engine.evaluate("keyword", columns, tenant_id="t1")
+    default = engine.evaluate("keyword", columns)
+
+    assert [i.title for i in tenant] == ["Needs review: keyword 2 (60 clicks)"]
+    assert len(default) == 3
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"keyword_poor": {"params": {"min_clicks": "10"}}}, "must be a number"),
+    ({"keyword_poor": {"params": {"min_clicks": True}}}, "must be a number"),
+    ({"keyword_poor": {"enabled": "false"}}, "true or false"),
+    ({"keyword_poor": {"priority": 2.5}}, "integer from 1 to 5"),
+    ({"keyword_poor": {"confidence": 1.5}}, "from 0 to 1"),
+    ({"keyword_poor": {"impact": "huge"}}, "one of high"),
+    ({"keyword_poor": {"title": "{nope}"}}, "unknown field 'nope'"),
+    ({"keyword_poor": {"title": "{text"}}, "invalid title template"),
+    ({"keyword_poor": {"when": "clicks > 0"}}, "does not allow overriding"),
+    ({"keyword_poor": {"params": {"max_cost": 1}}}, "has no params"),
+    ({"no_such_rule": {"enabled": False}}, "Unknown rule"),
+])
+def test_invalid_overrides_are_rejected(overrides, message):
+    engine = RulesEngine()
+    with pytest.raises(ValueError, match=message):
+        engine.set_tenant_overrides("t1", overrides)
+    assert engine.get_tenant_overrides("t1") == {}
@@ -0,0 +1,105 @@
+"""
+Service calls against the stand-in servers
+
+Reads are checked against the stand-ins' own synthetic data, so a query the
+installed API version rejects, or a change that loses rows, fails here
+instead of in production.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.date_ranges import period_range
+from app.services.google_ads_service import google_ads_service
+from app.services.meta_ads_service import meta_ads_service
+from stand_ins.faults import ERROR, THROTTLED, FaultInjector, FaultProfile
+
+
+@pytest.fixture(scope="module")
+def customer(google_ads_stand_in):
+    """The first stand-in customer; tests here only read from it"""
+    customer_id = google_ads_stand_in.accounts.customer_ids[0]
+    return str(customer_id), google_ads_stand_in.accounts.get(customer_id)
+
+
+@pytest.fixture(scope="module")
+def ad_account(graph_stand_in):
+    account = graph_stand_in.accounts.all()[0]
+    return account.account_id, account
+
+
+def test_campaigns_load_on_installed_api_version(customer):
+    customer_id, account = customer
+    campaigns = asyncio.run(google_ads_service.get_campaigns(customer_id))
+
+    expected = account.campaigns[account.campaigns["campaign.status"] != "REMOVED"]
+    assert sorted(c.id for c in campaigns) == sorted(str(i) for i in expected["campaign.id"])
+    starts = dict(zip(expected["campaign.id"].astype(str), expected["campaign.start_date_time"].str[:10]))
+    assert all(c.start_date == starts[c.id] for c in campaigns)
+    assert all(c.budget_id for c in campaigns)
+
+
+def test_ranged_reads_match_stand_in_facts(customer):
+    customer_id, account = customer
+    date_range = period_range("LAST_7_DAYS")
+    summary = asyncio.run(google_ads_service.get_performance_summary(customer_id, date_range=date_range))
+    keywords = asyncio.run(google_ads_service.get_keywords(customer_id, date_range=date_range))
+
+    facts = account.facts[account.facts["segments.date"].between(date_range.start.isoformat(), date_range.end.isoformat())]
+    assert summary["total_impressions"] == facts["metrics.impressions"].sum()
+    assert summary["total_spend"] == pytest.approx(facts["metrics.cost_micros"].sum() / 1_000_000)
+    assert sum(k.impressions for k in keywords) <= summary["total_impressions"]
+
+
+def test_update_campaign_round_trips(google_ads_stand_in):
+    customer_id = str(google_ads_stand_in.accounts.customer_ids[1])
+    campaign = asyncio.run(google_ads_service.get_campaigns(customer_id))[0]
+
+    assert asyncio.run(google_ads_service.update_campaign(customer_id, campaign.id, {"name": "Renamed", "status": "paused"}))
+
+    account = google_ads_stand_in.accounts.get(customer_id)
+    row = account.campaigns[account.campaigns["campaign.id"].astype(str) == campaign.id].iloc[0]
+    assert (row["campaign.name"], row["campaign.status"]) == ("Renamed", "PAUSED")
+
+
+def test_meta_campaign_insights_add_up_to_account_insights(ad_account):
+    account_id, _ = ad_account
+    table = meta_ads_service.get_campaigns_insights(account_id)
+    account = meta_ads_service.get_account_insights(account_id)
+
+    assert len(table) > 0
+    assert table["impressions"].sum() == account["impressions"]
+    assert table["spend"].sum() == pytest.approx(account["spend"], abs=0.01 * len(table))
+
+
+def test_meta_ad_tree_matches_stand_in_objects(ad_account):
+    account_id, account = ad_account
+    tree = meta_ads_service.get_account_ad_tree(account_id)
+
+    visible = [c for c in account.campaigns if c["status"] != "DELETED"]
+    assert sorted(c["id"] for c in tree) == sorted(c["id"] for c in visible)
+    for campaign in tree:
+        assert all(ad_set["ads"] is not None for ad_set in campaign["ad_sets"])
+        assert campaign["ads_count"] == sum(len(ad_set["ads"]) for ad_set in campaign["ad_sets"])
+
+
+def test_fault_injection_is_deterministic_per_seed():
+    def outcomes():
+        injector = FaultInjector(FaultProfile(error_rate=0.3, seed=7))
+        return [injector.decide() for _ in range(50)]
+
+    first = outcomes()
+    assert first == outcomes()
+    assert 0 < first.count(ERROR) < 50
+
+
+def test_throttling_admits_the_burst_then_the_rate():
+    injector = FaultInjector(FaultProfile(throttle_rps=20, throttle_burst=3))
+    burst = [injector.decide() for _ in range(5)]
+    assert burst == [None, None, None, THROTTLED, THROTTLED]
+
+    time.sleep(0.06)  # a little over one token at 20 per second
+    assert injector.decide() is None
+    assert injector.stats()["throttled"] == 2
@@ -0,0 +1,38 @@
+"""Cross-platform performance against the stand-ins"""
+
+import asyncio
+import sys
+import threading
+
+from app.core.date_ranges import period_range
+from app.core.singleflight import single_flight
+from app.services.daily_metrics_cache import DailyMetricsCache
+from app.services.google_ads_service import google_ads_service
+from app.services.unified_performance import unified_performance_service
+
+
+def test_concurrent_requests_share_one_google_call(google_ads_stand_in, monkeypatch):
+    customer_id = str(google_ads_stand_in.accounts.customer_ids[0])
+    date_range = period_range("LAST_7_DAYS")
+    threads = set()
+    daily_metrics = google_ads_service._daily_metrics
+
+    def recording(*args):
+        threads.add(threading.current_thread().name)
+        return daily_metrics(*args)
+
+    monkeypatch.setattr(google_ads_service, "_daily_metrics", recording)
+    monkeypatch.setattr(sys.modules[type(google_ads_service).__module__], "daily_metrics_cache", DailyMetricsCache())  # nothing cached by earlier tests
+    before = single_flight.stats()["methods"].get("GoogleAdsService.get_performance_summary", {"executions": 0})
+
+    async def requests():
+        return await asyncio.gather(*(
+            unified_performance_service.get_google_rollup(date_range, [customer_id]) for _ in range(4)
+        ))
+
+    results = asyncio.run(requests())
+
+    after = single_flight.stats()["methods"]["GoogleAdsService.get_performance_summary"]
+    assert after["executions"] - before["executions"] == 1
+    assert all(result["accounts"][customer_id]["status"] == "ok" for result in results)
+    assert threads and all(name.startswith("google-ads") for name in threads)